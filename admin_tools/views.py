@@ -19,6 +19,7 @@ from election.controllers import elections_import_from_sample_file
 from email_outbound.models import EmailAddress
 from follow.models import FollowOrganizationList
 from friend.models import CurrentFriend, FriendManager, SuggestedFriend
+from friend.suggested_friend_refresh import refresh_suggested_friends
 from import_export_facebook.models import FacebookLinkToVoter, FacebookManager
 from import_export_google_civic.models import GoogleCivicApiCounterManager
 from import_export_vote_smart.models import VoteSmartApiCounterManager
@@ -1104,20 +1105,9 @@ def data_cleanup_voter_list_analysis_view(request):
 
     suggested_friend_created_count = 0
     if updated_suggested_friends:
-        current_friends_results = CurrentFriend.objects.all()
-
-        for one_current_friend in current_friends_results:
-            # Start with one_current_friend.viewer_voter_we_vote_id, get a list of all of that voter's friends
-            results = friend_manager.update_suggested_friends_starting_with_one_voter(
-                one_current_friend.viewer_voter_we_vote_id)
-            if results['suggested_friend_created_count']:
-                suggested_friend_created_count += results['suggested_friend_created_count']
-
-            # Then do the other side of the friendship - the viewee
-            results = friend_manager.update_suggested_friends_starting_with_one_voter(
-                one_current_friend.viewee_voter_we_vote_id)
-            if results['suggested_friend_created_count']:
-                suggested_friend_created_count += results['suggested_friend_created_count']
+        # Suggest friends of friends to every voter with a friend, a chunk of voters per query
+        results = refresh_suggested_friends(active_days=0)
+        suggested_friend_created_count = results['suggested_friend_created_count']
 
     voter_list_with_sign_in_data_query = Voter.objects.order_by('-id', '-date_last_changed')
     voter_list_with_sign_in_data_query = voter_list_with_sign_in_data_query.filter(
@@ -15,7 +15,7 @@ from measure.models import ContestMeasureManager
 from position.models import PositionMetricsManager
 from voter.models import VoterManager, VoterMetricsManager
 import wevote_functions.admin
-from wevote_functions.functions import convert_to_int, positive_value_exists
+from wevote_functions.functions import convert_to_int, normalize_we_vote_id, positive_value_exists
 
 logger = wevote_functions.admin.get_logger(__name__)
 
@@ -80,7 +80,7 @@ def augment_one_voter_analytics_action_entries_without_election_id(voter_we_vote
     analytics_updated_count = 0
     try:
         voter_history_query = AnalyticsAction.objects.using('analytics').all()
-        voter_history_query = voter_history_query.filter(voter_we_vote_id__iexact=voter_we_vote_id)
+        voter_history_query = voter_history_query.filter(voter_we_vote_id=normalize_we_vote_id(voter_we_vote_id))
         if positive_value_exists(starting_analytics_action_id):
             voter_history_query = voter_history_query.filter(id__gte=starting_analytics_action_id)
         voter_history_query = voter_history_query.order_by("id")  # order by oldest first
@@ -10,7 +10,7 @@ from exception.models import print_to_log
 from follow.models import FollowOrganizationList
 from organization.models import Organization
 import wevote_functions.admin
-from wevote_functions.functions import convert_to_int, positive_value_exists
+from wevote_functions.functions import convert_to_int, normalize_we_vote_id, positive_value_exists
 
 ACTION_VOTER_GUIDE_VISIT = 1
 ACTION_VOTER_GUIDE_ENTRY = 2  # DEPRECATED: Now we use ACTION_VOTER_GUIDE_VISIT + first_visit
@@ -197,7 +197,8 @@ class AnalyticsCountManager(models.Model):
             first_visit_query = AnalyticsAction.objects.using('analytics').all()
             first_visit_query = first_visit_query.filter(Q(action_constant=ACTION_VOTER_GUIDE_VISIT) |
                                                          Q(action_constant=ACTION_ORGANIZATION_AUTO_FOLLOW))
-            first_visit_query = first_visit_query.filter(organization_we_vote_id__iexact=organization_we_vote_id)
+            first_visit_query = first_visit_query.filter(
+                organization_we_vote_id=normalize_we_vote_id(organization_we_vote_id))
             if positive_value_exists(google_civic_election_id):
                 first_visit_query = first_visit_query.filter(google_civic_election_id=google_civic_election_id)
             first_visit_query = first_visit_query.filter(first_visit_today=True)
@@ -317,7 +318,7 @@ class AnalyticsCountManager(models.Model):
                 count_query = count_query.filter(google_civic_election_id=google_civic_election_id)
             if positive_value_exists(organization_we_vote_id):
                 count_query = count_query.filter(action_constant=ACTION_VOTER_GUIDE_VISIT)
-                count_query = count_query.filter(organization_we_vote_id__iexact=organization_we_vote_id)
+                count_query = count_query.filter(organization_we_vote_id=normalize_we_vote_id(organization_we_vote_id))
             if positive_value_exists(limit_to_one_date_as_integer):
                 count_query = count_query.filter(date_as_integer=limit_to_one_date_as_integer)
             elif positive_value_exists(count_through_this_date_as_integer):
@@ -342,7 +343,7 @@ class AnalyticsCountManager(models.Model):
             count_query = AnalyticsAction.objects.using('analytics').all()
             count_query = count_query.filter(Q(action_constant=ACTION_VOTER_GUIDE_VISIT) |
                                              Q(action_constant=ACTION_ORGANIZATION_AUTO_FOLLOW))
-            count_query = count_query.filter(organization_we_vote_id__iexact=organization_we_vote_id)
+            count_query = count_query.filter(organization_we_vote_id=normalize_we_vote_id(organization_we_vote_id))
             count_query = count_query.filter(google_civic_election_id=google_civic_election_id)
             count_query = count_query.filter(first_visit_today=True)
             count_query = count_query.values('voter_we_vote_id').distinct()
@@ -363,7 +364,7 @@ class AnalyticsCountManager(models.Model):
             count_query = count_query.filter(Q(action_constant=ACTION_ORGANIZATION_FOLLOW) |
                                              Q(action_constant=ACTION_ORGANIZATION_AUTO_FOLLOW))
             if positive_value_exists(organization_we_vote_id):
-                count_query = count_query.filter(organization_we_vote_id__iexact=organization_we_vote_id)
+                count_query = count_query.filter(organization_we_vote_id=normalize_we_vote_id(organization_we_vote_id))
             count_query = count_query.filter(google_civic_election_id=google_civic_election_id)
             count_query = count_query.values('voter_we_vote_id').distinct()
             count_result = count_query.count()
@@ -382,7 +383,7 @@ class AnalyticsCountManager(models.Model):
             count_query = AnalyticsAction.objects.using('analytics').all()
             count_query = count_query.filter(action_constant=ACTION_ORGANIZATION_AUTO_FOLLOW)
             if positive_value_exists(organization_we_vote_id):
-                count_query = count_query.filter(organization_we_vote_id__iexact=organization_we_vote_id)
+                count_query = count_query.filter(organization_we_vote_id=normalize_we_vote_id(organization_we_vote_id))
             count_query = count_query.filter(google_civic_election_id=google_civic_election_id)
             count_query = count_query.values('voter_we_vote_id').distinct()
             count_result = count_query.count()
@@ -394,7 +395,7 @@ class AnalyticsCountManager(models.Model):
         count_result = None
         try:
             count_query = AnalyticsAction.objects.using('analytics').all()
-            count_query = count_query.filter(voter_we_vote_id__iexact=voter_we_vote_id)
+            count_query = count_query.filter(voter_we_vote_id=normalize_we_vote_id(voter_we_vote_id))
             count_result = count_query.count()
         except Exception as e:
             pass
@@ -404,7 +405,7 @@ class AnalyticsCountManager(models.Model):
         count_result = None
         try:
             count_query = AnalyticsAction.objects.using('analytics').all()
-            count_query = count_query.filter(voter_we_vote_id__iexact=voter_we_vote_id)
+            count_query = count_query.filter(voter_we_vote_id=normalize_we_vote_id(voter_we_vote_id))
             count_query = count_query.filter(action_constant=ACTION_BALLOT_VISIT)
             count_result = count_query.count()
         except Exception as e:
@@ -415,7 +416,7 @@ class AnalyticsCountManager(models.Model):
         count_result = None
         try:
             count_query = AnalyticsAction.objects.using('analytics').all()
-            count_query = count_query.filter(voter_we_vote_id__iexact=voter_we_vote_id)
+            count_query = count_query.filter(voter_we_vote_id=normalize_we_vote_id(voter_we_vote_id))
             count_query = count_query.filter(action_constant=ACTION_WELCOME_VISIT)
             count_result = count_query.count()
         except Exception as e:
@@ -426,7 +427,7 @@ class AnalyticsCountManager(models.Model):
         count_result = None
         try:
             count_query = AnalyticsAction.objects.using('analytics').all()
-            count_query = count_query.filter(voter_we_vote_id__iexact=voter_we_vote_id)
+            count_query = count_query.filter(voter_we_vote_id=normalize_we_vote_id(voter_we_vote_id))
             count_query = count_query.values('date_as_integer').distinct()
             count_result = count_query.count()
         except Exception as e:
@@ -437,7 +438,7 @@ class AnalyticsCountManager(models.Model):
         last_action_date = None
         try:
             fetch_query = AnalyticsAction.objects.using('analytics').all()
-            fetch_query = fetch_query.filter(voter_we_vote_id__iexact=voter_we_vote_id)
+            fetch_query = fetch_query.filter(voter_we_vote_id=normalize_we_vote_id(voter_we_vote_id))
             fetch_query = fetch_query.order_by('-id')
             fetch_query = fetch_query[:1]
             fetch_result = list(fetch_query)
@@ -451,7 +452,7 @@ class AnalyticsCountManager(models.Model):
         count_result = 0
         try:
             count_query = AnalyticsAction.objects.using('analytics').all()
-            count_query = count_query.filter(voter_we_vote_id__iexact=voter_we_vote_id)
+            count_query = count_query.filter(voter_we_vote_id=normalize_we_vote_id(voter_we_vote_id))
             count_query = count_query.filter(action_constant=ACTION_VOTER_GUIDE_VISIT)
             count_query = count_query.values('organization_we_vote_id').distinct()
             count_result = count_query.count()
@@ -604,6 +605,58 @@ class AnalyticsManager(models.Model):
         }
         return results
 
+    def create_action_type2_list(
+            self, action_constant_list, voter_we_vote_id, voter_id, is_signed_in, state_code="",
+            google_civic_election_id=0, user_agent_string="", is_bot=False, is_mobile=False, is_desktop=False,
+            is_tablet=False):
+        """
+        Create the AnalyticsAction entries for several actions by one voter (that don't need organization ids) with
+        one INSERT
+        """
+        status = ""
+        actions_saved = 0
+        if not action_constant_list or not voter_we_vote_id:
+            results = {
+                'success':          True,
+                'status':           'NO_ACTIONS_OR_MISSING_VOTER_WE_VOTE_ID ',
+                'actions_saved':    actions_saved,
+            }
+            return results
+
+        action_list = []
+        for action_constant in action_constant_list:
+            action = AnalyticsAction(
+                action_constant=action_constant,
+                voter_we_vote_id=voter_we_vote_id,
+                voter_id=voter_id,
+                is_signed_in=is_signed_in,
+                state_code=state_code,
+                google_civic_election_id=google_civic_election_id,
+                user_agent=user_agent_string,
+                is_bot=is_bot,
+                is_mobile=is_mobile,
+                is_desktop=is_desktop,
+                is_tablet=is_tablet
+            )
+            # bulk_create doesn't call save(), which sets date_as_integer
+            action.generate_date_as_integer()
+            action_list.append(action)
+        try:
+            AnalyticsAction.objects.using('analytics').bulk_create(action_list)
+            success = True
+            actions_saved = len(action_list)
+            status += 'ACTION_TYPE2_LIST_SAVED '
+        except Exception as e:
+            success = False
+            status += 'COULD_NOT_SAVE_ACTION_TYPE2_LIST ' + str(e) + ' '
+
+        results = {
+            'success':          success,
+            'status':           status,
+            'actions_saved':    actions_saved,
+        }
+        return results
+
     def retrieve_analytics_action_list(self, voter_we_vote_id='', google_civic_election_id=0):
         success = False
         status = ""
@@ -612,7 +665,7 @@ class AnalyticsManager(models.Model):
         try:
             list_query = AnalyticsAction.objects.using('analytics').all()
             if positive_value_exists(voter_we_vote_id):
-                list_query = list_query.filter(voter_we_vote_id__iexact=voter_we_vote_id)
+                list_query = list_query.filter(voter_we_vote_id=normalize_we_vote_id(voter_we_vote_id))
             if positive_value_exists(google_civic_election_id):
                 list_query = list_query.filter(google_civic_election_id=google_civic_election_id)
             analytics_action_list = list(list_query)
@@ -843,7 +896,7 @@ class AnalyticsManager(models.Model):
             try:
                 metrics_saved, created = OrganizationElectionMetrics.objects.using('analytics').update_or_create(
                     google_civic_election_id=google_civic_election_id,
-                    organization_we_vote_id__iexact=organization_we_vote_id,
+                    organization_we_vote_id=normalize_we_vote_id(organization_we_vote_id),
                     defaults=organization_election_metrics_values
                 )
             except Exception as e:
@@ -923,7 +976,7 @@ class AnalyticsManager(models.Model):
 
             try:
                 metrics_saved, created = SitewideVoterMetrics.objects.using('analytics').update_or_create(
-                    voter_we_vote_id__iexact=voter_we_vote_id,
+                    voter_we_vote_id=normalize_we_vote_id(voter_we_vote_id),
                     defaults=sitewide_voter_metrics_values
                 )
                 success = True
@@ -949,7 +1002,7 @@ class AnalyticsManager(models.Model):
 
     def sitewide_voter_metrics_for_this_voter_updated_this_date(self, voter_we_vote_id, updated_date_integer):
         updated_on_date_query = SitewideVoterMetrics.objects.using('analytics').filter(
-            voter_we_vote_id__iexact=voter_we_vote_id,
+            voter_we_vote_id=normalize_we_vote_id(voter_we_vote_id),
             last_calculated_date_as_integer=updated_date_integer
         )
         return positive_value_exists(updated_on_date_query.count())
@@ -1016,7 +1069,8 @@ class AnalyticsManager(models.Model):
                     first_visit_query = AnalyticsAction.objects.using('analytics').all()
                     first_visit_query = first_visit_query.order_by("id")  # order by oldest first
                     first_visit_query = first_visit_query.filter(date_as_integer=one_date_as_integer)
-                    first_visit_query = first_visit_query.filter(voter_we_vote_id__iexact=voter_we_vote_id)
+                    first_visit_query = first_visit_query.filter(
+                        voter_we_vote_id=normalize_we_vote_id(voter_we_vote_id))
                     analytics_action = first_visit_query.first()
 
                     if not analytics_action.first_visit_today:
@@ -1046,7 +1100,7 @@ class AnalyticsManager(models.Model):
         # Get distinct days
         try:
             distinct_days_query = AnalyticsAction.objects.using('analytics').all()
-            distinct_days_query = distinct_days_query.filter(voter_we_vote_id__iexact=voter_we_vote_id)
+            distinct_days_query = distinct_days_query.filter(voter_we_vote_id=normalize_we_vote_id(voter_we_vote_id))
             distinct_days_query = distinct_days_query.values('date_as_integer').distinct()
             distinct_days_list = list(distinct_days_query)
         except Exception as e:
@@ -1063,7 +1117,7 @@ class AnalyticsManager(models.Model):
                 first_visit_query = AnalyticsAction.objects.using('analytics').all()
                 first_visit_query = first_visit_query.order_by("id")  # order by oldest first
                 first_visit_query = first_visit_query.filter(date_as_integer=one_date_as_integer)
-                first_visit_query = first_visit_query.filter(voter_we_vote_id__iexact=voter_we_vote_id)
+                first_visit_query = first_visit_query.filter(voter_we_vote_id=normalize_we_vote_id(voter_we_vote_id))
                 analytics_action = first_visit_query.first()
 
                 analytics_action.first_visit_today = True
@@ -22,7 +22,7 @@ from election.models import Election
 from exception.models import print_to_log
 from voter.models import voter_has_authority
 import wevote_functions.admin
-from wevote_functions.functions import convert_to_int, positive_value_exists
+from wevote_functions.functions import convert_to_int, normalize_we_vote_id, positive_value_exists
 
 logger = wevote_functions.admin.get_logger(__name__)
 
@@ -112,7 +112,8 @@ def organization_analytics_index_view(request):
         organization_election_metrics_query = OrganizationElectionMetrics.objects.using('analytics').\
             order_by('-election_day_text')
         organization_election_metrics_query = \
-            organization_election_metrics_query.filter(organization_we_vote_id__iexact=organization_we_vote_id)
+            organization_election_metrics_query.filter(
+                organization_we_vote_id=normalize_we_vote_id(organization_we_vote_id))
         organization_election_metrics_query = organization_election_metrics_query[:3]
         organization_election_metrics_list = list(organization_election_metrics_query)
     except OrganizationElectionMetrics.DoesNotExist:
@@ -124,7 +125,8 @@ def organization_analytics_index_view(request):
         organization_daily_metrics_query = \
             OrganizationDailyMetrics.objects.using('analytics').order_by('-date_as_integer')
         organization_daily_metrics_query = \
-            organization_daily_metrics_query.filter(organization_we_vote_id__iexact=organization_we_vote_id)
+            organization_daily_metrics_query.filter(
+                organization_we_vote_id=normalize_we_vote_id(organization_we_vote_id))
         organization_daily_metrics_query = organization_daily_metrics_query[:3]
         organization_daily_metrics_list = list(organization_daily_metrics_query)
     except OrganizationDailyMetrics.DoesNotExist:
@@ -201,12 +203,13 @@ def analytics_action_list_view(request, voter_we_vote_id=False, organization_we_
     try:
         analytics_action_query = AnalyticsAction.objects.using('analytics').order_by('-id')
         if positive_value_exists(voter_we_vote_id):
-            analytics_action_query = analytics_action_query.filter(voter_we_vote_id__iexact=voter_we_vote_id)
+            analytics_action_query = analytics_action_query.filter(
+                voter_we_vote_id=normalize_we_vote_id(voter_we_vote_id))
         if positive_value_exists(google_civic_election_id):
             analytics_action_query = analytics_action_query.filter(google_civic_election_id=google_civic_election_id)
         if positive_value_exists(organization_we_vote_id):
             analytics_action_query = analytics_action_query.filter(
-                organization_we_vote_id__iexact=organization_we_vote_id)
+                organization_we_vote_id=normalize_we_vote_id(organization_we_vote_id))
 
         if positive_value_exists(analytics_action_search):
             search_words = analytics_action_search.split()
@@ -302,7 +305,7 @@ def organization_daily_metrics_view(request):
         organization_daily_metrics_query = OrganizationDailyMetrics.objects.using('analytics').\
             order_by('-date_as_integer')
         organization_daily_metrics_query = organization_daily_metrics_query.filter(
-            organization_we_vote_id__iexact=organization_we_vote_id)
+            organization_we_vote_id=normalize_we_vote_id(organization_we_vote_id))
         organization_daily_metrics_list = list(organization_daily_metrics_query)
     except OrganizationDailyMetrics.DoesNotExist:
         # This is fine
@@ -378,7 +381,8 @@ def organization_election_metrics_view(request):
                 organization_election_metrics_query.filter(google_civic_election_id=google_civic_election_id)
         if positive_value_exists(organization_we_vote_id):
             organization_election_metrics_query = \
-                organization_election_metrics_query.filter(organization_we_vote_id__iexact=organization_we_vote_id)
+                organization_election_metrics_query.filter(
+                    organization_we_vote_id=normalize_we_vote_id(organization_we_vote_id))
         organization_election_metrics_list = list(organization_election_metrics_query)
     except OrganizationElectionMetrics.DoesNotExist:
         # This is fine
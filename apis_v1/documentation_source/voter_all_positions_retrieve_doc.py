@@ -26,6 +26,18 @@ def voter_all_positions_retrieve_doc_template_values(url_root):
             'description':  'The unique identifier for a particular election. If not provided, return all positions'
                             ' for this voter.',
         },
+        {
+            'name':         'after_position_key',
+            'value':        'string',  # boolean, integer, long, string
+            'description':  'The next_position_key returned with the previous page of positions. '
+                            'Leave out to retrieve the first page. Turns on paging, like page_size.',
+        },
+        {
+            'name':         'page_size',
+            'value':        'integer',  # boolean, integer, long, string
+            'description':  'The largest number of positions to return in one page (no more than 1000). '
+                            'If neither page_size nor after_position_key is provided, all positions are returned.',
+        },
     ]
 
     potential_status_codes_list = [
@@ -43,7 +55,10 @@ def voter_all_positions_retrieve_doc_template_values(url_root):
                    '     "ballot_item_we_vote_id": string,\n' \
                    '     "is_support": boolean,\n' \
                    '     "is_oppose": boolean,\n' \
+                   '     "statement_text": string,\n' \
+                   '     "is_public_position": boolean,\n' \
                    '   ],\n' \
+                   '  "next_position_key": string (empty on the last page),\n' \
                    '}'
 
     template_values = {
@@ -60,7 +75,10 @@ def voter_all_positions_retrieve_doc_template_values(url_root):
         'optional_query_parameter_list': optional_query_parameter_list,
         'api_response': api_response,
         'api_response_notes':
-            "",
+            "Without page_size or after_position_key, all of the voter's positions are returned, public positions "
+            "first, then positions for friends, with the most recent election last in each. With them, public "
+            "positions and then positions for friends are returned in the order they were first saved, one page at "
+            "a time. While next_position_key is not empty, pass it as after_position_key to retrieve the next page.",
         'potential_status_codes_list': potential_status_codes_list,
     }
     return template_values
@@ -6,6 +6,8 @@ from django.urls import reverse
 from django.test import TestCase
 import json
 from organization.models import Organization
+from unittest import mock
+from voter.models import Voter, VoterManager
 
 
 class WeVoteAPIsV1TestsVoterGuidesToFollowRetrieve(TestCase):
@@ -152,3 +154,16 @@ class WeVoteAPIsV1TestsVoterGuidesToFollowRetrieve(TestCase):
                              "owner_voter_id expected in voterGuidesToFollowRetrieveView json but not found")
             self.assertEqual('last_updated' in one_voter_guide, True,
                              "last_updated expected in voterGuidesToFollowRetrieveView json but not found")
+
+    def test_retrieve_reads_voter_from_readonly(self):
+        response = self.client.get(self.generate_voter_device_id_url)
+        voter_device_id = json.loads(response.content.decode())['voter_device_id']
+        self.client.get(self.voter_create_url, {'voter_device_id': voter_device_id})
+        voter = Voter.objects.get()
+
+        retrieve_voter_by_id = VoterManager.retrieve_voter_by_id
+        with mock.patch.object(VoterManager, 'retrieve_voter_by_id', autospec=True,
+                               side_effect=retrieve_voter_by_id) as retrieve_voter_by_id_mock:
+            response = self.client.get(self.voter_guides_to_follow_retrieve_url, {'voter_device_id': voter_device_id})
+        self.assertTrue(json.loads(response.content.decode())['success'])
+        retrieve_voter_by_id_mock.assert_any_call(mock.ANY, voter.id, read_only=True)
@@ -6,7 +6,9 @@ from future.standard_library import install_aliases
 from django.urls import reverse
 from django.test import TestCase
 from django.test import Client
+from django.test import override_settings
 import json
+from voter.models import Voter
 install_aliases()
 
 
@@ -79,3 +81,32 @@ class WeVoteAPIsV1TestsVoterRetrieve(TestCase):
                          "last_name expected in the voterRetrieveView json response but not found")
         self.assertEqual('email' in json_data3, True,
                          "email expected in the voterRetrieveView json response but not found")
+
+    @override_settings(CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+        'voter_identity': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+        'voter_profile': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'voter_profile'},
+    })
+    def test_retrieve_from_voter_profile_cache(self):
+        response = self.client2.get(self.generate_voter_device_id_url)
+        voter_device_id = json.loads(response.content.decode())['voter_device_id']
+        self.client2.get(self.voter_create_url, {'voter_device_id': voter_device_id})
+
+        json_data = json.loads(self.client2.get(
+            self.voter_retrieve_url, {'voter_device_id': voter_device_id}).content.decode())
+        self.assertNotIn('VOTER_PROFILE_FROM_CACHE', json_data['status'])
+
+        json_data2 = json.loads(self.client2.get(
+            self.voter_retrieve_url, {'voter_device_id': voter_device_id}).content.decode())
+        self.assertIn('VOTER_PROFILE_FROM_CACHE', json_data2['status'])
+        self.assertEqual(json_data2['we_vote_id'], json_data['we_vote_id'])
+        self.assertEqual(json_data2['linked_organization_we_vote_id'], json_data['linked_organization_we_vote_id'])
+
+        # Saving the voter clears the cached profile
+        voter = Voter.objects.get(we_vote_id=json_data['we_vote_id'])
+        voter.first_name = "Ada"
+        voter.save()
+        json_data3 = json.loads(self.client2.get(
+            self.voter_retrieve_url, {'voter_device_id': voter_device_id}).content.decode())
+        self.assertNotIn('VOTER_PROFILE_FROM_CACHE', json_data3['status'])
+        self.assertEqual(json_data3['first_name'], "Ada")
@@ -7,12 +7,14 @@ import json
 from ballot.controllers import figure_out_google_civic_election_id_voter_is_watching
 from ballot.models import OFFICE, CANDIDATE, MEASURE
 from position.controllers import calculate_positions_count_for_all_ballot_items_for_api, \
+    count_for_all_ballot_items_from_position_index_for_api, \
     count_for_all_ballot_items_from_position_network_score_for_api, \
     position_list_for_ballot_item_for_api, position_list_for_opinion_maker_for_api, \
     position_list_for_voter_for_api, \
     position_retrieve_for_api, position_save_for_api
 from position.models import ANY_STANCE, SUPPORT, STILL_DECIDING, INFORMATION_ONLY, NO_STANCE, OPPOSE, PERCENT_RATING, \
     FRIENDS_ONLY, PUBLIC_ONLY, FRIENDS_AND_PUBLIC
+from position.position_index import POSITION_COUNT_ENGINE, READ_TIME_INDEX
 from position_like.controllers import position_like_count_for_api
 from support_oppose_deciding.controllers import position_oppose_count_for_ballot_item_for_api, \
     position_support_count_for_ballot_item_for_api, \
@@ -371,6 +373,20 @@ def positions_count_for_all_ballot_items_view(request):  # positionsCountForAllB
     google_civic_election_id = request.GET.get('google_civic_election_id', 0)
     force_recount = request.GET.get('force_recount', 0)
 
+    if POSITION_COUNT_ENGINE == READ_TIME_INDEX:
+        # Counts are computed from the positions themselves, so a recount rebuilds this worker's index of them
+        results = count_for_all_ballot_items_from_position_index_for_api(
+            voter_device_id=voter_device_id,
+            google_civic_election_id=google_civic_election_id,
+            force_recount=positive_value_exists(force_recount))
+        json_data = {
+            'status':                   results['status'],
+            'success':                  results['success'],
+            'google_civic_election_id': results['google_civic_election_id'],
+            'position_counts_list':     results['position_counts_list'],
+        }
+        return HttpResponse(json.dumps(json_data), content_type='application/json')
+
     if positive_value_exists(force_recount):
         # Calculate the positions from source tables
         calculate_results = calculate_positions_count_for_all_ballot_items_for_api(
@@ -35,6 +35,7 @@ from voter.controllers import voter_address_retrieve_for_api, voter_create_for_a
     voter_split_into_two_accounts_for_api
 from voter.models import BALLOT_ADDRESS, VoterAddress, \
     VoterAddressManager, VoterDeviceLink, VoterDeviceLinkManager, VoterManager
+from voter.voter_context import fetch_voter_context
 from voter_guide.controllers import voter_follow_all_organizations_followed_by_organization_for_api
 import wevote_functions.admin
 from wevote_functions.functions import convert_to_int, get_maximum_number_to_retrieve_from_request, \
@@ -579,7 +580,8 @@ def voter_ballot_items_retrieve_view(request):  # voterBallotItemsRetrieve
         google_civic_election_id = 2000  # The Google Civic test election
 
     json_data = voter_ballot_items_retrieve_for_api(voter_device_id, google_civic_election_id,
-                                                    ballot_returned_we_vote_id, ballot_location_shortcut)
+                                                    ballot_returned_we_vote_id, ballot_location_shortcut,
+                                                    voter_context=fetch_voter_context(request))
 
     return HttpResponse(json.dumps(json_data), content_type='application/json')
 
@@ -1109,10 +1111,14 @@ def voter_all_positions_retrieve_view(request):  # voterAllPositionsRetrieve
     """
     voter_device_id = get_voter_device_id(request)  # We standardize how we take in the voter_device_id
     google_civic_election_id = request.GET.get('google_civic_election_id', 0)
+    after_position_key = request.GET.get('after_position_key', '')
+    page_size = request.GET.get('page_size', 0)
 
     return voter_all_positions_retrieve_for_api(
         voter_device_id=voter_device_id,
-        google_civic_election_id=google_civic_election_id
+        google_civic_election_id=google_civic_election_id,
+        after_position_key=after_position_key,
+        page_size=page_size
     )
 
 
@@ -1266,7 +1272,8 @@ def voter_retrieve_view(request):  # voterRetrieve
 
     results = voter_retrieve_for_api(voter_device_id=voter_device_id,
                                      state_code_from_ip_address=state_code_from_ip_address,
-                                     user_agent_string=user_agent_string, user_agent_object=user_agent_object)
+                                     user_agent_string=user_agent_string, user_agent_object=user_agent_object,
+                                     voter_context=fetch_voter_context(request))
     return HttpResponse(json.dumps(results), content_type='application/json')
 
 
@@ -6,7 +6,8 @@ from ballot.controllers import choose_election_from_existing_data
 from config.base import get_environment_variable
 from django.http import HttpResponse
 import json
-from voter.models import VoterAddress, VoterAddressManager, VoterDeviceLinkManager
+from voter.models import VoterAddress, VoterAddressManager
+from voter.voter_context import fetch_voter_context
 from voter_guide.controllers import voter_guide_possibility_retrieve_for_api, voter_guide_possibility_save_for_api, \
     voter_guide_save_for_api, \
     voter_guides_followed_retrieve_for_api, voter_guides_ignored_retrieve_for_api, voter_guides_retrieve_for_api, \
@@ -134,8 +135,7 @@ def voter_guides_to_follow_retrieve_view(request):  # voterGuidesToFollowRetriev
             # If here we don't have either a ballot_item or a google_civic_election_id.
             # Look in the places we cache google_civic_election_id
             google_civic_election_id = 0
-            voter_device_link_manager = VoterDeviceLinkManager()
-            voter_device_link_results = voter_device_link_manager.retrieve_voter_device_link(voter_device_id)
+            voter_device_link_results = fetch_voter_context(request).retrieve_voter_device_link_results()
             voter_device_link = voter_device_link_results['voter_device_link']
             if voter_device_link_results['voter_device_link_found']:
                 voter_id = voter_device_link.voter_id
@@ -157,7 +157,8 @@ def voter_guides_to_follow_retrieve_view(request):  # voterGuidesToFollowRetriev
                                                       google_civic_election_id, search_string,
                                                       start_retrieve_at_this_number, maximum_number_to_retrieve,
                                                       filter_voter_guides_by_issue,
-                                                      add_voter_guides_not_from_election)
+                                                      add_voter_guides_not_from_election,
+                                                      voter_context=fetch_voter_context(request))
     return HttpResponse(json.dumps(results['json_data']), content_type='application/json')
 
 
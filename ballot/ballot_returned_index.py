@@ -0,0 +1,202 @@
+# ballot/ballot_returned_index.py
+# Brought to you by We Vote. Be good.
+# -*- coding: UTF-8 -*-
+
+from collections import OrderedDict
+from config.base import get_environment_variable_default
+from heapq import heappush, heappushpop
+import math
+import threading
+import time
+from wevote_functions.functions import convert_to_int, positive_value_exists
+
+# False to always search the database (bounded by latitude and longitude) instead of the in-memory index
+BALLOT_RETURNED_INDEX_ON = positive_value_exists(get_environment_variable_default("BALLOT_RETURNED_INDEX_ON", True))
+# How many seconds an election's index can be used before it is rebuilt from the database. Saving or deleting a
+# BallotReturned marks its election's index stale right away in the worker that made the change.
+BALLOT_RETURNED_INDEX_TIME_TO_LIVE = \
+    convert_to_int(get_environment_variable_default("BALLOT_RETURNED_INDEX_TIME_TO_LIVE", 300))
+# How many elections each worker keeps indexed at one time
+BALLOT_RETURNED_INDEX_MAXIMUM_ELECTIONS = 10
+# The width, in degrees of latitude and longitude, of each grid cell. About 11 km at 0.1.
+BALLOT_RETURNED_INDEX_CELL_SIZE = 0.1
+
+
+class BallotReturnedLocationGrid(object):
+    """
+    Points bucketed into square cells, so the nearest ones can be found by searching outward from the cell the
+    search point is in, instead of measuring the distance to every point. Distances are the same squared difference
+    in degrees that find_closest_ballot_returned has always ordered by.
+    """
+
+    def __init__(self, cell_size=BALLOT_RETURNED_INDEX_CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells = {}  # (row, column) -> [(latitude, longitude, ballot_returned_id), ...]
+        self.minimum_row = None
+        self.maximum_row = None
+        self.minimum_column = None
+        self.maximum_column = None
+        self.point_count = 0
+
+    def cell_for(self, latitude, longitude):
+        return int(math.floor(latitude / self.cell_size)), int(math.floor(longitude / self.cell_size))
+
+    def add(self, latitude, longitude, ballot_returned_id):
+        row, column = self.cell_for(latitude, longitude)
+        self.cells.setdefault((row, column), []).append((latitude, longitude, ballot_returned_id))
+        self.minimum_row = row if self.minimum_row is None else min(self.minimum_row, row)
+        self.maximum_row = row if self.maximum_row is None else max(self.maximum_row, row)
+        self.minimum_column = column if self.minimum_column is None else min(self.minimum_column, column)
+        self.maximum_column = column if self.maximum_column is None else max(self.maximum_column, column)
+        self.point_count += 1
+
+    def cells_in_ring(self, center_row, center_column, ring):
+        if ring == 0:
+            yield center_row, center_column
+            return
+        for column in range(center_column - ring, center_column + ring + 1):
+            yield center_row - ring, column
+            yield center_row + ring, column
+        for row in range(center_row - ring + 1, center_row + ring):
+            yield row, center_column - ring
+            yield row, center_column + ring
+
+    def find_nearest(self, latitude, longitude, number_to_find=1):
+        """
+        Return up to number_to_find (distance, ballot_returned_id) tuples, nearest first
+        :param latitude:
+        :param longitude:
+        :param number_to_find:
+        :return:
+        """
+        if not self.point_count or number_to_find < 1:
+            return []
+        center_row, center_column = self.cell_for(latitude, longitude)
+        # Once we are this many rings out, we have looked at every cell
+        last_ring = max(abs(center_row - self.minimum_row), abs(center_row - self.maximum_row),
+                        abs(center_column - self.minimum_column), abs(center_column - self.maximum_column))
+        nearest_heap = []  # (-distance, ballot_returned_id), so the farthest of the nearest is on top
+        ring = 0
+        while ring <= last_ring:
+            for cell in self.cells_in_ring(center_row, center_column, ring):
+                for point_latitude, point_longitude, ballot_returned_id in self.cells.get(cell, ()):
+                    distance = (point_latitude - latitude) ** 2 + (point_longitude - longitude) ** 2
+                    if len(nearest_heap) < number_to_find:
+                        heappush(nearest_heap, (-distance, ballot_returned_id))
+                    elif distance < -nearest_heap[0][0]:
+                        heappushpop(nearest_heap, (-distance, ballot_returned_id))
+            # Every point we haven't looked at is at least this far away, in latitude or in longitude
+            unsearched_distance = (ring * self.cell_size) ** 2
+            if len(nearest_heap) == number_to_find and -nearest_heap[0][0] <= unsearched_distance:
+                break
+            ring += 1
+        return sorted((-negative_distance, ballot_returned_id)
+                      for negative_distance, ballot_returned_id in nearest_heap)
+
+
+class ElectionBallotReturnedIndex(object):
+    """
+    The locations of one election's polling location ballots, in one grid per state and one for all of them
+    """
+
+    def __init__(self, google_civic_election_id):
+        self.google_civic_election_id = convert_to_int(google_civic_election_id)
+        self.grid_by_state_code = {}
+        self.grid_for_all_states = BallotReturnedLocationGrid()
+        self.time_built = None
+        self.stale = False
+
+    def build(self, ballot_returned_location_list):
+        """
+        :param ballot_returned_location_list: (ballot_returned_id, latitude, longitude, normalized_state) tuples
+        :return:
+        """
+        grid_by_state_code = {}
+        grid_for_all_states = BallotReturnedLocationGrid()
+        for ballot_returned_id, latitude, longitude, normalized_state in ballot_returned_location_list:
+            if latitude is None or longitude is None:
+                continue
+            grid_for_all_states.add(latitude, longitude, ballot_returned_id)
+            if positive_value_exists(normalized_state):
+                state_code = normalized_state.strip().upper()
+                if state_code not in grid_by_state_code:
+                    grid_by_state_code[state_code] = BallotReturnedLocationGrid()
+                grid_by_state_code[state_code].add(latitude, longitude, ballot_returned_id)
+        self.grid_by_state_code = grid_by_state_code
+        self.grid_for_all_states = grid_for_all_states
+        self.time_built = time.monotonic()
+        return self
+
+    def is_stale(self):
+        if self.stale or self.time_built is None:
+            return True
+        return time.monotonic() - self.time_built > BALLOT_RETURNED_INDEX_TIME_TO_LIVE
+
+    def find_nearest(self, latitude, longitude, state_code='', number_to_find=1):
+        if positive_value_exists(state_code):
+            grid = self.grid_by_state_code.get(state_code.strip().upper())
+            if grid is None:
+                return []
+        else:
+            grid = self.grid_for_all_states
+        return grid.find_nearest(latitude, longitude, number_to_find)
+
+
+_ballot_returned_index_cache = OrderedDict()
+_ballot_returned_index_lock = threading.Lock()
+_ballot_returned_index_build_lock_by_election = {}
+
+
+def ballot_returned_index_build_lock(google_civic_election_id):
+    # Held while an election's index is rebuilt, so the other requests in this worker wait for it instead of each
+    # rebuilding it too
+    with _ballot_returned_index_lock:
+        return _ballot_returned_index_build_lock_by_election.setdefault(google_civic_election_id, threading.Lock())
+
+
+def fetch_ballot_returned_index(google_civic_election_id, retrieve_locations_function):
+    """
+    Return this worker's index for the election, rebuilding it when it is stale
+    :param google_civic_election_id:
+    :param retrieve_locations_function: Called with google_civic_election_id to get the
+      (ballot_returned_id, latitude, longitude, normalized_state) tuples to build from
+    :return:
+    """
+    google_civic_election_id = convert_to_int(google_civic_election_id)
+    with _ballot_returned_index_lock:
+        election_index = _ballot_returned_index_cache.get(google_civic_election_id)
+        if election_index is not None:
+            _ballot_returned_index_cache.move_to_end(google_civic_election_id)
+    if election_index is not None and not election_index.is_stale():
+        return election_index
+
+    with ballot_returned_index_build_lock(google_civic_election_id):
+        # Another request may have rebuilt it while we waited
+        with _ballot_returned_index_lock:
+            election_index = _ballot_returned_index_cache.get(google_civic_election_id)
+        if election_index is not None and not election_index.is_stale():
+            return election_index
+
+        election_index = ElectionBallotReturnedIndex(google_civic_election_id).build(
+            retrieve_locations_function(google_civic_election_id))
+        with _ballot_returned_index_lock:
+            _ballot_returned_index_cache[google_civic_election_id] = election_index
+            _ballot_returned_index_cache.move_to_end(google_civic_election_id)
+            while len(_ballot_returned_index_cache) > BALLOT_RETURNED_INDEX_MAXIMUM_ELECTIONS:
+                _ballot_returned_index_cache.popitem(last=False)
+    return election_index
+
+
+def mark_ballot_returned_index_stale(google_civic_election_id):
+    with _ballot_returned_index_lock:
+        election_index = _ballot_returned_index_cache.get(convert_to_int(google_civic_election_id))
+        if election_index is not None:
+            election_index.stale = True
+
+
+def clear_ballot_returned_index(google_civic_election_id=0):
+    with _ballot_returned_index_lock:
+        if positive_value_exists(google_civic_election_id):
+            _ballot_returned_index_cache.pop(convert_to_int(google_civic_election_id), None)
+        else:
+            _ballot_returned_index_cache.clear()
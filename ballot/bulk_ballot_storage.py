@@ -0,0 +1,246 @@
+# ballot/bulk_ballot_storage.py
+# Brought to you by We Vote. Be good.
+# -*- coding: UTF-8 -*-
+
+from .models import BallotItem, BallotPayloadCacheManager
+from collections import OrderedDict
+from config.base import get_environment_variable_default
+from django.db import transaction
+from measure.models import ContestMeasureManager
+from office.models import ContestOfficeManager
+import wevote_functions.admin
+from wevote_functions.functions import convert_to_int, normalize_we_vote_id, positive_value_exists
+
+logger = wevote_functions.admin.get_logger(__name__)
+
+# How many polling location ballots are collected before their ballot items are saved together
+BULK_BALLOT_STORAGE_POLLING_LOCATIONS = \
+    convert_to_int(get_environment_variable_default("BULK_BALLOT_STORAGE_POLLING_LOCATIONS", 100))
+
+# The BallotItem fields that are saved for a polling location's ballot item (see
+# BallotItemManager.update_or_create_ballot_item_for_polling_location)
+BULK_BALLOT_ITEM_FIELDS = [
+    'contest_office_id', 'contest_office_we_vote_id', 'contest_measure_id', 'contest_measure_we_vote_id',
+    'google_ballot_placement', 'local_ballot_order', 'ballot_item_display_name', 'measure_subtitle', 'measure_text',
+    'state_code',
+]
+
+
+class BulkBallotStorage(object):
+    """
+    Used while importing the ballots of many polling locations in one election. The same offices, candidates and
+    measures are on thousands of those ballots, so each one is saved the first time it is seen, and the other ballots
+    reuse what was saved. The polling locations' ballot items are collected, and then saved together with
+    save_ballot_items.
+    """
+
+    def __init__(self, google_civic_election_id):
+        self.google_civic_election_id = convert_to_int(google_civic_election_id)
+        self.contest_office_results_by_key = {}
+        self.contest_measure_results_by_key = {}
+        self.candidate_keys_stored = set()
+        # (polling_location_we_vote_id, contest_office_id, contest_measure_id) -> values for the BallotItem
+        self.ballot_item_values_by_key = OrderedDict()
+        self.polling_location_we_vote_id_list = []
+
+    def fetch_contest_office_results(self, office_key):
+        """
+        The results of update_or_create_contest_office, if this office was already saved in this import
+        :param office_key: See contest_office_key
+        :return:
+        """
+        if office_key not in self.contest_office_results_by_key:
+            return None
+        results = self.contest_office_results_by_key[office_key].copy()
+        # So each ballot's contests aren't counted as saved again
+        results['saved'] = False
+        results['updated'] = False
+        results['status'] = 'CONTEST_OFFICE_ALREADY_SAVED_IN_THIS_IMPORT '
+        return results
+
+    def remember_contest_office_results(self, office_key, results):
+        if results['success']:
+            self.contest_office_results_by_key[office_key] = results
+
+    def fetch_contest_measure_results(self, measure_key):
+        if measure_key not in self.contest_measure_results_by_key:
+            return None
+        results = self.contest_measure_results_by_key[measure_key].copy()
+        results['saved'] = False
+        results['updated'] = False
+        results['status'] = 'CONTEST_MEASURE_ALREADY_SAVED_IN_THIS_IMPORT '
+        return results
+
+    def remember_contest_measure_results(self, measure_key, results):
+        if results['success']:
+            self.contest_measure_results_by_key[measure_key] = results
+
+    def candidate_already_stored(self, contest_office_we_vote_id, google_civic_candidate_name):
+        return (normalize_we_vote_id(contest_office_we_vote_id),
+                google_civic_candidate_name.strip().lower()) in self.candidate_keys_stored
+
+    def remember_candidate_stored(self, contest_office_we_vote_id, google_civic_candidate_name):
+        self.candidate_keys_stored.add((normalize_we_vote_id(contest_office_we_vote_id),
+                                        google_civic_candidate_name.strip().lower()))
+
+    def add_polling_location_ballot_item(
+            self, polling_location_we_vote_id, google_ballot_placement, ballot_item_display_name, measure_subtitle,
+            measure_text, local_ballot_order, contest_office_id=0, contest_office_we_vote_id='',
+            contest_measure_id=0, contest_measure_we_vote_id='', state_code=''):
+        """
+        Collect a ballot item, to be saved with save_ballot_items. Takes the same values as
+        BallotItemManager.update_or_create_ballot_item_for_polling_location, and like it, looks up a missing
+        contest_office_id or contest_office_we_vote_id (and measure id) and skips the ballot item if it doesn't have
+        both ids of its office or measure.
+        :return:
+        """
+        if positive_value_exists(contest_office_we_vote_id) and not positive_value_exists(contest_office_id):
+            contest_office_id = ContestOfficeManager().fetch_contest_office_id_from_we_vote_id(
+                contest_office_we_vote_id)
+        elif positive_value_exists(contest_office_id) and not positive_value_exists(contest_office_we_vote_id):
+            contest_office_we_vote_id = ContestOfficeManager().fetch_contest_office_we_vote_id_from_id(
+                contest_office_id)
+        if positive_value_exists(contest_measure_we_vote_id) and not positive_value_exists(contest_measure_id):
+            contest_measure_id = ContestMeasureManager().fetch_contest_measure_id_from_we_vote_id(
+                contest_measure_we_vote_id)
+        elif positive_value_exists(contest_measure_id) and not positive_value_exists(contest_measure_we_vote_id):
+            contest_measure_we_vote_id = ContestMeasureManager().fetch_contest_measure_we_vote_id_from_id(
+                contest_measure_id)
+
+        # We require both contest_office_id and contest_office_we_vote_id
+        #  OR both contest_measure_id and contest_measure_we_vote_id
+        required_office_ids_found = positive_value_exists(contest_office_id) \
+            and positive_value_exists(contest_office_we_vote_id)
+        required_measure_ids_found = positive_value_exists(contest_measure_id) \
+            and positive_value_exists(contest_measure_we_vote_id)
+        if not required_office_ids_found and not required_measure_ids_found:
+            results = {
+                'success':  False,
+                'status':   'MISSING_SUFFICIENT_OFFICE_OR_MEASURE_IDS-POLLING_LOCATION ',
+            }
+            return results
+        if not positive_value_exists(polling_location_we_vote_id):
+            results = {
+                'success':  False,
+                'status':   'MISSING_POLLING_LOCATION_WE_VOTE_ID ',
+            }
+            return results
+
+        polling_location_we_vote_id = normalize_we_vote_id(polling_location_we_vote_id)
+        if polling_location_we_vote_id not in self.polling_location_we_vote_id_list:
+            self.polling_location_we_vote_id_list.append(polling_location_we_vote_id)
+        ballot_item_key = (polling_location_we_vote_id, str(convert_to_int(contest_office_id)),
+                           str(convert_to_int(contest_measure_id)))
+        self.ballot_item_values_by_key[ballot_item_key] = {
+            'contest_office_id':            str(convert_to_int(contest_office_id)),
+            'contest_office_we_vote_id':    normalize_we_vote_id(contest_office_we_vote_id),
+            'contest_measure_id':           str(convert_to_int(contest_measure_id)),
+            'contest_measure_we_vote_id':   normalize_we_vote_id(contest_measure_we_vote_id),
+            'google_ballot_placement':      google_ballot_placement,
+            'local_ballot_order':           local_ballot_order,
+            'ballot_item_display_name':     ballot_item_display_name,
+            'measure_subtitle':             measure_subtitle,
+            'measure_text':                 measure_text,
+            'state_code':                   state_code,
+        }
+        results = {
+            'success':  True,
+            'status':   'BALLOT_ITEM_ADDED_TO_BULK_BALLOT_STORAGE ',
+        }
+        return results
+
+    def ready_to_save(self):
+        return len(self.polling_location_we_vote_id_list) >= BULK_BALLOT_STORAGE_POLLING_LOCATIONS
+
+    def save_ballot_items(self):
+        """
+        Save the ballot items collected since the last save: ballot items that are new are created together,
+        existing ballot items are only updated when they have changed, and extra copies of a ballot item are deleted.
+        :return:
+        """
+        status = ""
+        ballot_items_created = 0
+        ballot_items_updated = 0
+        duplicates_deleted = 0
+        ballot_item_values_by_key = self.ballot_item_values_by_key
+        polling_location_we_vote_id_list = self.polling_location_we_vote_id_list
+        self.ballot_item_values_by_key = OrderedDict()
+        self.polling_location_we_vote_id_list = []
+
+        if not positive_value_exists(self.google_civic_election_id) or not ballot_item_values_by_key:
+            status += "BULK_BALLOT_STORAGE-NO_BALLOT_ITEMS_TO_SAVE "
+            results = {
+                'success':                          True,
+                'status':                           status,
+                'ballot_items_created':             ballot_items_created,
+                'ballot_items_updated':             ballot_items_updated,
+                'polling_location_we_vote_id_list': polling_location_we_vote_id_list,
+            }
+            return results
+
+        google_civic_election_id_text = str(self.google_civic_election_id)
+        try:
+            with transaction.atomic():
+                existing_ballot_item_by_key = {}
+                duplicate_ballot_item_id_list = []
+                existing_query = BallotItem.objects.filter(
+                    google_civic_election_id=google_civic_election_id_text,
+                    polling_location_we_vote_id__in=polling_location_we_vote_id_list)
+                existing_query = existing_query.only('id', 'polling_location_we_vote_id', *BULK_BALLOT_ITEM_FIELDS)
+                for ballot_item in existing_query.order_by('id'):
+                    ballot_item_key = (normalize_we_vote_id(ballot_item.polling_location_we_vote_id),
+                                       str(convert_to_int(ballot_item.contest_office_id)),
+                                       str(convert_to_int(ballot_item.contest_measure_id)))
+                    if ballot_item_key in existing_ballot_item_by_key:
+                        duplicate_ballot_item_id_list.append(ballot_item.id)
+                    else:
+                        existing_ballot_item_by_key[ballot_item_key] = ballot_item
+
+                ballot_item_list_to_create = []
+                for ballot_item_key, ballot_item_values in ballot_item_values_by_key.items():
+                    if ballot_item_key in existing_ballot_item_by_key:
+                        ballot_item = existing_ballot_item_by_key[ballot_item_key]
+                        changed_values = {}
+                        for field_name, value in ballot_item_values.items():
+                            if getattr(ballot_item, field_name) != value:
+                                changed_values[field_name] = value
+                        if changed_values:
+                            BallotItem.objects.filter(id=ballot_item.id).update(**changed_values)
+                            ballot_items_updated += 1
+                    else:
+                        # bulk_create doesn't send pre_save, so the we_vote_ids were normalized when collected
+                        ballot_item_list_to_create.append(BallotItem(
+                            google_civic_election_id=google_civic_election_id_text,
+                            polling_location_we_vote_id=ballot_item_key[0],
+                            **ballot_item_values))
+                if ballot_item_list_to_create:
+                    BallotItem.objects.bulk_create(ballot_item_list_to_create, batch_size=500)
+                    ballot_items_created = len(ballot_item_list_to_create)
+                if duplicate_ballot_item_id_list:
+                    duplicates_deleted, deleted_by_model = \
+                        BallotItem.objects.filter(id__in=duplicate_ballot_item_id_list).delete()
+            success = True
+            status += "BULK_BALLOT_STORAGE-BALLOT_ITEMS_SAVED created: {created}, updated: {updated}, " \
+                      "duplicates deleted: {deleted} ".format(created=ballot_items_created,
+                                                               updated=ballot_items_updated,
+                                                               deleted=duplicates_deleted)
+        except Exception as e:
+            success = False
+            ballot_items_created = 0
+            ballot_items_updated = 0
+            status += 'BULK_BALLOT_STORAGE-FAILED_TO_SAVE_BALLOT_ITEMS ' \
+                      '{error} [type: {error_type}] '.format(error=e, error_type=type(e))
+            logger.error(status)
+
+        if ballot_items_created or ballot_items_updated:
+            # bulk_create and update() don't send the post_save that retires cached ballots, so retire them once here
+            BallotPayloadCacheManager().bump_ballot_content_version(self.google_civic_election_id)
+
+        results = {
+            'success':                          success,
+            'status':                           status,
+            'ballot_items_created':             ballot_items_created,
+            'ballot_items_updated':             ballot_items_updated,
+            'polling_location_we_vote_id_list': polling_location_we_vote_id_list,
+        }
+        return results
@@ -2,14 +2,18 @@
 # Brought to you by We Vote. Be good.
 # -*- coding: UTF-8 -*-
 
-from .models import BallotItemListManager, BallotItemManager, BallotReturnedListManager, BallotReturnedManager, \
-    CANDIDATE, copy_existing_ballot_items_from_stored_ballot, OFFICE, MEASURE, \
-    refresh_ballot_items_for_voter_copied_from_one_polling_location, VoterBallotSaved, VoterBallotSavedManager
+from .models import BALLOT_PAYLOAD_CACHE_ON, BallotItemListManager, BallotItemManager, BallotPayloadCacheManager, \
+    BallotReturnedListManager, BallotReturnedManager, CANDIDATE, copy_existing_ballot_items_from_stored_ballot, \
+    OFFICE, MEASURE, refresh_ballot_items_for_voter_copied_from_one_polling_location, VoterBallotSaved, \
+    VoterBallotSavedManager
 from candidate.models import CandidateCampaignListManager
 from config.base import get_environment_variable
 from datetime import datetime, timedelta
+from .election_snapshot import fetch_election_snapshot, retrieve_all_candidates_for_office_from_snapshot, \
+    retrieve_contest_office_from_snapshot
 from election.models import ElectionManager, fetch_next_election_for_state
 from exception.models import handle_exception
+from geoip.models import GeocodeCacheManager
 from import_export_ballotpedia.controllers import voter_ballot_items_retrieve_from_ballotpedia_for_api
 from import_export_google_civic.controllers import \
     refresh_voter_ballot_items_from_google_civic_from_voter_ballot_saved, \
@@ -19,16 +23,14 @@ from office.models import ContestOfficeManager, ContestOfficeListManager
 from polling_location.models import PollingLocationManager
 import pytz
 from voter.models import BALLOT_ADDRESS, VoterAddress, VoterAddressManager, VoterDeviceLinkManager
+from voter.voter_context import voter_context_for_voter_device_id
 import wevote_functions.admin
 from wevote_functions.functions import convert_to_int, extract_state_code_from_address_string, positive_value_exists, \
     process_request_from_master, strip_html_tags
-from geopy.geocoders import get_geocoder_for_service
 
 logger = wevote_functions.admin.get_logger(__name__)
 
-GEOCODE_TIMEOUT = 10
 GOOGLE_CIVIC_API_KEY = get_environment_variable("GOOGLE_CIVIC_API_KEY")
-GOOGLE_MAPS_API_KEY = get_environment_variable("GOOGLE_MAPS_API_KEY")
 WE_VOTE_API_KEY = get_environment_variable("WE_VOTE_API_KEY")
 BALLOT_ITEMS_SYNC_URL = get_environment_variable("BALLOT_ITEMS_SYNC_URL")  # ballotItemsSyncOut
 BALLOT_RETURNED_SYNC_URL = get_environment_variable("BALLOT_RETURNED_SYNC_URL")  # ballotReturnedSyncOut
@@ -412,20 +414,12 @@ def ballot_returned_import_from_structured_json(structured_json):
 
 
 def heal_geo_coordinates(text_for_map_search):
-    longitude = None
-    latitude = None
-    try:
-        google_client = get_geocoder_for_service('google')(GOOGLE_MAPS_API_KEY)
-        location = google_client.geocode(text_for_map_search, sensor=False, timeout=GEOCODE_TIMEOUT)
-        if location is None:
-            status = 'Could not find location matching "{}" '.format(text_for_map_search)
-            logger.debug(status)
-        else:
-            latitude = location.latitude
-            longitude = location.longitude
-    except Exception as e:
-        pass
-    return latitude, longitude
+    geocode_cache_manager = GeocodeCacheManager()
+    geocode_results = geocode_cache_manager.retrieve_geocoded_address(text_for_map_search)
+    if not geocode_results['location_found']:
+        status = 'Could not find location matching "{}" '.format(text_for_map_search)
+        logger.debug(status)
+    return geocode_results['latitude'], geocode_results['longitude']
 
 
 def move_ballot_items_to_another_measure(from_contest_measure_id, from_contest_measure_we_vote_id,
@@ -729,6 +723,32 @@ def refresh_voter_ballots_from_polling_location(ballot_returned_from_polling_loc
     return results
 
 
+def save_bulk_ballot_items_and_refresh_voter_ballots(bulk_ballot_storage, ballot_returned_list_to_refresh):
+    """
+    Save the ballot items a BulkBallotStorage has collected, and then refresh the voter ballots copied from those
+    polling locations
+    :param bulk_ballot_storage:
+    :param ballot_returned_list_to_refresh: The polling locations' BallotReturned entries
+    :return:
+    """
+    status = ""
+    ballots_refreshed = 0
+    save_results = bulk_ballot_storage.save_ballot_items()
+    status += save_results['status']
+    if save_results['success']:
+        for ballot_returned in ballot_returned_list_to_refresh:
+            refresh_results = refresh_voter_ballots_from_polling_location(
+                ballot_returned, bulk_ballot_storage.google_civic_election_id)
+            ballots_refreshed += refresh_results['ballots_refreshed']
+
+    results = {
+        'status':               status,
+        'success':              save_results['success'],
+        'ballots_refreshed':    ballots_refreshed,
+    }
+    return results
+
+
 def refresh_voter_ballots_not_copied_from_polling_location(google_civic_election_id, refresh_from_google=False):
     status = ""
     success = True
@@ -911,15 +931,23 @@ def repair_ballot_items_for_election(google_civic_election_id, refresh_from_goog
 
 def voter_ballot_items_retrieve_for_api(
         voter_device_id, google_civic_election_id,
-        ballot_returned_we_vote_id='', ballot_location_shortcut=''):  # voterBallotItemsRetrieve
+        ballot_returned_we_vote_id='', ballot_location_shortcut='', voter_context=None):  # voterBallotItemsRetrieve
+    """
+    :param voter_device_id:
+    :param google_civic_election_id:
+    :param ballot_returned_we_vote_id:
+    :param ballot_location_shortcut:
+    :param voter_context: The request's VoterContext, so the VoterDeviceLink it already retrieved is reused
+    :return:
+    """
     status = ''
 
     specific_ballot_requested = positive_value_exists(ballot_returned_we_vote_id) or \
         positive_value_exists(ballot_location_shortcut)
 
     # We retrieve voter_device_link
-    voter_device_link_manager = VoterDeviceLinkManager()
-    voter_device_link_results = voter_device_link_manager.retrieve_voter_device_link(voter_device_id)
+    voter_context = voter_context_for_voter_device_id(voter_device_id, voter_context)
+    voter_device_link_results = voter_context.retrieve_voter_device_link_results()
     if not voter_device_link_results['voter_device_link_found']:
         status += "VALID_VOTER_DEVICE_ID_MISSING "
         error_json_data = {
@@ -1026,6 +1054,7 @@ def voter_ballot_items_retrieve_for_api(
 
     # Update voter_device_link
     if voter_device_link.google_civic_election_id != google_civic_election_id:
+        voter_device_link_manager = VoterDeviceLinkManager()
         voter_device_link_manager.update_voter_device_link_with_election_id(voter_device_link, google_civic_election_id)
 
     # Update voter_address to include matching google_civic_election_id and voter_ballot_saved entry
@@ -1863,10 +1892,10 @@ def voter_ballot_items_retrieve_for_one_election_for_api(voter_device_id, voter_
     """
     status = ""
     ballot_item_list_manager = BallotItemListManager()
-    contest_office_manager = ContestOfficeManager()
 
     ballot_item_list = []
     ballot_items_to_display = []
+    polling_location_we_vote_id = ''
     results = {}
     try:
         read_only = True
@@ -1875,6 +1904,8 @@ def voter_ballot_items_retrieve_for_one_election_for_api(voter_device_id, voter_
         success = results['success']
         status += results['status']
         ballot_item_list = results['ballot_item_list']
+        # Only set when the voter is reading a polling location's ballot items
+        polling_location_we_vote_id = results['polling_location_we_vote_id']
     except Exception as e:
         status += 'FAILED voter_ballot_items_retrieve. ' \
                  '{error} [type: {error_type}]'.format(error=e, error_type=type(e))
@@ -1883,24 +1914,115 @@ def voter_ballot_items_retrieve_for_one_election_for_api(voter_device_id, voter_
 
     if success:
         status += "BALLOT_ITEM_LIST_FOUND "
-        for ballot_item in ballot_item_list:
-            if ballot_item.contest_office_we_vote_id:
-                kind_of_ballot_item = OFFICE
-                office_id = ballot_item.contest_office_id
-                office_we_vote_id = ballot_item.contest_office_we_vote_id
+        if BALLOT_PAYLOAD_CACHE_ON and positive_value_exists(polling_location_we_vote_id):
+            payload_results = retrieve_ballot_item_list_payload_for_polling_location(
+                polling_location_we_vote_id, google_civic_election_id, ballot_item_list)
+        else:
+            payload_results = generate_ballot_item_list_payload(ballot_item_list)
+        status += payload_results['status']
+        ballot_items_to_display = payload_results['ballot_item_list']
+
+        results = {
+            'status': status,
+            'success': True,
+            'voter_device_id': voter_device_id,
+            'ballot_item_list': ballot_items_to_display,
+            'google_civic_election_id': google_civic_election_id,
+        }
+    else:
+        results = {
+            'status': status,
+            'success': False,
+            'voter_device_id': voter_device_id,
+            'ballot_item_list': [],
+            'google_civic_election_id': google_civic_election_id,
+        }
+    return results
+
+
+def retrieve_ballot_item_list_payload_for_polling_location(polling_location_we_vote_id, google_civic_election_id,
+                                                           ballot_item_list=None, office_payload_dict=None):
+    """
+    The ballot_item_list voterBallotItemsRetrieve returns for this polling location's ballot, from the
+    BallotPayloadCache when the election's ballots haven't changed since it was saved. Otherwise it is generated and
+    saved.
+    :param polling_location_we_vote_id:
+    :param google_civic_election_id:
+    :param ballot_item_list: The polling location's BallotItem entries, if the caller has them already
+    :param office_payload_dict: See generate_ballot_item_list_payload
+    :return:
+    """
+    status = ""
+    ballot_payload_cache_manager = BallotPayloadCacheManager()
+    cache_results = ballot_payload_cache_manager.retrieve_cached_ballot_item_list(
+        polling_location_we_vote_id, google_civic_election_id)
+    status += cache_results['status']
+    if cache_results['ballot_item_list_found']:
+        results = {
+            'success':          True,
+            'status':           status,
+            'ballot_item_list': cache_results['ballot_item_list'],
+            'cache_hit':        True,
+        }
+        return results
+
+    # Read before we look anything up, so a list built while the election's ballots change is never used
+    content_version = ballot_payload_cache_manager.fetch_ballot_content_version(google_civic_election_id)
+    # Build from a snapshot of that version, not one this worker loaded before the change
+    fetch_election_snapshot(google_civic_election_id, content_version=content_version)
+    if ballot_item_list is None:
+        ballot_item_list_manager = BallotItemListManager()
+        retrieve_results = ballot_item_list_manager.retrieve_all_ballot_items_for_polling_location(
+            polling_location_we_vote_id, google_civic_election_id)
+        ballot_item_list = retrieve_results['ballot_item_list']
+    payload_results = generate_ballot_item_list_payload(ballot_item_list, office_payload_dict)
+    status += payload_results['status']
+    save_results = ballot_payload_cache_manager.save_cached_ballot_item_list(
+        polling_location_we_vote_id, google_civic_election_id, content_version, payload_results['ballot_item_list'])
+    status += save_results['status']
+
+    results = {
+        'success':          True,
+        'status':           status,
+        'ballot_item_list': payload_results['ballot_item_list'],
+        'cache_hit':        False,
+    }
+    return results
+
+
+def generate_ballot_item_list_payload(ballot_item_list, office_payload_dict=None):
+    """
+    Build the ballot_item_list voterBallotItemsRetrieve returns from BallotItem entries
+    :param ballot_item_list:
+    :param office_payload_dict: Pass the same dict in when generating many ballots from one election, so each office
+      and its candidates are only looked up once
+    :return:
+    """
+    status = ""
+    if office_payload_dict is None:
+        office_payload_dict = {}
+
+    ballot_items_to_display = []
+    for ballot_item in ballot_item_list:
+        if ballot_item.contest_office_we_vote_id:
+            kind_of_ballot_item = OFFICE
+            office_id = ballot_item.contest_office_id
+            office_we_vote_id = ballot_item.contest_office_we_vote_id
+            if (office_id, office_we_vote_id) in office_payload_dict:
+                race_office_level, candidates_to_display = office_payload_dict[(office_id, office_we_vote_id)]
+            else:
                 race_office_level = ""
                 if positive_value_exists(office_we_vote_id):
-                    read_only = True
-                    office_results = contest_office_manager.retrieve_contest_office_from_we_vote_id(
-                        office_we_vote_id, read_only=read_only)
+                    office_results = retrieve_contest_office_from_snapshot(
+                        contest_office_we_vote_id=office_we_vote_id,
+                        google_civic_election_id=ballot_item.google_civic_election_id)
                     if office_results['contest_office_found']:
                         contest_office = office_results['contest_office']
                         race_office_level = contest_office.ballotpedia_race_office_level
+                results = {}
                 try:
-                    candidate_list_object = CandidateCampaignListManager()
-                    read_only = True
-                    results = candidate_list_object.retrieve_all_candidates_for_office(
-                        office_id, office_we_vote_id, read_only=read_only)
+                    results = retrieve_all_candidates_for_office_from_snapshot(
+                        office_id, office_we_vote_id, ballot_item.google_civic_election_id)
                     candidates_to_display = []
                     if results['candidate_list_found']:
                         candidate_list = results['candidate_list']
@@ -1952,62 +2074,52 @@ def voter_ballot_items_retrieve_for_one_election_for_api(voter_device_id, voter_
                     candidates_to_display = []
                     if hasattr(results, 'status'):
                         status += results['status'] + " "
+                office_payload_dict[(office_id, office_we_vote_id)] = (race_office_level, candidates_to_display)
 
-                if len(candidates_to_display):
-                    one_ballot_item = {
-                        'ballot_item_display_name':     ballot_item.ballot_item_display_name,
-                        'google_civic_election_id':     ballot_item.google_civic_election_id,
-                        'google_ballot_placement':      ballot_item.google_ballot_placement,
-                        'id':                           office_id,
-                        'local_ballot_order':           ballot_item.local_ballot_order,
-                        'kind_of_ballot_item':          kind_of_ballot_item,
-                        'race_office_level':            race_office_level,
-                        'we_vote_id':                   office_we_vote_id,
-                        'candidate_list':               candidates_to_display,
-                    }
-                    ballot_items_to_display.append(one_ballot_item.copy())
-                else:
-                    status += "NO_CANDIDATES_FOR_OFFICE:" + str(office_we_vote_id) + " "
-            elif ballot_item.contest_measure_we_vote_id:
-                kind_of_ballot_item = MEASURE
-                measure_id = ballot_item.contest_measure_id
-                measure_we_vote_id = ballot_item.contest_measure_we_vote_id
-                measure_display_name_number = 100
+            if len(candidates_to_display):
                 one_ballot_item = {
                     'ballot_item_display_name':     ballot_item.ballot_item_display_name,
                     'google_civic_election_id':     ballot_item.google_civic_election_id,
                     'google_ballot_placement':      ballot_item.google_ballot_placement,
-                    'id':                           measure_id,
-                    'kind_of_ballot_item':          kind_of_ballot_item,
+                    'id':                           office_id,
                     'local_ballot_order':           ballot_item.local_ballot_order,
-                    'measure_subtitle':             ballot_item.measure_subtitle,
-                    'measure_text':                 ballot_item.measure_text,
-                    'measure_url':                  ballot_item.measure_url,
-                    'no_vote_description':          strip_html_tags(ballot_item.no_vote_description),
-                    'district_name':                "",  # TODO Add this
-                    'election_display_name':        "",  # TODO Add this
-                    'regional_display_name':        "",  # TODO Add this
-                    'state_display_name':           "",  # TODO Add this
-                    'we_vote_id':                   measure_we_vote_id,
-                    'yes_vote_description':         strip_html_tags(ballot_item.yes_vote_description),
+                    'kind_of_ballot_item':          kind_of_ballot_item,
+                    'race_office_level':            race_office_level,
+                    'we_vote_id':                   office_we_vote_id,
+                    'candidate_list':               candidates_to_display,
                 }
                 ballot_items_to_display.append(one_ballot_item.copy())
+            else:
+                status += "NO_CANDIDATES_FOR_OFFICE:" + str(office_we_vote_id) + " "
+        elif ballot_item.contest_measure_we_vote_id:
+            kind_of_ballot_item = MEASURE
+            measure_id = ballot_item.contest_measure_id
+            measure_we_vote_id = ballot_item.contest_measure_we_vote_id
+            one_ballot_item = {
+                'ballot_item_display_name':     ballot_item.ballot_item_display_name,
+                'google_civic_election_id':     ballot_item.google_civic_election_id,
+                'google_ballot_placement':      ballot_item.google_ballot_placement,
+                'id':                           measure_id,
+                'kind_of_ballot_item':          kind_of_ballot_item,
+                'local_ballot_order':           ballot_item.local_ballot_order,
+                'measure_subtitle':             ballot_item.measure_subtitle,
+                'measure_text':                 ballot_item.measure_text,
+                'measure_url':                  ballot_item.measure_url,
+                'no_vote_description':          strip_html_tags(ballot_item.no_vote_description),
+                'district_name':                "",  # TODO Add this
+                'election_display_name':        "",  # TODO Add this
+                'regional_display_name':        "",  # TODO Add this
+                'state_display_name':           "",  # TODO Add this
+                'we_vote_id':                   measure_we_vote_id,
+                'yes_vote_description':         strip_html_tags(ballot_item.yes_vote_description),
+            }
+            ballot_items_to_display.append(one_ballot_item.copy())
 
-        results = {
-            'status': status,
-            'success': True,
-            'voter_device_id': voter_device_id,
-            'ballot_item_list': ballot_items_to_display,
-            'google_civic_election_id': google_civic_election_id,
-        }
-    else:
-        results = {
-            'status': status,
-            'success': False,
-            'voter_device_id': voter_device_id,
-            'ballot_item_list': [],
-            'google_civic_election_id': google_civic_election_id,
-        }
+    results = {
+        'success':          True,
+        'status':           status,
+        'ballot_item_list': ballot_items_to_display,
+    }
     return results
 
 
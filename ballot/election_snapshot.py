@@ -0,0 +1,389 @@
+# ballot/election_snapshot.py
+# Brought to you by We Vote. Be good.
+# -*- coding: UTF-8 -*-
+
+from .models import BallotPayloadCacheManager
+from candidate.models import CandidateCampaign, CandidateCampaignListManager, CandidateCampaignManager
+from collections import OrderedDict
+from config.base import get_environment_variable_default
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from measure.models import ContestMeasure, ContestMeasureManager
+from office.models import ContestOffice, ContestOfficeManager
+import os
+import pickle
+import stat
+import tempfile
+import threading
+import time
+import wevote_functions.admin
+from wevote_functions.functions import convert_to_int, positive_value_exists
+
+logger = wevote_functions.admin.get_logger(__name__)
+
+# False to always read offices, candidates and measures from the database
+ELECTION_SNAPSHOT_ON = positive_value_exists(get_environment_variable_default("ELECTION_SNAPSHOT_ON", True))
+# Where snapshot files are written, so every worker on this server loads a snapshot instead of building it. Snapshot
+# files are unpickled, so the directory is created readable and writable only by the user the workers run as, and it
+# isn't used if anyone else owns it or can write to it (see election_snapshot_directory_is_private).
+ELECTION_SNAPSHOT_DIRECTORY = get_environment_variable_default(
+    "ELECTION_SNAPSHOT_DIRECTORY", os.path.join(tempfile.gettempdir(), "wevote_election_snapshots_{}".format(
+        os.getuid())))
+# How many seconds a worker uses its snapshot before checking the election's BallotContentVersion again. Changes
+# saved in another worker (or on another server) show up within this many seconds.
+ELECTION_SNAPSHOT_CHECK_SECONDS = \
+    convert_to_int(get_environment_variable_default("ELECTION_SNAPSHOT_CHECK_SECONDS", 15))
+# How many elections each worker keeps in memory at one time
+ELECTION_SNAPSHOT_MAXIMUM_ELECTIONS = 5
+
+
+class ElectionSnapshot(object):
+    """
+    The offices, candidates and measures in one election, as of one content_version of the election. The model
+    instances are shared by every request in the worker, so treat them as read-only. To change one, retrieve it from
+    the database.
+    """
+
+    def __init__(self, google_civic_election_id, content_version, content_version_token):
+        self.google_civic_election_id = convert_to_int(google_civic_election_id)
+        # The election's BallotContentVersion when this was built
+        self.content_version = content_version
+        self.content_version_token = content_version_token
+        self.offices_by_we_vote_id = {}
+        self.office_we_vote_id_by_id = {}
+        self.candidates_by_we_vote_id = {}
+        self.candidate_we_vote_id_by_id = {}
+        # Candidates ordered like retrieve_all_candidates_for_office, most twitter followers first
+        self.candidate_we_vote_id_list_by_office_we_vote_id = {}
+        self.candidate_we_vote_id_list_by_office_id = {}
+        self.measures_by_we_vote_id = {}
+        self.measure_we_vote_id_by_id = {}
+        self.time_checked = None
+
+    def build(self):
+        google_civic_election_id_text = str(self.google_civic_election_id)
+        # From the primary database: the content_version was read there, and a replica could still have the data
+        # from before the change that bumped it
+        for contest_office in ContestOffice.objects.filter(
+                google_civic_election_id=google_civic_election_id_text):
+            self.offices_by_we_vote_id[contest_office.we_vote_id] = contest_office
+            self.office_we_vote_id_by_id[contest_office.id] = contest_office.we_vote_id
+
+        candidate_query = CandidateCampaign.objects.filter(
+            Q(google_civic_election_id=google_civic_election_id_text) |
+            Q(contest_office_we_vote_id__in=list(self.offices_by_we_vote_id.keys())))
+        candidate_list = sorted(candidate_query, key=lambda candidate: -(candidate.twitter_followers_count or 0))
+        for candidate in candidate_list:
+            self.candidates_by_we_vote_id[candidate.we_vote_id] = candidate
+            self.candidate_we_vote_id_by_id[candidate.id] = candidate.we_vote_id
+            if positive_value_exists(candidate.contest_office_we_vote_id):
+                self.candidate_we_vote_id_list_by_office_we_vote_id.setdefault(
+                    candidate.contest_office_we_vote_id, []).append(candidate.we_vote_id)
+            if positive_value_exists(candidate.contest_office_id):
+                self.candidate_we_vote_id_list_by_office_id.setdefault(
+                    convert_to_int(candidate.contest_office_id), []).append(candidate.we_vote_id)
+
+        for contest_measure in ContestMeasure.objects.filter(
+                google_civic_election_id=google_civic_election_id_text):
+            self.measures_by_we_vote_id[contest_measure.we_vote_id] = contest_measure
+            self.measure_we_vote_id_by_id[contest_measure.id] = contest_measure.we_vote_id
+        return self
+
+    def contest_office(self, contest_office_id=0, contest_office_we_vote_id=''):
+        if not positive_value_exists(contest_office_we_vote_id):
+            contest_office_we_vote_id = self.office_we_vote_id_by_id.get(convert_to_int(contest_office_id))
+        return self.offices_by_we_vote_id.get(contest_office_we_vote_id)
+
+    def candidate_list_for_office(self, contest_office_id=0, contest_office_we_vote_id=''):
+        """
+        The candidates running for this office, or None when the office isn't in this election
+        """
+        if positive_value_exists(contest_office_id):
+            if convert_to_int(contest_office_id) not in self.office_we_vote_id_by_id:
+                return None
+            candidate_we_vote_id_list = self.candidate_we_vote_id_list_by_office_id.get(
+                convert_to_int(contest_office_id), [])
+        else:
+            if contest_office_we_vote_id not in self.offices_by_we_vote_id:
+                return None
+            candidate_we_vote_id_list = self.candidate_we_vote_id_list_by_office_we_vote_id.get(
+                contest_office_we_vote_id, [])
+        return [self.candidates_by_we_vote_id[candidate_we_vote_id]
+                for candidate_we_vote_id in candidate_we_vote_id_list]
+
+    def candidate(self, candidate_id=0, candidate_we_vote_id=''):
+        if not positive_value_exists(candidate_we_vote_id):
+            candidate_we_vote_id = self.candidate_we_vote_id_by_id.get(convert_to_int(candidate_id))
+        return self.candidates_by_we_vote_id.get(candidate_we_vote_id)
+
+    def contest_measure(self, contest_measure_id=0, contest_measure_we_vote_id=''):
+        if not positive_value_exists(contest_measure_we_vote_id):
+            contest_measure_we_vote_id = self.measure_we_vote_id_by_id.get(convert_to_int(contest_measure_id))
+        return self.measures_by_we_vote_id.get(contest_measure_we_vote_id)
+
+
+_election_snapshot_cache = OrderedDict()
+_election_snapshot_lock = threading.Lock()
+
+
+def election_snapshot_file_path(google_civic_election_id, content_version, content_version_token):
+    return os.path.join(ELECTION_SNAPSHOT_DIRECTORY, "election_{}_{}_{}.pickle".format(
+        convert_to_int(google_civic_election_id), content_version_token, content_version))
+
+
+def election_snapshot_directory_is_private(create=False):
+    """
+    Loading a snapshot file runs whatever the pickle says, so we only read and write snapshot files in a directory
+    (not a symlink) that belongs to this user and that nobody else can read or write.
+    :param create: Create the directory (mode 0o700) if it doesn't exist yet
+    :return:
+    """
+    try:
+        if create:
+            os.makedirs(ELECTION_SNAPSHOT_DIRECTORY, mode=0o700, exist_ok=True)
+        directory_stat = os.lstat(ELECTION_SNAPSHOT_DIRECTORY)
+    except FileNotFoundError:
+        return False
+    except OSError as e:
+        logger.error("ELECTION_SNAPSHOT_DIRECTORY_NOT_AVAILABLE {}: {}".format(ELECTION_SNAPSHOT_DIRECTORY, e))
+        return False
+    if not stat.S_ISDIR(directory_stat.st_mode) or directory_stat.st_uid != os.getuid() or \
+            stat.S_IMODE(directory_stat.st_mode) & 0o077:
+        logger.error("ELECTION_SNAPSHOT_DIRECTORY_NOT_PRIVATE {}: needs to be a directory owned by this user with "
+                     "mode 0o700".format(ELECTION_SNAPSHOT_DIRECTORY))
+        return False
+    return True
+
+
+def load_election_snapshot_file(google_civic_election_id, content_version, content_version_token):
+    file_path = election_snapshot_file_path(google_civic_election_id, content_version, content_version_token)
+    if not os.path.exists(file_path) or not election_snapshot_directory_is_private():
+        return None
+    try:
+        file_descriptor = os.open(file_path, os.O_RDONLY | os.O_NOFOLLOW)
+        with os.fdopen(file_descriptor, 'rb') as snapshot_file:
+            file_stat = os.fstat(snapshot_file.fileno())
+            if file_stat.st_uid != os.getuid() or stat.S_IMODE(file_stat.st_mode) & 0o077:
+                logger.error("ELECTION_SNAPSHOT_FILE_NOT_PRIVATE {}".format(file_path))
+                return None
+            election_snapshot = pickle.load(snapshot_file)
+        if isinstance(election_snapshot, ElectionSnapshot) and \
+                election_snapshot.content_version == content_version and \
+                election_snapshot.content_version_token == content_version_token:
+            return election_snapshot
+    except Exception as e:
+        logger.error("ELECTION_SNAPSHOT_FILE_NOT_LOADED {}: {}".format(file_path, e))
+    return None
+
+
+def save_election_snapshot_file(election_snapshot):
+    """
+    Write to a temporary file and then rename it, so another worker never loads half a snapshot. Files for earlier
+    versions of the election are removed.
+    :param election_snapshot:
+    :return: True when the file was saved
+    """
+    file_path = election_snapshot_file_path(election_snapshot.google_civic_election_id,
+                                            election_snapshot.content_version, election_snapshot.content_version_token)
+    if not election_snapshot_directory_is_private(create=True):
+        return False
+    try:
+        # mkstemp creates the file with mode 0o600
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=ELECTION_SNAPSHOT_DIRECTORY, suffix=".tmp")
+        with os.fdopen(file_descriptor, 'wb') as snapshot_file:
+            pickle.dump(election_snapshot, snapshot_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary_path, file_path)
+
+        earlier_prefix = "election_{}_".format(election_snapshot.google_civic_election_id)
+        for file_name in os.listdir(ELECTION_SNAPSHOT_DIRECTORY):
+            if file_name.startswith(earlier_prefix) and file_name != os.path.basename(file_path):
+                try:
+                    os.remove(os.path.join(ELECTION_SNAPSHOT_DIRECTORY, file_name))
+                except OSError:
+                    pass
+        return True
+    except Exception as e:
+        logger.error("ELECTION_SNAPSHOT_FILE_NOT_SAVED {}: {}".format(file_path, e))
+        return False
+
+
+def fetch_election_snapshot(google_civic_election_id, content_version=None):
+    """
+    This worker's snapshot of the election, loaded from the snapshot file or built from the database when the
+    election's BallotContentVersion has changed. None when snapshots are off or the snapshot can't be built.
+    :param google_civic_election_id:
+    :param content_version: The content_version the caller just read, when it needs a snapshot of that version
+    :return:
+    """
+    google_civic_election_id = convert_to_int(google_civic_election_id)
+    if not ELECTION_SNAPSHOT_ON or not positive_value_exists(google_civic_election_id):
+        return None
+    with _election_snapshot_lock:
+        election_snapshot = _election_snapshot_cache.get(google_civic_election_id)
+        if election_snapshot is not None:
+            _election_snapshot_cache.move_to_end(google_civic_election_id)
+    now = time.monotonic()
+    if election_snapshot is not None:
+        if content_version is not None:
+            if election_snapshot.content_version == content_version:
+                return election_snapshot
+        elif election_snapshot.time_checked is not None and \
+                now - election_snapshot.time_checked < ELECTION_SNAPSHOT_CHECK_SECONDS:
+            return election_snapshot
+
+    try:
+        current_version, content_version_token = \
+            BallotPayloadCacheManager().fetch_ballot_content_version_and_token(google_civic_election_id)
+        if election_snapshot is None or election_snapshot.content_version != current_version or \
+                election_snapshot.content_version_token != content_version_token:
+            election_snapshot = load_election_snapshot_file(
+                google_civic_election_id, current_version, content_version_token)
+            if election_snapshot is None:
+                election_snapshot = ElectionSnapshot(
+                    google_civic_election_id, current_version, content_version_token).build()
+                save_election_snapshot_file(election_snapshot)
+    except Exception as e:
+        logger.error("ELECTION_SNAPSHOT_NOT_BUILT {}: {}".format(google_civic_election_id, e))
+        return None
+    election_snapshot.time_checked = now
+
+    with _election_snapshot_lock:
+        _election_snapshot_cache[google_civic_election_id] = election_snapshot
+        _election_snapshot_cache.move_to_end(google_civic_election_id)
+        while len(_election_snapshot_cache) > ELECTION_SNAPSHOT_MAXIMUM_ELECTIONS:
+            _election_snapshot_cache.popitem(last=False)
+    return election_snapshot
+
+
+def loaded_election_snapshot_list():
+    # For lookups that don't know the election: only the elections this worker already has in memory are searched
+    with _election_snapshot_lock:
+        election_snapshot_list = list(reversed(_election_snapshot_cache.values()))
+    now = time.monotonic()
+    return [election_snapshot for election_snapshot in election_snapshot_list
+            if election_snapshot.time_checked is not None and
+            now - election_snapshot.time_checked < ELECTION_SNAPSHOT_CHECK_SECONDS]
+
+
+def election_snapshot_list_to_search(google_civic_election_id):
+    if not ELECTION_SNAPSHOT_ON:
+        return []
+    if positive_value_exists(google_civic_election_id):
+        election_snapshot = fetch_election_snapshot(google_civic_election_id)
+        return [election_snapshot] if election_snapshot is not None else []
+    return loaded_election_snapshot_list()
+
+
+def clear_election_snapshots(google_civic_election_id=0):
+    with _election_snapshot_lock:
+        if positive_value_exists(google_civic_election_id):
+            _election_snapshot_cache.pop(convert_to_int(google_civic_election_id), None)
+        else:
+            _election_snapshot_cache.clear()
+
+
+@receiver(post_save, sender=CandidateCampaign)
+@receiver(post_delete, sender=CandidateCampaign)
+@receiver(post_save, sender=ContestMeasure)
+@receiver(post_delete, sender=ContestMeasure)
+@receiver(post_save, sender=ContestOffice)
+@receiver(post_delete, sender=ContestOffice)
+def check_election_snapshot_signal(sender, instance, **kwargs):
+    # This worker checks the election's version on its next read, instead of waiting ELECTION_SNAPSHOT_CHECK_SECONDS.
+    # Only once the version has been bumped: a request that checked in the meantime saw the old version, and would
+    # keep the old snapshot. bump_ballot_content_version_signal (in ballot/models.py, which is imported before this
+    # module) is connected first, so its on_commit callback runs before this one.
+    google_civic_election_id = convert_to_int(instance.google_civic_election_id)
+
+    def check_election_snapshot_on_next_read():
+        with _election_snapshot_lock:
+            election_snapshot = _election_snapshot_cache.get(google_civic_election_id)
+            if election_snapshot is not None:
+                election_snapshot.time_checked = None
+
+    transaction.on_commit(check_election_snapshot_on_next_read)
+
+
+# The read API. Each returns the same results as the manager function it replaces, from the election's snapshot
+# when the election is known (or already loaded), and from the database otherwise.
+
+def retrieve_contest_office_from_snapshot(contest_office_id=0, contest_office_we_vote_id='',
+                                          google_civic_election_id=0):
+    for election_snapshot in election_snapshot_list_to_search(google_civic_election_id):
+        contest_office = election_snapshot.contest_office(contest_office_id, contest_office_we_vote_id)
+        if contest_office is not None:
+            results = {
+                'success':                      True,
+                'status':                       "CONTEST_OFFICE_FOUND_IN_ELECTION_SNAPSHOT ",
+                'contest_office_found':         True,
+                'contest_office_id':            contest_office.id,
+                'contest_office_we_vote_id':    contest_office.we_vote_id,
+                'contest_office':               contest_office,
+            }
+            return results
+    contest_office_manager = ContestOfficeManager()
+    if positive_value_exists(contest_office_id):
+        return contest_office_manager.retrieve_contest_office_from_id(contest_office_id)
+    return contest_office_manager.retrieve_contest_office_from_we_vote_id(contest_office_we_vote_id, read_only=True)
+
+
+def retrieve_all_candidates_for_office_from_snapshot(contest_office_id=0, contest_office_we_vote_id='',
+                                                     google_civic_election_id=0):
+    for election_snapshot in election_snapshot_list_to_search(google_civic_election_id):
+        candidate_list = election_snapshot.candidate_list_for_office(contest_office_id, contest_office_we_vote_id)
+        if candidate_list is not None:
+            candidate_list_found = len(candidate_list) > 0
+            results = {
+                'success':              candidate_list_found,
+                'status':               "CANDIDATES_FOR_OFFICE_FROM_ELECTION_SNAPSHOT ",
+                'office_id':            contest_office_id,
+                'office_we_vote_id':    contest_office_we_vote_id,
+                'candidate_list_found': candidate_list_found,
+                'candidate_list':       candidate_list,
+            }
+            return results
+    candidate_list_manager = CandidateCampaignListManager()
+    return candidate_list_manager.retrieve_all_candidates_for_office(
+        contest_office_id, contest_office_we_vote_id, read_only=True)
+
+
+def retrieve_candidate_campaign_from_snapshot(candidate_campaign_id=0, candidate_campaign_we_vote_id='',
+                                              google_civic_election_id=0):
+    for election_snapshot in election_snapshot_list_to_search(google_civic_election_id):
+        candidate = election_snapshot.candidate(candidate_campaign_id, candidate_campaign_we_vote_id)
+        if candidate is not None:
+            results = {
+                'success':                          True,
+                'status':                           "CANDIDATE_FOUND_IN_ELECTION_SNAPSHOT ",
+                'candidate_campaign_found':         True,
+                'candidate_campaign_id':            candidate.id,
+                'candidate_campaign_we_vote_id':    candidate.we_vote_id,
+                'candidate_campaign':               candidate,
+            }
+            return results
+    candidate_campaign_manager = CandidateCampaignManager()
+    if positive_value_exists(candidate_campaign_id):
+        return candidate_campaign_manager.retrieve_candidate_campaign_from_id(candidate_campaign_id)
+    return candidate_campaign_manager.retrieve_candidate_campaign_from_we_vote_id(candidate_campaign_we_vote_id)
+
+
+def retrieve_contest_measure_from_snapshot(contest_measure_id=0, contest_measure_we_vote_id='',
+                                           google_civic_election_id=0):
+    for election_snapshot in election_snapshot_list_to_search(google_civic_election_id):
+        contest_measure = election_snapshot.contest_measure(contest_measure_id, contest_measure_we_vote_id)
+        if contest_measure is not None:
+            results = {
+                'success':                      True,
+                'status':                       "CONTEST_MEASURE_FOUND_IN_ELECTION_SNAPSHOT ",
+                'contest_measure_found':        True,
+                'contest_measure_id':           contest_measure.id,
+                'contest_measure_we_vote_id':   contest_measure.we_vote_id,
+                'contest_measure':              contest_measure,
+            }
+            return results
+    contest_measure_manager = ContestMeasureManager()
+    if positive_value_exists(contest_measure_id):
+        return contest_measure_manager.retrieve_contest_measure_from_id(contest_measure_id)
+    return contest_measure_manager.retrieve_contest_measure_from_we_vote_id(contest_measure_we_vote_id)
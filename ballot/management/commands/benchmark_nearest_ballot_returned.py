@@ -0,0 +1,99 @@
+import random
+import time
+from ballot.ballot_returned_index import clear_ballot_returned_index
+from ballot.models import BallotReturned, BallotReturnedManager
+from django.core.management.base import BaseCommand
+from django.db.models import F, Q
+
+
+class Command(BaseCommand):
+    help = 'Times finding the nearest polling location ballot for points around an election, by sorting every ' \
+           'ballot in the database (the old way), with the database box search, and with the in-memory index. ' \
+           'Reports any points where the answers differ.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('google_civic_election_id', type=int)
+        parser.add_argument('--points', type=int, default=200, help='How many points to search from')
+        parser.add_argument('--state_code', default='')
+
+    def full_sort(self, google_civic_election_id, latitude, longitude, state_code):
+        ballot_returned_query = BallotReturned.objects.filter(google_civic_election_id=google_civic_election_id)
+        ballot_returned_query = ballot_returned_query.exclude(
+            Q(polling_location_we_vote_id__isnull=True) | Q(polling_location_we_vote_id=""))
+        ballot_returned_query = ballot_returned_query.exclude(latitude__isnull=True).exclude(longitude__isnull=True)
+        if state_code:
+            ballot_returned_query = ballot_returned_query.filter(normalized_state__iexact=state_code)
+        ballot_returned_query = ballot_returned_query.annotate(
+            distance=(F('latitude') - latitude) ** 2 + (F('longitude') - longitude) ** 2)
+        return list(ballot_returned_query.order_by('distance')[:1])
+
+    def time_engine(self, nearest_function, point_list):
+        nearest_by_point = {}
+        start = time.perf_counter()
+        for latitude, longitude in point_list:
+            nearest_by_point[(latitude, longitude)] = nearest_function(latitude, longitude)
+        elapsed = time.perf_counter() - start
+        return nearest_by_point, elapsed * 1000 / len(point_list)
+
+    def handle(self, *args, **options):
+        google_civic_election_id = options['google_civic_election_id']
+        state_code = options['state_code']
+        ballot_returned_manager = BallotReturnedManager()
+
+        location_list = ballot_returned_manager.retrieve_ballot_returned_locations_for_election(
+            google_civic_election_id)
+        if state_code:
+            location_list = [location for location in location_list
+                             if (location[3] or '').strip().upper() == state_code.upper()]
+        if not location_list:
+            self.stdout.write('No polling location ballots with coordinates in this election')
+            return
+        # Search from near (but not exactly at) the ballots we have
+        random_generator = random.Random(google_civic_election_id)
+        point_list = []
+        for point_number in range(max(options['points'], 1)):
+            ballot_returned_id, latitude, longitude, normalized_state = random_generator.choice(location_list)
+            point_list.append((latitude + random_generator.uniform(-0.2, 0.2),
+                               longitude + random_generator.uniform(-0.2, 0.2)))
+
+        full_sort_results, full_sort_milliseconds = self.time_engine(
+            lambda latitude, longitude: self.full_sort(google_civic_election_id, latitude, longitude, state_code),
+            point_list)
+        box_results, box_milliseconds = self.time_engine(
+            lambda latitude, longitude: ballot_returned_manager.retrieve_nearest_ballot_returned_list_from_database(
+                google_civic_election_id, latitude, longitude, state_code),
+            point_list)
+
+        # Time the first search (which builds the index) separately from the searches that reuse it
+        clear_ballot_returned_index(google_civic_election_id)
+        start = time.perf_counter()
+        ballot_returned_manager.retrieve_nearest_ballot_returned_list(
+            google_civic_election_id, point_list[0][0], point_list[0][1], state_code)
+        index_build_milliseconds = (time.perf_counter() - start) * 1000
+        index_results, index_milliseconds = self.time_engine(
+            lambda latitude, longitude: ballot_returned_manager.retrieve_nearest_ballot_returned_list(
+                google_civic_election_id, latitude, longitude, state_code)['ballot_returned_list'],
+            point_list)
+
+        self.stdout.write('{} ballots, {} points'.format(len(location_list), len(point_list)))
+        self.stdout.write('FULL_SORT: {:.2f} ms per search'.format(full_sort_milliseconds))
+        self.stdout.write('DATABASE_BOX: {:.2f} ms per search'.format(box_milliseconds))
+        self.stdout.write('INDEX: {:.2f} ms per search ({:.1f} ms for the first search, which builds the '
+                          'index)'.format(index_milliseconds, index_build_milliseconds))
+
+        def distance_of(nearest_list, latitude, longitude):
+            # Two ballots the same distance away are both right, so compare distances rather than ids
+            if not nearest_list:
+                return None
+            return round((nearest_list[0].latitude - latitude) ** 2 + (nearest_list[0].longitude - longitude) ** 2, 12)
+
+        differences = 0
+        for latitude, longitude in point_list:
+            full_sort_distance = distance_of(full_sort_results[(latitude, longitude)], latitude, longitude)
+            if full_sort_distance != distance_of(box_results[(latitude, longitude)], latitude, longitude) or \
+                    full_sort_distance != distance_of(index_results[(latitude, longitude)], latitude, longitude):
+                differences += 1
+        if differences:
+            self.stdout.write('The nearest ballot differs for {} points'.format(differences))
+        else:
+            self.stdout.write('The nearest ballot matches for every point')
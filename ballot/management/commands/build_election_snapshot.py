@@ -0,0 +1,34 @@
+import time
+from ballot.election_snapshot import ELECTION_SNAPSHOT_DIRECTORY, election_snapshot_file_path, ElectionSnapshot, \
+    save_election_snapshot_file
+from ballot.models import BallotPayloadCacheManager
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Writes the snapshot file for an election to ELECTION_SNAPSHOT_DIRECTORY, so web workers on this server ' \
+           'load it instead of each building it from the database. With --bump, first retires the current ' \
+           'snapshot and ballot payloads (for changes saved with queryset updates, which send no signals).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('google_civic_election_id', type=int)
+        parser.add_argument('--bump', action='store_true')
+
+    def handle(self, *args, **options):
+        google_civic_election_id = options['google_civic_election_id']
+        ballot_payload_cache_manager = BallotPayloadCacheManager()
+        if options['bump']:
+            ballot_payload_cache_manager.bump_ballot_content_version(google_civic_election_id)
+        content_version, content_version_token = \
+            ballot_payload_cache_manager.fetch_ballot_content_version_and_token(google_civic_election_id)
+
+        start = time.perf_counter()
+        election_snapshot = ElectionSnapshot(google_civic_election_id, content_version, content_version_token).build()
+        built_seconds = time.perf_counter() - start
+        if not save_election_snapshot_file(election_snapshot):
+            self.stderr.write('The snapshot could not be saved to {}'.format(ELECTION_SNAPSHOT_DIRECTORY))
+            return
+        self.stdout.write('{} offices, {} candidates and {} measures built in {:.1f} seconds and saved to {}'.format(
+            len(election_snapshot.offices_by_we_vote_id), len(election_snapshot.candidates_by_we_vote_id),
+            len(election_snapshot.measures_by_we_vote_id), built_seconds,
+            election_snapshot_file_path(google_civic_election_id, content_version, content_version_token)))
@@ -0,0 +1,92 @@
+from ballot.models import BallotItem, VoterBallotSaved
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from wevote_functions.functions import convert_to_int, positive_value_exists
+
+
+class Command(BaseCommand):
+    help = 'Deletes the BallotItem entries that were copied for a voter from the polling location their ' \
+           'VoterBallotSaved points to, now that voters read those ballot items from the polling location. A ' \
+           'voter whose ballot items are not the same offices and measures as the polling location is left alone.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--google_civic_election_id', type=int, default=0)
+        parser.add_argument('--batch_size', type=int, default=500)
+        parser.add_argument('--dry_run', action='store_true', help='Count what would be deleted without deleting')
+
+    def contests_by_key(self, ballot_item_query, owner_field):
+        # (owner, google_civic_election_id) -> ({(office we_vote_id, measure we_vote_id), ...}, [ballot_item_id, ...])
+        contests_by_key = {}
+        for ballot_item_id, owner, google_civic_election_id, office_we_vote_id, measure_we_vote_id in \
+                ballot_item_query.values_list('id', owner_field, 'google_civic_election_id',
+                                              'contest_office_we_vote_id', 'contest_measure_we_vote_id'):
+            contest_set, ballot_item_id_list = contests_by_key.setdefault(
+                (owner, convert_to_int(google_civic_election_id)), (set(), []))
+            contest_set.add(((office_we_vote_id or '').lower(), (measure_we_vote_id or '').lower()))
+            ballot_item_id_list.append(ballot_item_id)
+        return contests_by_key
+
+    def collapse_batch(self, voter_ballot_saved_batch, dry_run):
+        voter_id_set = set(voter_id for voter_id, election_id, polling_location_we_vote_id in voter_ballot_saved_batch)
+        polling_location_we_vote_id_set = set(polling_location_we_vote_id for voter_id, election_id,
+                                              polling_location_we_vote_id in voter_ballot_saved_batch)
+        election_id_set = set(str(election_id) for voter_id, election_id, polling_location_we_vote_id in
+                              voter_ballot_saved_batch)
+        voter_contests = self.contests_by_key(BallotItem.objects.filter(
+            voter_id__in=voter_id_set, google_civic_election_id__in=election_id_set), 'voter_id')
+        polling_location_contests = self.contests_by_key(BallotItem.objects.using('readonly').filter(
+            polling_location_we_vote_id__in=polling_location_we_vote_id_set,
+            google_civic_election_id__in=election_id_set), 'polling_location_we_vote_id')
+
+        collapsed = 0
+        kept = 0
+        ballot_item_id_list_to_delete = []
+        for voter_id, election_id, polling_location_we_vote_id in voter_ballot_saved_batch:
+            voter_contest_set, voter_ballot_item_id_list = voter_contests.pop((voter_id, election_id), (set(), []))
+            if not voter_ballot_item_id_list:
+                continue
+            polling_location_contest_set, polling_location_ballot_item_id_list = \
+                polling_location_contests.get((polling_location_we_vote_id, election_id), (set(), []))
+            if voter_contest_set == polling_location_contest_set:
+                ballot_item_id_list_to_delete += voter_ballot_item_id_list
+                collapsed += 1
+            else:
+                kept += 1
+        if ballot_item_id_list_to_delete and not dry_run:
+            BallotItem.objects.filter(id__in=ballot_item_id_list_to_delete).delete()
+        return collapsed, kept, len(ballot_item_id_list_to_delete)
+
+    def handle(self, *args, **options):
+        batch_size = max(options['batch_size'], 1)
+        dry_run = options['dry_run']
+        voter_ballot_saved_query = VoterBallotSaved.objects.using('readonly').filter(voter_id__gt=0)
+        voter_ballot_saved_query = voter_ballot_saved_query.exclude(
+            Q(polling_location_we_vote_id_source__isnull=True) | Q(polling_location_we_vote_id_source=""))
+        if positive_value_exists(options['google_civic_election_id']):
+            voter_ballot_saved_query = voter_ballot_saved_query.filter(
+                google_civic_election_id=options['google_civic_election_id'])
+
+        voters_collapsed = 0
+        voters_kept = 0
+        ballot_items_deleted = 0
+        voter_ballot_saved_batch = []
+        voter_ballot_saved_list = voter_ballot_saved_query.order_by('id').values_list(
+            'voter_id', 'google_civic_election_id', 'polling_location_we_vote_id_source')
+        for voter_id, election_id, polling_location_we_vote_id in voter_ballot_saved_list.iterator():
+            voter_ballot_saved_batch.append((voter_id, election_id, polling_location_we_vote_id))
+            if len(voter_ballot_saved_batch) >= batch_size:
+                collapsed, kept, deleted = self.collapse_batch(voter_ballot_saved_batch, dry_run)
+                voters_collapsed += collapsed
+                voters_kept += kept
+                ballot_items_deleted += deleted
+                voter_ballot_saved_batch = []
+        if voter_ballot_saved_batch:
+            collapsed, kept, deleted = self.collapse_batch(voter_ballot_saved_batch, dry_run)
+            voters_collapsed += collapsed
+            voters_kept += kept
+            ballot_items_deleted += deleted
+
+        self.stdout.write('{} ballot items {} for {} voter ballots. {} voter ballots differ from their polling '
+                          'location and were kept.'.format(ballot_items_deleted,
+                                                           'would be deleted' if dry_run else 'deleted',
+                                                           voters_collapsed, voters_kept))
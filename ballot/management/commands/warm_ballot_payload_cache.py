@@ -0,0 +1,50 @@
+import time
+from ballot.controllers import retrieve_ballot_item_list_payload_for_polling_location
+from ballot.models import BallotItem, VoterBallotSaved
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+
+class Command(BaseCommand):
+    help = 'Saves the ballot_item_list voterBallotItemsRetrieve returns for every polling location ballot in an ' \
+           'election to the BallotPayloadCache, so the first voters to see each ballot after a change do not wait ' \
+           'for it to be built. Ballots already cached for the current version of the election are skipped.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('google_civic_election_id', type=int)
+        parser.add_argument('--only_ballots_in_use', action='store_true',
+                            help='Only the polling locations that a VoterBallotSaved points to')
+
+    def handle(self, *args, **options):
+        google_civic_election_id = options['google_civic_election_id']
+        if options['only_ballots_in_use']:
+            polling_location_query = VoterBallotSaved.objects.using('readonly').filter(
+                google_civic_election_id=google_civic_election_id)
+            polling_location_query = polling_location_query.exclude(
+                Q(polling_location_we_vote_id_source__isnull=True) | Q(polling_location_we_vote_id_source=""))
+            polling_location_we_vote_id_list = polling_location_query.values_list(
+                'polling_location_we_vote_id_source', flat=True).distinct()
+        else:
+            polling_location_query = BallotItem.objects.using('readonly').filter(
+                google_civic_election_id=google_civic_election_id)
+            polling_location_query = polling_location_query.exclude(
+                Q(polling_location_we_vote_id__isnull=True) | Q(polling_location_we_vote_id=""))
+            polling_location_we_vote_id_list = polling_location_query.values_list(
+                'polling_location_we_vote_id', flat=True).distinct()
+
+        # Polling locations in one election share most of their offices, so each office is only looked up once
+        office_payload_dict = {}
+        already_cached = 0
+        saved = 0
+        start = time.perf_counter()
+        for polling_location_we_vote_id in list(polling_location_we_vote_id_list):
+            results = retrieve_ballot_item_list_payload_for_polling_location(
+                polling_location_we_vote_id, google_civic_election_id, office_payload_dict=office_payload_dict)
+            if results['cache_hit']:
+                already_cached += 1
+            elif 'BALLOT_PAYLOAD_CACHE_SAVED' in results['status']:
+                saved += 1
+            else:
+                self.stderr.write('{}: {}'.format(polling_location_we_vote_id, results['status']))
+        self.stdout.write('{} ballots saved and {} already cached in {:.1f} seconds'.format(
+            saved, already_cached, time.perf_counter() - start))
@@ -2,20 +2,26 @@
 # Brought to you by We Vote. Be good.
 # -*- coding: UTF-8 -*-
 
+from ballot.ballot_returned_index import BALLOT_RETURNED_INDEX_ON, fetch_ballot_returned_index, \
+    mark_ballot_returned_index_stale
 from candidate.models import CandidateCampaign
-from config.base import get_environment_variable
+from config.base import get_environment_variable_default
 from datetime import date, datetime
-from django.db import models
-from django.db.models import F, Q, Count
+from django.db import IntegrityError, models, transaction
+from django.db.models import F, OuterRef, Q, Count, Subquery
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from election.models import ElectionManager
 from exception.models import handle_exception, handle_record_found_more_than_one_exception
-from geopy.geocoders import get_geocoder_for_service
-from geopy.exc import GeocoderQuotaExceeded
-from measure.models import ContestMeasureManager
-from office.models import ContestOfficeManager
+from geoip.models import GeocodeCacheManager
+import json
+from measure.models import ContestMeasure, ContestMeasureManager
+from office.models import ContestOffice, ContestOfficeManager
 from polling_location.models import PollingLocationManager
 import wevote_functions.admin
-from wevote_functions.functions import convert_date_to_date_as_integer, convert_to_int, positive_value_exists
+from wevote_functions.functions import convert_date_to_date_as_integer, convert_to_int, generate_random_string, \
+    normalize_we_vote_id, positive_value_exists
 from wevote_settings.models import fetch_next_we_vote_id_ballot_returned_integer, fetch_site_unique_id_prefix
 
 OFFICE = 'OFFICE'
@@ -29,8 +35,12 @@ KIND_OF_BALLOT_ITEM_CHOICES = (
     (MEASURE,       'Measure'),
 )
 
-GOOGLE_MAPS_API_KEY = get_environment_variable("GOOGLE_MAPS_API_KEY")
-GEOCODE_TIMEOUT = 10
+# When a voter's ballot comes from a polling location, read the polling location's BallotItem entries instead of
+# copying them for the voter. Ballot items saved for the voter (from the voter's own address) still come first.
+BALLOT_ITEMS_SHARED_FROM_POLLING_LOCATION = positive_value_exists(
+    get_environment_variable_default("BALLOT_ITEMS_SHARED_FROM_POLLING_LOCATION", True))
+# Keep the ballot_item_list voterBallotItemsRetrieve returns for each polling location's ballot in BallotPayloadCache
+BALLOT_PAYLOAD_CACHE_ON = positive_value_exists(get_environment_variable_default("BALLOT_PAYLOAD_CACHE_ON", True))
 
 logger = wevote_functions.admin.get_logger(__name__)
 
@@ -487,7 +497,7 @@ class BallotItemManager(models.Model):
                     contest_measure_id__exact=contest_measure_id,
                     contest_office_id__exact=contest_office_id,
                     google_civic_election_id__exact=google_civic_election_id,
-                    polling_location_we_vote_id__iexact=polling_location_we_vote_id,
+                    polling_location_we_vote_id=normalize_we_vote_id(polling_location_we_vote_id),
                     defaults=create_values)
                 ballot_item_found = True
             except BallotItem.MultipleObjectsReturned as e:
@@ -641,14 +651,14 @@ class BallotItemManager(models.Model):
                     positive_value_exists(google_civic_election_id):
                 if positive_value_exists(defaults['contest_office_we_vote_id']):
                     existing_ballot_item_entry = BallotItem.objects.get(
-                        contest_office_we_vote_id__iexact=defaults['contest_office_we_vote_id'],
-                        polling_location_we_vote_id__iexact=defaults['polling_location_we_vote_id'],
+                        contest_office_we_vote_id=normalize_we_vote_id(defaults['contest_office_we_vote_id']),
+                        polling_location_we_vote_id=normalize_we_vote_id(defaults['polling_location_we_vote_id']),
                         google_civic_election_id=google_civic_election_id)
                     ballot_item_found = True
                 elif positive_value_exists(defaults['contest_measure_we_vote_id']):
                     existing_ballot_item_entry = BallotItem.objects.get(
-                        contest_measure_we_vote_id__iexact=defaults['contest_measure_we_vote_id'],
-                        polling_location_we_vote_id__iexact=defaults['polling_location_we_vote_id'],
+                        contest_measure_we_vote_id=normalize_we_vote_id(defaults['contest_measure_we_vote_id']),
+                        polling_location_we_vote_id=normalize_we_vote_id(defaults['polling_location_we_vote_id']),
                         google_civic_election_id=google_civic_election_id)
                     ballot_item_found = True
 
@@ -961,7 +971,7 @@ class BallotItemListManager(models.Model):
                 ballot_item_queryset = ballot_item_queryset.filter(voter_id=voter_id)
             if positive_value_exists(polling_location_we_vote_id):
                 ballot_item_queryset = ballot_item_queryset.filter(
-                    polling_location_we_vote_id__iexact=polling_location_we_vote_id)
+                    polling_location_we_vote_id=normalize_we_vote_id(polling_location_we_vote_id))
 
             ballot_item_list = list(ballot_item_queryset)
             ballot_item_list_count = len(ballot_item_list)
@@ -1033,10 +1043,22 @@ class BallotItemListManager(models.Model):
         }
         return results
 
-    def retrieve_all_ballot_items_for_voter(self, voter_id, google_civic_election_id, read_only=False):
+    def retrieve_all_ballot_items_for_voter(self, voter_id, google_civic_election_id, read_only=False,
+                                            include_shared=True):
+        """
+        The voter's own ballot items for this election. If there aren't any and the voter's ballot for this election
+        came from a polling location, the polling location's ballot items
+        (see BALLOT_ITEMS_SHARED_FROM_POLLING_LOCATION)
+        :param voter_id:
+        :param google_civic_election_id:
+        :param read_only:
+        :param include_shared: False to only return ballot items saved for this voter, like when updating them
+        :return:
+        """
         polling_location_we_vote_id = ''
         ballot_item_list = []
         ballot_item_list_found = False
+        status = ''
         try:
             if positive_value_exists(voter_id):
                 # Intentionally not using 'readonly' here as the default
@@ -1049,11 +1071,28 @@ class BallotItemListManager(models.Model):
                 ballot_item_queryset = ballot_item_queryset.filter(google_civic_election_id=google_civic_election_id)
                 ballot_item_list = list(ballot_item_queryset)
 
+                if not len(ballot_item_list) and include_shared:
+                    polling_location_we_vote_id = self.fetch_polling_location_we_vote_id_shared_with_voter(
+                        voter_id, google_civic_election_id, read_only=read_only)
+                    if positive_value_exists(polling_location_we_vote_id):
+                        if read_only:
+                            ballot_item_queryset = BallotItem.objects.using('readonly').all()
+                        else:
+                            ballot_item_queryset = BallotItem.objects.all()
+                        ballot_item_queryset = ballot_item_queryset.order_by(
+                            'local_ballot_order', 'google_ballot_placement')
+                        ballot_item_queryset = ballot_item_queryset.filter(
+                            polling_location_we_vote_id=polling_location_we_vote_id)
+                        ballot_item_queryset = ballot_item_queryset.filter(
+                            google_civic_election_id=google_civic_election_id)
+                        ballot_item_list = list(ballot_item_queryset)
+                        status += 'SHARED_FROM_POLLING_LOCATION '
+
             if len(ballot_item_list):
                 ballot_item_list_found = True
-                status = 'BALLOT_ITEMS_FOUND, retrieve_all_ballot_items_for_voter '
+                status += 'BALLOT_ITEMS_FOUND, retrieve_all_ballot_items_for_voter '
             else:
-                status = 'NO_BALLOT_ITEMS_FOUND_0 '
+                status += 'NO_BALLOT_ITEMS_FOUND_0 '
         except BallotItem.DoesNotExist:
             # No ballot items found. Not a problem.
             status = 'NO_BALLOT_ITEMS_FOUND_DoesNotExist '
@@ -1074,6 +1113,33 @@ class BallotItemListManager(models.Model):
         }
         return results
 
+    def fetch_polling_location_we_vote_id_shared_with_voter(self, voter_id, google_civic_election_id,
+                                                            read_only=False):
+        """
+        The polling location whose ballot this voter is looking at for this election, from their VoterBallotSaved
+        :param voter_id:
+        :param google_civic_election_id:
+        :param read_only:
+        :return:
+        """
+        if not positive_value_exists(voter_id) or not positive_value_exists(google_civic_election_id):
+            return ''
+        try:
+            if read_only:
+                voter_ballot_saved_queryset = VoterBallotSaved.objects.using('readonly').all()
+            else:
+                voter_ballot_saved_queryset = VoterBallotSaved.objects.all()
+            voter_ballot_saved_queryset = voter_ballot_saved_queryset.filter(
+                voter_id=voter_id, google_civic_election_id=google_civic_election_id)
+            voter_ballot_saved_queryset = voter_ballot_saved_queryset.exclude(
+                Q(polling_location_we_vote_id_source__isnull=True) | Q(polling_location_we_vote_id_source=""))
+            polling_location_we_vote_id = voter_ballot_saved_queryset.order_by('-id').values_list(
+                'polling_location_we_vote_id_source', flat=True).first()
+            return polling_location_we_vote_id or ''
+        except Exception as e:
+            handle_exception(e, logger=logger)
+        return ''
+
     def retrieve_all_ballot_items_for_polling_location(self, polling_location_we_vote_id, google_civic_election_id,
                                                        for_editing=False):
         voter_id = 0
@@ -1142,7 +1208,7 @@ class BallotItemListManager(models.Model):
                     voter_id=voter_id)
             elif positive_value_exists(polling_location_we_vote_id):
                 ballot_item_queryset = ballot_item_queryset.filter(
-                    polling_location_we_vote_id__iexact=polling_location_we_vote_id)
+                    polling_location_we_vote_id=normalize_we_vote_id(polling_location_we_vote_id))
             ballot_item_queryset = ballot_item_queryset.filter(google_civic_election_id=google_civic_election_id)
             return ballot_item_queryset.count()
         except BallotItem.DoesNotExist:
@@ -1179,6 +1245,18 @@ class BallotItemListManager(models.Model):
             }
             return error_results
 
+        if BALLOT_ITEMS_SHARED_FROM_POLLING_LOCATION and \
+                positive_value_exists(ballot_returned.polling_location_we_vote_id):
+            # The voter reads these through their VoterBallotSaved.polling_location_we_vote_id_source, which the
+            # caller saves, so nothing is copied
+            status += "BALLOT_ITEMS_SHARED_FROM_POLLING_LOCATION "
+            results = {
+                'ballot_returned_copied':   True,
+                'success':                  True,
+                'status':                   status,
+            }
+            return results
+
         ballot_item_manager = BallotItemManager()
 
         # This is a list of ballot items, usually from a polling location, that we are copying over to a voter
@@ -1227,8 +1305,10 @@ class BallotItemListManager(models.Model):
             }
             return error_results
 
-        # Get all ballot items for this voter
-        retrieve_results = self.retrieve_all_ballot_items_for_voter(voter_id, google_civic_election_id)
+        # Get all ballot items for this voter. Ballot items shared from a polling location are refreshed with the
+        # polling location's ballot.
+        retrieve_results = self.retrieve_all_ballot_items_for_voter(voter_id, google_civic_election_id,
+                                                                    include_shared=False)
         status += retrieve_results['status']
         ballot_item_list_found = retrieve_results['ballot_item_list_found']
         ballot_item_list = retrieve_results['ballot_item_list']
@@ -1363,7 +1443,7 @@ class BallotItemListManager(models.Model):
             ballot_item_queryset = ballot_item_queryset.filter(google_civic_election_id=google_civic_election_id)
             if positive_value_exists(polling_location_we_vote_id):
                 ballot_item_queryset = ballot_item_queryset.filter(
-                    polling_location_we_vote_id__iexact=polling_location_we_vote_id)
+                    polling_location_we_vote_id=normalize_we_vote_id(polling_location_we_vote_id))
             else:
                 ballot_item_queryset = ballot_item_queryset.filter(
                     voter_id=voter_id)
@@ -1377,17 +1457,17 @@ class BallotItemListManager(models.Model):
                 if positive_value_exists(contest_office_we_vote_id):
                     # Ignore entries with contest_office_we_vote_id coming in from master server
                     ballot_item_queryset = ballot_item_queryset.filter(~Q(
-                        contest_office_we_vote_id__iexact=contest_office_we_vote_id))
+                        contest_office_we_vote_id=normalize_we_vote_id(contest_office_we_vote_id)))
                 elif positive_value_exists(contest_measure_we_vote_id):
                     # Ignore entries with contest_measure_we_vote_id coming in from master server
                     ballot_item_queryset = ballot_item_queryset.filter(~Q(
-                        contest_measure_we_vote_id__iexact=contest_measure_we_vote_id))
+                        contest_measure_we_vote_id=normalize_we_vote_id(contest_measure_we_vote_id)))
             elif positive_value_exists(contest_office_we_vote_id):
                 ballot_item_queryset = ballot_item_queryset.filter(
-                    contest_office_we_vote_id__iexact=contest_office_we_vote_id)
+                    contest_office_we_vote_id=normalize_we_vote_id(contest_office_we_vote_id))
             elif positive_value_exists(contest_measure_we_vote_id):
                 ballot_item_queryset = ballot_item_queryset.filter(
-                    contest_measure_we_vote_id__iexact=contest_measure_we_vote_id)
+                    contest_measure_we_vote_id=normalize_we_vote_id(contest_measure_we_vote_id))
 
             ballot_item_list_objects = list(ballot_item_queryset)
             ballot_item_list_count = len(ballot_item_list_objects)
@@ -1470,6 +1550,10 @@ class BallotReturned(models.Model):
     normalized_zip = models.CharField(max_length=255, blank=True, null=True,
                                       verbose_name='normalized zip returned from Google')
 
+    class Meta:
+        # For the box around a point that retrieve_nearest_ballot_returned_list_from_database searches
+        index_together = (('google_civic_election_id', 'latitude'),)
+
     # We override the save function so we can auto-generate we_vote_id
     def save(self, *args, **kwargs):
         # Even if this voter_guide came from another source we still need a unique we_vote_id
@@ -1502,6 +1586,16 @@ class BallotReturned(models.Model):
             return ""
 
 
+@receiver(post_save, sender=BallotReturned)
+@receiver(post_delete, sender=BallotReturned)
+def mark_ballot_returned_index_stale_signal(sender, instance, **kwargs):
+    # The next nearest-ballot search in this election rebuilds the index from the database. A voter's own ballot
+    # isn't in the index, so saving one (which happens on every voter ballot retrieve) doesn't mark it stale.
+    if not positive_value_exists(instance.polling_location_we_vote_id):
+        return
+    mark_ballot_returned_index_stale(instance.google_civic_election_id)
+
+
 class BallotReturnedManager(models.Model):
     """
     Scenario where we get an incomplete address and Google Civic can't find it:
@@ -1628,7 +1722,8 @@ class BallotReturnedManager(models.Model):
                 success = True
                 status = "BALLOT_RETURNED_FOUND_FROM_VOTER_ID "
             elif positive_value_exists(ballot_returned_we_vote_id):
-                ballot_returned = BallotReturned.objects.get(we_vote_id__iexact=ballot_returned_we_vote_id)
+                ballot_returned = BallotReturned.objects.get(
+                    we_vote_id=normalize_we_vote_id(ballot_returned_we_vote_id))
                 # If still here, we found an existing ballot_returned
                 ballot_returned_id = ballot_returned.id
                 ballot_returned_found = True if positive_value_exists(ballot_returned_id) else False
@@ -1970,8 +2065,6 @@ class BallotReturnedManager(models.Model):
         """
         ballot_returned_found = False
         ballot_returned = None
-        location = None
-        try_without_maps_key = False
         status = ""
         state_code = ""
 
@@ -1984,38 +2077,23 @@ class BallotReturnedManager(models.Model):
                 'ballot_returned': ballot_returned,
             }
 
-        if not hasattr(self, 'google_client') or not self.google_client:
-            self.google_client = get_geocoder_for_service('google')(GOOGLE_MAPS_API_KEY)
-
-        try:
-            location = self.google_client.geocode(text_for_map_search, sensor=False, timeout=GEOCODE_TIMEOUT)
-        except GeocoderQuotaExceeded:
-            try_without_maps_key = True
-            status += "GEOCODER_QUOTA_EXCEEDED "
-        except Exception as e:
-            try_without_maps_key = True
-            status += 'GEOCODER_ERROR {error} [type: {error_type}] '.format(error=e, error_type=type(e))
+        geocode_cache_manager = GeocodeCacheManager()
+        geocode_results = geocode_cache_manager.retrieve_geocoded_address(text_for_map_search)
+        status += geocode_results['geocoder_status']
+        if geocode_results['geocoder_quota_exceeded']:
+            results = {
+                'status':                   status,
+                'geocoder_quota_exceeded':  True,
+                'ballot_returned_found':    ballot_returned_found,
+                'ballot_returned':          ballot_returned,
+            }
+            return results
+        if not geocode_results['success']:
             logger.info(status + " @ " + text_for_map_search + "  google_civic_election_id=" +
                         str(google_civic_election_id))
 
-        if try_without_maps_key:
-            # If we have exceeded our account, try without a maps key
-            try:
-                temp_google_client = get_geocoder_for_service('google')()
-                location = temp_google_client.geocode(text_for_map_search, sensor=False, timeout=GEOCODE_TIMEOUT)
-            except GeocoderQuotaExceeded:
-                results = {
-                    'status':                   status,
-                    'geocoder_quota_exceeded':  True,
-                    'ballot_returned_found':    ballot_returned_found,
-                    'ballot_returned':          ballot_returned,
-                }
-                return results
-            except Exception as e:
-                location = None
-
         ballot = None
-        if location is None:
+        if not geocode_results['location_found']:
             status += 'Geocoder could not find location matching "{}". Trying City, State. '.format(text_for_map_search)
             # If Geocoder is not able to give us a location, look to see if their voter entered their address as
             # "city_name, state_code" eg: "Sunnyvale, CA". If so, try to parse the entry and get ballot data
@@ -2059,7 +2137,7 @@ class BallotReturnedManager(models.Model):
         else:
             # If here, then the geocoder successfully found the address
             status += 'GEOCODER_FOUND_LOCATION '
-            address = location.address
+            address = geocode_results['formatted_address']
             # address has format "line_1, state zip, USA"
             ballot_returned_query = BallotReturned.objects.all()
             # Limit this query to entries stored for polling locations
@@ -2067,35 +2145,40 @@ class BallotReturnedManager(models.Model):
                 Q(polling_location_we_vote_id__isnull=True) | Q(polling_location_we_vote_id=""))
             if positive_value_exists(address):
                 state_code = address.split(', ')[-2][:2]
-            if positive_value_exists(state_code):
-                # This search for normalized_state is NOT redundant because some elections are in many states
-                ballot_returned_query = ballot_returned_query.filter(normalized_state__iexact=state_code)
+            if not positive_value_exists(state_code):
+                # GeocodeCache entries filled by warm_geocode_cache from an address without a street, city or state
+                # don't have a formatted_address
+                state_code = geocode_results['state_code']
 
+            election_id_to_search = 0
             if positive_value_exists(google_civic_election_id):
-                ballot_returned_query = ballot_returned_query.filter(google_civic_election_id=google_civic_election_id)
+                election_id_to_search = google_civic_election_id
             else:
                 # If we have an active election coming up, including today
                 # fetch_next_upcoming_election_in_this_state returns next election with ballot items
                 upcoming_google_civic_election_id = self.fetch_next_upcoming_election_in_this_state(state_code)
                 if positive_value_exists(upcoming_google_civic_election_id):
-                    ballot_returned_query = ballot_returned_query.filter(
-                        google_civic_election_id=upcoming_google_civic_election_id)
+                    election_id_to_search = upcoming_google_civic_election_id
                 else:
                     past_google_civic_election_id = self.fetch_last_election_in_this_state(state_code)
                     if positive_value_exists(past_google_civic_election_id):
                         # Limit the search to the most recent election with ballot items
-                        ballot_returned_query = ballot_returned_query.filter(
-                            google_civic_election_id=past_google_civic_election_id)
+                        election_id_to_search = past_google_civic_election_id
 
-            # TODO: This should be updated to a more modern approach. I think this will be deprecated in > Django 1.9
-            ballot_returned_query = ballot_returned_query.annotate(distance=(F('latitude') - location.latitude) ** 2 +
-                                                                            (F('longitude') - location.longitude) ** 2)
-            ballot_returned_query = ballot_returned_query.order_by('distance')
-
-            ballot = ballot_returned_query.first()
-            # ballot_returned_list = list(ballot_returned_query)
-            # if positive_value_exists(len(ballot_returned_list)):
-            #     ballot = ballot_returned_list[0]
+            nearest_results = self.retrieve_nearest_ballot_returned_list(
+                election_id_to_search, geocode_results['latitude'], geocode_results['longitude'], state_code)
+            status += nearest_results['status']
+            if nearest_results['ballot_returned_list_found']:
+                ballot = nearest_results['ballot_returned_list'][0]
+            else:
+                # Only ballots without coordinates could be left, and the database puts those last
+                if positive_value_exists(state_code):
+                    # This search for normalized_state is NOT redundant because some elections are in many states
+                    ballot_returned_query = ballot_returned_query.filter(normalized_state__iexact=state_code)
+                if positive_value_exists(election_id_to_search):
+                    ballot_returned_query = ballot_returned_query.filter(
+                        google_civic_election_id=election_id_to_search)
+                ballot = ballot_returned_query.first()
 
         if ballot is not None:
             ballot_returned = ballot
@@ -2111,6 +2194,94 @@ class BallotReturnedManager(models.Model):
             'ballot_returned':          ballot_returned,
         }
 
+    def retrieve_ballot_returned_locations_for_election(self, google_civic_election_id):
+        """
+        The (id, latitude, longitude, normalized_state) of every polling location ballot in this election, which is
+        what the in-memory index in ballot/ballot_returned_index.py is built from
+        :param google_civic_election_id:
+        :return:
+        """
+        ballot_returned_query = BallotReturned.objects.using('readonly').filter(
+            google_civic_election_id=google_civic_election_id)
+        ballot_returned_query = ballot_returned_query.exclude(
+            Q(polling_location_we_vote_id__isnull=True) | Q(polling_location_we_vote_id=""))
+        ballot_returned_query = ballot_returned_query.exclude(latitude__isnull=True).exclude(longitude__isnull=True)
+        return list(ballot_returned_query.values_list('id', 'latitude', 'longitude', 'normalized_state'))
+
+    def retrieve_nearest_ballot_returned_list(self, google_civic_election_id, latitude, longitude, state_code='',
+                                              number_to_retrieve=1):
+        """
+        The polling location ballots nearest to this point, nearest first. With an election, the election's in-memory
+        index is searched. Without one (or with BALLOT_RETURNED_INDEX_ON False), the database is searched, a box
+        around the point at a time.
+        :param google_civic_election_id:
+        :param latitude:
+        :param longitude:
+        :param state_code: Only return ballots in this state
+        :param number_to_retrieve:
+        :return:
+        """
+        status = ""
+        ballot_returned_list = []
+        number_to_retrieve = max(convert_to_int(number_to_retrieve), 1)
+        if latitude is None or longitude is None:
+            return {
+                'success':                      False,
+                'status':                       "NEAREST_BALLOT_RETURNED-MISSING_LATITUDE_OR_LONGITUDE ",
+                'ballot_returned_list_found':   False,
+                'ballot_returned_list':         [],
+            }
+
+        if BALLOT_RETURNED_INDEX_ON and positive_value_exists(google_civic_election_id):
+            election_index = fetch_ballot_returned_index(
+                google_civic_election_id, self.retrieve_ballot_returned_locations_for_election)
+            nearest_list = election_index.find_nearest(latitude, longitude, state_code, number_to_retrieve)
+            ballot_returned_id_list = [ballot_returned_id for distance, ballot_returned_id in nearest_list]
+            ballot_returned_by_id = BallotReturned.objects.in_bulk(ballot_returned_id_list)
+            # A ballot deleted since the index was built is skipped
+            ballot_returned_list = [ballot_returned_by_id[ballot_returned_id]
+                                    for ballot_returned_id in ballot_returned_id_list
+                                    if ballot_returned_id in ballot_returned_by_id]
+            status += "NEAREST_BALLOT_RETURNED_FROM_INDEX "
+        else:
+            ballot_returned_list = self.retrieve_nearest_ballot_returned_list_from_database(
+                google_civic_election_id, latitude, longitude, state_code, number_to_retrieve)
+            status += "NEAREST_BALLOT_RETURNED_FROM_DATABASE "
+
+        return {
+            'success':                      True,
+            'status':                       status,
+            'ballot_returned_list_found':   positive_value_exists(len(ballot_returned_list)),
+            'ballot_returned_list':         ballot_returned_list,
+        }
+
+    def retrieve_nearest_ballot_returned_list_from_database(self, google_civic_election_id, latitude, longitude,
+                                                            state_code='', number_to_retrieve=1):
+        ballot_returned_query = BallotReturned.objects.all()
+        # Limit this query to entries stored for polling locations
+        ballot_returned_query = ballot_returned_query.exclude(
+            Q(polling_location_we_vote_id__isnull=True) | Q(polling_location_we_vote_id=""))
+        if positive_value_exists(state_code):
+            # This search for normalized_state is NOT redundant because some elections are in many states
+            ballot_returned_query = ballot_returned_query.filter(normalized_state__iexact=state_code)
+        if positive_value_exists(google_civic_election_id):
+            ballot_returned_query = ballot_returned_query.filter(google_civic_election_id=google_civic_election_id)
+        ballot_returned_query = ballot_returned_query.annotate(
+            distance=(F('latitude') - latitude) ** 2 + (F('longitude') - longitude) ** 2)
+
+        # Look in a box around the point first, so the database only measures and sorts the ballots in the box.
+        # A ballot found in the box is only the nearest if it is closer than the edge of the box.
+        for box_size in (0.1, 0.5, 2.0, 10.0):
+            box_query = ballot_returned_query.filter(
+                latitude__range=(latitude - box_size, latitude + box_size),
+                longitude__range=(longitude - box_size, longitude + box_size))
+            ballot_returned_list = list(box_query.order_by('distance')[:number_to_retrieve])
+            if len(ballot_returned_list) == number_to_retrieve and \
+                    ballot_returned_list[-1].distance <= box_size ** 2:
+                return ballot_returned_list
+        return list(ballot_returned_query.exclude(latitude__isnull=True).exclude(longitude__isnull=True).order_by(
+            'distance')[:number_to_retrieve])
+
     def should_election_search_data_be_saved(self, google_civic_election_id):
         if not positive_value_exists(google_civic_election_id):
             return False
@@ -2236,10 +2407,6 @@ class BallotReturnedManager(models.Model):
         :return:
         """
         status = ""
-        # We try to use existing google_client
-        if not hasattr(self, 'google_client') or not self.google_client:
-            self.google_client = get_geocoder_for_service('google')(GOOGLE_MAPS_API_KEY)
-
         if not hasattr(ballot_returned_object, "normalized_line1"):
             results = {
                 'status':                   "POPULATE_LATITUDE_AND_LONGITUDE-NOT_A_BALLOT_RETURNED_OBJECT ",
@@ -2265,26 +2432,20 @@ class BallotReturnedManager(models.Model):
             ballot_returned_object.normalized_city,
             ballot_returned_object.normalized_state,
             ballot_returned_object.normalized_zip)
-        try:
-            location = self.google_client.geocode(full_ballot_address, sensor=False, timeout=GEOCODE_TIMEOUT)
-        except GeocoderQuotaExceeded:
-            status += "GeocoderQuotaExceeded "
+        # We try to use existing geocode_cache_manager
+        if not hasattr(self, 'geocode_cache_manager') or not self.geocode_cache_manager:
+            self.geocode_cache_manager = GeocodeCacheManager()
+        geocode_results = self.geocode_cache_manager.retrieve_geocoded_address(full_ballot_address)
+        status += geocode_results['status']
+        if not geocode_results['success']:
             results = {
                 'status':                   status,
-                'geocoder_quota_exceeded':  True,
-                'success':                  False,
-            }
-            return results
-        except Exception as e:
-            status += "Geocoder-Exception: " + str(e) + " "
-            results = {
-                'status':                   status,
-                'geocoder_quota_exceeded':  False,
+                'geocoder_quota_exceeded':  geocode_results['geocoder_quota_exceeded'],
                 'success':                  False,
             }
             return results
 
-        if location is None:
+        if not geocode_results['location_found']:
             results = {
                 'status':                   "POPULATE_LATITUDE_AND_LONGITUDE-LOCATION_NOT_RETURNED_FROM_GEOCODER ",
                 'geocoder_quota_exceeded':  False,
@@ -2293,7 +2454,8 @@ class BallotReturnedManager(models.Model):
             return results
 
         try:
-            ballot_returned_object.latitude, ballot_returned_object.longitude = location.latitude, location.longitude
+            ballot_returned_object.latitude = geocode_results['latitude']
+            ballot_returned_object.longitude = geocode_results['longitude']
             ballot_returned_object.save()
             status += "BALLOT_RETURNED_SAVED_WITH_LATITUDE_AND_LONGITUDE "
             success = True
@@ -2410,7 +2572,8 @@ class BallotReturnedListManager(models.Model):
             ballot_returned_queryset = \
                 ballot_returned_queryset.filter(google_civic_election_id=google_civic_election_id)
             ballot_returned_queryset = \
-                ballot_returned_queryset.filter(polling_location_we_vote_id__iexact=polling_location_we_vote_id)
+                ballot_returned_queryset.filter(
+                    polling_location_we_vote_id=normalize_we_vote_id(polling_location_we_vote_id))
             ballot_returned_queryset = ballot_returned_queryset.filter(voter_id=voter_id)
 
             ballot_returned_list = list(ballot_returned_queryset)
@@ -2465,13 +2628,13 @@ class BallotReturnedListManager(models.Model):
                 new_filter = Q(normalized_state__icontains=ballot_returned_search_str)
                 filters.append(new_filter)
 
-                new_filter = Q(we_vote_id__iexact=ballot_returned_search_str)
+                new_filter = Q(we_vote_id=normalize_we_vote_id(ballot_returned_search_str))
                 filters.append(new_filter)
 
                 new_filter = Q(voter_id__iexact=ballot_returned_search_str)
                 filters.append(new_filter)
 
-                new_filter = Q(polling_location_we_vote_id__iexact=ballot_returned_search_str)
+                new_filter = Q(polling_location_we_vote_id=normalize_we_vote_id(ballot_returned_search_str))
                 filters.append(new_filter)
 
                 # Add the first query
@@ -2586,7 +2749,7 @@ class BallotReturnedListManager(models.Model):
 
             # Ignore entries with polling_location_we_vote_id coming in from master server
             ballot_returned_queryset = ballot_returned_queryset.filter(~Q(
-                polling_location_we_vote_id__iexact=polling_location_we_vote_id))
+                polling_location_we_vote_id=normalize_we_vote_id(polling_location_we_vote_id)))
 
             ballot_returned_list_objects = ballot_returned_queryset
 
@@ -2876,7 +3039,7 @@ class VoterBallotSavedManager(models.Model):
                 status += "VOTER_BALLOT_SAVED_FOUND_FROM_VOTER_ID_AND_GOOGLE_CIVIC "
             elif positive_value_exists(voter_id) and positive_value_exists(ballot_returned_we_vote_id):
                 voter_ballot_saved = VoterBallotSaved.objects.get(
-                    voter_id=voter_id, ballot_returned_we_vote_id__iexact=ballot_returned_we_vote_id)
+                    voter_id=voter_id, ballot_returned_we_vote_id=normalize_we_vote_id(ballot_returned_we_vote_id))
                 # If still here, we found an existing voter_ballot_saved
                 voter_ballot_saved_id = voter_ballot_saved.id
                 voter_ballot_saved_found = True if positive_value_exists(voter_ballot_saved_id) else False
@@ -3172,6 +3335,173 @@ class VoterBallotSavedManager(models.Model):
         return results
 
 
+def generate_content_version_token():
+    return generate_random_string(12)
+
+
+class BallotContentVersion(models.Model):
+    """
+    Goes up by one whenever an office, candidate, measure or polling location ballot item in this election changes,
+    which retires every BallotPayloadCache entry saved for this election before the change
+    """
+    google_civic_election_id = models.PositiveIntegerField(
+        verbose_name="google civic election id", default=0, null=False, unique=True)
+    content_version = models.PositiveIntegerField(verbose_name="version of this election's ballots", default=0)
+    # Tells this entry's versions apart from those of an earlier entry for the election (like before a database
+    # was restored), for anything saved outside the database under a version number
+    content_version_token = models.CharField(
+        verbose_name="random token for this entry", max_length=12, default=generate_content_version_token)
+
+
+class BallotPayloadCache(models.Model):
+    """
+    The ballot_item_list that voterBallotItemsRetrieve returns for one polling location's ballot, already serialized,
+    so the many voters who share that ballot don't each cause every office and its candidates to be looked up again
+    """
+    polling_location_we_vote_id = models.CharField(
+        verbose_name="we vote permanent id of the polling location", max_length=255, null=False)
+    google_civic_election_id = models.PositiveIntegerField(
+        verbose_name="google civic election id", default=0, null=False)
+    # Only used while it matches BallotContentVersion.content_version for this election
+    content_version = models.PositiveIntegerField(verbose_name="version of this election's ballots", default=0)
+    ballot_item_list_json = models.TextField(verbose_name="ballot_item_list as json", null=False, default="[]")
+    date_last_changed = models.DateTimeField(verbose_name='date last changed', null=True, auto_now=True)
+
+    class Meta:
+        unique_together = (('polling_location_we_vote_id', 'google_civic_election_id'),)
+
+
+class BallotPayloadCacheManager(models.Model):
+
+    def __unicode__(self):
+        return "BallotPayloadCacheManager"
+
+    def fetch_ballot_content_version(self, google_civic_election_id):
+        content_version = BallotContentVersion.objects.filter(
+            google_civic_election_id=convert_to_int(google_civic_election_id)).values_list(
+            'content_version', flat=True).first()
+        return content_version or 0
+
+    def fetch_ballot_content_version_and_token(self, google_civic_election_id):
+        """
+        The election's content_version and content_version_token, creating its BallotContentVersion if needed
+        :param google_civic_election_id:
+        :return:
+        """
+        ballot_content_version, created = BallotContentVersion.objects.get_or_create(
+            google_civic_election_id=convert_to_int(google_civic_election_id))
+        return ballot_content_version.content_version, ballot_content_version.content_version_token
+
+    def bump_ballot_content_version(self, google_civic_election_id):
+        google_civic_election_id = convert_to_int(google_civic_election_id)
+        if not positive_value_exists(google_civic_election_id):
+            return
+        try:
+            updated = BallotContentVersion.objects.filter(google_civic_election_id=google_civic_election_id).update(
+                content_version=F('content_version') + 1)
+            if not updated:
+                try:
+                    with transaction.atomic():
+                        BallotContentVersion.objects.create(
+                            google_civic_election_id=google_civic_election_id, content_version=1)
+                except IntegrityError:
+                    # Created by someone else since we looked
+                    BallotContentVersion.objects.filter(google_civic_election_id=google_civic_election_id).update(
+                        content_version=F('content_version') + 1)
+        except Exception as e:
+            handle_exception(e, logger=logger)
+
+    def retrieve_cached_ballot_item_list(self, polling_location_we_vote_id, google_civic_election_id):
+        """
+        The cached ballot_item_list for this polling location's ballot, if it was saved for the current version of
+        this election's ballots
+        :param polling_location_we_vote_id:
+        :param google_civic_election_id:
+        :return:
+        """
+        ballot_item_list = []
+        ballot_item_list_found = False
+        status = ""
+        try:
+            current_version_query = BallotContentVersion.objects.filter(
+                google_civic_election_id=OuterRef('google_civic_election_id')).values('content_version')[:1]
+            cached_query = BallotPayloadCache.objects.filter(
+                polling_location_we_vote_id=polling_location_we_vote_id,
+                google_civic_election_id=convert_to_int(google_civic_election_id))
+            cached_query = cached_query.annotate(current_version=Coalesce(Subquery(current_version_query), 0))
+            cached = cached_query.values_list('content_version', 'current_version', 'ballot_item_list_json').first()
+            if cached is None:
+                status += "BALLOT_PAYLOAD_CACHE_MISS "
+            elif cached[0] != cached[1]:
+                status += "BALLOT_PAYLOAD_CACHE_OUT_OF_DATE "
+            else:
+                ballot_item_list = json.loads(cached[2])
+                ballot_item_list_found = True
+                status += "BALLOT_PAYLOAD_CACHE_HIT "
+        except Exception as e:
+            status += "BALLOT_PAYLOAD_CACHE_RETRIEVE_FAILED " + str(e) + " "
+            handle_exception(e, logger=logger, exception_message=status)
+
+        results = {
+            'success':                  True,
+            'status':                   status,
+            'ballot_item_list_found':   ballot_item_list_found,
+            'ballot_item_list':         ballot_item_list,
+        }
+        return results
+
+    def save_cached_ballot_item_list(self, polling_location_we_vote_id, google_civic_election_id, content_version,
+                                     ballot_item_list):
+        """
+        :param polling_location_we_vote_id:
+        :param google_civic_election_id:
+        :param content_version: The version read (with fetch_ballot_content_version) before ballot_item_list was
+          built, so a list built from data that changed while we were building it is never used
+        :param ballot_item_list:
+        :return:
+        """
+        status = ""
+        success = True
+        try:
+            BallotPayloadCache.objects.update_or_create(
+                polling_location_we_vote_id=polling_location_we_vote_id,
+                google_civic_election_id=convert_to_int(google_civic_election_id),
+                defaults={
+                    'content_version':          content_version,
+                    'ballot_item_list_json':    json.dumps(ballot_item_list),
+                })
+            status += "BALLOT_PAYLOAD_CACHE_SAVED "
+        except Exception as e:
+            # Another request may have saved the same ballot first
+            status += "BALLOT_PAYLOAD_CACHE_NOT_SAVED " + str(e) + " "
+            success = False
+
+        results = {
+            'success':  success,
+            'status':   status,
+        }
+        return results
+
+
+@receiver(post_save, sender=CandidateCampaign)
+@receiver(post_delete, sender=CandidateCampaign)
+@receiver(post_save, sender=ContestMeasure)
+@receiver(post_delete, sender=ContestMeasure)
+@receiver(post_save, sender=ContestOffice)
+@receiver(post_delete, sender=ContestOffice)
+@receiver(post_save, sender=BallotItem)
+@receiver(post_delete, sender=BallotItem)
+def bump_ballot_content_version_signal(sender, instance, **kwargs):
+    if sender is BallotItem and not positive_value_exists(instance.polling_location_we_vote_id):
+        # Ballot items saved for one voter aren't in any BallotPayloadCache entry
+        return
+    google_civic_election_id = convert_to_int(instance.google_civic_election_id)
+    if positive_value_exists(google_civic_election_id):
+        # After the change commits, so a ballot_item_list built from the old data in the meantime is retired too
+        transaction.on_commit(lambda: BallotPayloadCacheManager().bump_ballot_content_version(
+            google_civic_election_id))
+
+
 def copy_existing_ballot_items_from_stored_ballot(voter_id, text_for_map_search, google_civic_election_id=0,
                                                   ballot_returned_we_vote_id='', ballot_location_shortcut=''):
     """
@@ -3659,8 +3989,11 @@ def retrieve_address_fields_from_geocoder(text_for_map_search):
     state_code = ""
     zip_long = ""
     try:
-        google_client = get_geocoder_for_service('google')(GOOGLE_MAPS_API_KEY)
-        location = google_client.geocode(text_for_map_search, sensor=False, timeout=GEOCODE_TIMEOUT)
+        # The GeocodeCache doesn't keep the city, so this asks Google directly
+        geocode_cache_manager = GeocodeCacheManager()
+        geocode_results = geocode_cache_manager.geocode_with_google(text_for_map_search)
+        status += geocode_results['status']
+        location = geocode_results['location']
         if location is None:
             status += 'REFRESH_ADDRESS_FIELDS: Could not find location matching "{}" '.format(text_for_map_search)
             logger.debug(status)
@@ -1,9 +1,27 @@
 from unittest import mock
 from collections import namedtuple
+import os
+import stat
+import tempfile
+import threading
+import time
 
 from django.test import TestCase
+from django.utils.timezone import now
 
-from ballot.models import BallotReturned, BallotReturnedManager
+from ballot.ballot_returned_index import BallotReturnedLocationGrid, clear_ballot_returned_index, \
+    fetch_ballot_returned_index
+from ballot.bulk_ballot_storage import BulkBallotStorage
+from ballot.controllers import voter_ballot_items_retrieve_for_one_election_for_api
+from ballot.election_snapshot import clear_election_snapshots, election_snapshot_file_path, \
+    fetch_election_snapshot, load_election_snapshot_file, retrieve_all_candidates_for_office_from_snapshot, \
+    save_election_snapshot_file
+from ballot.models import BallotItem, BallotItemListManager, BallotPayloadCacheManager, BallotReturned, \
+    BallotReturnedManager, VoterBallotSaved
+from candidate.models import CandidateCampaign
+from geoip.models import GeocodeCache, normalize_address_for_geocode_cache
+from office.models import ContestOffice
+import random
 
 
 Location = namedtuple('Location', ['address', 'latitude', 'longitude'])
@@ -24,7 +42,7 @@ class BallotTestCase(TestCase):
         self.ballot_manager = BallotReturnedManager()
 
     def test_do_not_return_ballot_in_different_state(self):
-        with mock.patch('ballot.models.get_geocoder_for_service') as mock_geopy:
+        with mock.patch('geoip.models.get_geocoder_for_service') as mock_geopy:
             google_client = mock_geopy('google')()
             google_client.geocode.return_value = Location(address='1200 Broadway Avenue, Oakland, CA 94720, USA',
                                                           latitude=37.8030442, longitude=-122.2739699)
@@ -36,8 +54,20 @@ class BallotTestCase(TestCase):
                                       'ballot_returned_found': False,
                                       'ballot_returned': None})
 
+    def test_state_from_cached_address_without_formatted_address(self):
+        # As saved by warm_geocode_cache for an address without a street
+        GeocodeCache.objects.create(
+            normalized_address=normalize_address_for_geocode_cache('Oakland, CA'), location_found=True,
+            formatted_address=None, latitude=37.8030442, longitude=-122.2739699, state_code='CA',
+            date_geocoded=now())
+        with mock.patch('geoip.models.get_geocoder_for_service') as mock_geopy:
+            result = self.ballot_manager.find_closest_ballot_returned('Oakland, CA')
+            self.assertEqual(mock_geopy('google')().geocode.call_count, 0)
+        self.assertEqual(result['status'], 'GEOCODER_FOUND_LOCATION NO_STORED_BALLOT_MATCHES_STATE CA. ')
+        self.assertFalse(result['ballot_returned_found'])
+
     def test_address_not_found(self):
-        with mock.patch('ballot.models.get_geocoder_for_service') as mock_geopy:
+        with mock.patch('geoip.models.get_geocoder_for_service') as mock_geopy:
             google_client = mock_geopy('google')()
             google_client.geocode.return_value = None
             result = self.ballot_manager.find_closest_ballot_returned('blah bal blh, OK')
@@ -51,7 +81,7 @@ class BallotTestCase(TestCase):
     def test_ballot_found(self):
         ballot_in_ms = BallotReturned.objects.get()
         self.assertEqual(ballot_in_ms.normalized_state, 'MS')
-        with mock.patch('ballot.models.get_geocoder_for_service') as mock_geopy:
+        with mock.patch('geoip.models.get_geocoder_for_service') as mock_geopy:
             google_client = mock_geopy('google')()
             google_client.geocode.return_value = Location(address='Jackson, MS, USA',
                                                           latitude=32.310251, longitude=-90.3289724)
@@ -75,7 +105,7 @@ class BallotTestCase(TestCase):
                                                              'polling_location_we_vote_id': 'wv01ploc42284',
                                                              })
         self.assertEqual(BallotReturned.objects.filter(normalized_state='MS').count(), 2)
-        with mock.patch('ballot.models.get_geocoder_for_service') as mock_geopy:
+        with mock.patch('geoip.models.get_geocoder_for_service') as mock_geopy:
             google_client = mock_geopy('google')()
             google_client.geocode.return_value = Location(address='Jackson, MS, USA',
                                                           latitude=32.310251, longitude=-90.3289724)
@@ -86,3 +116,266 @@ class BallotTestCase(TestCase):
                                       'geocoder_quota_exceeded': False,
                                       'ballot_returned_found': True,
                                       'ballot_returned': ballot_in_jackson})
+
+    def test_nearest_ballots_from_election_index(self):
+        ballot_in_coldwater = BallotReturned.objects.get()
+        ballot_in_jackson = BallotReturned.objects.create(**{'google_civic_election_id': 4184,
+                                                             'latitude': 32.269163,
+                                                             'longitude': -90.234566,
+                                                             'normalized_city': 'jackson',
+                                                             'normalized_line1': '1020 w mcdowell rd',
+                                                             'normalized_state': 'MS',
+                                                             'normalized_zip': '39204',
+                                                             'polling_location_we_vote_id': 'wv01ploc42284',
+                                                             })
+        results = self.ballot_manager.retrieve_nearest_ballot_returned_list(4184, 32.310251, -90.3289724, 'ms', 2)
+        self.assertEqual(results['ballot_returned_list'], [ballot_in_jackson, ballot_in_coldwater])
+        results = self.ballot_manager.retrieve_nearest_ballot_returned_list(4184, 32.310251, -90.3289724, 'CA')
+        self.assertEqual(results['ballot_returned_list'], [])
+
+
+class SharedBallotItemsTestCase(TestCase):
+
+    def setUp(self):
+        clear_election_snapshots()
+        self.ballot_returned = BallotReturned.objects.create(**{'google_civic_election_id': 4184,
+                                                                'normalized_state': 'MS',
+                                                                'polling_location_we_vote_id': 'wv01ploc43132',
+                                                                })
+        BallotItem.objects.create(polling_location_we_vote_id='wv01ploc43132', google_civic_election_id='4184',
+                                  contest_office_id='1', contest_office_we_vote_id='wv01off1',
+                                  ballot_item_display_name='Governor', local_ballot_order=1)
+        BallotItem.objects.create(polling_location_we_vote_id='wv01ploc43132', google_civic_election_id='4184',
+                                  contest_measure_id='2', contest_measure_we_vote_id='wv01meas2',
+                                  ballot_item_display_name='Measure A', local_ballot_order=2)
+        self.ballot_item_list_manager = BallotItemListManager()
+
+    def test_voter_reads_polling_location_ballot_items_without_copies(self):
+        results = self.ballot_item_list_manager.copy_ballot_items(self.ballot_returned, 7)
+        self.assertTrue(results['ballot_returned_copied'])
+        self.assertEqual(BallotItem.objects.filter(voter_id=7).count(), 0)
+
+        VoterBallotSaved.objects.create(voter_id=7, google_civic_election_id=4184,
+                                        polling_location_we_vote_id_source='wv01ploc43132')
+        results = self.ballot_item_list_manager.retrieve_all_ballot_items_for_voter(7, 4184)
+        self.assertEqual([ballot_item.ballot_item_display_name for ballot_item in results['ballot_item_list']],
+                         ['Governor', 'Measure A'])
+        self.assertEqual(results['polling_location_we_vote_id'], 'wv01ploc43132')
+
+        # Ballot items saved for the voter come first
+        BallotItem.objects.create(voter_id=7, google_civic_election_id='4184', contest_office_id='1',
+                                  contest_office_we_vote_id='wv01off1', ballot_item_display_name='Governor')
+        results = self.ballot_item_list_manager.retrieve_all_ballot_items_for_voter(7, 4184)
+        self.assertEqual([ballot_item.voter_id for ballot_item in results['ballot_item_list']], [7])
+
+    def test_polling_location_ballot_payload_is_cached_until_the_election_changes(self):
+        VoterBallotSaved.objects.create(voter_id=7, google_civic_election_id=4184,
+                                        polling_location_we_vote_id_source='wv01ploc43132')
+        results = voter_ballot_items_retrieve_for_one_election_for_api('', 7, 4184)
+        self.assertIn('BALLOT_PAYLOAD_CACHE_SAVED', results['status'])
+        self.assertEqual([ballot_item['we_vote_id'] for ballot_item in results['ballot_item_list']], ['wv01meas2'])
+
+        cached_results = voter_ballot_items_retrieve_for_one_election_for_api('', 7, 4184)
+        self.assertIn('BALLOT_PAYLOAD_CACHE_HIT', cached_results['status'])
+        self.assertEqual(cached_results['ballot_item_list'], results['ballot_item_list'])
+
+        BallotPayloadCacheManager().bump_ballot_content_version(4184)
+        results = voter_ballot_items_retrieve_for_one_election_for_api('', 7, 4184)
+        self.assertIn('BALLOT_PAYLOAD_CACHE_OUT_OF_DATE', results['status'])
+
+
+class ElectionSnapshotTestCase(TestCase):
+
+    def setUp(self):
+        clear_election_snapshots()
+        self.snapshot_directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.snapshot_directory.cleanup)
+        patcher = mock.patch('ballot.election_snapshot.ELECTION_SNAPSHOT_DIRECTORY', self.snapshot_directory.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(clear_election_snapshots)
+
+        self.contest_office = ContestOffice.objects.create(
+            we_vote_id='wv01off9', office_name='Governor', google_civic_election_id='4184')
+        CandidateCampaign.objects.create(
+            we_vote_id='wv01cand1', candidate_name='Fewer Followers', google_civic_election_id='4184',
+            contest_office_id=str(self.contest_office.id), contest_office_we_vote_id='wv01off9',
+            twitter_followers_count=10)
+        CandidateCampaign.objects.create(
+            we_vote_id='wv01cand2', candidate_name='More Followers', google_civic_election_id='4184',
+            contest_office_id=str(self.contest_office.id), contest_office_we_vote_id='wv01off9',
+            twitter_followers_count=500)
+
+    def test_candidates_for_office_come_from_the_snapshot(self):
+        results = retrieve_all_candidates_for_office_from_snapshot(self.contest_office.id, 'wv01off9', 4184)
+        self.assertEqual(results['status'], "CANDIDATES_FOR_OFFICE_FROM_ELECTION_SNAPSHOT ")
+        self.assertEqual([candidate.we_vote_id for candidate in results['candidate_list']],
+                         ['wv01cand2', 'wv01cand1'])
+
+        # Another worker loads the file instead of building the snapshot again
+        election_snapshot = fetch_election_snapshot(4184)
+        clear_election_snapshots()
+        with mock.patch('ballot.election_snapshot.ElectionSnapshot.build') as mock_build:
+            loaded_election_snapshot = fetch_election_snapshot(4184)
+            self.assertEqual(mock_build.call_count, 0)
+        self.assertEqual(loaded_election_snapshot.content_version_token, election_snapshot.content_version_token)
+        self.assertEqual(sorted(loaded_election_snapshot.candidates_by_we_vote_id), ['wv01cand1', 'wv01cand2'])
+
+    def test_snapshot_files_only_used_in_a_private_directory(self):
+        election_snapshot = fetch_election_snapshot(4184)
+        file_path = election_snapshot_file_path(4184, election_snapshot.content_version,
+                                                election_snapshot.content_version_token)
+        self.assertEqual(stat.S_IMODE(os.stat(file_path).st_mode) & 0o077, 0)
+
+        # A file anyone else can write to isn't unpickled
+        os.chmod(file_path, 0o666)
+        with mock.patch('ballot.election_snapshot.pickle.load') as mock_load:
+            self.assertIsNone(load_election_snapshot_file(4184, election_snapshot.content_version,
+                                                          election_snapshot.content_version_token))
+            self.assertEqual(mock_load.call_count, 0)
+
+        # Nor is anything read from or written to a directory anyone else can write to
+        os.chmod(file_path, 0o600)
+        os.chmod(self.snapshot_directory.name, 0o777)
+        self.addCleanup(os.chmod, self.snapshot_directory.name, 0o700)
+        with mock.patch('ballot.election_snapshot.pickle.load') as mock_load:
+            self.assertIsNone(load_election_snapshot_file(4184, election_snapshot.content_version,
+                                                          election_snapshot.content_version_token))
+            self.assertEqual(mock_load.call_count, 0)
+        os.remove(file_path)
+        self.assertFalse(save_election_snapshot_file(election_snapshot))
+        self.assertFalse(os.path.exists(file_path))
+
+    def test_snapshot_checked_again_once_the_version_is_bumped(self):
+        election_snapshot = fetch_election_snapshot(4184)
+        on_commit_callback_list = []
+        with mock.patch('django.db.transaction.on_commit', side_effect=on_commit_callback_list.append):
+            candidate = CandidateCampaign.objects.get(we_vote_id='wv01cand1')
+            candidate.candidate_name = 'Renamed'
+            candidate.save()
+        # Until the change commits and the version is bumped, the snapshot isn't checked again
+        self.assertIsNotNone(election_snapshot.time_checked)
+
+        for on_commit_callback in on_commit_callback_list:
+            on_commit_callback()
+        self.assertIsNone(election_snapshot.time_checked)
+        new_election_snapshot = fetch_election_snapshot(4184)
+        self.assertNotEqual(new_election_snapshot.content_version_token, election_snapshot.content_version_token)
+        self.assertEqual(new_election_snapshot.candidates_by_we_vote_id['wv01cand1'].candidate_name, 'Renamed')
+
+    def test_offices_not_in_the_election_come_from_the_database(self):
+        other_office = ContestOffice.objects.create(
+            we_vote_id='wv01off10', office_name='Mayor', google_civic_election_id='5000')
+        results = retrieve_all_candidates_for_office_from_snapshot(other_office.id, 'wv01off10', 4184)
+        self.assertNotIn('ELECTION_SNAPSHOT', results['status'])
+        self.assertFalse(results['candidate_list_found'])
+
+
+class BulkBallotStorageTestCase(TestCase):
+
+    def test_save_ballot_items_creates_updates_and_removes_duplicates(self):
+        BallotItem.objects.create(
+            google_civic_election_id='4184', polling_location_we_vote_id='wv01ploc1', contest_office_id='9',
+            contest_office_we_vote_id='wv01off9', contest_measure_id='0', ballot_item_display_name='Governor',
+            local_ballot_order=1)
+        BallotItem.objects.create(
+            google_civic_election_id='4184', polling_location_we_vote_id='wv01ploc1', contest_office_id='9',
+            contest_office_we_vote_id='wv01off9', contest_measure_id='0', ballot_item_display_name='Governor',
+            local_ballot_order=1)
+
+        bulk_ballot_storage = BulkBallotStorage(4184)
+        for polling_location_we_vote_id in ['WV01PLOC1', 'wv01ploc2']:
+            bulk_ballot_storage.add_polling_location_ballot_item(
+                polling_location_we_vote_id, 0, 'Governor', '', '', 2, 9, 'wv01off9', state_code='ms')
+            bulk_ballot_storage.add_polling_location_ballot_item(
+                polling_location_we_vote_id, 0, 'Measure A', '', '', 3, contest_measure_id=4,
+                contest_measure_we_vote_id='wv01meas4', state_code='ms')
+        results = bulk_ballot_storage.save_ballot_items()
+
+        self.assertTrue(results['success'])
+        self.assertEqual(results['ballot_items_created'], 3)
+        self.assertEqual(results['ballot_items_updated'], 1)
+        self.assertEqual(results['polling_location_we_vote_id_list'], ['wv01ploc1', 'wv01ploc2'])
+        self.assertEqual(BallotItem.objects.filter(polling_location_we_vote_id='wv01ploc1').count(), 2)
+        self.assertEqual(BallotItem.objects.get(polling_location_we_vote_id='wv01ploc1',
+                                                contest_office_we_vote_id='wv01off9').local_ballot_order, 2)
+
+        # Saving the same ballots again doesn't change anything
+        bulk_ballot_storage.add_polling_location_ballot_item(
+            'wv01ploc2', 0, 'Governor', '', '', 2, 9, 'wv01off9', state_code='ms')
+        results = bulk_ballot_storage.save_ballot_items()
+        self.assertEqual(results['ballot_items_created'], 0)
+        self.assertEqual(results['ballot_items_updated'], 0)
+
+
+    def test_ballot_items_without_both_ids_are_not_saved(self):
+        bulk_ballot_storage = BulkBallotStorage(4184)
+        results = bulk_ballot_storage.add_polling_location_ballot_item(
+            'wv01ploc1', 0, 'Governor', '', '', 1, contest_office_we_vote_id='wv01off404')
+        self.assertFalse(results['success'])
+        results = bulk_ballot_storage.add_polling_location_ballot_item('wv01ploc1', 0, 'Governor', '', '', 1)
+        self.assertFalse(results['success'])
+
+        # The missing id is looked up, as update_or_create_ballot_item_for_polling_location does
+        contest_office = ContestOffice.objects.create(
+            we_vote_id='wv01off5', office_name='Governor', google_civic_election_id='4184')
+        results = bulk_ballot_storage.add_polling_location_ballot_item(
+            'wv01ploc1', 0, 'Governor', '', '', 1, contest_office_we_vote_id='wv01off5')
+        self.assertTrue(results['success'])
+        self.assertEqual(bulk_ballot_storage.save_ballot_items()['ballot_items_created'], 1)
+        self.assertEqual(BallotItem.objects.get(polling_location_we_vote_id='wv01ploc1').contest_office_id,
+                         str(contest_office.id))
+
+
+class BallotReturnedLocationGridTestCase(TestCase):
+
+    def test_find_nearest_matches_measuring_every_point(self):
+        random_generator = random.Random(4184)
+        point_list = [(random_generator.uniform(30, 35), random_generator.uniform(-95, -88), ballot_returned_id)
+                      for ballot_returned_id in range(2000)]
+        grid = BallotReturnedLocationGrid()
+        for latitude, longitude, ballot_returned_id in point_list:
+            grid.add(latitude, longitude, ballot_returned_id)
+
+        for search_number in range(50):
+            latitude = random_generator.uniform(28, 37)
+            longitude = random_generator.uniform(-97, -86)
+            every_distance_list = sorted(((point_latitude - latitude) ** 2 + (point_longitude - longitude) ** 2,
+                                          ballot_returned_id)
+                                         for point_latitude, point_longitude, ballot_returned_id in point_list)
+            self.assertEqual(grid.find_nearest(latitude, longitude, 3), every_distance_list[:3])
+
+
+class BallotReturnedIndexTestCase(TestCase):
+
+    def setUp(self):
+        clear_ballot_returned_index()
+        self.addCleanup(clear_ballot_returned_index)
+
+    def test_only_polling_location_ballots_mark_the_index_stale(self):
+        ballot_returned_manager = BallotReturnedManager()
+        election_index = fetch_ballot_returned_index(
+            4184, ballot_returned_manager.retrieve_ballot_returned_locations_for_election)
+        BallotReturned.objects.create(google_civic_election_id=4184, voter_id=1, latitude=32.3, longitude=-90.3)
+        self.assertFalse(election_index.is_stale())
+        BallotReturned.objects.create(google_civic_election_id=4184, polling_location_we_vote_id='wv01ploc42284',
+                                      latitude=32.3, longitude=-90.3)
+        self.assertTrue(election_index.is_stale())
+
+    def test_concurrent_requests_build_the_index_once(self):
+        build_count = []
+
+        def retrieve_locations_slowly(google_civic_election_id):
+            build_count.append(google_civic_election_id)
+            time.sleep(0.2)
+            return [(1, 32.3, -90.3, 'MS')]
+
+        election_index_list = []
+        thread_list = [threading.Thread(target=lambda: election_index_list.append(
+            fetch_ballot_returned_index(4184, retrieve_locations_slowly))) for thread_number in range(4)]
+        for thread in thread_list:
+            thread.start()
+        for thread in thread_list:
+            thread.join()
+        self.assertEqual(build_count, [4184])
+        self.assertEqual(len(set(map(id, election_index_list))), 1)
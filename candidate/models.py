@@ -142,6 +142,55 @@ class CandidateCampaignListManager(models.Model):
         }
         return results
 
+    def fetch_candidate_we_vote_id_list_for_office_list(self, office_we_vote_id_list, read_only=True):
+        """
+        One query for the candidates under many offices, instead of calling retrieve_all_candidates_for_office
+        once per office.
+        :param office_we_vote_id_list:
+        :param read_only:
+        :return:
+        """
+        candidate_we_vote_id_list = []
+        if not office_we_vote_id_list:
+            return candidate_we_vote_id_list
+
+        try:
+            if read_only:
+                candidate_queryset = CandidateCampaign.objects.using('readonly').all()
+            else:
+                candidate_queryset = CandidateCampaign.objects.all()
+            candidate_queryset = candidate_queryset.filter(contest_office_we_vote_id__in=office_we_vote_id_list)
+            candidate_we_vote_id_list = list(candidate_queryset.values_list('we_vote_id', flat=True))
+        except Exception as e:
+            handle_exception(e, logger=logger)
+        return candidate_we_vote_id_list
+
+    def fetch_candidate_we_vote_ids_by_office(self, office_we_vote_id_list, read_only=True):
+        """
+        One query for the candidates under many offices. Each office's candidates are in the same order as
+        retrieve_all_candidates_for_office returns them.
+        :param office_we_vote_id_list:
+        :param read_only:
+        :return: dict of office_we_vote_id -> list of candidate_we_vote_ids
+        """
+        candidate_we_vote_ids_by_office = {}
+        if not office_we_vote_id_list:
+            return candidate_we_vote_ids_by_office
+
+        try:
+            if read_only:
+                candidate_queryset = CandidateCampaign.objects.using('readonly').all()
+            else:
+                candidate_queryset = CandidateCampaign.objects.all()
+            candidate_queryset = candidate_queryset.filter(contest_office_we_vote_id__in=office_we_vote_id_list)
+            candidate_queryset = candidate_queryset.order_by('-twitter_followers_count')
+            for office_we_vote_id, candidate_we_vote_id in \
+                    candidate_queryset.values_list('contest_office_we_vote_id', 'we_vote_id'):
+                candidate_we_vote_ids_by_office.setdefault(office_we_vote_id, []).append(candidate_we_vote_id)
+        except Exception as e:
+            handle_exception(e, logger=logger)
+        return candidate_we_vote_ids_by_office
+
     def retrieve_all_candidates_for_upcoming_election(self, google_civic_election_id=0, state_code='',
                                                       return_list_of_objects=False):
         candidate_list_objects = []
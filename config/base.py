@@ -153,6 +153,7 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'wevote_social.middleware.SocialMiddleware',
+    'voter.middleware.VoterContextMiddleware',
 ]
 
 AUTHENTICATION_BACKENDS = (
@@ -191,6 +192,41 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'config.wsgi.application'
 
+# The "voter_identity" cache is the shared tier of the voter_device_id -> voter cache (voter/voter_identity_cache.py).
+# It is off by default, and while it is off identities aren't cached at all (not even in each worker), so a signed out
+# voter_device_id stops working everywhere right away. To cache identities, set VOTER_IDENTITY_CACHE_BACKEND to
+# django.core.cache.backends.db.DatabaseCache with VOTER_IDENTITY_CACHE_LOCATION set to a table name (then run
+# "python manage.py createcachetable"), or to django.core.cache.backends.filebased.FileBasedCache with a directory.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'voter_identity': {
+        'BACKEND':  get_environment_variable_default('VOTER_IDENTITY_CACHE_BACKEND',
+                                                     'django.core.cache.backends.dummy.DummyCache'),
+        'LOCATION': get_environment_variable_default('VOTER_IDENTITY_CACHE_LOCATION', ''),
+        'TIMEOUT':  int(get_environment_variable_default('VOTER_IDENTITY_CACHE_TIME_TO_LIVE', 600)),
+    },
+    # What voterRetrieve returns about each voter (voter/voter_profile_cache.py). Also off by default, and set up the
+    # same way with VOTER_PROFILE_CACHE_BACKEND and VOTER_PROFILE_CACHE_LOCATION. Keep the time to live short: saves
+    # made with queryset.update() don't clear it.
+    'voter_profile': {
+        'BACKEND':  get_environment_variable_default('VOTER_PROFILE_CACHE_BACKEND',
+                                                     'django.core.cache.backends.dummy.DummyCache'),
+        'LOCATION': get_environment_variable_default('VOTER_PROFILE_CACHE_LOCATION', ''),
+        'TIMEOUT':  int(get_environment_variable_default('VOTER_PROFILE_CACHE_TIME_TO_LIVE', 60)),
+    },
+    # Each voter's friends (friend/friend_graph_cache.py), set up with FRIEND_GRAPH_CACHE_BACKEND and
+    # FRIEND_GRAPH_CACHE_LOCATION like the "voter_identity" cache. While it is off, friends aren't cached at all (not
+    # even in each worker). Friendships saved, deleted or merged clear the entries of the voters involved.
+    'friend_graph': {
+        'BACKEND':  get_environment_variable_default('FRIEND_GRAPH_CACHE_BACKEND',
+                                                     'django.core.cache.backends.dummy.DummyCache'),
+        'LOCATION': get_environment_variable_default('FRIEND_GRAPH_CACHE_LOCATION', ''),
+        'TIMEOUT':  int(get_environment_variable_default('FRIEND_GRAPH_CACHE_TIME_TO_LIVE', 600)),
+    },
+}
+
 # Internationalization
 # https://docs.djangoproject.com/en/1.8/topics/i18n/
 
@@ -6,7 +6,9 @@ from .controllers import election_remote_retrieve, elections_import_from_master_
 from .models import Election
 from admin_tools.views import redirect_to_sign_in_page
 from analytics.models import AnalyticsManager
-from ballot.controllers import refresh_voter_ballots_from_polling_location
+from ballot.bulk_ballot_storage import BulkBallotStorage
+from ballot.controllers import refresh_voter_ballots_from_polling_location, \
+    save_bulk_ballot_items_and_refresh_voter_ballots
 from ballot.models import BallotItemListManager, BallotReturnedListManager, BallotReturnedManager, \
     VoterBallotSaved, VoterBallotSavedManager
 from candidate.models import CandidateCampaignListManager, CandidateCampaign
@@ -213,6 +215,11 @@ def election_all_ballots_retrieve_view(request, election_local_id=0):
     # number_of_polling_locations_to_retrieve = int(.1 * polling_location_count)
     ballot_returned_manager = BallotReturnedManager()
     rate_limit_count = 0
+    # Offices, candidates and measures shared by many polling locations are only saved once, and the ballot items
+    # are saved together every BULK_BALLOT_STORAGE_POLLING_LOCATIONS polling locations
+    bulk_ballot_storage = BulkBallotStorage(google_civic_election_id)
+    # The copies of these ballots are refreshed after their ballot items are saved
+    ballot_returned_list_to_refresh = []
     # Step though our set of polling locations, until we find one that contains a ballot.  Some won't contain ballots
     # due to data quality issues.
     for polling_location in polling_location_list:
@@ -224,19 +231,17 @@ def election_all_ballots_retrieve_view(request, election_local_id=0):
             text_for_map_search, election_on_stage.google_civic_election_id)
         if one_ballot_results['success']:
             one_ballot_json = one_ballot_results['structured_json']
-            store_one_ballot_results = store_one_ballot_from_google_civic_api(one_ballot_json, 0,
-                                                                              polling_location.we_vote_id)
+            store_one_ballot_results = store_one_ballot_from_google_civic_api(
+                one_ballot_json, 0, polling_location.we_vote_id, bulk_ballot_storage=bulk_ballot_storage)
             if store_one_ballot_results['success']:
                 success = True
                 if store_one_ballot_results['ballot_returned_found']:
                     ballot_returned = store_one_ballot_results['ballot_returned']
                     ballot_returned_id = ballot_returned.id
-                    # Now refresh all of the other copies of this ballot
+                    # Now refresh all of the other copies of this ballot, once its ballot items are saved
                     if positive_value_exists(polling_location.we_vote_id) \
                             and positive_value_exists(google_civic_election_id):
-                        refresh_ballot_results = refresh_voter_ballots_from_polling_location(
-                            ballot_returned, google_civic_election_id)
-                        ballots_refreshed += refresh_ballot_results['ballots_refreshed']
+                        ballot_returned_list_to_refresh.append(ballot_returned)
                 # NOTE: We don't support retrieving ballots for polling locations AND geocoding simultaneously
                 # if store_one_ballot_results['ballot_returned_found']:
                 #     ballot_returned = store_one_ballot_results['ballot_returned']
@@ -275,6 +280,14 @@ def election_all_ballots_retrieve_view(request, election_local_id=0):
         if one_ballot_results['election_administration_data_retrieved']:
             ballots_with_election_administration_data += 1
 
+        if bulk_ballot_storage.ready_to_save():
+            save_results = save_bulk_ballot_items_and_refresh_voter_ballots(
+                bulk_ballot_storage, ballot_returned_list_to_refresh)
+            if not save_results['success']:
+                messages.add_message(request, messages.ERROR, save_results['status'])
+            ballots_refreshed += save_results['ballots_refreshed']
+            ballot_returned_list_to_refresh = []
+
         # We used to only retrieve up to 500 locations from each state, but we don't limit now
         # # Break out of this loop, assuming we have a minimum number of ballots with contests retrieved
         # #  If we don't achieve the minimum number of ballots_with_contests_retrieved, break out at the emergency level
@@ -283,6 +296,12 @@ def election_all_ballots_retrieve_view(request, election_local_id=0):
         #         ballots_with_contests_retrieved > 20) or emergency:
         #     break
 
+    save_results = save_bulk_ballot_items_and_refresh_voter_ballots(
+        bulk_ballot_storage, ballot_returned_list_to_refresh)
+    if not save_results['success']:
+        messages.add_message(request, messages.ERROR, save_results['status'])
+    ballots_refreshed += save_results['ballots_refreshed']
+
     total_retrieved = ballots_retrieved + ballots_not_retrieved
     if ballots_retrieved > 0:
         messages.add_message(request, messages.INFO,
@@ -11,7 +11,7 @@ from issue.models import IssueManager
 from organization.models import OrganizationManager
 import pytz
 import wevote_functions.admin
-from wevote_functions.functions import positive_value_exists
+from wevote_functions.functions import normalize_we_vote_id, positive_value_exists
 from voter.models import VoterManager
 
 
@@ -217,15 +217,15 @@ class FollowIssueManager(models.Model):
                 status = 'FOLLOW_ISSUE_FOUND_WITH_ID'
             elif positive_value_exists(voter_we_vote_id) and positive_value_exists(issue_id):
                 follow_issue_on_stage = FollowIssue.objects.get(
-                    voter_we_vote_id__iexact=voter_we_vote_id,
+                    voter_we_vote_id=normalize_we_vote_id(voter_we_vote_id),
                     issue_id=issue_id)
                 follow_issue_on_stage_id = follow_issue_on_stage.id
                 success = True
                 status = 'FOLLOW_ISSUE_FOUND_WITH_VOTER_WE_VOTE_ID_AND_ISSUE_ID'
             elif positive_value_exists(voter_we_vote_id) and positive_value_exists(issue_we_vote_id):
                 follow_issue_on_stage = FollowIssue.objects.get(
-                    voter_we_vote_id__iexact=voter_we_vote_id,
-                    issue_we_vote_id__iexact=issue_we_vote_id)
+                    voter_we_vote_id=normalize_we_vote_id(voter_we_vote_id),
+                    issue_we_vote_id=normalize_we_vote_id(issue_we_vote_id))
                 follow_issue_on_stage_id = follow_issue_on_stage.id
                 success = True
                 status = 'FOLLOW_ISSUE_FOUND_WITH_VOTER_WE_VOTE_ID_AND_ISSUE_WE_VOTE_ID'
@@ -285,7 +285,7 @@ class FollowIssueManager(models.Model):
                 status += 'FOLLOW_ISSUE_DELETED_BY_ID '
             elif positive_value_exists(voter_we_vote_id) and positive_value_exists(issue_id):
                 follow_issue_query = FollowIssue.objects.filter(
-                    voter_we_vote_id__iexact=voter_we_vote_id,
+                    voter_we_vote_id=normalize_we_vote_id(voter_we_vote_id),
                     issue_id=issue_id)
                 follow_issue_list = list(follow_issue_query)
                 for one_follow_issue in follow_issue_list:
@@ -295,8 +295,8 @@ class FollowIssueManager(models.Model):
                 status += 'FOLLOW_ISSUE_DELETED_BY_VOTER_WE_VOTE_ID_AND_ISSUE_ID '
             elif positive_value_exists(voter_we_vote_id) and positive_value_exists(issue_we_vote_id):
                 follow_issue_query = FollowIssue.objects.filter(
-                    voter_we_vote_id__iexact=voter_we_vote_id,
-                    issue_we_vote_id__iexact=issue_we_vote_id)
+                    voter_we_vote_id=normalize_we_vote_id(voter_we_vote_id),
+                    issue_we_vote_id=normalize_we_vote_id(issue_we_vote_id))
                 follow_issue_list = list(follow_issue_query)
                 for one_follow_issue in follow_issue_list:
                     one_follow_issue.delete()
@@ -364,7 +364,7 @@ class FollowIssueManager(models.Model):
         try:
             suggested_issue_to_follow_queryset = SuggestedIssueToFollow.objects.all()
             suggested_issue_to_follow_list = suggested_issue_to_follow_queryset.filter(
-                viewer_voter_we_vote_id__iexact=viewer_voter_we_vote_id,
+                viewer_voter_we_vote_id=normalize_we_vote_id(viewer_voter_we_vote_id),
                 from_twitter=from_twitter)
             if len(suggested_issue_to_follow_list):
                 success = True
@@ -402,7 +402,7 @@ class FollowMetricsManager(models.Model):
         count_result = None
         try:
             count_query = FollowOrganization.objects.using('readonly').all()
-            count_query = count_query.filter(organization_we_vote_id__iexact=organization_we_vote_id)
+            count_query = count_query.filter(organization_we_vote_id=normalize_we_vote_id(organization_we_vote_id))
             count_query = count_query.filter(following_status=FOLLOWING)
             count_query = count_query.values("voter_id").distinct()
             if positive_value_exists(google_civic_election_id):
@@ -437,7 +437,7 @@ class FollowMetricsManager(models.Model):
         try:
             count_query = FollowIssue.objects.using('readonly').all()
             if positive_value_exists(voter_we_vote_id):
-                count_query = count_query.filter(voter_we_vote_id__iexact=voter_we_vote_id)
+                count_query = count_query.filter(voter_we_vote_id=normalize_we_vote_id(voter_we_vote_id))
             count_query = count_query.filter(following_status=FOLLOWING)
             if positive_value_exists(limit_to_one_date_as_integer):
                 # TODO DALE THIS NEEDS WORK TO FIND ALL ENTRIES ON ONE DAY
@@ -472,7 +472,8 @@ class FollowIssueList(models.Model):
         follow_issue_list_length = 0
         try:
             follow_issue_list_query = FollowIssue.objects.using('readonly').all()
-            follow_issue_list_query = follow_issue_list_query.filter(voter_we_vote_id__iexact=voter_we_vote_id)
+            follow_issue_list_query = follow_issue_list_query.filter(
+                voter_we_vote_id=normalize_we_vote_id(voter_we_vote_id))
             follow_issue_list_query = follow_issue_list_query.filter(following_status=following_status)
             follow_issue_list_length = follow_issue_list_query.count()
 
@@ -494,7 +495,8 @@ class FollowIssueList(models.Model):
         follow_issue_list = {}
         try:
             follow_issue_list_query = FollowIssue.objects.using('readonly').all()
-            follow_issue_list_query = follow_issue_list_query.filter(voter_we_vote_id__iexact=voter_we_vote_id)
+            follow_issue_list_query = follow_issue_list_query.filter(
+                voter_we_vote_id=normalize_we_vote_id(voter_we_vote_id))
             if positive_value_exists(following_status):
                 follow_issue_list = follow_issue_list_query.filter(following_status=following_status)
             if len(follow_issue_list):
@@ -516,7 +518,8 @@ class FollowIssueList(models.Model):
 
         try:
             follow_issue_list_query = FollowIssue.objects.using('readonly').all()
-            follow_issue_list_query = follow_issue_list_query.filter(voter_we_vote_id__iexact=voter_we_vote_id)
+            follow_issue_list_query = follow_issue_list_query.filter(
+                voter_we_vote_id=normalize_we_vote_id(voter_we_vote_id))
             if positive_value_exists(following_status):
                 follow_issue_list_query = follow_issue_list_query.filter(following_status=following_status)
             follow_issue_list_query = follow_issue_list_query.values("issue_we_vote_id").distinct()
@@ -568,7 +571,7 @@ class FollowIssueList(models.Model):
             if positive_value_exists(issue_id):
                 follow_issue_list = follow_issue_list.filter(issue_id=issue_id)
             else:
-                follow_issue_list = follow_issue_list.filter(issue_we_vote_id__iexact=issue_we_vote_id)
+                follow_issue_list = follow_issue_list.filter(issue_we_vote_id=normalize_we_vote_id(issue_we_vote_id))
             if positive_value_exists(following_status):
                 follow_issue_list = follow_issue_list.filter(following_status=following_status)
             if len(follow_issue_list):
@@ -957,7 +960,7 @@ class FollowOrganizationManager(models.Model):
         try:
             suggested_organization_to_follow_queryset = SuggestedOrganizationToFollow.objects.all()
             suggested_organization_to_follow_list = suggested_organization_to_follow_queryset.filter(
-                viewer_voter_we_vote_id__iexact=viewer_voter_we_vote_id,
+                viewer_voter_we_vote_id=normalize_we_vote_id(viewer_voter_we_vote_id),
                 from_twitter=from_twitter)
             if len(suggested_organization_to_follow_list):
                 success = True
@@ -0,0 +1,163 @@
+# friend/friend_graph_cache.py
+# Brought to you by We Vote. Be good.
+# -*- coding: UTF-8 -*-
+
+from collections import namedtuple, OrderedDict
+from config.base import get_environment_variable_default
+from django.core.cache import caches
+from django.core.cache.backends.base import InvalidCacheBackendError
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+import threading
+import time
+import wevote_functions.admin
+from wevote_functions.functions import convert_to_int, positive_value_exists
+
+logger = wevote_functions.admin.get_logger(__name__)
+
+# One voter's friends: their we_vote_ids (most recent friendship first), and the local voter id of each friend who
+# still has a Voter entry. Looked for in the in-process tier, then the shared tier (the "friend_graph" cache in
+# config/base.py), and only then in the CurrentFriend table (see fetch_friend_adjacency_dict in friend/models.py).
+# Both tiers are only used when the shared tier is set up: without it, a friendship saved on one worker couldn't clear
+# the friends other workers remember, so every lookup goes to the database.
+FriendAdjacency = namedtuple('FriendAdjacency', ['friend_we_vote_id_list', 'friend_voter_id_by_we_vote_id'])
+
+# How many seconds a worker can use its own copy of a voter's friends. Invalidation only reaches the worker that made
+# the change (and the shared tier), so this is how long another worker could miss a new friend or an unfriend. Set to
+# 0 to only use the shared tier.
+FRIEND_GRAPH_LOCAL_TIME_TO_LIVE = \
+    convert_to_int(get_environment_variable_default("FRIEND_GRAPH_LOCAL_TIME_TO_LIVE", 30))
+# How many voters' friends each worker remembers
+FRIEND_GRAPH_LOCAL_MAXIMUM_ENTRIES = \
+    convert_to_int(get_environment_variable_default("FRIEND_GRAPH_LOCAL_MAXIMUM_ENTRIES", 10000))
+FRIEND_GRAPH_SHARED_CACHE_ALIAS = 'friend_graph'
+
+_friend_adjacency_cache = OrderedDict()  # voter_we_vote_id -> (FriendAdjacency, time stored)
+_friend_adjacency_lock = threading.Lock()
+
+
+def _shared_friend_graph_cache():
+    """
+    The shared tier, or None if it isn't set up. DummyCache (the default) and LocMemCache aren't shared between
+    workers, so they don't count.
+    :return:
+    """
+    try:
+        shared_cache = caches[FRIEND_GRAPH_SHARED_CACHE_ALIAS]
+    except InvalidCacheBackendError:
+        return None
+    if isinstance(shared_cache, (DummyCache, LocMemCache)):
+        return None
+    return shared_cache
+
+
+def friend_graph_cache_on():
+    """
+    So callers know whether what they read will be cached (and so has to come from the primary database)
+    :return:
+    """
+    return _shared_friend_graph_cache() is not None
+
+
+def _shared_cache_key(voter_we_vote_id):
+    return 'friend_adjacency_' + voter_we_vote_id
+
+
+def fetch_cached_friend_adjacency_dict(voter_we_vote_id_list):
+    """
+    Look for each voter's FriendAdjacency in the in-process tier, then (for the rest, with one get_many) in the
+    shared tier
+    :param voter_we_vote_id_list: Normalized we_vote_ids
+    :return: voter_we_vote_id -> FriendAdjacency, for the voters that were found
+    """
+    friend_adjacency_dict = {}
+    shared_cache = _shared_friend_graph_cache()
+    if shared_cache is None:
+        return friend_adjacency_dict
+
+    missing_we_vote_id_list = []
+    with _friend_adjacency_lock:
+        for voter_we_vote_id in voter_we_vote_id_list:
+            cached_entry = _friend_adjacency_cache.get(voter_we_vote_id)
+            if cached_entry is not None:
+                friend_adjacency, time_stored = cached_entry
+                if time.monotonic() - time_stored <= FRIEND_GRAPH_LOCAL_TIME_TO_LIVE:
+                    _friend_adjacency_cache.move_to_end(voter_we_vote_id)
+                    friend_adjacency_dict[voter_we_vote_id] = friend_adjacency
+                    continue
+                del _friend_adjacency_cache[voter_we_vote_id]
+            missing_we_vote_id_list.append(voter_we_vote_id)
+
+    if not missing_we_vote_id_list:
+        return friend_adjacency_dict
+    try:
+        shared_value_dict = shared_cache.get_many(
+            [_shared_cache_key(voter_we_vote_id) for voter_we_vote_id in missing_we_vote_id_list])
+    except Exception as e:
+        logger.error("fetch_cached_friend_adjacency_dict, shared cache unavailable: " + str(e))
+        return friend_adjacency_dict
+    shared_friend_adjacency_dict = {}
+    for voter_we_vote_id in missing_we_vote_id_list:
+        shared_value = shared_value_dict.get(_shared_cache_key(voter_we_vote_id))
+        if shared_value is not None:
+            shared_friend_adjacency_dict[voter_we_vote_id] = FriendAdjacency(*shared_value)
+    _store_local_friend_adjacency_dict(shared_friend_adjacency_dict)
+    friend_adjacency_dict.update(shared_friend_adjacency_dict)
+    return friend_adjacency_dict
+
+
+def _store_local_friend_adjacency_dict(friend_adjacency_dict):
+    if FRIEND_GRAPH_LOCAL_TIME_TO_LIVE <= 0:
+        return
+    with _friend_adjacency_lock:
+        for voter_we_vote_id, friend_adjacency in friend_adjacency_dict.items():
+            _friend_adjacency_cache[voter_we_vote_id] = (friend_adjacency, time.monotonic())
+            _friend_adjacency_cache.move_to_end(voter_we_vote_id)
+        while len(_friend_adjacency_cache) > FRIEND_GRAPH_LOCAL_MAXIMUM_ENTRIES:
+            _friend_adjacency_cache.popitem(last=False)
+
+
+def store_cached_friend_adjacency_dict(friend_adjacency_dict):
+    if not friend_adjacency_dict:
+        return
+    shared_cache = _shared_friend_graph_cache()
+    if shared_cache is None:
+        return
+    _store_local_friend_adjacency_dict(friend_adjacency_dict)
+    try:
+        shared_cache.set_many({_shared_cache_key(voter_we_vote_id): tuple(friend_adjacency)
+                               for voter_we_vote_id, friend_adjacency in friend_adjacency_dict.items()})
+    except Exception as e:
+        logger.error("store_cached_friend_adjacency_dict, shared cache unavailable: " + str(e))
+
+
+def invalidate_cached_friend_adjacency(voter_we_vote_id_list):
+    """
+    Forget these voters' friends in this worker and in the shared tier. Call whenever a friendship of theirs is
+    created, deleted or moved to another voter.
+    :param voter_we_vote_id_list: Normalized we_vote_ids
+    :return:
+    """
+    voter_we_vote_id_list = [voter_we_vote_id for voter_we_vote_id in voter_we_vote_id_list
+                             if positive_value_exists(voter_we_vote_id)]
+    if not voter_we_vote_id_list:
+        return
+    with _friend_adjacency_lock:
+        for voter_we_vote_id in voter_we_vote_id_list:
+            _friend_adjacency_cache.pop(voter_we_vote_id, None)
+    shared_cache = _shared_friend_graph_cache()
+    if shared_cache is None:
+        return
+    try:
+        shared_cache.delete_many([_shared_cache_key(voter_we_vote_id) for voter_we_vote_id in voter_we_vote_id_list])
+    except Exception as e:
+        logger.error("invalidate_cached_friend_adjacency, shared cache unavailable: " + str(e))
+
+
+def clear_cached_friend_adjacencies():
+    """
+    Forget every voter's friends in this worker. The shared tier entries expire on their own.
+    :return:
+    """
+    with _friend_adjacency_lock:
+        _friend_adjacency_cache.clear()
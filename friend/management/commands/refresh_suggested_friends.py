@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from friend.suggested_friend_refresh import refresh_suggested_friends
+from friend.tasks import refresh_suggested_friends_task
+
+
+class Command(BaseCommand):
+    help = 'Suggests friends of friends to every voter with a friend who has been seen in the last --active_days, ' \
+           'most friends in common first, leaving out voters who are already friends or have a pending or ignored ' \
+           'invitation between them.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--active_days', type=int, default=None,
+                            help='Defaults to SUGGESTED_FRIEND_REFRESH_ACTIVE_DAYS; 0 for every voter with a friend')
+        parser.add_argument('--chunk_size', type=int, default=None,
+                            help='Voters handled with one query. Defaults to SUGGESTED_FRIEND_REFRESH_CHUNK_SIZE')
+        parser.add_argument('--background', action='store_true',
+                            help='Queue the refresh for the background task worker instead of running it now')
+
+    def handle(self, *args, **options):
+        if options['background']:
+            refresh_suggested_friends_task(active_days=options['active_days'])
+            self.stdout.write('Suggested friends refresh queued for the background task worker.')
+            return
+
+        results = refresh_suggested_friends(active_days=options['active_days'], chunk_size=options['chunk_size'])
+        self.stdout.write(results['status'])
@@ -2,11 +2,21 @@
 # Brought to you by We Vote. Be good.
 # -*- coding: UTF-8 -*-
 
-from django.db import models
+from collections import OrderedDict
+from config.base import get_environment_variable_default
+from django.db import connection, models, transaction
 from django.db.models import Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
 from email_outbound.models import EmailAddress, EmailManager
-from wevote_functions.functions import convert_to_int, positive_value_exists
-from voter.models import VoterManager
+from friend.friend_graph_cache import fetch_cached_friend_adjacency_dict, friend_graph_cache_on, FriendAdjacency, \
+    invalidate_cached_friend_adjacency, store_cached_friend_adjacency_dict
+import wevote_functions.admin
+from wevote_functions.functions import convert_to_int, normalize_we_vote_id, positive_value_exists
+from voter.models import Voter, VoterManager
+
+logger = wevote_functions.admin.get_logger(__name__)
 
 NO_RESPONSE = 'NO_RESPONSE'
 PENDING_EMAIL_VERIFICATION = 'PENDING_EMAIL_VERIFICATION'
@@ -35,6 +45,12 @@ FRIENDS_IN_COMMON = 'FRIENDS_IN_COMMON'
 IGNORED_FRIEND_INVITATIONS = 'IGNORED_FRIEND_INVITATIONS'
 SUGGESTED_FRIEND_LIST = 'SUGGESTED_FRIEND_LIST'
 
+# The most friends of friends suggested to one voter at a time, those with the most friends in common first
+SUGGESTED_FRIEND_MAXIMUM_PER_VOTER = \
+    convert_to_int(get_environment_variable_default("SUGGESTED_FRIEND_MAXIMUM_PER_VOTER", 100))
+# Two voters with an invitation between them in one of these states are not suggested to each other
+SUGGESTED_FRIEND_EXCLUDED_INVITATION_STATUS_LIST = [NO_RESPONSE, PENDING_EMAIL_VERIFICATION, IGNORED]
+
 
 class CurrentFriend(models.Model):
     """
@@ -165,7 +181,7 @@ class FriendManager(models.Model):
 
         try:
             friend_invitation, created = FriendInvitationEmailLink.objects.update_or_create(
-                sender_voter_we_vote_id__iexact=sender_voter_we_vote_id,
+                sender_voter_we_vote_id=normalize_we_vote_id(sender_voter_we_vote_id),
                 recipient_voter_email__iexact=recipient_voter_email,
                 defaults=defaults,
             )
@@ -205,8 +221,8 @@ class FriendManager(models.Model):
 
         try:
             friend_invitation, created = FriendInvitationVoterLink.objects.update_or_create(
-                sender_voter_we_vote_id__iexact=sender_voter_we_vote_id,
-                recipient_voter_we_vote_id__iexact=recipient_voter_we_vote_id,
+                sender_voter_we_vote_id=normalize_we_vote_id(sender_voter_we_vote_id),
+                recipient_voter_we_vote_id=normalize_we_vote_id(recipient_voter_we_vote_id),
                 defaults=defaults,
             )
             friend_invitation_saved = True
@@ -268,13 +284,13 @@ class FriendManager(models.Model):
         try:
             if positive_value_exists(for_editing):
                 current_friend = CurrentFriend.objects.get(
-                    viewer_voter_we_vote_id__iexact=sender_voter_we_vote_id,
-                    viewee_voter_we_vote_id__iexact=recipient_voter_we_vote_id,
+                    viewer_voter_we_vote_id=normalize_we_vote_id(sender_voter_we_vote_id),
+                    viewee_voter_we_vote_id=normalize_we_vote_id(recipient_voter_we_vote_id),
                 )
             else:
                 current_friend = CurrentFriend.objects.using('readonly').get(
-                    viewer_voter_we_vote_id__iexact=sender_voter_we_vote_id,
-                    viewee_voter_we_vote_id__iexact=recipient_voter_we_vote_id,
+                    viewer_voter_we_vote_id=normalize_we_vote_id(sender_voter_we_vote_id),
+                    viewee_voter_we_vote_id=normalize_we_vote_id(recipient_voter_we_vote_id),
                 )
             current_friend_found = True
             success = True
@@ -294,13 +310,13 @@ class FriendManager(models.Model):
             try:
                 if positive_value_exists(for_editing):
                     current_friend = CurrentFriend.objects.get(
-                        viewer_voter_we_vote_id__iexact=recipient_voter_we_vote_id,
-                        viewee_voter_we_vote_id__iexact=sender_voter_we_vote_id,
+                        viewer_voter_we_vote_id=normalize_we_vote_id(recipient_voter_we_vote_id),
+                        viewee_voter_we_vote_id=normalize_we_vote_id(sender_voter_we_vote_id),
                     )
                 else:
                     current_friend = CurrentFriend.objects.using('readonly').get(
-                        viewer_voter_we_vote_id__iexact=recipient_voter_we_vote_id,
-                        viewee_voter_we_vote_id__iexact=sender_voter_we_vote_id,
+                        viewer_voter_we_vote_id=normalize_we_vote_id(recipient_voter_we_vote_id),
+                        viewee_voter_we_vote_id=normalize_we_vote_id(sender_voter_we_vote_id),
                     )
                 current_friend_found = True
                 success = True
@@ -330,13 +346,13 @@ class FriendManager(models.Model):
         try:
             if positive_value_exists(for_editing):
                 suggested_friend = SuggestedFriend.objects.get(
-                    viewer_voter_we_vote_id__iexact=sender_voter_we_vote_id,
-                    viewee_voter_we_vote_id__iexact=recipient_voter_we_vote_id,
+                    viewer_voter_we_vote_id=normalize_we_vote_id(sender_voter_we_vote_id),
+                    viewee_voter_we_vote_id=normalize_we_vote_id(recipient_voter_we_vote_id),
                 )
             else:
                 suggested_friend = SuggestedFriend.objects.using('readonly').get(
-                    viewer_voter_we_vote_id__iexact=sender_voter_we_vote_id,
-                    viewee_voter_we_vote_id__iexact=recipient_voter_we_vote_id,
+                    viewer_voter_we_vote_id=normalize_we_vote_id(sender_voter_we_vote_id),
+                    viewee_voter_we_vote_id=normalize_we_vote_id(recipient_voter_we_vote_id),
                 )
             suggested_friend_found = True
             success = True
@@ -356,13 +372,13 @@ class FriendManager(models.Model):
             try:
                 if positive_value_exists(for_editing):
                     suggested_friend = SuggestedFriend.objects.get(
-                        viewer_voter_we_vote_id__iexact=recipient_voter_we_vote_id,
-                        viewee_voter_we_vote_id__iexact=sender_voter_we_vote_id,
+                        viewer_voter_we_vote_id=normalize_we_vote_id(recipient_voter_we_vote_id),
+                        viewee_voter_we_vote_id=normalize_we_vote_id(sender_voter_we_vote_id),
                     )
                 else:
                     suggested_friend = SuggestedFriend.objects.using('readonly').get(
-                        viewer_voter_we_vote_id__iexact=recipient_voter_we_vote_id,
-                        viewee_voter_we_vote_id__iexact=sender_voter_we_vote_id,
+                        viewer_voter_we_vote_id=normalize_we_vote_id(recipient_voter_we_vote_id),
+                        viewee_voter_we_vote_id=normalize_we_vote_id(sender_voter_we_vote_id),
                     )
                 suggested_friend_found = True
                 success = True
@@ -519,8 +535,8 @@ class FriendManager(models.Model):
         friend_invitation_voter_link = FriendInvitationVoterLink()
         try:
             friend_invitation_voter_link = FriendInvitationVoterLink.objects.get(
-                recipient_voter_we_vote_id__iexact=voter.we_vote_id,
-                sender_voter_we_vote_id__iexact=sender_voter.we_vote_id,
+                recipient_voter_we_vote_id=voter.we_vote_id,
+                sender_voter_we_vote_id=sender_voter.we_vote_id,
             )
             success = True
             friend_invitation_found = True
@@ -606,7 +622,7 @@ class FriendManager(models.Model):
         friend_invitation_email_link = FriendInvitationEmailLink()
         try:
             friend_invitation_email_link = FriendInvitationEmailLink.objects.get(
-                sender_voter_we_vote_id__iexact=sender_voter.we_vote_id,
+                sender_voter_we_vote_id=sender_voter.we_vote_id,
                 recipient_voter_email__iexact=recipient_voter_email,
             )
             success = True
@@ -650,20 +666,12 @@ class FriendManager(models.Model):
         return results
 
     def fetch_current_friends_count(self, voter_we_vote_id):
-        current_friends_count = 0
-
         if not positive_value_exists(voter_we_vote_id):
-            return current_friends_count
-
-        try:
-            current_friend_queryset = CurrentFriend.objects.using('readonly').all()
-            current_friend_queryset = current_friend_queryset.filter(
-                Q(viewer_voter_we_vote_id__iexact=voter_we_vote_id) |
-                Q(viewee_voter_we_vote_id__iexact=voter_we_vote_id))
-            current_friends_count = current_friend_queryset.count()
-        except Exception as e:
-            current_friends_count = 0
-        return current_friends_count
+            return 0
+        friend_adjacency = fetch_friend_adjacency(voter_we_vote_id, include_voter_ids=False)
+        if friend_adjacency is None:
+            return 0
+        return len(friend_adjacency.friend_we_vote_id_list)
 
     def fetch_suggested_friends_count(self, voter_we_vote_id):
         suggested_friends_count = 0
@@ -674,8 +682,8 @@ class FriendManager(models.Model):
         try:
             suggested_friend_queryset = SuggestedFriend.objects.using('readonly').all()
             suggested_friend_queryset = suggested_friend_queryset.filter(
-                Q(viewer_voter_we_vote_id__iexact=voter_we_vote_id) |
-                Q(viewee_voter_we_vote_id__iexact=voter_we_vote_id))
+                Q(viewer_voter_we_vote_id=normalize_we_vote_id(voter_we_vote_id)) |
+                Q(viewee_voter_we_vote_id=normalize_we_vote_id(voter_we_vote_id)))
             suggested_friends_count = suggested_friend_queryset.count()
         except Exception as e:
             suggested_friends_count = 0
@@ -703,8 +711,8 @@ class FriendManager(models.Model):
             else:
                 current_friend_queryset = CurrentFriend.objects.using('readonly').all()
             current_friend_queryset = current_friend_queryset.filter(
-                Q(viewer_voter_we_vote_id__iexact=voter_we_vote_id) |
-                Q(viewee_voter_we_vote_id__iexact=voter_we_vote_id))
+                Q(viewer_voter_we_vote_id=normalize_we_vote_id(voter_we_vote_id)) |
+                Q(viewee_voter_we_vote_id=normalize_we_vote_id(voter_we_vote_id)))
             current_friend_queryset = current_friend_queryset.order_by('-date_last_changed')
             current_friend_list = current_friend_queryset
 
@@ -743,7 +751,6 @@ class FriendManager(models.Model):
         :param voter_we_vote_id:
         :return:
         """
-        current_friend_list = []  # The entries from CurrentFriend table
         friend_list_found = False
         friend_list = []  # A list of friends, returned as voter entries
 
@@ -759,46 +766,33 @@ class FriendManager(models.Model):
             }
             return results
 
+        friend_adjacency = fetch_friend_adjacency(voter_we_vote_id)
+        if friend_adjacency is None:
+            results = {
+                'success':              False,
+                'status':               'FAILED retrieve_current_friends_as_voters-FRIENDS_NOT_READ ',
+                'voter_we_vote_id':     voter_we_vote_id,
+                'friend_list_found':    friend_list_found,
+                'friend_list':          friend_list,
+            }
+            return results
+        friend_voter_id_by_we_vote_id = friend_adjacency.friend_voter_id_by_we_vote_id
         try:
-            # Note that since we are ultimately returning a list of voter objects (which are always retrieved from the
-            #  master database, as opposed to the readonly database), we don't need to call this function with a
-            #  "for_editing" specification.
-            current_friend_queryset = CurrentFriend.objects.using('readonly').all()
-            current_friend_queryset = current_friend_queryset.filter(
-                Q(viewer_voter_we_vote_id__iexact=voter_we_vote_id) |
-                Q(viewee_voter_we_vote_id__iexact=voter_we_vote_id))
-            current_friend_queryset = current_friend_queryset.order_by('-date_last_changed')
-            current_friend_list = current_friend_queryset
-
-            if len(current_friend_list):
-                success = True
-                current_friend_list_found = True
-                status = 'FRIEND_LIST_RETRIEVED'
-            else:
-                success = True
-                current_friend_list_found = False
-                status = 'NO_FRIEND_LIST_RETRIEVED'
-        except CurrentFriend.DoesNotExist:
-            # No data found. Not a problem.
+            # Note that we return voter objects from the master database, as opposed to the readonly database.
+            # One query for every friend, in the order of the friendships (most recent first).
+            friend_voter_by_id = Voter.objects.in_bulk(list(friend_voter_id_by_we_vote_id.values()))
+            for we_vote_id_of_friend in friend_adjacency.friend_we_vote_id_list:
+                # This is the voter you are friends with
+                friend_voter = friend_voter_by_id.get(friend_voter_id_by_we_vote_id.get(we_vote_id_of_friend))
+                if friend_voter is not None:
+                    friend_list.append(friend_voter)
+                    friend_list_found = True
             success = True
-            current_friend_list_found = False
-            status = 'NO_FRIEND_LIST_RETRIEVED_DoesNotExist'
-            friend_list = []
+            status = 'FRIEND_LIST_RETRIEVED' if friend_list_found else 'NO_FRIEND_LIST_RETRIEVED'
         except Exception as e:
             success = False
-            current_friend_list_found = False
             status = 'FAILED retrieve_current_friends_as_voters '
-
-        if current_friend_list_found:
-            voter_manager = VoterManager()
-            for current_friend_entry in current_friend_list:
-                we_vote_id_of_friend = current_friend_entry.fetch_other_voter_we_vote_id(voter_we_vote_id)
-                # This is the voter you are friends with
-                friend_voter_results = voter_manager.retrieve_voter_by_we_vote_id(we_vote_id_of_friend)
-                if friend_voter_results['voter_found']:
-                    friend_voter = friend_voter_results['voter']
-                    friend_list.append(friend_voter)
-                    friend_list_found = True
+            friend_list = []
 
         results = {
             'success':              success,
@@ -811,13 +805,11 @@ class FriendManager(models.Model):
 
     def retrieve_friends_we_vote_id_list(self, voter_we_vote_id):
         """
-        This is similar to retrieve_current_friends, but only returns the we_vote_id
+        This is similar to retrieve_current_friends, but only returns the we_vote_id. Read through the friend graph
+        cache (see fetch_friend_adjacency).
         :param voter_we_vote_id:
-        :param read_only:
         :return:
         """
-        current_friend_list_found = False
-        current_friend_list = []  # The entries from CurrentFriend table
         friends_we_vote_id_list_found = False
         friends_we_vote_id_list = []  # A list of friends, returned as we_vote_id's
 
@@ -833,42 +825,18 @@ class FriendManager(models.Model):
             }
             return results
 
-        try:
-            current_friend_queryset = CurrentFriend.objects.using('readonly').all()
-            current_friend_queryset = current_friend_queryset.filter(
-                Q(viewer_voter_we_vote_id__iexact=voter_we_vote_id) |
-                Q(viewee_voter_we_vote_id__iexact=voter_we_vote_id))
-            current_friend_queryset = current_friend_queryset.order_by('-date_last_changed')
-            current_friend_list = current_friend_queryset
-
-            if len(current_friend_list):
-                success = True
-                current_friend_list_found = True
-                status = 'FRIEND_LIST_RETRIEVED'
-            else:
-                success = True
-                current_friend_list_found = False
-                status = 'NO_FRIEND_LIST_RETRIEVED'
-        except CurrentFriend.DoesNotExist:
-            # No data found. Not a problem.
-            success = True
-            current_friend_list_found = False
-            status = 'NO_FRIEND_LIST_RETRIEVED_DoesNotExist'
-            friends_we_vote_id_list = []
-        except Exception as e:
+        friend_adjacency = fetch_friend_adjacency(voter_we_vote_id, include_voter_ids=False)
+        if friend_adjacency is None:
             success = False
-            current_friend_list_found = False
             status = 'FAILED retrieve_friends_we_vote_id_list '
-
-        if current_friend_list_found:
-            for current_friend_entry in current_friend_list:
-                if current_friend_entry.viewer_voter_we_vote_id == voter_we_vote_id:
-                    we_vote_id_of_friend = current_friend_entry.viewee_voter_we_vote_id
-                else:
-                    we_vote_id_of_friend = current_friend_entry.viewer_voter_we_vote_id
-                # This is the voter you are friends with
-                friends_we_vote_id_list.append(we_vote_id_of_friend)
+        else:
+            success = True
+            friends_we_vote_id_list = list(friend_adjacency.friend_we_vote_id_list)
+            if len(friends_we_vote_id_list):
                 friends_we_vote_id_list_found = True
+                status = 'FRIEND_LIST_RETRIEVED'
+            else:
+                status = 'NO_FRIEND_LIST_RETRIEVED'
 
         results = {
             'success':                          success,
@@ -899,7 +867,7 @@ class FriendManager(models.Model):
             # Find invitations that I sent.
             friend_invitation_email_queryset = FriendInvitationEmailLink.objects.all()
             friend_invitation_email_queryset = friend_invitation_email_queryset.filter(
-                sender_voter_we_vote_id__iexact=sender_voter_we_vote_id)
+                sender_voter_we_vote_id=normalize_we_vote_id(sender_voter_we_vote_id))
             friend_invitation_email_link_list = friend_invitation_email_queryset
 
             if len(friend_invitation_email_link_list):
@@ -952,10 +920,10 @@ class FriendManager(models.Model):
             friend_invitation_voter_queryset = FriendInvitationVoterLink.objects.all()
             if positive_value_exists(sender_voter_we_vote_id):
                 friend_invitation_voter_queryset = friend_invitation_voter_queryset.filter(
-                    sender_voter_we_vote_id__iexact=sender_voter_we_vote_id)
+                    sender_voter_we_vote_id=normalize_we_vote_id(sender_voter_we_vote_id))
             if positive_value_exists(recipient_voter_we_vote_id):
                 friend_invitation_voter_queryset = friend_invitation_voter_queryset.filter(
-                    recipient_voter_we_vote_id__iexact=recipient_voter_we_vote_id)
+                    recipient_voter_we_vote_id=normalize_we_vote_id(recipient_voter_we_vote_id))
             friend_invitation_from_voter_list = friend_invitation_voter_queryset
 
             if len(friend_invitation_from_voter_list):
@@ -1017,10 +985,10 @@ class FriendManager(models.Model):
             # Find invitations that I sent that were accepted. Do NOT show invitations that were ignored.
             friend_invitation_voter_queryset = FriendInvitationVoterLink.objects.all()
             friend_invitation_voter_queryset = friend_invitation_voter_queryset.filter(
-                sender_voter_we_vote_id__iexact=viewer_voter_we_vote_id)
+                sender_voter_we_vote_id=normalize_we_vote_id(viewer_voter_we_vote_id))
             # It is possible through account merging to have an invitation to yourself. We want to exclude these.
             friend_invitation_voter_queryset = friend_invitation_voter_queryset.exclude(
-                recipient_voter_we_vote_id__iexact=viewer_voter_we_vote_id)
+                recipient_voter_we_vote_id=normalize_we_vote_id(viewer_voter_we_vote_id))
             friend_invitation_voter_queryset = friend_invitation_voter_queryset.filter(invitation_status=ACCEPTED)
             friend_invitation_voter_queryset = friend_invitation_voter_queryset.filter(deleted=True)
             friend_invitation_voter_queryset = friend_invitation_voter_queryset.order_by('-date_last_changed')
@@ -1050,7 +1018,7 @@ class FriendManager(models.Model):
             # Find invitations that I sent that were accepted. Do NOT show invitations that were ignored.
             friend_invitation_email_queryset = FriendInvitationEmailLink.objects.all()
             friend_invitation_email_queryset = friend_invitation_email_queryset.filter(
-                sender_voter_we_vote_id__iexact=viewer_voter_we_vote_id)
+                sender_voter_we_vote_id=normalize_we_vote_id(viewer_voter_we_vote_id))
             friend_invitation_email_queryset = friend_invitation_email_queryset.filter(invitation_status=ACCEPTED)
             friend_invitation_email_queryset = friend_invitation_email_queryset.filter(deleted=True)
             friend_invitation_email_queryset = friend_invitation_email_queryset.order_by('-date_last_changed')
@@ -1093,10 +1061,10 @@ class FriendManager(models.Model):
             # Find invitations that I received, including ones that I have ignored.
             friend_invitation_voter_queryset = FriendInvitationVoterLink.objects.all()
             friend_invitation_voter_queryset = friend_invitation_voter_queryset.filter(
-                recipient_voter_we_vote_id__iexact=viewer_voter_we_vote_id)
+                recipient_voter_we_vote_id=normalize_we_vote_id(viewer_voter_we_vote_id))
             # It is possible through account merging to have an invitation to yourself. We want to exclude these.
             friend_invitation_voter_queryset = friend_invitation_voter_queryset.exclude(
-                sender_voter_we_vote_id__iexact=viewer_voter_we_vote_id)
+                sender_voter_we_vote_id=normalize_we_vote_id(viewer_voter_we_vote_id))
             friend_invitation_voter_queryset = friend_invitation_voter_queryset.filter(
                 Q(invitation_status=ACCEPTED) |
                 Q(invitation_status=IGNORED))
@@ -1259,10 +1227,10 @@ class FriendManager(models.Model):
         try:
             friend_invitation_voter_queryset = FriendInvitationVoterLink.objects.all()
             friend_invitation_voter_queryset = friend_invitation_voter_queryset.filter(
-                sender_voter_we_vote_id__iexact=sender_voter_we_vote_id)
+                sender_voter_we_vote_id=normalize_we_vote_id(sender_voter_we_vote_id))
             # It is possible through account merging to have an invitation to yourself. We want to exclude these.
             friend_invitation_voter_queryset = friend_invitation_voter_queryset.exclude(
-                recipient_voter_we_vote_id__iexact=sender_voter_we_vote_id)
+                recipient_voter_we_vote_id=normalize_we_vote_id(sender_voter_we_vote_id))
             friend_invitation_voter_queryset = friend_invitation_voter_queryset.filter(deleted=False)
             friend_invitation_voter_queryset = friend_invitation_voter_queryset.order_by('-date_last_changed')
             friend_list = friend_invitation_voter_queryset
@@ -1290,7 +1258,7 @@ class FriendManager(models.Model):
         try:
             friend_invitation_email_queryset = FriendInvitationEmailLink.objects.all()
             friend_invitation_email_queryset = friend_invitation_email_queryset.filter(
-                sender_voter_we_vote_id__iexact=sender_voter_we_vote_id)
+                sender_voter_we_vote_id=normalize_we_vote_id(sender_voter_we_vote_id))
             friend_invitation_email_queryset = friend_invitation_email_queryset.filter(deleted=False)
             friend_invitation_email_queryset = friend_invitation_email_queryset.order_by('-date_last_changed')
             friend_list_email = friend_invitation_email_queryset
@@ -1388,10 +1356,10 @@ class FriendManager(models.Model):
         try:
             friend_invitation_voter_queryset = FriendInvitationVoterLink.objects.all()
             friend_invitation_voter_queryset = friend_invitation_voter_queryset.filter(
-                recipient_voter_we_vote_id__iexact=recipient_voter_we_vote_id)
+                recipient_voter_we_vote_id=normalize_we_vote_id(recipient_voter_we_vote_id))
             # It is possible through account merging to have an invitation to yourself. We want to exclude these.
             friend_invitation_voter_queryset = friend_invitation_voter_queryset.exclude(
-                sender_voter_we_vote_id__iexact=recipient_voter_we_vote_id)
+                sender_voter_we_vote_id=normalize_we_vote_id(recipient_voter_we_vote_id))
             friend_invitation_voter_queryset = friend_invitation_voter_queryset.order_by('-date_last_changed')
             friend_list = friend_invitation_voter_queryset
 
@@ -1613,9 +1581,9 @@ class FriendManager(models.Model):
         try:
             suggested_friend_queryset = SuggestedFriend.objects.using('readonly').all()
             suggested_friend_queryset = suggested_friend_queryset.filter(
-                Q(viewer_voter_we_vote_id__iexact=voter_we_vote_id) |
-                Q(viewee_voter_we_vote_id__iexact=voter_we_vote_id))
-            suggested_friend_queryset = suggested_friend_queryset.order_by('-date_last_changed')
+                Q(viewer_voter_we_vote_id=normalize_we_vote_id(voter_we_vote_id)) |
+                Q(viewee_voter_we_vote_id=normalize_we_vote_id(voter_we_vote_id)))
+            suggested_friend_queryset = suggested_friend_queryset.order_by('-mutual_friend_count', '-date_last_changed')
             suggested_friend_list = suggested_friend_queryset
 
             if len(suggested_friend_list):
@@ -1672,9 +1640,9 @@ class FriendManager(models.Model):
         try:
             suggested_friend_queryset = SuggestedFriend.objects.using('readonly').all()
             suggested_friend_queryset = suggested_friend_queryset.filter(
-                Q(viewer_voter_we_vote_id__iexact=voter_we_vote_id) |
-                Q(viewee_voter_we_vote_id__iexact=voter_we_vote_id))
-            suggested_friend_queryset = suggested_friend_queryset.order_by('-date_last_changed')
+                Q(viewer_voter_we_vote_id=normalize_we_vote_id(voter_we_vote_id)) |
+                Q(viewee_voter_we_vote_id=normalize_we_vote_id(voter_we_vote_id)))
+            suggested_friend_queryset = suggested_friend_queryset.order_by('-mutual_friend_count', '-date_last_changed')
             suggested_friend_list = suggested_friend_queryset
 
             if len(suggested_friend_list):
@@ -1707,7 +1675,7 @@ class FriendManager(models.Model):
         invitations_sent_to_me_we_vote_id_list = self.fetch_friend_invitations_sent_to_me_we_vote_id_list(
             voter_we_vote_id)
 
-        filtered_suggested_friend_list_we_vote_ids = {}
+        filtered_suggested_friend_list_we_vote_ids = OrderedDict()
         if suggested_friend_list_found:
             voter_manager = VoterManager()
             for suggested_friend_entry in suggested_friend_list:
@@ -1725,14 +1693,11 @@ class FriendManager(models.Model):
                     # If we have already been sent an invite from them, don't suggest as a friend
                     continue
 
-                # Create a dictionary of we_vote_ids with the number of times a friend is suggested
-                if hasattr(filtered_suggested_friend_list_we_vote_ids, we_vote_id_of_friend):
-                    filtered_suggested_friend_list_we_vote_ids[we_vote_id_of_friend] += 1
-                else:
-                    filtered_suggested_friend_list_we_vote_ids[we_vote_id_of_friend] = 1
+                # Keep the first (most friends in common) entry for each suggested voter
+                if we_vote_id_of_friend not in filtered_suggested_friend_list_we_vote_ids:
+                    filtered_suggested_friend_list_we_vote_ids[we_vote_id_of_friend] = True
 
-            ordered_suggested_friend_list_we_vote_ids = sorted(filtered_suggested_friend_list_we_vote_ids)
-            for we_vote_id_of_friend in ordered_suggested_friend_list_we_vote_ids:
+            for we_vote_id_of_friend in filtered_suggested_friend_list_we_vote_ids:
                 # This is the voter you are friends with
                 friend_voter_results = voter_manager.retrieve_voter_by_we_vote_id(we_vote_id_of_friend)
                 if friend_voter_results['voter_found']:
@@ -1751,37 +1716,158 @@ class FriendManager(models.Model):
 
     def update_suggested_friends_starting_with_one_voter(self, starting_voter_we_vote_id):
         """
-
+        Suggest each friend of this voter to every other friend of theirs who isn't already their friend
         :param starting_voter_we_vote_id:
         :return:
         """
-        all_friends_one_person_results = self.retrieve_current_friends(starting_voter_we_vote_id)
+        friend_adjacency = fetch_friend_adjacency(starting_voter_we_vote_id, include_voter_ids=False)
+        if friend_adjacency is None:
+            results = {
+                'status':                           "UPDATE_SUGGESTED_FRIENDS-FRIENDS_NOT_READ ",
+                'success':                          False,
+                'suggested_friend_created_count':   0,
+                'suggested_friend_updated_count':   0,
+            }
+            return results
+        friend_we_vote_id_list = list(friend_adjacency.friend_we_vote_id_list)
+        if len(friend_we_vote_id_list) < 2:
+            results = {
+                'status':                           "UPDATE_SUGGESTED_FRIENDS_COMPLETED ",
+                'success':                          True,
+                'suggested_friend_created_count':   0,
+                'suggested_friend_updated_count':   0,
+            }
+            return results
+        return self.update_suggested_friends_for_voters(friend_we_vote_id_list, friend_we_vote_id_list)
+
+    def update_suggested_friends_for_voters(self, voter_we_vote_id_list, suggested_we_vote_id_list=None):
+        """
+        Suggest the friends of friends of each voter in voter_we_vote_id_list to them, found with one self-join of the
+        CurrentFriend table. Voters who are already friends, or have a pending or ignored invitation between them,
+        are left out, and each voter gets at most SUGGESTED_FRIEND_MAXIMUM_PER_VOTER suggestions, those with the most
+        friends in common first. New SuggestedFriend entries are created in bulk, and the mutual_friend_count of
+        existing ones is brought up to date.
+        :param voter_we_vote_id_list:
+        :param suggested_we_vote_id_list: Only suggest these voters (all friends of friends if None)
+        :return:
+        """
+        status = "UPDATE_SUGGESTED_FRIENDS "
         suggested_friend_created_count = 0
-        if all_friends_one_person_results['current_friend_list_found']:
-            current_friend_list = all_friends_one_person_results['current_friend_list']
-            # For each friend on this list, suggest every other friend as a possible friend
-            for one_current_friend_to_suggest in current_friend_list:
-                first_voter_we_vote_id = one_current_friend_to_suggest.fetch_other_voter_we_vote_id(
-                    starting_voter_we_vote_id)
-                for second_current_friend_to_suggest in current_friend_list:
-                    second_voter_we_vote_id = second_current_friend_to_suggest.fetch_other_voter_we_vote_id(
-                        starting_voter_we_vote_id)
-                    if positive_value_exists(first_voter_we_vote_id) and \
-                            positive_value_exists(second_voter_we_vote_id) and \
-                            first_voter_we_vote_id != second_voter_we_vote_id:
-                        # Are they already friends?
-                        already_friend_results = self.retrieve_current_friend(first_voter_we_vote_id,
-                                                                              second_voter_we_vote_id)
-                        if not already_friend_results['current_friend_found']:
-                            suggested_friend_results = self.create_or_update_suggested_friend(first_voter_we_vote_id,
-                                                                                              second_voter_we_vote_id)
-                            if suggested_friend_results['suggested_friend_created']:
-                                suggested_friend_created_count += 1
+        suggested_friend_updated_count = 0
+        voter_we_vote_id_list = [normalize_we_vote_id(voter_we_vote_id) for voter_we_vote_id in voter_we_vote_id_list
+                                 if positive_value_exists(voter_we_vote_id)]
+        if suggested_we_vote_id_list is not None:
+            suggested_we_vote_id_list = [normalize_we_vote_id(voter_we_vote_id)
+                                         for voter_we_vote_id in suggested_we_vote_id_list
+                                         if positive_value_exists(voter_we_vote_id)]
+
+        # Each friendship in both directions: voter_we_vote_id is friends with friend_we_vote_id
+        friend_edge_sql = "(SELECT viewer_voter_we_vote_id AS voter_we_vote_id, " \
+                          "viewee_voter_we_vote_id AS friend_we_vote_id FROM {current_friend} " \
+                          "UNION ALL SELECT viewee_voter_we_vote_id, viewer_voter_we_vote_id " \
+                          "FROM {current_friend})".format(current_friend=CurrentFriend._meta.db_table)
+        # first and second are both friends of the same voter, so they are friends of friends
+        sql = "SELECT voter_we_vote_id, suggested_we_vote_id, mutual_friend_count FROM (" \
+              "SELECT first.friend_we_vote_id AS voter_we_vote_id, " \
+              "second.friend_we_vote_id AS suggested_we_vote_id, " \
+              "COUNT(DISTINCT first.voter_we_vote_id) AS mutual_friend_count, " \
+              "ROW_NUMBER() OVER (PARTITION BY first.friend_we_vote_id " \
+              "ORDER BY COUNT(DISTINCT first.voter_we_vote_id) DESC, second.friend_we_vote_id) AS suggestion_rank " \
+              "FROM {friend_edge} AS first JOIN {friend_edge} AS second " \
+              "ON second.voter_we_vote_id = first.voter_we_vote_id " \
+              "WHERE first.friend_we_vote_id = ANY(%s) {only_suggested_sql}" \
+              "AND second.friend_we_vote_id != first.friend_we_vote_id " \
+              "AND NOT EXISTS (SELECT 1 FROM {current_friend} AS current_friend WHERE " \
+              "(current_friend.viewer_voter_we_vote_id = first.friend_we_vote_id " \
+              "AND current_friend.viewee_voter_we_vote_id = second.friend_we_vote_id) " \
+              "OR (current_friend.viewer_voter_we_vote_id = second.friend_we_vote_id " \
+              "AND current_friend.viewee_voter_we_vote_id = first.friend_we_vote_id)) " \
+              "AND NOT EXISTS (SELECT 1 FROM {invitation} AS invitation WHERE invitation.deleted = FALSE " \
+              "AND invitation.invitation_status = ANY(%s) " \
+              "AND ((invitation.sender_voter_we_vote_id = first.friend_we_vote_id " \
+              "AND invitation.recipient_voter_we_vote_id = second.friend_we_vote_id) " \
+              "OR (invitation.sender_voter_we_vote_id = second.friend_we_vote_id " \
+              "AND invitation.recipient_voter_we_vote_id = first.friend_we_vote_id))) " \
+              "GROUP BY first.friend_we_vote_id, second.friend_we_vote_id) AS ranked_suggestion " \
+              "WHERE suggestion_rank <= %s".format(
+                  friend_edge=friend_edge_sql,
+                  only_suggested_sql="" if suggested_we_vote_id_list is None else
+                  "AND second.friend_we_vote_id = ANY(%s) ",
+                  current_friend=CurrentFriend._meta.db_table,
+                  invitation=FriendInvitationVoterLink._meta.db_table)
+        params = [voter_we_vote_id_list]
+        if suggested_we_vote_id_list is not None:
+            params.append(suggested_we_vote_id_list)
+        params += [SUGGESTED_FRIEND_EXCLUDED_INVITATION_STATUS_LIST, SUGGESTED_FRIEND_MAXIMUM_PER_VOTER]
+
+        try:
+            if not len(voter_we_vote_id_list) or \
+                    (suggested_we_vote_id_list is not None and not len(suggested_we_vote_id_list)):
+                suggestion_list = []
+            else:
+                with connection.cursor() as cursor:
+                    cursor.execute(sql, params)
+                    suggestion_list = cursor.fetchall()
+
+            # The direction of a suggestion does not matter, so a pair found from both sides is saved once
+            mutual_friend_count_by_pair = {}
+            for voter_we_vote_id, suggested_we_vote_id, mutual_friend_count in suggestion_list:
+                mutual_friend_count_by_pair[tuple(sorted((voter_we_vote_id, suggested_we_vote_id)))] = \
+                    mutual_friend_count
+
+            if len(mutual_friend_count_by_pair):
+                pair_we_vote_id_set = set(we_vote_id for pair in mutual_friend_count_by_pair for we_vote_id in pair)
+                with transaction.atomic():
+                    existing_pair_set = set()
+                    changed_count_list = []
+                    for suggested_friend_id, viewer_voter_we_vote_id, viewee_voter_we_vote_id, mutual_friend_count \
+                            in SuggestedFriend.objects.filter(viewer_voter_we_vote_id__in=pair_we_vote_id_set,
+                                                              viewee_voter_we_vote_id__in=pair_we_vote_id_set) \
+                            .values_list('id', 'viewer_voter_we_vote_id', 'viewee_voter_we_vote_id',
+                                         'mutual_friend_count'):
+                        pair = tuple(sorted((viewer_voter_we_vote_id, viewee_voter_we_vote_id)))
+                        if pair not in mutual_friend_count_by_pair:
+                            continue
+                        existing_pair_set.add(pair)
+                        if mutual_friend_count != mutual_friend_count_by_pair[pair]:
+                            changed_count_list.append((suggested_friend_id, mutual_friend_count_by_pair[pair]))
+
+                    SuggestedFriend.objects.bulk_create([
+                        SuggestedFriend(viewer_voter_we_vote_id=pair[0], viewee_voter_we_vote_id=pair[1],
+                                        mutual_friend_count=mutual_friend_count)
+                        for pair, mutual_friend_count in mutual_friend_count_by_pair.items()
+                        if pair not in existing_pair_set], batch_size=1000)
+                    suggested_friend_created_count = len(mutual_friend_count_by_pair) - len(existing_pair_set)
+
+                    batch_size = 1000
+                    for start in range(0, len(changed_count_list), batch_size):
+                        changed_count_batch = changed_count_list[start:start + batch_size]
+                        with connection.cursor() as cursor:
+                            cursor.execute(
+                                "UPDATE {table} AS suggested_friend "
+                                "SET mutual_friend_count = source.mutual_friend_count, date_last_changed = %s "
+                                "FROM (VALUES {values_sql}) AS source (id, mutual_friend_count) "
+                                "WHERE suggested_friend.id = source.id".format(
+                                    table=SuggestedFriend._meta.db_table,
+                                    values_sql=", ".join(["(%s::bigint, %s::integer)"] * len(changed_count_batch))),
+                                [timezone.now()] +
+                                [value for one_change in changed_count_batch for value in one_change])
+                            suggested_friend_updated_count += cursor.rowcount
+            success = True
+            status += "UPDATE_SUGGESTED_FRIENDS_COMPLETED created:" + str(suggested_friend_created_count) + \
+                ",updated:" + str(suggested_friend_updated_count) + " "
+        except Exception as e:
+            success = False
+            suggested_friend_created_count = 0
+            suggested_friend_updated_count = 0
+            status += "UPDATE_SUGGESTED_FRIENDS_FAILED " + str(e) + " "
+            logger.error("update_suggested_friends_for_voters: " + str(e))
 
         results = {
-            'status':                           "UPDATE_SUGGESTED_FRIENDS_COMPLETED ",
-            'success':                          True,
+            'status':                           status,
+            'success':                          success,
             'suggested_friend_created_count':   suggested_friend_created_count,
+            'suggested_friend_updated_count':   suggested_friend_updated_count,
         }
         return results
 
@@ -1791,9 +1877,11 @@ class SuggestedFriend(models.Model):
     This table stores possible friend connections.
     """
     viewer_voter_we_vote_id = models.CharField(
-        verbose_name="voter we vote id person 1", max_length=255, null=True, blank=True, unique=False)
+        verbose_name="voter we vote id person 1", max_length=255, null=True, blank=True, unique=False, db_index=True)
     viewee_voter_we_vote_id = models.CharField(
-        verbose_name="voter we vote id person 2", max_length=255, null=True, blank=True, unique=False)
+        verbose_name="voter we vote id person 2", max_length=255, null=True, blank=True, unique=False, db_index=True)
+    # How many friends the two voters have in common, the last time suggestions were updated for either of them
+    mutual_friend_count = models.PositiveIntegerField(default=0, null=False)
     date_last_changed = models.DateTimeField(verbose_name='date last changed', null=True, auto_now=True)
 
     def fetch_other_voter_we_vote_id(self, one_we_vote_id):
@@ -1804,3 +1892,94 @@ class SuggestedFriend(models.Model):
         else:
             # If the we_vote_id passed in wasn't found, don't return another we_vote_id
             return ""
+
+
+def fetch_friend_adjacency_dict(voter_we_vote_id_list, include_voter_ids=True):
+    """
+    The friends of many voters at once: voters already in the friend graph cache (friend/friend_graph_cache.py) come
+    from there, and the rest are read with one CurrentFriend query and one Voter query, however many there are.
+    :param voter_we_vote_id_list:
+    :param include_voter_ids: False if the caller only needs friend_we_vote_id_list. When nothing is cached, this
+     skips the Voter query and friend_voter_id_by_we_vote_id is left empty.
+    :return: voter_we_vote_id (normalized) -> FriendAdjacency, with an empty FriendAdjacency for voters with no friends.
+     Voters whose friends couldn't be read are left out.
+    """
+    voter_we_vote_id_list = list(OrderedDict.fromkeys(
+        normalize_we_vote_id(voter_we_vote_id) for voter_we_vote_id in voter_we_vote_id_list
+        if positive_value_exists(voter_we_vote_id)))
+    friend_adjacency_dict = fetch_cached_friend_adjacency_dict(voter_we_vote_id_list)
+    missing_we_vote_id_list = [voter_we_vote_id for voter_we_vote_id in voter_we_vote_id_list
+                               if voter_we_vote_id not in friend_adjacency_dict]
+    if not missing_we_vote_id_list:
+        return friend_adjacency_dict
+
+    # When friends are cached, read from the primary database, since friends are often looked up right after an
+    # invitation is accepted, and whatever we read here is reused until it is invalidated. Otherwise read from the
+    # read-only database, like every lookup did before friends were cached.
+    cache_friend_adjacency = friend_graph_cache_on()
+    database_alias = 'default' if cache_friend_adjacency else 'readonly'
+    include_voter_ids = include_voter_ids or cache_friend_adjacency
+    friend_we_vote_id_list_by_voter = OrderedDict(
+        (voter_we_vote_id, []) for voter_we_vote_id in missing_we_vote_id_list)
+    try:
+        current_friend_query = CurrentFriend.objects.using(database_alias).filter(
+            Q(viewer_voter_we_vote_id__in=missing_we_vote_id_list) |
+            Q(viewee_voter_we_vote_id__in=missing_we_vote_id_list)) \
+            .order_by('-date_last_changed').values_list('viewer_voter_we_vote_id', 'viewee_voter_we_vote_id')
+        for viewer_voter_we_vote_id, viewee_voter_we_vote_id in current_friend_query:
+            for one_voter_we_vote_id, other_voter_we_vote_id in ((viewer_voter_we_vote_id, viewee_voter_we_vote_id),
+                                                                 (viewee_voter_we_vote_id, viewer_voter_we_vote_id)):
+                friend_we_vote_id_list = friend_we_vote_id_list_by_voter.get(one_voter_we_vote_id)
+                if friend_we_vote_id_list is not None and positive_value_exists(other_voter_we_vote_id) and \
+                        other_voter_we_vote_id not in friend_we_vote_id_list:
+                    friend_we_vote_id_list.append(other_voter_we_vote_id)
+
+        all_friend_we_vote_id_set = set()
+        for friend_we_vote_id_list in friend_we_vote_id_list_by_voter.values():
+            all_friend_we_vote_id_set.update(friend_we_vote_id_list)
+        voter_id_by_we_vote_id = {}
+        if all_friend_we_vote_id_set and include_voter_ids:
+            voter_id_by_we_vote_id = dict(Voter.objects.using(database_alias).filter(
+                we_vote_id__in=all_friend_we_vote_id_set).values_list('we_vote_id', 'id'))
+    except Exception as e:
+        logger.error("fetch_friend_adjacency_dict: " + str(e))
+        return friend_adjacency_dict
+
+    loaded_friend_adjacency_dict = {}
+    for voter_we_vote_id, friend_we_vote_id_list in friend_we_vote_id_list_by_voter.items():
+        loaded_friend_adjacency_dict[voter_we_vote_id] = FriendAdjacency(
+            tuple(friend_we_vote_id_list),
+            {friend_we_vote_id: voter_id_by_we_vote_id[friend_we_vote_id]
+             for friend_we_vote_id in friend_we_vote_id_list if friend_we_vote_id in voter_id_by_we_vote_id})
+    if cache_friend_adjacency:
+        store_cached_friend_adjacency_dict(loaded_friend_adjacency_dict)
+    friend_adjacency_dict.update(loaded_friend_adjacency_dict)
+    return friend_adjacency_dict
+
+
+def fetch_friend_adjacency(voter_we_vote_id, include_voter_ids=True):
+    """
+    One voter's friends. See fetch_friend_adjacency_dict
+    :param voter_we_vote_id:
+    :param include_voter_ids:
+    :return: FriendAdjacency, or None if the voter's friends couldn't be read
+    """
+    if not positive_value_exists(voter_we_vote_id):
+        return FriendAdjacency((), {})
+    return fetch_friend_adjacency_dict([voter_we_vote_id], include_voter_ids=include_voter_ids).get(
+        normalize_we_vote_id(voter_we_vote_id))
+
+
+def invalidate_friend_adjacency_now_and_on_commit(voter_we_vote_id_list):
+    voter_we_vote_id_list = [normalize_we_vote_id(voter_we_vote_id) for voter_we_vote_id in voter_we_vote_id_list]
+    invalidate_cached_friend_adjacency(voter_we_vote_id_list)
+    transaction.on_commit(lambda: invalidate_cached_friend_adjacency(voter_we_vote_id_list))
+
+
+@receiver(post_save, sender=CurrentFriend)
+@receiver(post_delete, sender=CurrentFriend)
+def invalidate_friend_adjacency_for_current_friend_signal(sender, instance, **kwargs):
+    # Accepted invitations and unfriending come through here. Forget both voters' friends now, and again when the
+    # transaction commits, so a request that reads the old friendships in the meantime can't cache them for long.
+    invalidate_friend_adjacency_now_and_on_commit(
+        [instance.viewer_voter_we_vote_id, instance.viewee_voter_we_vote_id])
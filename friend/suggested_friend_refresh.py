@@ -0,0 +1,86 @@
+# friend/suggested_friend_refresh.py
+# Brought to you by We Vote. Be good.
+# -*- coding: UTF-8 -*-
+
+from .models import CurrentFriend, FriendManager
+from config.base import get_environment_variable_default
+from datetime import timedelta
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+from voter.models import Voter, VoterDeviceLink
+import wevote_functions.admin
+from wevote_functions.functions import convert_to_int, positive_value_exists
+
+logger = wevote_functions.admin.get_logger(__name__)
+
+# Suggestions are refreshed for voters seen (on any device) in this many days
+SUGGESTED_FRIEND_REFRESH_ACTIVE_DAYS = \
+    convert_to_int(get_environment_variable_default("SUGGESTED_FRIEND_REFRESH_ACTIVE_DAYS", 30))
+# How many voters' suggestions are computed with one query
+SUGGESTED_FRIEND_REFRESH_CHUNK_SIZE = \
+    convert_to_int(get_environment_variable_default("SUGGESTED_FRIEND_REFRESH_CHUNK_SIZE", 200))
+
+
+def voters_with_friends_queryset(active_days):
+    """
+    Voters with at least one friend, who have been seen in the last active_days
+    :param active_days: 0 for every voter with a friend
+    :return:
+    """
+    voter_query = Voter.objects.annotate(
+        has_friend_as_viewer=Exists(CurrentFriend.objects.filter(viewer_voter_we_vote_id=OuterRef('we_vote_id'))),
+        has_friend_as_viewee=Exists(CurrentFriend.objects.filter(viewee_voter_we_vote_id=OuterRef('we_vote_id'))))
+    voter_query = voter_query.filter(Q(has_friend_as_viewer=True) | Q(has_friend_as_viewee=True))
+    if positive_value_exists(active_days):
+        cutoff = timezone.now() - timedelta(days=active_days)
+        voter_query = voter_query.filter(
+            id__in=VoterDeviceLink.objects.filter(date_last_changed__gte=cutoff).values('voter_id'))
+    return voter_query
+
+
+def refresh_suggested_friends(active_days=None, chunk_size=None):
+    """
+    Suggest friends of friends to every voter with a friend who has been seen in the last active_days, chunk_size
+    voters at a time (see FriendManager.update_suggested_friends_for_voters)
+    :param active_days: 0 for every voter with a friend
+    :param chunk_size:
+    :return:
+    """
+    status = "REFRESH_SUGGESTED_FRIENDS "
+    success = True
+    active_days = SUGGESTED_FRIEND_REFRESH_ACTIVE_DAYS if active_days is None else active_days
+    chunk_size = SUGGESTED_FRIEND_REFRESH_CHUNK_SIZE if chunk_size is None else max(chunk_size, 1)
+    friend_manager = FriendManager()
+
+    voters_refreshed = 0
+    suggested_friend_created_count = 0
+    suggested_friend_updated_count = 0
+    last_voter_id = 0
+    while True:
+        voter_list = list(voters_with_friends_queryset(active_days).filter(id__gt=last_voter_id)
+                          .order_by('id').values_list('id', 'we_vote_id')[:chunk_size])
+        if not voter_list:
+            break
+        results = friend_manager.update_suggested_friends_for_voters(
+            [voter_we_vote_id for voter_id, voter_we_vote_id in voter_list])
+        if not results['success']:
+            success = False
+            status += "REFRESH_SUGGESTED_FRIENDS-CHUNK_FAILED after voter id " + str(last_voter_id) + ": " + \
+                results['status']
+            logger.error("refresh_suggested_friends: " + status)
+            break
+        voters_refreshed += len(voter_list)
+        suggested_friend_created_count += results['suggested_friend_created_count']
+        suggested_friend_updated_count += results['suggested_friend_updated_count']
+        last_voter_id = voter_list[-1][0]
+
+    status += "REFRESHED " + str(voters_refreshed) + " voters, created:" + str(suggested_friend_created_count) + \
+        ",updated:" + str(suggested_friend_updated_count) + " "
+    results = {
+        'success':                          success,
+        'status':                           status,
+        'voters_refreshed':                 voters_refreshed,
+        'suggested_friend_created_count':   suggested_friend_created_count,
+        'suggested_friend_updated_count':   suggested_friend_updated_count,
+    }
+    return results
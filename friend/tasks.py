@@ -0,0 +1,20 @@
+# friend/tasks.py
+# Brought to you by We Vote. Be good.
+# -*- coding: UTF-8 -*-
+
+from background_task import background
+from .suggested_friend_refresh import refresh_suggested_friends
+import wevote_functions.admin
+
+logger = wevote_functions.admin.get_logger(__name__)
+
+
+@background()
+def refresh_suggested_friends_task(active_days=None):
+    """
+    Run refresh_suggested_friends from the background task worker (python manage.py process_tasks), so suggesting
+    friends of friends to every recently active voter doesn't have to finish within one admin page request.
+    """
+    results = refresh_suggested_friends(active_days=active_days)
+    if not results['success']:
+        logger.error("refresh_suggested_friends_task: " + results['status'])
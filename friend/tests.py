@@ -0,0 +1,145 @@
+from django.core.cache import caches
+from django.test import override_settings, TestCase
+import shutil
+import tempfile
+from unittest import mock
+
+from friend.friend_graph_cache import clear_cached_friend_adjacencies
+from friend.models import CurrentFriend, fetch_friend_adjacency, fetch_friend_adjacency_dict, \
+    FriendInvitationVoterLink, FriendManager, IGNORED, SuggestedFriend
+from voter.models import Voter
+
+
+class FriendGraphTestCase(TestCase):
+
+    def setUp(self):
+        clear_cached_friend_adjacencies()
+        self.addCleanup(clear_cached_friend_adjacencies)
+        self.voter1 = Voter.objects.create()
+        self.voter2 = Voter.objects.create()
+        self.voter3 = Voter.objects.create()
+        CurrentFriend.objects.create(viewer_voter_we_vote_id=self.voter1.we_vote_id,
+                                     viewee_voter_we_vote_id=self.voter2.we_vote_id)
+        CurrentFriend.objects.create(viewer_voter_we_vote_id=self.voter3.we_vote_id,
+                                     viewee_voter_we_vote_id=self.voter1.we_vote_id)
+
+    def test_many_voters_in_two_queries(self):
+        with self.assertNumQueries(0), self.assertNumQueries(2, using='readonly'):
+            friend_adjacency_dict = fetch_friend_adjacency_dict(
+                [self.voter1.we_vote_id, self.voter2.we_vote_id, 'wv01voter999'])
+        self.assertEqual(set(friend_adjacency_dict[self.voter1.we_vote_id].friend_we_vote_id_list),
+                         {self.voter2.we_vote_id, self.voter3.we_vote_id})
+        self.assertEqual(friend_adjacency_dict[self.voter2.we_vote_id].friend_voter_id_by_we_vote_id,
+                         {self.voter1.we_vote_id: self.voter1.id})
+        self.assertEqual(friend_adjacency_dict['wv01voter999'].friend_we_vote_id_list, ())
+
+    def shared_tier_settings(self):
+        shared_cache_directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, shared_cache_directory, ignore_errors=True)
+        return override_settings(CACHES={
+            'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+            'friend_graph': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                             'LOCATION': shared_cache_directory},
+        })
+
+    def test_nothing_cached_without_shared_tier(self):
+        fetch_friend_adjacency(self.voter1.we_vote_id)
+        with self.assertNumQueries(0), self.assertNumQueries(2, using='readonly'):
+            fetch_friend_adjacency(self.voter1.we_vote_id)
+
+        with override_settings(CACHES={
+                'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+                'friend_graph': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}):
+            fetch_friend_adjacency(self.voter1.we_vote_id)
+            # Callers that only need we_vote_ids don't look up the friends' voter ids
+            with self.assertNumQueries(0), self.assertNumQueries(1, using='readonly'):
+                results = FriendManager().retrieve_friends_we_vote_id_list(self.voter1.we_vote_id)
+                self.assertEqual(set(results['friends_we_vote_id_list']),
+                                 {self.voter2.we_vote_id, self.voter3.we_vote_id})
+            with self.assertNumQueries(0), self.assertNumQueries(1, using='readonly'):
+                self.assertEqual(FriendManager().fetch_current_friends_count(self.voter1.we_vote_id), 2)
+
+    def test_database_error_is_reported(self):
+        with mock.patch.object(CurrentFriend.objects, 'using', side_effect=Exception('database unavailable')):
+            results = FriendManager().retrieve_friends_we_vote_id_list(self.voter1.we_vote_id)
+            self.assertFalse(results['success'])
+            self.assertIsNone(fetch_friend_adjacency(self.voter1.we_vote_id))
+
+    def test_shared_tier(self):
+        with self.shared_tier_settings():
+            # Read from the primary, since it is cached
+            with self.assertNumQueries(2), self.assertNumQueries(0, using='readonly'):
+                FriendManager().retrieve_friends_we_vote_id_list(self.voter1.we_vote_id)
+            with self.assertNumQueries(0):
+                fetch_friend_adjacency(self.voter1.we_vote_id)
+
+            # Another worker, with nothing in its own tier
+            clear_cached_friend_adjacencies()
+            with self.assertNumQueries(0):
+                self.assertEqual(set(fetch_friend_adjacency(self.voter1.we_vote_id).friend_we_vote_id_list),
+                                 {self.voter2.we_vote_id, self.voter3.we_vote_id})
+
+    def test_unfriended_on_another_worker_without_local_tier(self):
+        with self.shared_tier_settings(), \
+                mock.patch('friend.friend_graph_cache.FRIEND_GRAPH_LOCAL_TIME_TO_LIVE', 0):
+            fetch_friend_adjacency(self.voter1.we_vote_id)
+            # Another worker deletes a friendship, which clears the shared tier
+            CurrentFriend.objects.filter(viewer_voter_we_vote_id=self.voter3.we_vote_id).update(
+                viewer_voter_we_vote_id='wv01voter999')
+            caches['friend_graph'].clear()
+            self.assertEqual(fetch_friend_adjacency(self.voter1.we_vote_id).friend_we_vote_id_list,
+                             (self.voter2.we_vote_id,))
+
+    def test_unfriend_and_new_friend_clear_the_cache(self):
+        fetch_friend_adjacency_dict([self.voter1.we_vote_id, self.voter2.we_vote_id, self.voter3.we_vote_id])
+
+        CurrentFriend.objects.get(viewer_voter_we_vote_id=self.voter3.we_vote_id).delete()
+        self.assertEqual(fetch_friend_adjacency(self.voter1.we_vote_id).friend_we_vote_id_list,
+                         (self.voter2.we_vote_id,))
+        self.assertEqual(FriendManager().fetch_current_friends_count(self.voter3.we_vote_id), 0)
+
+        CurrentFriend.objects.create(viewer_voter_we_vote_id=self.voter2.we_vote_id,
+                                     viewee_voter_we_vote_id=self.voter3.we_vote_id)
+        results = FriendManager().retrieve_friends_we_vote_id_list(self.voter3.we_vote_id)
+        self.assertEqual(results['friends_we_vote_id_list'], [self.voter2.we_vote_id])
+
+
+class SuggestedFriendTestCase(TestCase):
+
+    def setUp(self):
+        clear_cached_friend_adjacencies()
+        # voter1 is friends with voter2, voter3 and voter4, and voter2 and voter3 are both friends with voter5
+        for viewer_voter_we_vote_id, viewee_voter_we_vote_id in [('wv01voter1', 'wv01voter2'),
+                                                                 ('wv01voter3', 'wv01voter1'),
+                                                                 ('wv01voter1', 'wv01voter4'),
+                                                                 ('wv01voter2', 'wv01voter5'),
+                                                                 ('wv01voter5', 'wv01voter3')]:
+            CurrentFriend.objects.create(viewer_voter_we_vote_id=viewer_voter_we_vote_id,
+                                         viewee_voter_we_vote_id=viewee_voter_we_vote_id)
+        FriendInvitationVoterLink.objects.create(sender_voter_we_vote_id='wv01voter4',
+                                                 recipient_voter_we_vote_id='wv01voter2', invitation_status=IGNORED)
+
+    def fetch_mutual_friend_count_by_pair(self):
+        return {tuple(sorted((suggested_friend.viewer_voter_we_vote_id, suggested_friend.viewee_voter_we_vote_id))):
+                suggested_friend.mutual_friend_count for suggested_friend in SuggestedFriend.objects.all()}
+
+    def test_starting_with_one_voter(self):
+        results = FriendManager().update_suggested_friends_starting_with_one_voter('wv01voter1')
+        self.assertTrue(results['success'])
+        self.assertEqual(results['suggested_friend_created_count'], 2)
+        # voter2 and voter4 have an ignored invitation between them, so they aren't suggested to each other
+        self.assertEqual(self.fetch_mutual_friend_count_by_pair(),
+                         {('wv01voter2', 'wv01voter3'): 2, ('wv01voter3', 'wv01voter4'): 1})
+
+        results = FriendManager().update_suggested_friends_starting_with_one_voter('wv01voter1')
+        self.assertEqual(results['suggested_friend_created_count'], 0)
+        self.assertEqual(SuggestedFriend.objects.count(), 2)
+
+    def test_friends_of_friends_for_voters(self):
+        SuggestedFriend.objects.create(viewer_voter_we_vote_id='wv01voter1', viewee_voter_we_vote_id='wv01voter5',
+                                       mutual_friend_count=1)
+        results = FriendManager().update_suggested_friends_for_voters(['wv01voter5'])
+        self.assertTrue(results['success'])
+        self.assertEqual(results['suggested_friend_created_count'], 0)
+        self.assertEqual(results['suggested_friend_updated_count'], 1)
+        self.assertEqual(self.fetch_mutual_friend_count_by_pair(), {('wv01voter1', 'wv01voter5'): 2})
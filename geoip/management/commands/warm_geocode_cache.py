@@ -0,0 +1,144 @@
+from django.core.management.base import BaseCommand
+from django.db import IntegrityError, transaction
+from django.utils.timezone import now
+from geoip.models import GeocodeCache, GeocodeCacheManager, normalize_address_for_geocode_cache
+from polling_location.models import PollingLocation
+from voter.models import VoterAddress
+from wevote_functions.functions import convert_to_float, positive_value_exists
+
+
+class Command(BaseCommand):
+    help = 'Fills the GeocodeCache from the coordinates we already have for VoterAddress and PollingLocation ' \
+           'entries, so those addresses are not sent to Google again. With --geocode_missing, also asks Google for ' \
+           'up to that many addresses that have no coordinates yet.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch_size', type=int, default=1000)
+        parser.add_argument('--geocode_missing', type=int, default=0,
+                            help='Number of addresses without coordinates to send to Google')
+
+    def formatted_address(self, line1, city, state_code, zip_code):
+        # The same "line1, city, ST zip, USA" form Google returns, which find_closest_ballot_returned relies on
+        if not positive_value_exists(line1) or not positive_value_exists(city) or not positive_value_exists(state_code):
+            return None
+        return "{}, {}, {} {}, USA".format(line1.strip(), city.strip(), state_code.strip().upper(),
+                                           (zip_code or "").strip()[:5]).replace(" ,", ",")
+
+    def voter_address_entries(self):
+        voter_address_query = VoterAddress.objects.exclude(text_for_map_search='')
+        voter_address_query = voter_address_query.exclude(latitude__isnull=True).exclude(latitude='')
+        voter_address_query = voter_address_query.exclude(longitude__isnull=True).exclude(longitude='')
+        for voter_address in voter_address_query.order_by('-date_last_changed').iterator():
+            latitude = convert_to_float(voter_address.latitude)
+            longitude = convert_to_float(voter_address.longitude)
+            if not latitude or not longitude:
+                continue
+            state_code = (voter_address.normalized_state or "")[:2]
+            yield GeocodeCache(
+                normalized_address=normalize_address_for_geocode_cache(voter_address.text_for_map_search),
+                text_for_map_search=voter_address.text_for_map_search[:255],
+                location_found=True,
+                formatted_address=self.formatted_address(voter_address.normalized_line1, voter_address.normalized_city,
+                                                         state_code, voter_address.normalized_zip),
+                latitude=latitude,
+                longitude=longitude,
+                state_code=state_code.upper() or None,
+                zip_code=(voter_address.normalized_zip or "")[:10] or None,
+                date_geocoded=voter_address.date_last_changed or now())
+
+    def polling_location_entries(self):
+        polling_location_query = PollingLocation.objects.filter(polling_location_deleted=False)
+        polling_location_query = polling_location_query.exclude(latitude__isnull=True)
+        polling_location_query = polling_location_query.exclude(longitude__isnull=True)
+        for polling_location in polling_location_query.order_by('id').iterator():
+            text_for_map_search = polling_location.get_text_for_map_search()
+            if not positive_value_exists(text_for_map_search):
+                continue
+            zip_code = polling_location.get_formatted_zip()
+            yield GeocodeCache(
+                normalized_address=normalize_address_for_geocode_cache(text_for_map_search),
+                text_for_map_search=text_for_map_search[:255],
+                location_found=True,
+                formatted_address=self.formatted_address(polling_location.line1, polling_location.city,
+                                                         polling_location.state, zip_code),
+                latitude=polling_location.latitude,
+                longitude=polling_location.longitude,
+                state_code=(polling_location.state or "")[:2].upper() or None,
+                zip_code=(zip_code or "")[:10] or None,
+                date_geocoded=now())
+
+    def save_batch(self, geocode_cache_batch):
+        normalized_address_list = [geocode_cache.normalized_address for geocode_cache in geocode_cache_batch]
+        existing_normalized_address_set = set(GeocodeCache.objects.filter(
+            normalized_address__in=normalized_address_list).values_list('normalized_address', flat=True))
+        new_geocode_cache_list = [geocode_cache for geocode_cache in geocode_cache_batch
+                                  if geocode_cache.normalized_address not in existing_normalized_address_set]
+        if not new_geocode_cache_list:
+            return 0
+        try:
+            with transaction.atomic():
+                GeocodeCache.objects.bulk_create(new_geocode_cache_list)
+            return len(new_geocode_cache_list)
+        except IntegrityError:
+            # Someone geocoded one of these addresses while we were working. Save the rest one at a time.
+            saved = 0
+            for geocode_cache in new_geocode_cache_list:
+                try:
+                    with transaction.atomic():
+                        geocode_cache.save()
+                    saved += 1
+                except IntegrityError:
+                    pass
+            return saved
+
+    def warm_from(self, geocode_cache_entries, batch_size):
+        """
+        :return: The number of addresses saved, and how many of the addresses looked at had no formatted_address
+          because the street, city or state was missing. Those are saved with their coordinates and state_code only.
+        """
+        saved = 0
+        without_formatted_address = 0
+        seen_normalized_address_set = set()
+        geocode_cache_batch = []
+        for geocode_cache in geocode_cache_entries:
+            if not positive_value_exists(geocode_cache.normalized_address) or \
+                    geocode_cache.normalized_address in seen_normalized_address_set:
+                continue
+            seen_normalized_address_set.add(geocode_cache.normalized_address)
+            if geocode_cache.formatted_address is None:
+                without_formatted_address += 1
+            geocode_cache_batch.append(geocode_cache)
+            if len(geocode_cache_batch) >= batch_size:
+                saved += self.save_batch(geocode_cache_batch)
+                geocode_cache_batch = []
+        if geocode_cache_batch:
+            saved += self.save_batch(geocode_cache_batch)
+        return saved, without_formatted_address
+
+    def geocode_missing(self, maximum_to_geocode):
+        geocode_cache_manager = GeocodeCacheManager()
+        geocoded = 0
+        polling_location_query = PollingLocation.objects.filter(polling_location_deleted=False, latitude__isnull=True)
+        for polling_location in polling_location_query.order_by('id').iterator():
+            if geocoded >= maximum_to_geocode:
+                break
+            results = geocode_cache_manager.retrieve_geocoded_address(polling_location.get_text_for_map_search())
+            if results['geocoder_quota_exceeded']:
+                self.stderr.write('Geocoder quota exceeded')
+                break
+            if 'GEOCODE_CACHE_HIT' not in results['status']:
+                geocoded += 1
+        return geocoded
+
+    def handle(self, *args, **options):
+        batch_size = max(options['batch_size'], 1)
+        for source_name, geocode_cache_entries in (('VoterAddress', self.voter_address_entries()),
+                                                   ('PollingLocation', self.polling_location_entries())):
+            saved, without_formatted_address = self.warm_from(geocode_cache_entries, batch_size)
+            self.stdout.write('{} addresses added from {}'.format(saved, source_name))
+            if without_formatted_address:
+                self.stdout.write('{} of the {} addresses had no street, city or state, so have no '
+                                  'formatted_address'.format(without_formatted_address, source_name))
+        if positive_value_exists(options['geocode_missing']):
+            geocoded = self.geocode_missing(options['geocode_missing'])
+            self.stdout.write('{} PollingLocation addresses sent to Google'.format(geocoded))
@@ -1,3 +1,219 @@
+# geoip/models.py
+# Brought to you by We Vote. Be good.
+# -*- coding: UTF-8 -*-
+
+from config.base import get_environment_variable, get_environment_variable_default
+from datetime import timedelta
 from django.db import models
+from django.utils.timezone import now
+from exception.models import handle_exception
+from geopy.exc import GeocoderQuotaExceeded
+from geopy.geocoders import get_geocoder_for_service
+import re
+import wevote_functions.admin
+from wevote_functions.functions import convert_to_int, positive_value_exists, STATE_CODE_MAP
+
+logger = wevote_functions.admin.get_logger(__name__)
+
+GOOGLE_MAPS_API_KEY = get_environment_variable("GOOGLE_MAPS_API_KEY")
+GEOCODE_TIMEOUT = 10
+# How many days a geocoded address is used before we ask Google again
+GEOCODE_CACHE_DAYS_TO_LIVE = convert_to_int(get_environment_variable_default("GEOCODE_CACHE_DAYS_TO_LIVE", 90))
+# How many days we remember that Google couldn't find an address
+GEOCODE_CACHE_NOT_FOUND_DAYS_TO_LIVE = \
+    convert_to_int(get_environment_variable_default("GEOCODE_CACHE_NOT_FOUND_DAYS_TO_LIVE", 7))
+
+# Full state names, longest first so "west virginia" is replaced before "virginia"
+STATE_NAME_TO_CODE_LIST = sorted(((state_name.lower(), state_code.lower())
+                                  for state_code, state_name in STATE_CODE_MAP.items()),
+                                 key=lambda state_name_and_code: -len(state_name_and_code[0]))
+
+
+def normalize_address_for_geocode_cache(text_for_map_search):
+    """
+    Reduce an address to the form we use as the GeocodeCache key, so "123 Main St., Oakland, California 94612-1234"
+    and "123 main st oakland ca 94612" share one entry
+    :param text_for_map_search:
+    :return:
+    """
+    if not positive_value_exists(text_for_map_search):
+        return ""
+    normalized_address = text_for_map_search.lower()
+    normalized_address = re.sub(r"[^\w\s-]", " ", normalized_address)
+    normalized_address = re.sub(r"\s+", " ", normalized_address).strip()
+    normalized_address = re.sub(r"\s*\b(usa|us|united states|united states of america)$", "", normalized_address)
+    # ZIP+4 geocodes to the same place as the 5-digit ZIP
+    normalized_address = re.sub(r"\b(\d{5})-\d{4}\b", r"\1", normalized_address)
+    # Only a state name followed by a ZIP (or at the end) is a state. "123 Washington St" is a street.
+    for state_name, state_code in STATE_NAME_TO_CODE_LIST:
+        normalized_address = re.sub(r"\b{}\b(?=\s+\d{{5}}\b|$)".format(re.escape(state_name)), state_code,
+                                    normalized_address)
+    return normalized_address[:255]
+
+
+class GeocodeCache(models.Model):
+    """
+    What Google's geocoder told us about one address, so the same address isn't sent to Google (which is slow,
+    rate limited and costs money) every time a voter saves it or retrieves their ballot
+    """
+    normalized_address = models.CharField(
+        verbose_name="address normalized with normalize_address_for_geocode_cache", max_length=255, unique=True)
+    text_for_map_search = models.CharField(
+        verbose_name="address as it was first sent to the geocoder", max_length=255, null=True, blank=True)
+    # False when Google couldn't find the address, so we don't keep asking
+    location_found = models.BooleanField(verbose_name="did the geocoder find this address", default=False)
+    formatted_address = models.CharField(
+        verbose_name="address as returned by the geocoder", max_length=255, null=True, blank=True)
+    latitude = models.FloatField(verbose_name="latitude returned from the geocoder", null=True, blank=True)
+    longitude = models.FloatField(verbose_name="longitude returned from the geocoder", null=True, blank=True)
+    # Google's location_type: ROOFTOP, RANGE_INTERPOLATED, GEOMETRIC_CENTER or APPROXIMATE
+    confidence = models.CharField(verbose_name="geocoder location type", max_length=50, null=True, blank=True)
+    partial_match = models.BooleanField(verbose_name="geocoder only matched part of the address", default=False)
+    state_code = models.CharField(verbose_name="state from the geocoder", max_length=2, null=True, blank=True)
+    zip_code = models.CharField(verbose_name="postal code from the geocoder", max_length=10, null=True, blank=True)
+    date_geocoded = models.DateTimeField(verbose_name="when the geocoder answered", null=True)
+
+    def is_stale(self):
+        if self.date_geocoded is None:
+            return True
+        days_to_live = GEOCODE_CACHE_DAYS_TO_LIVE if self.location_found else GEOCODE_CACHE_NOT_FOUND_DAYS_TO_LIVE
+        return now() - self.date_geocoded > timedelta(days=days_to_live)
+
+
+class GeocodeCacheManager(models.Model):
+
+    def __unicode__(self):
+        return "GeocodeCacheManager"
+
+    def geocode_with_google(self, text_for_map_search):
+        """
+        Ask Google, trying without our maps key if our quota has been exceeded
+        :param text_for_map_search:
+        :return:
+        """
+        status = ""
+        success = True
+        geocoder_quota_exceeded = False
+        location = None
+        try_without_maps_key = False
+
+        if not hasattr(self, 'google_client') or not self.google_client:
+            self.google_client = get_geocoder_for_service('google')(GOOGLE_MAPS_API_KEY)
+
+        try:
+            location = self.google_client.geocode(text_for_map_search, sensor=False, timeout=GEOCODE_TIMEOUT)
+        except GeocoderQuotaExceeded:
+            try_without_maps_key = True
+            status += "GEOCODER_QUOTA_EXCEEDED "
+        except Exception as e:
+            try_without_maps_key = True
+            status += 'GEOCODER_ERROR {error} [type: {error_type}] '.format(error=e, error_type=type(e))
+
+        if try_without_maps_key:
+            try:
+                temp_google_client = get_geocoder_for_service('google')()
+                location = temp_google_client.geocode(text_for_map_search, sensor=False, timeout=GEOCODE_TIMEOUT)
+                success = True
+            except GeocoderQuotaExceeded:
+                geocoder_quota_exceeded = True
+                success = False
+            except Exception as e:
+                status += 'GEOCODER_ERROR_WITHOUT_MAPS_KEY {error} [type: {error_type}] '.format(
+                    error=e, error_type=type(e))
+                success = False
+
+        return {
+            'success':                  success,
+            'status':                   status,
+            'geocoder_quota_exceeded':  geocoder_quota_exceeded,
+            'location':                 location,
+        }
+
+    def retrieve_geocoded_address(self, text_for_map_search, use_cache=True):
+        """
+        Geocode an address, from the GeocodeCache when we have a fresh answer, and from Google (saving the answer)
+        when we don't. If Google can't be reached, a stale answer is better than none.
+        :param text_for_map_search:
+        :param use_cache: False to ask Google even when we have a fresh answer
+        :return:
+        """
+        status = ""
+        geocode_cache = None
+        normalized_address = normalize_address_for_geocode_cache(text_for_map_search)
+        if not positive_value_exists(normalized_address):
+            return self.geocode_cache_results(None, False, "GEOCODE_CACHE-NO_TEXT_FOR_MAP_SEARCH ", False)
+        geocoder_status = ""
+
+        try:
+            geocode_cache = GeocodeCache.objects.filter(normalized_address=normalized_address).first()
+        except Exception as e:
+            status += "GEOCODE_CACHE_RETRIEVE_FAILED " + str(e) + " "
+        if geocode_cache is not None and use_cache and not geocode_cache.is_stale():
+            status += "GEOCODE_CACHE_HIT "
+            return self.geocode_cache_results(geocode_cache, True, status, False)
+
+        geocode_results = self.geocode_with_google(text_for_map_search)
+        geocoder_status = geocode_results['status']
+        status += geocoder_status
+        if not geocode_results['success']:
+            # We don't remember failures to reach Google, only addresses Google couldn't find
+            if geocode_cache is not None:
+                status += "GEOCODE_CACHE_STALE_ENTRY_USED "
+                return self.geocode_cache_results(geocode_cache, True, status, False, geocoder_status)
+            return self.geocode_cache_results(None, False, status, geocode_results['geocoder_quota_exceeded'],
+                                              geocoder_status)
+
+        location = geocode_results['location']
+        if geocode_cache is None:
+            geocode_cache = GeocodeCache(normalized_address=normalized_address)
+        geocode_cache.text_for_map_search = text_for_map_search[:255]
+        geocode_cache.date_geocoded = now()
+        if location is None:
+            geocode_cache.location_found = False
+            geocode_cache.formatted_address = None
+            geocode_cache.latitude = None
+            geocode_cache.longitude = None
+            geocode_cache.confidence = None
+            geocode_cache.partial_match = False
+            geocode_cache.state_code = None
+            geocode_cache.zip_code = None
+        else:
+            raw = getattr(location, 'raw', None)
+            raw = raw if isinstance(raw, dict) else {}
+            geocode_cache.location_found = True
+            geocode_cache.formatted_address = location.address[:255] if location.address else None
+            geocode_cache.latitude = location.latitude
+            geocode_cache.longitude = location.longitude
+            geocode_cache.confidence = raw.get('geometry', {}).get('location_type')
+            geocode_cache.partial_match = positive_value_exists(raw.get('partial_match'))
+            geocode_cache.state_code = None
+            geocode_cache.zip_code = None
+            for one_address_component in raw.get('address_components', []):
+                if 'administrative_area_level_1' in one_address_component.get('types', []):
+                    geocode_cache.state_code = (one_address_component.get('short_name') or '')[:2] or None
+                if 'postal_code' in one_address_component.get('types', []):
+                    geocode_cache.zip_code = (one_address_component.get('long_name') or '')[:10] or None
+        try:
+            geocode_cache.save()
+            status += "GEOCODE_CACHE_SAVED "
+        except Exception as e:
+            # Another request may have saved the same address first. The answer is still good.
+            handle_exception(e, logger=logger)
+            status += "GEOCODE_CACHE_NOT_SAVED "
+        return self.geocode_cache_results(geocode_cache, True, status, False, geocoder_status)
 
-# Create your models here.
+    def geocode_cache_results(self, geocode_cache, success, status, geocoder_quota_exceeded, geocoder_status=""):
+        location_found = geocode_cache is not None and geocode_cache.location_found
+        return {
+            'success':                  success,
+            'status':                   status,
+            'geocoder_status':          geocoder_status,  # Only what Google told us, if we asked
+            'geocoder_quota_exceeded':  geocoder_quota_exceeded,
+            'location_found':           location_found,
+            'formatted_address':        geocode_cache.formatted_address if location_found else "",
+            'latitude':                 geocode_cache.latitude if location_found else None,
+            'longitude':                geocode_cache.longitude if location_found else None,
+            'confidence':               geocode_cache.confidence if location_found else "",
+            'state_code':               geocode_cache.state_code or "" if location_found else "",
+            'zip_code':                 geocode_cache.zip_code or "" if location_found else "",
+        }
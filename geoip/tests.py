@@ -1,3 +1,20 @@
-from django.test import TestCase
+# geoip/tests.py
+# Brought to you by We Vote. Be good.
+# -*- coding: UTF-8 -*-
 
-# Create your tests here.
+from django.test import SimpleTestCase
+from .models import normalize_address_for_geocode_cache
+
+
+class GeocodeCacheTests(SimpleTestCase):
+
+    def test_normalize_address_for_geocode_cache(self):
+        self.assertEqual(normalize_address_for_geocode_cache("123 Main St., Oakland, California 94612-1234, USA"),
+                         "123 main st oakland ca 94612")
+        self.assertEqual(normalize_address_for_geocode_cache("  123 MAIN ST  Oakland CA 94612 "),
+                         "123 main st oakland ca 94612")
+        # A street named after a state is not a state
+        self.assertEqual(normalize_address_for_geocode_cache("500 Washington St, San Francisco, CA"),
+                         "500 washington st san francisco ca")
+        self.assertEqual(normalize_address_for_geocode_cache("Charleston, West Virginia"), "charleston wv")
+        self.assertEqual(normalize_address_for_geocode_cache(""), "")
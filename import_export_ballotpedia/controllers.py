@@ -10,7 +10,7 @@ from config.base import get_environment_variable
 from electoral_district.models import ElectoralDistrict, ElectoralDistrictManager
 from election.models import BallotpediaElection, ElectionManager
 from exception.models import handle_exception
-from geopy.geocoders import get_geocoder_for_service
+from geoip.models import GeocodeCacheManager
 from import_export_batches.controllers_ballotpedia import store_ballotpedia_json_response_to_import_batch_system
 import json
 from measure.models import ContestMeasureList, ContestMeasureManager
@@ -34,8 +34,6 @@ BALLOTPEDIA_API_ELECTIONS_TYPE = "elections"
 BALLOTPEDIA_API_FILES_TYPE = "files"
 BALLOTPEDIA_API_MEASURES_TYPE = "measures"
 BALLOTPEDIA_API_RACES_TYPE = "races"
-GEOCODE_TIMEOUT = 10
-GOOGLE_MAPS_API_KEY = get_environment_variable("GOOGLE_MAPS_API_KEY")
 
 logger = wevote_functions.admin.get_logger(__name__)
 
@@ -541,7 +539,18 @@ def retrieve_ballotpedia_candidates_by_district_from_api(google_civic_election_i
 
 def retrieve_ballot_items_from_polling_location(
         google_civic_election_id, polling_location_we_vote_id="", polling_location=None, batch_set_id=0,
-        state_code=""):
+        state_code="", district_contest_cache=None):
+    """
+    Retrieve the districts that contain this polling location from Ballotpedia, and save its ballot items to the
+    import batch system
+    :param google_civic_election_id:
+    :param polling_location_we_vote_id:
+    :param polling_location:
+    :param batch_set_id:
+    :param state_code:
+    :param district_contest_cache: See process_ballotpedia_voter_districts
+    :return:
+    """
     success = True
     status = ""
     polling_location_found = False
@@ -608,7 +617,8 @@ def retrieve_ballot_items_from_polling_location(
             # This function makes sure there are candidates attached to an office before including the office
             #  on the ballot.
             ballot_items_results = process_ballotpedia_voter_districts(google_civic_election_id, state_code,
-                                                                       modified_json_list, polling_location_we_vote_id)
+                                                                       modified_json_list, polling_location_we_vote_id,
+                                                                       district_contest_cache)
 
             if ballot_items_results['ballot_items_found']:
                 ballot_item_dict_list = ballot_items_results['ballot_item_dict_list']
@@ -1435,7 +1445,17 @@ def groom_ballotpedia_data_for_processing(structured_json, google_civic_election
 
 
 def process_ballotpedia_voter_districts(google_civic_election_id, state_code, modified_district_json_list,
-                                        polling_location_we_vote_id):
+                                        polling_location_we_vote_id, district_contest_cache=None):
+    """
+    The offices (with candidates) and measures in these Ballotpedia districts, as ballot item dicts
+    :param google_civic_election_id:
+    :param state_code:
+    :param modified_district_json_list:
+    :param polling_location_we_vote_id:
+    :param district_contest_cache: Pass the same dict in when processing many polling locations in one election, so
+      the offices and measures in each district are only retrieved once
+    :return:
+    """
     success = True
     status = ""
     ballot_items_found = False
@@ -1451,50 +1471,58 @@ def process_ballotpedia_voter_districts(google_civic_election_id, state_code, mo
                 and positive_value_exists(one_district['ballotpedia_district_id']):
             if not positive_value_exists(state_code):
                 state_code = one_district['state_code']
-            # Look for any offices in this election with this ballotpedia_district_id
-            results = contest_office_list_manager.retrieve_offices(
-                google_civic_election_id, state_code, [], return_list_of_objects, one_district['ballotpedia_district_id'])
-
-            if results['office_list_found']:
-                office_list_objects = results['office_list_objects']
-
-                # Remove any offices from this list that don't have candidates
+            district_key = (state_code, one_district['ballotpedia_district_id'])
+            if district_contest_cache is not None and district_key in district_contest_cache:
+                modified_office_list_objects, measure_list_objects = district_contest_cache[district_key]
+            else:
+                # Look for any offices in this election with this ballotpedia_district_id
                 modified_office_list_objects = []
-                for one_office in office_list_objects:
-                    results = candidate_campaign_list.retrieve_candidate_count_for_office(one_office.id, "")
-                    if positive_value_exists(results['candidate_count']):
-                        modified_office_list_objects.append(one_office)
-
-                for one_office in modified_office_list_objects:
-                    generated_ballot_order += 1
-                    ballot_item_dict = {
-                        'contest_office_we_vote_id': one_office.we_vote_id,
-                        'contest_office_id': one_office.id,
-                        'contest_office_name': one_office.office_name,
-                        'election_day_text': one_district['election_day_text'],
-                        'local_ballot_order': generated_ballot_order,
-                        'polling_location_we_vote_id': polling_location_we_vote_id,
-                        'state_code': state_code,
-                    }
-                    ballot_item_dict_list.append(ballot_item_dict)
-
-            # Look for any measures in this election with this ballotpedia_district_id
-            results = measure_list_manager.retrieve_measures(
-                google_civic_election_id, one_district['ballotpedia_district_id'], state_code=state_code)
-            if results['measure_list_found']:
-                measure_list_objects = results['measure_list_objects']
-                for one_measure in measure_list_objects:
-                    generated_ballot_order += 1
-                    ballot_item_dict = {
-                        'contest_measure_we_vote_id': one_measure.we_vote_id,
-                        'contest_measure_id': one_measure.id,
-                        'contest_measure_name': one_measure.measure_title,
-                        'election_day_text': one_district['election_day_text'],
-                        'local_ballot_order': generated_ballot_order,
-                        'polling_location_we_vote_id': polling_location_we_vote_id,
-                        'state_code': state_code,
-                    }
-                    ballot_item_dict_list.append(ballot_item_dict)
+                results = contest_office_list_manager.retrieve_offices(
+                    google_civic_election_id, state_code, [], return_list_of_objects,
+                    one_district['ballotpedia_district_id'])
+                if results['office_list_found']:
+                    office_list_objects = results['office_list_objects']
+
+                    # Remove any offices from this list that don't have candidates
+                    for one_office in office_list_objects:
+                        results = candidate_campaign_list.retrieve_candidate_count_for_office(one_office.id, "")
+                        if positive_value_exists(results['candidate_count']):
+                            modified_office_list_objects.append(one_office)
+
+                # Look for any measures in this election with this ballotpedia_district_id
+                measure_list_objects = []
+                results = measure_list_manager.retrieve_measures(
+                    google_civic_election_id, one_district['ballotpedia_district_id'], state_code=state_code)
+                if results['measure_list_found']:
+                    measure_list_objects = results['measure_list_objects']
+                if district_contest_cache is not None:
+                    district_contest_cache[district_key] = (modified_office_list_objects, measure_list_objects)
+
+            for one_office in modified_office_list_objects:
+                generated_ballot_order += 1
+                ballot_item_dict = {
+                    'contest_office_we_vote_id': one_office.we_vote_id,
+                    'contest_office_id': one_office.id,
+                    'contest_office_name': one_office.office_name,
+                    'election_day_text': one_district['election_day_text'],
+                    'local_ballot_order': generated_ballot_order,
+                    'polling_location_we_vote_id': polling_location_we_vote_id,
+                    'state_code': state_code,
+                }
+                ballot_item_dict_list.append(ballot_item_dict)
+
+            for one_measure in measure_list_objects:
+                generated_ballot_order += 1
+                ballot_item_dict = {
+                    'contest_measure_we_vote_id': one_measure.we_vote_id,
+                    'contest_measure_id': one_measure.id,
+                    'contest_measure_name': one_measure.measure_title,
+                    'election_day_text': one_district['election_day_text'],
+                    'local_ballot_order': generated_ballot_order,
+                    'polling_location_we_vote_id': polling_location_we_vote_id,
+                    'state_code': state_code,
+                }
+                ballot_item_dict_list.append(ballot_item_dict)
 
     if positive_value_exists(generated_ballot_order):
         ballot_items_found = True
@@ -1657,27 +1685,22 @@ def voter_ballot_items_retrieve_from_ballotpedia_for_api(voter_device_id, text_f
 
     try:
         # Make sure we have a latitude and longitude
-        google_client = get_geocoder_for_service('google')(GOOGLE_MAPS_API_KEY)
-        location = google_client.geocode(text_for_map_search, sensor=False, timeout=GEOCODE_TIMEOUT)
-        if location is None:
+        geocode_cache_manager = GeocodeCacheManager()
+        geocode_results = geocode_cache_manager.retrieve_geocoded_address(text_for_map_search)
+        if not geocode_results['location_found']:
             status += 'RETRIEVE_FROM_BALLOTPEDIA-Could not find location matching "{}"'.format(text_for_map_search)
             success = False
         else:
-            latitude = location.latitude
-            longitude = location.longitude
+            latitude = geocode_results['latitude']
+            longitude = geocode_results['longitude']
             lat_long_found = True
             # Now retrieve the ZIP code
             if not positive_value_exists(original_text_zip) or not positive_value_exists(original_text_state):
-                if hasattr(location, 'raw'):
-                    if 'address_components' in location.raw:
-                        for one_address_component in location.raw['address_components']:
-                            if 'postal_code' in one_address_component['types'] \
-                                    and positive_value_exists(one_address_component['long_name']):
-                                original_text_zip = one_address_component['long_name']
-                            if not positive_value_exists(original_text_state):
-                                if 'administrative_area_level_1' in one_address_component['types'] \
-                                        and positive_value_exists(one_address_component['short_name']):
-                                    original_text_state = one_address_component['short_name']
+                if positive_value_exists(geocode_results['zip_code']):
+                    original_text_zip = geocode_results['zip_code']
+                if not positive_value_exists(original_text_state) and \
+                        positive_value_exists(geocode_results['state_code']):
+                    original_text_state = geocode_results['state_code']
 
     except Exception as e:
         status += "RETRIEVE_FROM_BALLOTPEDIA-EXCEPTION with get_geocoder_for_service "
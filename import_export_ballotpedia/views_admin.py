@@ -681,10 +681,13 @@ def retrieve_ballotpedia_data_for_polling_locations_view(request, election_local
 
         # If here, we assume we have already retrieved races for this election, and now we want to
         # put ballot items for this location onto a ballot
+        # Polling locations share most of their districts, so each district's offices and measures are only
+        # retrieved once
+        district_contest_cache = {}
         for polling_location in polling_location_list:
             one_ballot_results = retrieve_ballot_items_from_polling_location(
                 google_civic_election_id, polling_location=polling_location, batch_set_id=batch_set_id,
-                state_code=state_code)
+                state_code=state_code, district_contest_cache=district_contest_cache)
             success = False
             if one_ballot_results['success']:
                 success = True
@@ -34,7 +34,7 @@ REPRESENTATIVES_BY_ADDRESS_URL = get_environment_variable("REPRESENTATIVES_BY_AD
 # https://developers.google.com/resources/api-libraries/documentation/civicinfo/v2/python/latest/civicinfo_v2.representatives.html
 def process_candidates_from_structured_json(
         candidates_structured_json, google_civic_election_id, ocd_division_id, state_code, contest_office_id,
-        contest_office_we_vote_id):
+        contest_office_we_vote_id, bulk_ballot_storage=None):
     """
     "candidates": [
         {
@@ -54,6 +54,15 @@ def process_candidates_from_structured_json(
            "type": "Twitter",
            "id": "https://twitter.com/johndennis2012"
     """
+    if bulk_ballot_storage is not None:
+        # Skip the candidates already saved from another ballot in this import
+        candidates_structured_json = [
+            one_candidate for one_candidate in candidates_structured_json
+            if not bulk_ballot_storage.candidate_already_stored(
+                contest_office_we_vote_id, one_candidate['name'] if 'name' in one_candidate else '')]
+        if not len(candidates_structured_json):
+            return {}
+
     contest_office_name = ""
     if positive_value_exists(contest_office_we_vote_id):
         contest_office_manager = ContestOfficeManager()
@@ -165,13 +174,16 @@ def process_candidates_from_structured_json(
                 we_vote_id, google_civic_election_id,
                 ocd_division_id, contest_office_id, contest_office_we_vote_id,
                 google_civic_candidate_name, updated_candidate_campaign_values)
+            if bulk_ballot_storage is not None and results['success']:
+                bulk_ballot_storage.remember_candidate_stored(
+                    contest_office_we_vote_id, one_candidate['name'] if 'name' in one_candidate else '')
 
     return results
 
 
 def process_contest_office_from_structured_json(
         one_contest_office_structured_json, google_civic_election_id, state_code, ocd_division_id, local_ballot_order,
-        voter_id, polling_location_we_vote_id):
+        voter_id, polling_location_we_vote_id, bulk_ballot_storage=None):
 
     # Protect against the case where this is NOT an office
     if 'candidates' not in one_contest_office_structured_json:
@@ -286,8 +298,16 @@ def process_contest_office_from_structured_json(
 
     we_vote_id = ''
     maplight_id = 0
+    # The same office is on many polling location ballots, so in a bulk import it is only saved once
+    office_key = (str(google_civic_election_id), (state_code or '').lower(), district_id, district_name,
+                  office_name.lower())
+    stored_contest_office_results = None
+    if bulk_ballot_storage is not None:
+        stored_contest_office_results = bulk_ballot_storage.fetch_contest_office_results(office_key)
     # Note that all of the information saved here is independent of a particular voter
-    if google_civic_election_id and (district_id or district_name) and office_name:
+    if stored_contest_office_results is not None:
+        update_or_create_contest_office_results = stored_contest_office_results
+    elif google_civic_election_id and (district_id or district_name) and office_name:
         updated_contest_office_values = {
             'google_civic_election_id': google_civic_election_id,
         }
@@ -340,6 +360,8 @@ def process_contest_office_from_structured_json(
         update_or_create_contest_office_results = contest_office_manager.update_or_create_contest_office(
             we_vote_id, maplight_id, google_civic_election_id, office_name, district_id,
             updated_contest_office_values)
+        if bulk_ballot_storage is not None:
+            bulk_ballot_storage.remember_contest_office_results(office_key, update_or_create_contest_office_results)
     else:
         update_or_create_contest_office_results = {
             'success': False,
@@ -376,16 +398,23 @@ def process_contest_office_from_structured_json(
     #  for nearby voters (when we don't have their full address)
     if positive_value_exists(polling_location_we_vote_id) and positive_value_exists(google_civic_election_id) \
             and positive_value_exists(contest_office_id):
-        ballot_item_manager = BallotItemManager()
         measure_subtitle = ""
         measure_text = ""
         contest_measure_id = 0
         contest_measure_we_vote_id = ""
-        ballot_item_manager.update_or_create_ballot_item_for_polling_location(
-            polling_location_we_vote_id, google_civic_election_id, google_ballot_placement,
-            ballot_item_display_name, measure_subtitle, measure_text, local_ballot_order,
-            contest_office_id, contest_office_we_vote_id,
-            contest_measure_id, contest_measure_we_vote_id, state_code)
+        if bulk_ballot_storage is not None:
+            bulk_ballot_storage.add_polling_location_ballot_item(
+                polling_location_we_vote_id, google_ballot_placement,
+                ballot_item_display_name, measure_subtitle, measure_text, local_ballot_order,
+                contest_office_id, contest_office_we_vote_id,
+                contest_measure_id, contest_measure_we_vote_id, state_code)
+        else:
+            ballot_item_manager = BallotItemManager()
+            ballot_item_manager.update_or_create_ballot_item_for_polling_location(
+                polling_location_we_vote_id, google_civic_election_id, google_ballot_placement,
+                ballot_item_display_name, measure_subtitle, measure_text, local_ballot_order,
+                contest_office_id, contest_office_we_vote_id,
+                contest_measure_id, contest_measure_we_vote_id, state_code)
 
     # Note: We do not need to connect the candidates with the voter here for a ballot item  # TODO DALE Actually we do
     # For VT, They don't have a district id, so all candidates were lumped together.
@@ -395,7 +424,7 @@ def process_contest_office_from_structured_json(
     # Perhaps have a special case for "district" -> "scope": "stateUpper"/"stateLower" vs. "scope": "statewide"
     candidates_results = process_candidates_from_structured_json(
         candidates_structured_json, google_civic_election_id, ocd_division_id, state_code, contest_office_id,
-        contest_office_we_vote_id)
+        contest_office_we_vote_id, bulk_ballot_storage)
 
     return update_or_create_contest_office_results
 
@@ -445,9 +474,10 @@ def process_contest_common_fields_from_structured_json(one_contest_structured_js
 
 def process_contests_from_structured_json(
         contests_structured_json, google_civic_election_id, ocd_division_id, state_code, voter_id,
-        polling_location_we_vote_id):
+        polling_location_we_vote_id, bulk_ballot_storage=None):
     """
-    Take in the portion of the json related to contests, and save to the database
+    Take in the portion of the json related to contests, and save to the database. When a BulkBallotStorage is
+    passed in, the polling location's ballot items are saved later, by bulk_ballot_storage.save_ballot_items.
     "type": 'General', "House of Delegates", 'locality', 'Primary', 'Run-off', "State Senate", "Municipal"
     or
     "type": "Referendum",
@@ -464,7 +494,7 @@ def process_contests_from_structured_json(
         if contest_type.lower() == 'referendum' or 'referendumTitle' in one_contest:  # Referendum
             process_contest_results = process_contest_referendum_from_structured_json(
                 one_contest, google_civic_election_id, state_code, ocd_division_id, local_ballot_order, voter_id,
-                polling_location_we_vote_id)
+                polling_location_we_vote_id, bulk_ballot_storage)
             if process_contest_results['saved']:
                 contests_saved += 1
             elif process_contest_results['updated']:
@@ -475,7 +505,7 @@ def process_contests_from_structured_json(
         else:
             process_contest_results = process_contest_office_from_structured_json(
                 one_contest, google_civic_election_id, state_code, ocd_division_id, local_ballot_order, voter_id,
-                polling_location_we_vote_id)
+                polling_location_we_vote_id, bulk_ballot_storage)
             if process_contest_results['saved']:
                 contests_saved += 1
             elif process_contest_results['updated']:
@@ -874,11 +904,13 @@ def retrieve_one_ballot_from_google_civic_api(text_for_map_search, incoming_goog
 
 # See import_data/voterInfoQuery_VA_sample.json
 def store_one_ballot_from_google_civic_api(one_ballot_json, voter_id=0, polling_location_we_vote_id='',
-                                           ballot_returned=None):
+                                           ballot_returned=None, bulk_ballot_storage=None):
     """
     When we pass in a voter_id, we want to save this ballot related to the voter.
     When we pass in polling_location_we_vote_id, we want to save a ballot for that area, which is useful for
     getting new voters started by showing them a ballot roughly near them.
+    When we pass in a BulkBallotStorage (while importing the ballots for many polling locations), the ballot items
+    aren't saved until bulk_ballot_storage.save_ballot_items is called.
     """
     #     "election": {
     #     "electionDay": "2015-11-03",
@@ -951,7 +983,7 @@ def store_one_ballot_from_google_civic_api(one_ballot_json, voter_id=0, polling_
     if 'contests' in one_ballot_json:
         results = process_contests_from_structured_json(one_ballot_json['contests'], google_civic_election_id,
                                                         ocd_division_id, state_code, voter_id,
-                                                        polling_location_we_vote_id)
+                                                        polling_location_we_vote_id, bulk_ballot_storage)
 
         status = results['status']
         success = results['success']
@@ -1534,7 +1566,7 @@ def voter_ballot_items_retrieve_from_google_civic_for_api(
 
 def process_contest_referendum_from_structured_json(
         one_contest_referendum_structured_json, google_civic_election_id, state_code,
-        ocd_division_id, local_ballot_order, voter_id, polling_location_we_vote_id):
+        ocd_division_id, local_ballot_order, voter_id, polling_location_we_vote_id, bulk_ballot_storage=None):
     """
     "referendumTitle": "Proposition 45",
     "referendumSubtitle": "Healthcare Insurance. Rate Changes. Initiative Statute.",
@@ -1566,7 +1598,15 @@ def process_contest_referendum_from_structured_json(
 
     # Note that all of the information saved here is independent of a particular voter
     we_vote_id = ''
-    if google_civic_election_id and (district_id or district_name) and referendum_title:
+    # The same measure is on many polling location ballots, so in a bulk import it is only saved once
+    measure_key = (str(google_civic_election_id), (state_code or '').lower(), district_id, district_name,
+                   referendum_title.lower())
+    stored_contest_measure_results = None
+    if bulk_ballot_storage is not None:
+        stored_contest_measure_results = bulk_ballot_storage.fetch_contest_measure_results(measure_key)
+    if stored_contest_measure_results is not None:
+        update_or_create_contest_measure_results = stored_contest_measure_results
+    elif google_civic_election_id and (district_id or district_name) and referendum_title:
         # We want to only add values, and never clear out existing values that may have been
         # entered independently
         updated_contest_measure_values = {
@@ -1606,6 +1646,8 @@ def process_contest_referendum_from_structured_json(
         update_or_create_contest_measure_results = contest_measure_manager.update_or_create_contest_measure(
             we_vote_id, google_civic_election_id, referendum_title, district_id, district_name, state_code,
             updated_contest_measure_values)
+        if bulk_ballot_storage is not None:
+            bulk_ballot_storage.remember_contest_measure_results(measure_key, update_or_create_contest_measure_results)
     else:
         update_or_create_contest_measure_results = {
             'success': False,
@@ -1638,11 +1680,18 @@ def process_contest_referendum_from_structured_json(
                 and positive_value_exists(contest_measure_id):
             contest_office_id = 0
             contest_office_we_vote_id = ''
-            ballot_item_manager.update_or_create_ballot_item_for_polling_location(
-                polling_location_we_vote_id, google_civic_election_id, google_ballot_placement,
-                ballot_item_display_name, measure_subtitle, measure_text, local_ballot_order,
-                contest_office_id, contest_office_we_vote_id,
-                contest_measure_id, contest_measure_we_vote_id, state_code)
+            if bulk_ballot_storage is not None:
+                bulk_ballot_storage.add_polling_location_ballot_item(
+                    polling_location_we_vote_id, google_ballot_placement,
+                    ballot_item_display_name, measure_subtitle, measure_text, local_ballot_order,
+                    contest_office_id, contest_office_we_vote_id,
+                    contest_measure_id, contest_measure_we_vote_id, state_code)
+            else:
+                ballot_item_manager.update_or_create_ballot_item_for_polling_location(
+                    polling_location_we_vote_id, google_civic_election_id, google_ballot_placement,
+                    ballot_item_display_name, measure_subtitle, measure_text, local_ballot_order,
+                    contest_office_id, contest_office_we_vote_id,
+                    contest_measure_id, contest_measure_we_vote_id, state_code)
 
     return update_or_create_contest_measure_results
 
@@ -3,8 +3,9 @@
 # -*- coding: UTF-8 -*-
 
 from config.base import get_environment_variable
-from django.db import models
-from django.db.models import Q
+from django.db import models, transaction
+from django.db.models import Count, Q
+from django.utils import timezone
 from exception.models import handle_record_found_more_than_one_exception
 from geopy.geocoders import get_geocoder_for_service
 from geopy.exc import GeocoderQuotaExceeded
@@ -15,6 +16,28 @@ from wevote_settings.models import fetch_next_we_vote_id_polling_location_intege
 GEOCODE_TIMEOUT = 10
 GOOGLE_MAPS_API_KEY = get_environment_variable("GOOGLE_MAPS_API_KEY")
 
+# What a PollingLocationRetrieveJob retrieves for each polling location
+RETRIEVE_GOOGLE_CIVIC_BALLOTS = 'GOOGLE_CIVIC_BALLOTS'
+RETRIEVE_BALLOTPEDIA_BALLOT_ITEMS = 'BALLOTPEDIA_BALLOT_ITEMS'
+RETRIEVE_BALLOTPEDIA_DISTRICTS = 'BALLOTPEDIA_DISTRICTS'
+KIND_OF_RETRIEVE_CHOICES = (
+    (RETRIEVE_GOOGLE_CIVIC_BALLOTS, 'Ballots from Google Civic'),
+    (RETRIEVE_BALLOTPEDIA_BALLOT_ITEMS, 'Ballot items from Ballotpedia'),
+    (RETRIEVE_BALLOTPEDIA_DISTRICTS, 'Districts from Ballotpedia'),
+)
+
+# The retrieve_status of each PollingLocationRetrieveJobEntry
+RETRIEVE_PENDING = 'PENDING'
+RETRIEVE_IN_PROGRESS = 'IN_PROGRESS'
+RETRIEVE_DONE = 'DONE'
+RETRIEVE_FAILED = 'FAILED'
+RETRIEVE_STATUS_CHOICES = (
+    (RETRIEVE_PENDING, 'Pending'),
+    (RETRIEVE_IN_PROGRESS, 'In progress'),
+    (RETRIEVE_DONE, 'Done'),
+    (RETRIEVE_FAILED, 'Failed'),
+)
+
 logger = wevote_functions.admin.get_logger(__name__)
 
 
@@ -505,3 +528,158 @@ class PollingLocationListManager(models.Model):
         }
         return results
 
+
+class PollingLocationRetrieveJob(models.Model):
+    """
+    Retrieving data from an outside provider (like ballots from Google Civic) for every polling location in one state
+    for one election, in the background. Each polling location has a PollingLocationRetrieveJobEntry, so a job that
+    stops part way through can be resumed.
+    """
+    kind_of_retrieve = models.CharField(max_length=32, choices=KIND_OF_RETRIEVE_CHOICES, null=False)
+    google_civic_election_id = models.PositiveIntegerField(default=0, null=False, db_index=True)
+    state_code = models.CharField(max_length=2, null=True, blank=True)
+    # For RETRIEVE_BALLOTPEDIA_BALLOT_ITEMS, the BatchSet the ballot items are saved to
+    batch_set_id = models.PositiveIntegerField(default=0, null=False)
+    voter_we_vote_id = models.CharField(max_length=255, null=True, blank=True)
+    date_created = models.DateTimeField(null=True, auto_now_add=True)
+    date_started = models.DateTimeField(null=True)
+    # Updated while a worker is running the job. A job that hasn't been updated in a while is no longer running.
+    date_last_running = models.DateTimeField(null=True)
+    date_completed = models.DateTimeField(null=True)
+    polling_location_count = models.PositiveIntegerField(default=0, null=False)
+
+    def is_running(self, seconds_until_stale):
+        if not self.date_last_running or self.date_completed:
+            return False
+        return (timezone.now() - self.date_last_running).total_seconds() < seconds_until_stale
+
+
+class PollingLocationRetrieveJobEntry(models.Model):
+    """
+    Where one polling location is in a PollingLocationRetrieveJob
+    """
+    job_id = models.PositiveIntegerField(null=False, db_index=True)
+    polling_location_we_vote_id = models.CharField(max_length=255, null=False)
+    retrieve_status = models.CharField(
+        max_length=16, choices=RETRIEVE_STATUS_CHOICES, default=RETRIEVE_PENDING, null=False, db_index=True)
+    # Set when a worker takes this entry, so two workers never retrieve the same polling location
+    claim_token = models.CharField(max_length=32, null=True, blank=True)
+    status = models.TextField(null=True, blank=True)
+    date_finished = models.DateTimeField(null=True)
+
+    class Meta:
+        unique_together = ('job_id', 'polling_location_we_vote_id')
+
+
+class PollingLocationRetrieveJobManager(models.Model):
+
+    def create_polling_location_retrieve_job(self, kind_of_retrieve, google_civic_election_id, state_code,
+                                             polling_location_we_vote_id_list, batch_set_id=0,
+                                             voter_we_vote_id=''):
+        status = ""
+        job = None
+        try:
+            job = PollingLocationRetrieveJob.objects.create(
+                kind_of_retrieve=kind_of_retrieve,
+                google_civic_election_id=google_civic_election_id,
+                state_code=state_code.lower() if positive_value_exists(state_code) else state_code,
+                batch_set_id=batch_set_id,
+                voter_we_vote_id=voter_we_vote_id,
+                polling_location_count=len(polling_location_we_vote_id_list))
+            PollingLocationRetrieveJobEntry.objects.bulk_create(
+                [PollingLocationRetrieveJobEntry(job_id=job.id, polling_location_we_vote_id=polling_location_we_vote_id)
+                 for polling_location_we_vote_id in polling_location_we_vote_id_list], batch_size=1000)
+            success = True
+            status += "POLLING_LOCATION_RETRIEVE_JOB_CREATED "
+        except Exception as e:
+            success = False
+            status += 'FAILED_TO_CREATE_POLLING_LOCATION_RETRIEVE_JOB ' \
+                      '{error} [type: {error_type}] '.format(error=e, error_type=type(e))
+
+        results = {
+            'success':      success,
+            'status':       status,
+            'job_found':    success,
+            'job':          job,
+        }
+        return results
+
+    def retrieve_polling_location_retrieve_job(self, job_id):
+        try:
+            job = PollingLocationRetrieveJob.objects.get(id=job_id)
+            job_found = True
+            status = "POLLING_LOCATION_RETRIEVE_JOB_FOUND "
+        except PollingLocationRetrieveJob.DoesNotExist:
+            job = None
+            job_found = False
+            status = "POLLING_LOCATION_RETRIEVE_JOB_NOT_FOUND "
+
+        results = {
+            'success':      True,
+            'status':       status,
+            'job_found':    job_found,
+            'job':          job,
+        }
+        return results
+
+    def claim_polling_location_retrieve_job_entries(self, job_id, claim_token, number_to_claim):
+        """
+        Take up to number_to_claim pending polling locations for one worker. The pending entries are locked while they
+        are taken, and entries another worker has locked are skipped, so workers claiming at the same time each get
+        different polling locations instead of waiting for (or losing) the same ones.
+        :param job_id:
+        :param claim_token: Unique to this worker
+        :param number_to_claim:
+        :return: The polling_location_we_vote_ids this worker now has
+        """
+        with transaction.atomic():
+            pending_entry_list = list(PollingLocationRetrieveJobEntry.objects.select_for_update(skip_locked=True)
+                                      .filter(job_id=job_id, retrieve_status=RETRIEVE_PENDING).order_by('id')
+                                      .values_list('id', 'polling_location_we_vote_id')[:number_to_claim])
+            if not pending_entry_list:
+                return []
+            PollingLocationRetrieveJobEntry.objects.filter(
+                id__in=[entry_id for entry_id, polling_location_we_vote_id in pending_entry_list]).update(
+                retrieve_status=RETRIEVE_IN_PROGRESS, claim_token=claim_token)
+        return [polling_location_we_vote_id for entry_id, polling_location_we_vote_id in pending_entry_list]
+
+    def pending_polling_location_retrieve_job_entries_exist(self, job_id):
+        return PollingLocationRetrieveJobEntry.objects.filter(job_id=job_id, retrieve_status=RETRIEVE_PENDING).exists()
+
+    def finish_polling_location_retrieve_job_entries(self, job_id, status_by_polling_location_we_vote_id,
+                                                     retrieve_status):
+        """
+        Record that these polling locations are done (or failed), with the status of each one
+        """
+        now = timezone.now()
+        # Most polling locations finish with the same status, so they are saved together
+        polling_location_we_vote_id_list_by_status = {}
+        for polling_location_we_vote_id, status in status_by_polling_location_we_vote_id.items():
+            polling_location_we_vote_id_list_by_status.setdefault(status, []).append(polling_location_we_vote_id)
+        for status, polling_location_we_vote_id_list in polling_location_we_vote_id_list_by_status.items():
+            PollingLocationRetrieveJobEntry.objects.filter(
+                job_id=job_id, polling_location_we_vote_id__in=polling_location_we_vote_id_list).update(
+                retrieve_status=retrieve_status, status=status, date_finished=now)
+
+    def reset_polling_location_retrieve_job_entries(self, job_id, retry_failed=False):
+        """
+        Before resuming a job: the polling locations a stopped worker had taken (and optionally the ones that failed)
+        are pending again
+        """
+        retrieve_status_list = [RETRIEVE_IN_PROGRESS, RETRIEVE_FAILED] if retry_failed else [RETRIEVE_IN_PROGRESS]
+        return PollingLocationRetrieveJobEntry.objects.filter(
+            job_id=job_id, retrieve_status__in=retrieve_status_list).update(
+            retrieve_status=RETRIEVE_PENDING, claim_token=None)
+
+    def retrieve_polling_location_retrieve_job_progress(self, job_id):
+        count_by_retrieve_status = {
+            RETRIEVE_PENDING:       0,
+            RETRIEVE_IN_PROGRESS:   0,
+            RETRIEVE_DONE:          0,
+            RETRIEVE_FAILED:        0,
+        }
+        status_count_list = PollingLocationRetrieveJobEntry.objects.filter(job_id=job_id).values(
+            'retrieve_status').annotate(entry_count=Count('id'))
+        for status_count in status_count_list:
+            count_by_retrieve_status[status_count['retrieve_status']] = status_count['entry_count']
+        return count_by_retrieve_status
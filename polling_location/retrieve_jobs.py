@@ -0,0 +1,380 @@
+# polling_location/retrieve_jobs.py
+# Brought to you by We Vote. Be good.
+# -*- coding: UTF-8 -*-
+
+from .models import PollingLocation, PollingLocationRetrieveJob, PollingLocationRetrieveJobManager, \
+    RETRIEVE_BALLOTPEDIA_BALLOT_ITEMS, RETRIEVE_BALLOTPEDIA_DISTRICTS, RETRIEVE_DONE, RETRIEVE_FAILED, \
+    RETRIEVE_GOOGLE_CIVIC_BALLOTS, RETRIEVE_IN_PROGRESS, RETRIEVE_PENDING
+from ballot.bulk_ballot_storage import BulkBallotStorage
+from ballot.controllers import save_bulk_ballot_items_and_refresh_voter_ballots
+from concurrent.futures import ThreadPoolExecutor
+from config.base import get_environment_variable, get_environment_variable_default
+from datetime import date
+from django.db import connection
+from django.db.models import F, Q
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from import_export_ballotpedia.controllers import retrieve_ballot_items_from_polling_location, \
+    retrieve_ballotpedia_district_id_list_for_polling_location
+from import_export_batches.models import BatchSet, BATCH_SET_SOURCE_IMPORT_BALLOTPEDIA_BALLOT_ITEMS
+from import_export_google_civic.controllers import retrieve_one_ballot_from_google_civic_api, \
+    store_one_ballot_from_google_civic_api
+import threading
+import time
+import wevote_functions.admin
+from wevote_functions.functions import convert_to_int, generate_random_string, positive_value_exists
+
+logger = wevote_functions.admin.get_logger(__name__)
+
+BALLOTPEDIA_API_CONTAINS_URL = get_environment_variable("BALLOTPEDIA_API_CONTAINS_URL")
+
+# How many polling locations in one job are retrieved at the same time, at most (each provider also has a limit)
+POLLING_LOCATION_RETRIEVE_WORKERS = \
+    convert_to_int(get_environment_variable_default("POLLING_LOCATION_RETRIEVE_WORKERS", 8))
+# How many polling locations a worker takes at a time. Their ballot items are saved together (see BulkBallotStorage),
+# and their entries are marked done together.
+POLLING_LOCATION_RETRIEVE_SHARD_SIZE = \
+    convert_to_int(get_environment_variable_default("POLLING_LOCATION_RETRIEVE_SHARD_SIZE", 50))
+# How long a worker waits before trying again, when every pending polling location was being claimed by another worker
+POLLING_LOCATION_RETRIEVE_CLAIM_RETRY_SECONDS = 0.1
+# A job that hasn't finished a shard in this many seconds is no longer running, and can be resumed
+POLLING_LOCATION_RETRIEVE_STALE_SECONDS = \
+    convert_to_int(get_environment_variable_default("POLLING_LOCATION_RETRIEVE_STALE_SECONDS", 600))
+
+PROVIDER_GOOGLE_CIVIC = 'GOOGLE_CIVIC'
+PROVIDER_BALLOTPEDIA = 'BALLOTPEDIA'
+PROVIDER_BY_KIND_OF_RETRIEVE = {
+    RETRIEVE_GOOGLE_CIVIC_BALLOTS:      PROVIDER_GOOGLE_CIVIC,
+    RETRIEVE_BALLOTPEDIA_BALLOT_ITEMS:  PROVIDER_BALLOTPEDIA,
+    RETRIEVE_BALLOTPEDIA_DISTRICTS:     PROVIDER_BALLOTPEDIA,
+}
+
+
+class ProviderLimiter(object):
+    """
+    Shared by every job in this process that calls one provider: at most `concurrency` polling locations are retrieved
+    from the provider at the same time, and they are started at most `requests_per_second` per second.
+    """
+
+    def __init__(self, concurrency, requests_per_second):
+        self.concurrency = max(concurrency, 1)
+        self.semaphore = threading.BoundedSemaphore(self.concurrency)
+        self.seconds_between_requests = 1.0 / requests_per_second if requests_per_second > 0 else 0
+        self.lock = threading.Lock()
+        self.time_of_next_request = 0.0
+
+    def __enter__(self):
+        self.semaphore.acquire()
+        with self.lock:
+            now = time.monotonic()
+            seconds_to_wait = self.time_of_next_request - now
+            self.time_of_next_request = max(now, self.time_of_next_request) + self.seconds_between_requests
+        if seconds_to_wait > 0:
+            time.sleep(seconds_to_wait)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.semaphore.release()
+        return False
+
+
+provider_limiter_by_provider = {
+    PROVIDER_GOOGLE_CIVIC: ProviderLimiter(
+        convert_to_int(get_environment_variable_default("GOOGLE_CIVIC_RETRIEVE_CONCURRENCY", 4)),
+        convert_to_int(get_environment_variable_default("GOOGLE_CIVIC_RETRIEVE_REQUESTS_PER_SECOND", 5))),
+    PROVIDER_BALLOTPEDIA: ProviderLimiter(
+        convert_to_int(get_environment_variable_default("BALLOTPEDIA_RETRIEVE_CONCURRENCY", 2)),
+        convert_to_int(get_environment_variable_default("BALLOTPEDIA_RETRIEVE_REQUESTS_PER_SECOND", 2))),
+}
+
+
+def fetch_polling_location_we_vote_id_list_for_retrieve(kind_of_retrieve, state_code):
+    """
+    The polling locations in this state to retrieve from, chosen the same way the admin retrieve views choose them
+    :param kind_of_retrieve:
+    :param state_code:
+    :return:
+    """
+    polling_location_query = PollingLocation.objects.using('readonly').filter(state__iexact=state_code)
+    if kind_of_retrieve == RETRIEVE_GOOGLE_CIVIC_BALLOTS:
+        # If Google wasn't able to return ballot data in the past ignore that polling location
+        polling_location_query = polling_location_query.filter(google_response_address_not_found__isnull=True)
+    else:
+        polling_location_query = polling_location_query.filter(polling_location_deleted=False)
+        if polling_location_query.filter(use_for_bulk_retrieve=True).exists():
+            polling_location_query = polling_location_query.filter(use_for_bulk_retrieve=True)
+        else:
+            # We didn't find any polling locations marked for bulk retrieve, so use the ones we can locate
+            polling_location_query = polling_location_query.exclude(Q(latitude__isnull=True) | Q(latitude__exact=0.0))
+            polling_location_query = polling_location_query.exclude(
+                Q(zip_long__isnull=True) | Q(zip_long__exact='0') | Q(zip_long__exact=''))
+    # Ordering by "location_name" creates a bit of (locational) random order
+    return list(polling_location_query.order_by('location_name').values_list('we_vote_id', flat=True))
+
+
+def create_polling_location_retrieve_job(kind_of_retrieve, google_civic_election_id, state_code, election_name='',
+                                         voter_we_vote_id=''):
+    status = ""
+    if kind_of_retrieve not in PROVIDER_BY_KIND_OF_RETRIEVE or not positive_value_exists(state_code):
+        results = {
+            'success':      False,
+            'status':       "POLLING_LOCATION_RETRIEVE_JOB-MISSING_KIND_OF_RETRIEVE_OR_STATE_CODE ",
+            'job_found':    False,
+            'job':          None,
+        }
+        return results
+
+    polling_location_we_vote_id_list = fetch_polling_location_we_vote_id_list_for_retrieve(
+        kind_of_retrieve, state_code)
+    if not len(polling_location_we_vote_id_list):
+        results = {
+            'success':      False,
+            'status':       "POLLING_LOCATION_RETRIEVE_JOB-NO_POLLING_LOCATIONS_FOR_STATE ",
+            'job_found':    False,
+            'job':          None,
+        }
+        return results
+
+    batch_set_id = 0
+    if kind_of_retrieve == RETRIEVE_BALLOTPEDIA_BALLOT_ITEMS:
+        import_date = date.today()
+        batch_set_name = "Ballotpedia ballot locations for " + election_name + \
+                         " (state " + str(state_code.upper()) + ")" + \
+                         " - " + str(import_date)
+        try:
+            batch_set = BatchSet.objects.create(batch_set_description_text="", batch_set_name=batch_set_name,
+                                                batch_set_source=BATCH_SET_SOURCE_IMPORT_BALLOTPEDIA_BALLOT_ITEMS,
+                                                google_civic_election_id=google_civic_election_id,
+                                                source_uri=BALLOTPEDIA_API_CONTAINS_URL, import_date=import_date)
+            batch_set_id = batch_set.id
+            status += "BATCH_SET_SAVED "
+        except Exception as e:
+            status += 'EXCEPTION_BATCH_SET {error} [type: {error_type}] '.format(error=e, error_type=type(e))
+            results = {
+                'success':      False,
+                'status':       status,
+                'job_found':    False,
+                'job':          None,
+            }
+            return results
+
+    job_manager = PollingLocationRetrieveJobManager()
+    results = job_manager.create_polling_location_retrieve_job(
+        kind_of_retrieve, google_civic_election_id, state_code, polling_location_we_vote_id_list,
+        batch_set_id=batch_set_id, voter_we_vote_id=voter_we_vote_id)
+    results['status'] = status + results['status']
+    return results
+
+
+def retrieve_google_civic_ballots_for_shard(job, polling_location_list, job_context):
+    """
+    Retrieve and save the Google Civic ballot for each polling location
+    :return: (status_by_polling_location_we_vote_id for the ones that are done, and for the ones that failed)
+    """
+    provider_limiter = provider_limiter_by_provider[PROVIDER_GOOGLE_CIVIC]
+    bulk_ballot_storage = BulkBallotStorage(job.google_civic_election_id)
+    ballot_returned_list_to_refresh = []
+    done_status_by_polling_location_we_vote_id = {}
+    failed_status_by_polling_location_we_vote_id = {}
+    for polling_location in polling_location_list:
+        text_for_map_search = polling_location.get_text_for_map_search_results()['text_for_map_search']
+        with provider_limiter:
+            one_ballot_results = retrieve_one_ballot_from_google_civic_api(
+                text_for_map_search, job.google_civic_election_id)
+        if not one_ballot_results['success']:
+            if positive_value_exists(one_ballot_results.get('google_response_address_not_found')):
+                # Skipped by later retrieves (see fetch_polling_location_we_vote_id_list_for_retrieve)
+                PollingLocation.objects.filter(id=polling_location.id).update(
+                    google_response_address_not_found=Coalesce(F('google_response_address_not_found'), 0) + 1)
+            failed_status_by_polling_location_we_vote_id[polling_location.we_vote_id] = one_ballot_results['status']
+            continue
+        store_one_ballot_results = store_one_ballot_from_google_civic_api(
+            one_ballot_results['structured_json'], 0, polling_location.we_vote_id,
+            bulk_ballot_storage=bulk_ballot_storage)
+        if store_one_ballot_results['success']:
+            done_status_by_polling_location_we_vote_id[polling_location.we_vote_id] = "BALLOT_RETRIEVED "
+            if store_one_ballot_results['ballot_returned_found']:
+                ballot_returned_list_to_refresh.append(store_one_ballot_results['ballot_returned'])
+        else:
+            failed_status_by_polling_location_we_vote_id[polling_location.we_vote_id] = \
+                store_one_ballot_results['status']
+
+    save_results = save_bulk_ballot_items_and_refresh_voter_ballots(
+        bulk_ballot_storage, ballot_returned_list_to_refresh)
+    if not save_results['success']:
+        # None of this shard's ballot items were saved
+        for polling_location_we_vote_id in done_status_by_polling_location_we_vote_id.keys():
+            failed_status_by_polling_location_we_vote_id[polling_location_we_vote_id] = save_results['status']
+        done_status_by_polling_location_we_vote_id = {}
+    return done_status_by_polling_location_we_vote_id, failed_status_by_polling_location_we_vote_id
+
+
+def retrieve_ballotpedia_ballot_items_for_shard(job, polling_location_list, job_context):
+    provider_limiter = provider_limiter_by_provider[PROVIDER_BALLOTPEDIA]
+    done_status_by_polling_location_we_vote_id = {}
+    failed_status_by_polling_location_we_vote_id = {}
+    for polling_location in polling_location_list:
+        with provider_limiter:
+            one_ballot_results = retrieve_ballot_items_from_polling_location(
+                job.google_civic_election_id, polling_location=polling_location, batch_set_id=job.batch_set_id,
+                state_code=job.state_code, district_contest_cache=job_context['district_contest_cache'])
+        if one_ballot_results['success']:
+            done_status_by_polling_location_we_vote_id[polling_location.we_vote_id] = one_ballot_results['status']
+        else:
+            failed_status_by_polling_location_we_vote_id[polling_location.we_vote_id] = one_ballot_results['status']
+    return done_status_by_polling_location_we_vote_id, failed_status_by_polling_location_we_vote_id
+
+
+def retrieve_ballotpedia_districts_for_shard(job, polling_location_list, job_context):
+    provider_limiter = provider_limiter_by_provider[PROVIDER_BALLOTPEDIA]
+    done_status_by_polling_location_we_vote_id = {}
+    failed_status_by_polling_location_we_vote_id = {}
+    for polling_location in polling_location_list:
+        with provider_limiter:
+            one_ballot_results = retrieve_ballotpedia_district_id_list_for_polling_location(
+                job.google_civic_election_id, polling_location=polling_location,
+                force_district_retrieve_from_ballotpedia=True)
+        if one_ballot_results['success']:
+            done_status_by_polling_location_we_vote_id[polling_location.we_vote_id] = \
+                "DISTRICTS: " + str(len(one_ballot_results['ballotpedia_district_id_list'])) + " "
+        else:
+            failed_status_by_polling_location_we_vote_id[polling_location.we_vote_id] = one_ballot_results['status']
+    return done_status_by_polling_location_we_vote_id, failed_status_by_polling_location_we_vote_id
+
+
+RETRIEVE_FUNCTION_BY_KIND_OF_RETRIEVE = {
+    RETRIEVE_GOOGLE_CIVIC_BALLOTS:      retrieve_google_civic_ballots_for_shard,
+    RETRIEVE_BALLOTPEDIA_BALLOT_ITEMS:  retrieve_ballotpedia_ballot_items_for_shard,
+    RETRIEVE_BALLOTPEDIA_DISTRICTS:     retrieve_ballotpedia_districts_for_shard,
+}
+
+
+def run_polling_location_retrieve_job_worker(job, job_context):
+    """
+    Take shards of pending polling locations from the job and retrieve them, until none are left
+    :return: How many polling locations were done, and how many failed
+    """
+    job_manager = PollingLocationRetrieveJobManager()
+    retrieve_function = RETRIEVE_FUNCTION_BY_KIND_OF_RETRIEVE[job.kind_of_retrieve]
+    claim_token = generate_random_string(16)
+    done_count = 0
+    failed_count = 0
+    while True:
+        polling_location_we_vote_id_list = job_manager.claim_polling_location_retrieve_job_entries(
+            job.id, claim_token, POLLING_LOCATION_RETRIEVE_SHARD_SIZE)
+        if not len(polling_location_we_vote_id_list):
+            # The pending entries left were locked by workers claiming them at the same time. Only stop once
+            # there are none.
+            if not job_manager.pending_polling_location_retrieve_job_entries_exist(job.id):
+                break
+            time.sleep(POLLING_LOCATION_RETRIEVE_CLAIM_RETRY_SECONDS)
+            continue
+        polling_location_list = list(PollingLocation.objects.filter(we_vote_id__in=polling_location_we_vote_id_list))
+        failed_status_by_polling_location_we_vote_id = {}
+        for polling_location_we_vote_id in \
+                set(polling_location_we_vote_id_list) - set(one.we_vote_id for one in polling_location_list):
+            failed_status_by_polling_location_we_vote_id[polling_location_we_vote_id] = "POLLING_LOCATION_NOT_FOUND "
+        try:
+            done_status_by_polling_location_we_vote_id, shard_failed_status_by_polling_location_we_vote_id = \
+                retrieve_function(job, polling_location_list, job_context)
+            failed_status_by_polling_location_we_vote_id.update(shard_failed_status_by_polling_location_we_vote_id)
+        except Exception as e:
+            status = 'POLLING_LOCATION_RETRIEVE_SHARD_FAILED {error} [type: {error_type}] '.format(
+                error=e, error_type=type(e))
+            logger.error(status)
+            done_status_by_polling_location_we_vote_id = {}
+            for polling_location in polling_location_list:
+                failed_status_by_polling_location_we_vote_id[polling_location.we_vote_id] = status
+        job_manager.finish_polling_location_retrieve_job_entries(
+            job.id, done_status_by_polling_location_we_vote_id, RETRIEVE_DONE)
+        job_manager.finish_polling_location_retrieve_job_entries(
+            job.id, failed_status_by_polling_location_we_vote_id, RETRIEVE_FAILED)
+        done_count += len(done_status_by_polling_location_we_vote_id)
+        failed_count += len(failed_status_by_polling_location_we_vote_id)
+        PollingLocationRetrieveJob.objects.filter(id=job.id).update(date_last_running=timezone.now())
+    return done_count, failed_count
+
+
+def run_polling_location_retrieve_job_worker_in_thread(job, job_context):
+    try:
+        return run_polling_location_retrieve_job_worker(job, job_context)
+    finally:
+        # Django opened a database connection for this thread
+        connection.close()
+
+
+def run_polling_location_retrieve_job(job_id):
+    """
+    Retrieve every pending polling location in the job, with a pool of workers. Run it again to resume a job that
+    stopped (see resume_polling_location_retrieve_job).
+    :param job_id:
+    :return:
+    """
+    job_manager = PollingLocationRetrieveJobManager()
+    results = job_manager.retrieve_polling_location_retrieve_job(job_id)
+    if not results['job_found']:
+        return results
+    job = results['job']
+    if job.kind_of_retrieve not in RETRIEVE_FUNCTION_BY_KIND_OF_RETRIEVE:
+        results = {
+            'success':  False,
+            'status':   "POLLING_LOCATION_RETRIEVE_JOB-UNKNOWN_KIND_OF_RETRIEVE ",
+        }
+        return results
+
+    now = timezone.now()
+    PollingLocationRetrieveJob.objects.filter(id=job.id).update(
+        date_started=Coalesce(F('date_started'), now), date_last_running=now, date_completed=None)
+
+    # Shared by the workers, so the offices and measures in each Ballotpedia district are only retrieved once
+    job_context = {
+        'district_contest_cache': {},
+    }
+    provider_limiter = provider_limiter_by_provider[PROVIDER_BY_KIND_OF_RETRIEVE[job.kind_of_retrieve]]
+    worker_count = max(min(POLLING_LOCATION_RETRIEVE_WORKERS, provider_limiter.concurrency), 1)
+    done_count = 0
+    failed_count = 0
+    if worker_count == 1:
+        done_count, failed_count = run_polling_location_retrieve_job_worker(job, job_context)
+    else:
+        with ThreadPoolExecutor(max_workers=worker_count) as executor:
+            future_list = [executor.submit(run_polling_location_retrieve_job_worker_in_thread, job, job_context)
+                           for worker_number in range(worker_count)]
+            for future in future_list:
+                worker_done_count, worker_failed_count = future.result()
+                done_count += worker_done_count
+                failed_count += worker_failed_count
+
+    count_by_retrieve_status = job_manager.retrieve_polling_location_retrieve_job_progress(job.id)
+    if not count_by_retrieve_status[RETRIEVE_PENDING] and not count_by_retrieve_status[RETRIEVE_IN_PROGRESS]:
+        PollingLocationRetrieveJob.objects.filter(id=job.id).update(date_completed=timezone.now())
+
+    results = {
+        'success':      True,
+        'status':       "POLLING_LOCATION_RETRIEVE_JOB_RUN done: {done}, failed: {failed} ".format(
+            done=done_count, failed=failed_count),
+        'done_count':   done_count,
+        'failed_count': failed_count,
+    }
+    return results
+
+
+def resume_polling_location_retrieve_job(job, retry_failed=False):
+    """
+    Make the polling locations a stopped job had taken (and optionally the ones that failed) pending again, so the
+    next run_polling_location_retrieve_job retrieves them
+    """
+    if job.is_running(POLLING_LOCATION_RETRIEVE_STALE_SECONDS):
+        results = {
+            'success':  False,
+            'status':   "POLLING_LOCATION_RETRIEVE_JOB_STILL_RUNNING ",
+        }
+        return results
+    job_manager = PollingLocationRetrieveJobManager()
+    reset_count = job_manager.reset_polling_location_retrieve_job_entries(job.id, retry_failed=retry_failed)
+    PollingLocationRetrieveJob.objects.filter(id=job.id).update(date_completed=None)
+    results = {
+        'success':  True,
+        'status':   "POLLING_LOCATION_RETRIEVE_JOB_RESUMED reset: {reset} ".format(reset=reset_count),
+    }
+    return results
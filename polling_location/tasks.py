@@ -0,0 +1,20 @@
+# polling_location/tasks.py
+# Brought to you by We Vote. Be good.
+# -*- coding: UTF-8 -*-
+
+from background_task import background
+from .retrieve_jobs import run_polling_location_retrieve_job
+import wevote_functions.admin
+
+logger = wevote_functions.admin.get_logger(__name__)
+
+
+@background()
+def run_polling_location_retrieve_job_task(job_id):
+    """
+    Run a PollingLocationRetrieveJob from the background task worker (python manage.py process_tasks), so
+    retrieving ballots for every polling location in a state doesn't have to finish within one admin page request.
+    """
+    results = run_polling_location_retrieve_job(job_id)
+    if not results['success']:
+        logger.error("run_polling_location_retrieve_job_task: " + results['status'])
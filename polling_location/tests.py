@@ -0,0 +1,148 @@
+from unittest import mock
+import threading
+
+from django.test import TestCase, TransactionTestCase
+
+from polling_location.models import PollingLocation, PollingLocationRetrieveJobEntry, \
+    PollingLocationRetrieveJobManager, RETRIEVE_DONE, RETRIEVE_FAILED, RETRIEVE_GOOGLE_CIVIC_BALLOTS, \
+    RETRIEVE_IN_PROGRESS, RETRIEVE_PENDING
+from polling_location.retrieve_jobs import resume_polling_location_retrieve_job, run_polling_location_retrieve_job
+
+
+class PollingLocationRetrieveJobTestCase(TestCase):
+
+    def setUp(self):
+        for polling_location_we_vote_id in ['wv01ploc1', 'wv01ploc2', 'wv01ploc3']:
+            PollingLocation.objects.create(we_vote_id=polling_location_we_vote_id, state='ms')
+        job_manager = PollingLocationRetrieveJobManager()
+        results = job_manager.create_polling_location_retrieve_job(
+            RETRIEVE_GOOGLE_CIVIC_BALLOTS, 4184, 'MS', ['wv01ploc1', 'wv01ploc2', 'wv01ploc3', 'wv01ploc4'])
+        self.job = results['job']
+
+    def test_claimed_entries_are_not_claimed_again(self):
+        job_manager = PollingLocationRetrieveJobManager()
+        first_list = job_manager.claim_polling_location_retrieve_job_entries(self.job.id, 'first', 3)
+        second_list = job_manager.claim_polling_location_retrieve_job_entries(self.job.id, 'second', 3)
+        self.assertEqual(len(first_list), 3)
+        self.assertEqual(second_list, ['wv01ploc4'])
+        self.assertEqual(job_manager.claim_polling_location_retrieve_job_entries(self.job.id, 'third', 3), [])
+
+    def test_worker_keeps_claiming_while_entries_are_pending(self):
+        claim_polling_location_retrieve_job_entries = \
+            PollingLocationRetrieveJobManager.claim_polling_location_retrieve_job_entries
+        claim_count_list = []
+
+        def claim_entries(job_manager, job_id, claim_token, number_to_claim):
+            claim_count_list.append(number_to_claim)
+            if len(claim_count_list) == 1:
+                # Another worker had the pending entries locked
+                return []
+            return claim_polling_location_retrieve_job_entries(job_manager, job_id, claim_token, number_to_claim)
+
+        def retrieve_shard(job, polling_location_list, job_context):
+            return {polling_location.we_vote_id: "BALLOT_RETRIEVED " for polling_location in polling_location_list}, {}
+
+        with mock.patch('polling_location.retrieve_jobs.POLLING_LOCATION_RETRIEVE_WORKERS', 1), \
+                mock.patch('polling_location.retrieve_jobs.POLLING_LOCATION_RETRIEVE_CLAIM_RETRY_SECONDS', 0), \
+                mock.patch.object(PollingLocationRetrieveJobManager, 'claim_polling_location_retrieve_job_entries',
+                                  autospec=True, side_effect=claim_entries), \
+                mock.patch.dict('polling_location.retrieve_jobs.RETRIEVE_FUNCTION_BY_KIND_OF_RETRIEVE',
+                                {RETRIEVE_GOOGLE_CIVIC_BALLOTS: retrieve_shard}):
+            results = run_polling_location_retrieve_job(self.job.id)
+        self.assertEqual(results['done_count'], 3)
+        self.assertEqual(results['failed_count'], 1)
+        self.assertEqual(PollingLocationRetrieveJobManager().retrieve_polling_location_retrieve_job_progress(
+            self.job.id)[RETRIEVE_PENDING], 0)
+
+    def test_run_and_resume(self):
+        def retrieve_shard(job, polling_location_list, job_context):
+            done_status_by_polling_location_we_vote_id = {}
+            failed_status_by_polling_location_we_vote_id = {}
+            for polling_location in polling_location_list:
+                if polling_location.we_vote_id == 'wv01ploc2':
+                    failed_status_by_polling_location_we_vote_id[polling_location.we_vote_id] = "TIMED_OUT "
+                else:
+                    done_status_by_polling_location_we_vote_id[polling_location.we_vote_id] = "BALLOT_RETRIEVED "
+            return done_status_by_polling_location_we_vote_id, failed_status_by_polling_location_we_vote_id
+
+        # A worker that stopped part way through left one polling location in progress
+        job_manager = PollingLocationRetrieveJobManager()
+        job_manager.claim_polling_location_retrieve_job_entries(self.job.id, 'stopped', 1)
+
+        with mock.patch('polling_location.retrieve_jobs.POLLING_LOCATION_RETRIEVE_WORKERS', 1), \
+                mock.patch('polling_location.retrieve_jobs.POLLING_LOCATION_RETRIEVE_SHARD_SIZE', 2), \
+                mock.patch.dict('polling_location.retrieve_jobs.RETRIEVE_FUNCTION_BY_KIND_OF_RETRIEVE',
+                                {RETRIEVE_GOOGLE_CIVIC_BALLOTS: retrieve_shard}):
+            results = run_polling_location_retrieve_job(self.job.id)
+            self.assertEqual(results['done_count'], 1)
+            # wv01ploc4 isn't a polling location
+            self.assertEqual(results['failed_count'], 2)
+            count_by_retrieve_status = job_manager.retrieve_polling_location_retrieve_job_progress(self.job.id)
+            self.assertEqual(count_by_retrieve_status[RETRIEVE_IN_PROGRESS], 1)
+            self.job.refresh_from_db()
+            self.assertIsNone(self.job.date_completed)
+
+            self.job.date_last_running = None
+            results = resume_polling_location_retrieve_job(self.job)
+            self.assertTrue(results['success'])
+            run_polling_location_retrieve_job(self.job.id)
+
+        count_by_retrieve_status = job_manager.retrieve_polling_location_retrieve_job_progress(self.job.id)
+        self.assertEqual(count_by_retrieve_status[RETRIEVE_PENDING], 0)
+        self.assertEqual(count_by_retrieve_status[RETRIEVE_DONE], 2)
+        self.assertEqual(count_by_retrieve_status[RETRIEVE_FAILED], 2)
+        self.assertEqual(PollingLocationRetrieveJobEntry.objects.get(
+            job_id=self.job.id, polling_location_we_vote_id='wv01ploc2').status, "TIMED_OUT ")
+        self.job.refresh_from_db()
+        self.assertIsNotNone(self.job.date_completed)
+
+
+class PollingLocationRetrieveJobWorkersTestCase(TransactionTestCase):
+    """
+    The workers run in threads with their own database connections, so the entries they claim have to be committed
+    """
+
+    def setUp(self):
+        self.polling_location_we_vote_id_list = ['wv01ploc{}'.format(number) for number in range(1, 9)]
+        for polling_location_we_vote_id in self.polling_location_we_vote_id_list:
+            PollingLocation.objects.create(we_vote_id=polling_location_we_vote_id, state='ms')
+        results = PollingLocationRetrieveJobManager().create_polling_location_retrieve_job(
+            RETRIEVE_GOOGLE_CIVIC_BALLOTS, 4184, 'MS', self.polling_location_we_vote_id_list)
+        self.job = results['job']
+
+    def test_two_workers_share_the_job(self):
+        # Each worker waits for the other one to have its first shard, so both are claiming at the same time
+        both_workers_started = threading.Barrier(2, timeout=10)
+        lock = threading.Lock()
+        thread_name_by_polling_location_we_vote_id = {}
+        retrieve_count_by_thread_name = {}
+
+        def retrieve_shard(job, polling_location_list, job_context):
+            thread_name = threading.current_thread().name
+            with lock:
+                first_shard = thread_name not in retrieve_count_by_thread_name
+                retrieve_count_by_thread_name[thread_name] = \
+                    retrieve_count_by_thread_name.get(thread_name, 0) + len(polling_location_list)
+                for polling_location in polling_location_list:
+                    self.assertNotIn(polling_location.we_vote_id, thread_name_by_polling_location_we_vote_id)
+                    thread_name_by_polling_location_we_vote_id[polling_location.we_vote_id] = thread_name
+            if first_shard:
+                both_workers_started.wait()
+            return {polling_location.we_vote_id: "BALLOT_RETRIEVED " for polling_location in polling_location_list}, {}
+
+        with mock.patch('polling_location.retrieve_jobs.POLLING_LOCATION_RETRIEVE_WORKERS', 2), \
+                mock.patch('polling_location.retrieve_jobs.POLLING_LOCATION_RETRIEVE_SHARD_SIZE', 1), \
+                mock.patch.dict('polling_location.retrieve_jobs.RETRIEVE_FUNCTION_BY_KIND_OF_RETRIEVE',
+                                {RETRIEVE_GOOGLE_CIVIC_BALLOTS: retrieve_shard}):
+            results = run_polling_location_retrieve_job(self.job.id)
+
+        self.assertEqual(results['done_count'], 8)
+        self.assertEqual(results['failed_count'], 0)
+        self.assertEqual(len(retrieve_count_by_thread_name), 2)
+        self.assertEqual(sorted(thread_name_by_polling_location_we_vote_id),
+                         sorted(self.polling_location_we_vote_id_list))
+        count_by_retrieve_status = PollingLocationRetrieveJobManager().retrieve_polling_location_retrieve_job_progress(
+            self.job.id)
+        self.assertEqual(count_by_retrieve_status[RETRIEVE_DONE], 8)
+        self.job.refresh_from_db()
+        self.assertIsNotNone(self.job.date_completed)
@@ -32,4 +32,10 @@ urlpatterns = [
         name='polling_location_summary'),
     url(r'^(?P<polling_location_we_vote_id>wv[\w]{2}ploc[\w]+)/summary/$',
         views_admin.polling_location_summary_by_we_vote_id_view, name='polling_location_summary_by_we_vote_id'),
+    url(r'^retrieve_job_start/$', views_admin.polling_location_retrieve_job_start_view,
+        name='polling_location_retrieve_job_start'),
+    url(r'^retrieve_job/(?P<job_id>[0-9]+)/$', views_admin.polling_location_retrieve_job_view,
+        name='polling_location_retrieve_job'),
+    url(r'^retrieve_job/(?P<job_id>[0-9]+)/resume/$', views_admin.polling_location_retrieve_job_resume_view,
+        name='polling_location_retrieve_job_resume'),
 ]
@@ -2,9 +2,13 @@
 # Brought to you by We Vote. Be good.
 # -*- coding: UTF-8 -*-
 
-from .models import PollingLocation, PollingLocationManager
+from .models import PollingLocation, PollingLocationManager, PollingLocationRetrieveJobEntry, \
+    PollingLocationRetrieveJobManager, RETRIEVE_DONE, RETRIEVE_FAILED, RETRIEVE_GOOGLE_CIVIC_BALLOTS
 from .controllers import filter_polling_locations_structured_json_for_local_duplicates, \
     import_and_save_all_polling_locations_data, polling_locations_import_from_structured_json
+from .retrieve_jobs import create_polling_location_retrieve_job, POLLING_LOCATION_RETRIEVE_STALE_SECONDS, \
+    resume_polling_location_retrieve_job
+from .tasks import run_polling_location_retrieve_job_task
 from admin_tools.views import redirect_to_sign_in_page
 from ballot.models import BallotReturned, BallotReturnedListManager
 from config.base import get_environment_variable
@@ -15,10 +19,11 @@ from django.contrib.auth.decorators import login_required
 from django.contrib.messages import get_messages
 from django.db.models import Q
 from django.shortcuts import render
+from election.models import ElectionManager
 from exception.models import handle_record_found_more_than_one_exception
-from voter.models import voter_has_authority
+from voter.models import fetch_voter_we_vote_id_from_voter_device_link, voter_has_authority
 from wevote_functions.functions import convert_state_code_to_state_text, convert_to_float, convert_to_int, \
-    positive_value_exists, process_request_from_master, STATE_CODE_MAP, STATE_GEOGRAPHIC_CENTER
+    get_voter_api_device_id, positive_value_exists, process_request_from_master, STATE_CODE_MAP, STATE_GEOGRAPHIC_CENTER
 import wevote_functions.admin
 from django.http import HttpResponse
 import json
@@ -666,3 +671,119 @@ def polling_location_summary_by_we_vote_id_view(request, polling_location_we_vot
         'polling_location':             polling_location_on_stage,
     }
     return render(request, 'polling_location/polling_location_summary.html', template_values)
+
+
+@login_required
+def polling_location_retrieve_job_start_view(request):
+    """
+    Start retrieving ballots (or Ballotpedia districts) for every polling location in one state, in the background
+    :param request:
+    :return:
+    """
+    authority_required = {'political_data_manager'}
+    if not voter_has_authority(request, authority_required):
+        return redirect_to_sign_in_page(request, authority_required)
+
+    google_civic_election_id = convert_to_int(request.GET.get('google_civic_election_id', 0))
+    state_code = request.GET.get('state_code', '')
+    kind_of_retrieve = request.GET.get('kind_of_retrieve', RETRIEVE_GOOGLE_CIVIC_BALLOTS)
+
+    election_manager = ElectionManager()
+    election_results = election_manager.retrieve_election(google_civic_election_id)
+    if not election_results['election_found']:
+        messages.add_message(request, messages.ERROR, 'Election could not be found.')
+        return HttpResponseRedirect(reverse('election:election_list', args=()))
+    election = election_results['election']
+
+    voter_api_device_id = get_voter_api_device_id(request)  # We look in the cookies for voter_api_device_id
+    voter_we_vote_id = fetch_voter_we_vote_id_from_voter_device_link(voter_api_device_id)
+
+    results = create_polling_location_retrieve_job(
+        kind_of_retrieve, google_civic_election_id, state_code, election_name=election.election_name,
+        voter_we_vote_id=voter_we_vote_id)
+    if not results['job_found']:
+        messages.add_message(request, messages.ERROR, 'Could not start retrieve: ' + results['status'])
+        return HttpResponseRedirect(reverse('election:election_summary', args=(election.id,)) +
+                                    "?state_code=" + str(state_code))
+
+    job = results['job']
+    run_polling_location_retrieve_job_task(job.id)
+    messages.add_message(request, messages.INFO,
+                         'Retrieving from {count} polling locations in the background.'.format(
+                             count=job.polling_location_count))
+    return HttpResponseRedirect(reverse('polling_location:polling_location_retrieve_job', args=(job.id,)))
+
+
+@login_required
+def polling_location_retrieve_job_view(request, job_id):
+    """
+    How far along a PollingLocationRetrieveJob is
+    :param request:
+    :param job_id:
+    :return:
+    """
+    authority_required = {'political_data_viewer'}
+    if not voter_has_authority(request, authority_required):
+        return redirect_to_sign_in_page(request, authority_required)
+
+    messages_on_stage = get_messages(request)
+    job_manager = PollingLocationRetrieveJobManager()
+    results = job_manager.retrieve_polling_location_retrieve_job(job_id)
+    if not results['job_found']:
+        messages.add_message(request, messages.ERROR, 'Polling location retrieve could not be found.')
+        return HttpResponseRedirect(reverse('election:election_list', args=()))
+    job = results['job']
+
+    count_by_retrieve_status = job_manager.retrieve_polling_location_retrieve_job_progress(job.id)
+    finished_count = count_by_retrieve_status[RETRIEVE_DONE] + count_by_retrieve_status[RETRIEVE_FAILED]
+    polling_locations_per_minute = 0
+    if job.date_started and job.date_last_running and finished_count:
+        seconds_running = (job.date_last_running - job.date_started).total_seconds()
+        if seconds_running > 0:
+            polling_locations_per_minute = round(finished_count * 60 / seconds_running, 1)
+
+    failed_entry_list = PollingLocationRetrieveJobEntry.objects.using('readonly').filter(
+        job_id=job.id, retrieve_status=RETRIEVE_FAILED).order_by('id')[:50]
+
+    template_values = {
+        'count_by_retrieve_status':     count_by_retrieve_status,
+        'failed_entry_list':            failed_entry_list,
+        'finished_count':               finished_count,
+        'google_civic_election_id':     job.google_civic_election_id,
+        'job':                          job,
+        'job_is_running':               job.is_running(POLLING_LOCATION_RETRIEVE_STALE_SECONDS),
+        'messages_on_stage':            messages_on_stage,
+        'polling_locations_per_minute': polling_locations_per_minute,
+        'state_code':                   job.state_code,
+    }
+    return render(request, 'polling_location/polling_location_retrieve_job.html', template_values)
+
+
+@login_required
+def polling_location_retrieve_job_resume_view(request, job_id):
+    """
+    Continue a PollingLocationRetrieveJob that stopped before every polling location was retrieved
+    :param request:
+    :param job_id:
+    :return:
+    """
+    authority_required = {'political_data_manager'}
+    if not voter_has_authority(request, authority_required):
+        return redirect_to_sign_in_page(request, authority_required)
+
+    retry_failed = positive_value_exists(request.GET.get('retry_failed', False))
+
+    job_manager = PollingLocationRetrieveJobManager()
+    results = job_manager.retrieve_polling_location_retrieve_job(job_id)
+    if not results['job_found']:
+        messages.add_message(request, messages.ERROR, 'Polling location retrieve could not be found.')
+        return HttpResponseRedirect(reverse('election:election_list', args=()))
+    job = results['job']
+
+    results = resume_polling_location_retrieve_job(job, retry_failed=retry_failed)
+    if results['success']:
+        run_polling_location_retrieve_job_task(job.id)
+        messages.add_message(request, messages.INFO, 'Retrieve resumed in the background.')
+    else:
+        messages.add_message(request, messages.ERROR, 'Could not resume retrieve: ' + results['status'])
+    return HttpResponseRedirect(reverse('polling_location:polling_location_retrieve_job', args=(job.id,)))
@@ -4,12 +4,14 @@
 
 from .models import PositionEntered, PositionForFriends, PositionManager, PositionListManager, ANY_STANCE, \
     FRIENDS_AND_PUBLIC, FRIENDS_ONLY, PUBLIC_ONLY, SHOW_PUBLIC, THIS_ELECTION_ONLY, ALL_OTHER_ELECTIONS, \
-    ALL_ELECTIONS, SUPPORT, OPPOSE, INFORMATION_ONLY, NO_STANCE
+    ALL_ELECTIONS, SUPPORT, OPPOSE, INFORMATION_ONLY, NO_STANCE, VOTER_POSITIONS_PAGE_SIZE
 from ballot.controllers import figure_out_google_civic_election_id_voter_is_watching, \
     figure_out_google_civic_election_id_voter_is_watching_by_voter_id
+from ballot.election_snapshot import retrieve_candidate_campaign_from_snapshot, \
+    retrieve_contest_measure_from_snapshot, retrieve_contest_office_from_snapshot
 from ballot.models import BallotItemListManager, OFFICE, CANDIDATE, MEASURE
 from candidate.models import CandidateCampaignManager, CandidateCampaignListManager
-from config.base import get_environment_variable
+from config.base import get_environment_variable, get_environment_variable_default
 from django.db.models import Q
 from django.http import HttpResponse
 from election.models import fetch_election_state
@@ -21,16 +23,22 @@ from office.models import ContestOfficeManager, ContestOfficeListManager
 from operator import itemgetter
 from organization.models import Organization, OrganizationManager, PUBLIC_FIGURE, UNKNOWN
 import json
+from position.position_index import fetch_election_position_index
+from .tasks import propagate_cached_values_to_positions_task
 from voter.models import fetch_voter_id_from_voter_device_link, VoterManager
 from voter_guide.models import ORGANIZATION, VOTER, VoterGuideManager
 import wevote_functions.admin
 from wevote_functions.functions import is_voter_device_id_valid, positive_value_exists, process_request_from_master, \
-    convert_to_int, is_link_to_video, is_speaker_type_organization, is_speaker_type_public_figure
+    convert_to_int, normalize_we_vote_id, is_link_to_video, is_speaker_type_organization, is_speaker_type_public_figure
 
 logger = wevote_functions.admin.get_logger(__name__)
 
 WE_VOTE_API_KEY = get_environment_variable("WE_VOTE_API_KEY")
 POSITIONS_SYNC_URL = get_environment_variable("POSITIONS_SYNC_URL")  # positionsSyncOut
+# When True, changes to candidates, offices, measures, organizations and voters are copied into the position tables
+# by the background task worker (python manage.py process_tasks) instead of during the request
+POSITION_CACHE_PROPAGATION_IN_BACKGROUND = get_environment_variable_default(
+    "POSITION_CACHE_PROPAGATION_IN_BACKGROUND", False)
 
 
 def add_position_network_count_entries_for_one_organization(voter_id, organization_we_vote_id,
@@ -231,11 +239,16 @@ def add_position_network_count_entries_for_one_friend(voter_id, friend_voter_we_
 
 
 def calculate_positions_count_for_all_ballot_items_for_api(
-        voter_device_id, google_civic_election_id=0):
+        voter_device_id, google_civic_election_id=0, bulk_recompute=True):
     """
     We want to return a JSON file with the list of the support and oppose counts from the orgs, friends and
     public figures the voter follows, and be caching the results as we look them up.
     This API call refreshes the data, and is not meant to be used when we just want the latest count.
+    :param voter_device_id:
+    :param google_civic_election_id:
+    :param bulk_recompute: Retrieve all positions for the ballot in a couple of queries and apply only the changes
+     to PositionNetworkScore in one transaction. Set to False to fall back to the ballot item by ballot item refresh.
+    :return:
     """
     status = "CALCULATE_POSITIONS_COUNT_FOR_ALL_BALLOT_ITEMS "
     support_or_oppose_exists = False
@@ -316,6 +329,30 @@ def calculate_positions_count_for_all_ballot_items_for_api(
     # Add yourself as a friend so your opinions show up
     friends_we_vote_id_list.append(voter_we_vote_id)
 
+    if positive_value_exists(bulk_recompute):
+        office_we_vote_id_list = []
+        measure_we_vote_id_list = []
+        for one_ballot_item in ballot_item_list:
+            if one_ballot_item.is_contest_office():
+                office_we_vote_id_list.append(one_ballot_item.contest_office_we_vote_id)
+            elif one_ballot_item.is_contest_measure():
+                measure_we_vote_id_list.append(one_ballot_item.contest_measure_we_vote_id)
+        candidate_we_vote_id_list = \
+            candidate_list_object.fetch_candidate_we_vote_id_list_for_office_list(office_we_vote_id_list)
+
+        results = position_list_manager.bulk_recompute_position_network_scores_for_voter(
+            voter_id, voter_we_vote_id, google_civic_election_id,
+            candidate_we_vote_id_list, measure_we_vote_id_list,
+            organizations_followed_by_voter_by_we_vote_id, friends_we_vote_id_list)
+        status += results['status']
+        json_data = {
+            'success':                  results['success'],
+            'status':                   status,
+            'google_civic_election_id': google_civic_election_id,
+            'support_or_oppose_exists': results['support_or_oppose_exists'],
+        }
+        return json_data
+
     # ballot_item_list is populated with contest_office and contest_measure entries
     for one_ballot_item in ballot_item_list:
         # Retrieve all positions for each ballot item
@@ -642,13 +679,130 @@ def count_for_all_ballot_items_from_position_network_score_for_api(  # positions
     return json_data
 
 
+def count_for_all_ballot_items_from_position_index_for_api(  # positionsCountForAllBallotItems
+        voter_device_id, google_civic_election_id=0, force_recount=False):
+    """
+    Returns the same results as count_for_all_ballot_items_from_position_network_score_for_api, but computes them
+    at read time from this worker's in-memory index of the election's positions, so the PositionNetworkScore
+    table doesn't need to be kept fresh. Turned on with POSITION_COUNT_ENGINE = READ_TIME_INDEX.
+    :param voter_device_id:
+    :param google_civic_election_id:
+    :param force_recount: Rebuild the election's index from the database before counting
+    :return:
+    """
+    status = ""
+    results = is_voter_device_id_valid(voter_device_id)
+    if not results['success']:
+        json_data = {
+            'status':                   "VALID_VOTER_DEVICE_ID_MISSING-COUNT_FOR_ALL_BALLOT_ITEMS_FROM_INDEX",
+            'success':                  False,
+            'google_civic_election_id': google_civic_election_id,
+            'position_counts_list':     [],
+            'support_or_oppose_exists': False,
+        }
+        return json_data
+
+    voter_manager = VoterManager()
+    voter_results = voter_manager.retrieve_voter_from_voter_device_id(voter_device_id)
+    if voter_results['voter_found']:
+        voter = voter_results['voter']
+        voter_id = voter.id
+        voter_we_vote_id = voter.we_vote_id
+        linked_organization_we_vote_id = voter.linked_organization_we_vote_id
+    else:
+        voter_id = 0
+        voter_we_vote_id = ""
+        linked_organization_we_vote_id = ""
+    if not positive_value_exists(voter_id):
+        json_data = {
+            'status':                   "VALID_VOTER_ID_MISSING-COUNT_FOR_ALL_BALLOT_ITEMS_FROM_INDEX",
+            'success':                  False,
+            'google_civic_election_id': google_civic_election_id,
+            'position_counts_list':     [],
+            'support_or_oppose_exists': False,
+        }
+        return json_data
+
+    if not positive_value_exists(google_civic_election_id):
+        # Look up the current google_civic_election_id for this voter
+        results = figure_out_google_civic_election_id_voter_is_watching(voter_device_id)
+        google_civic_election_id = results['google_civic_election_id']
+
+    if not positive_value_exists(google_civic_election_id):
+        json_data = {
+            'status':                   "VALID_GOOGLE_CIVIC_ELECTION_ID_MISSING-COUNT_FOR_ALL_BALLOT_ITEMS_FROM_INDEX",
+            'success':                  False,
+            'google_civic_election_id': google_civic_election_id,
+            'position_counts_list':     [],
+            'support_or_oppose_exists': False,
+        }
+        return json_data
+
+    follow_organization_list_manager = FollowOrganizationList()
+    return_we_vote_id = True
+    organizations_followed_we_vote_id_set = set(
+        follow_organization_list_manager.retrieve_follow_organization_by_voter_id_simple_id_array(
+            voter_id, return_we_vote_id))
+    # The voter's own public positions are counted as a friend's, the way the PositionNetworkScore table does
+    organizations_followed_we_vote_id_set.discard(linked_organization_we_vote_id)
+
+    friend_manager = FriendManager()
+    friend_results = friend_manager.retrieve_friends_we_vote_id_list(voter_we_vote_id)
+    friends_we_vote_id_set = set(friend_results['friends_we_vote_id_list']) \
+        if friend_results['friends_we_vote_id_list_found'] else set()
+    # Add yourself as a friend so your opinions show up
+    friends_we_vote_id_set.add(voter_we_vote_id)
+
+    read_only = True
+    ballot_item_list_manager = BallotItemListManager()
+    results = ballot_item_list_manager.retrieve_all_ballot_items_for_voter(
+        voter_id, google_civic_election_id, read_only)
+    status += results['status']
+    ballot_item_list = results['ballot_item_list']
+
+    office_we_vote_id_list = [one_ballot_item.contest_office_we_vote_id for one_ballot_item in ballot_item_list
+                              if one_ballot_item.is_contest_office()]
+    candidate_list_manager = CandidateCampaignListManager()
+    candidate_we_vote_ids_by_office = candidate_list_manager.fetch_candidate_we_vote_ids_by_office(
+        office_we_vote_id_list, read_only)
+
+    election_position_index = fetch_election_position_index(google_civic_election_id, force_rebuild=force_recount)
+
+    position_counts_list_results = []
+    support_or_oppose_exists = False
+    for one_ballot_item in ballot_item_list:
+        if one_ballot_item.is_contest_office():
+            ballot_item_we_vote_id_list = \
+                candidate_we_vote_ids_by_office.get(one_ballot_item.contest_office_we_vote_id, [])
+        elif one_ballot_item.is_contest_measure():
+            ballot_item_we_vote_id_list = [one_ballot_item.contest_measure_we_vote_id]
+        else:
+            continue
+        for ballot_item_we_vote_id in ballot_item_we_vote_id_list:
+            one_ballot_item_results = election_position_index.count_for_ballot_item(
+                ballot_item_we_vote_id, voter_we_vote_id,
+                organizations_followed_we_vote_id_set, friends_we_vote_id_set)
+            if one_ballot_item_results['support_count'] or one_ballot_item_results['oppose_count']:
+                support_or_oppose_exists = True
+            position_counts_list_results.append(one_ballot_item_results)
+
+    json_data = {
+        'success':                  True,
+        'status':                   "POSITIONS_COUNT_FOR_ALL_BALLOT_ITEMS_FROM_INDEX " + status,
+        'google_civic_election_id': google_civic_election_id,
+        'position_counts_list':     position_counts_list_results,
+        'support_or_oppose_exists': support_or_oppose_exists,
+    }
+    return json_data
+
+
 def find_organizations_referenced_in_positions_for_this_voter(voter):
     related_organizations = []
 
     position_filters = []
     final_position_filters = []
     if positive_value_exists(voter.we_vote_id):
-        new_position_filter = Q(voter_we_vote_id__iexact=voter.we_vote_id)
+        new_position_filter = Q(voter_we_vote_id=voter.we_vote_id)
         position_filters.append(new_position_filter)
     if positive_value_exists(voter.id):
         new_position_filter = Q(voter_id=voter.id)
@@ -684,7 +838,7 @@ def find_organizations_referenced_in_positions_for_this_voter(voter):
         if positive_value_exists(one_position.organization_we_vote_id) and \
                 one_position.organization_we_vote_id not in organization_we_vote_ids_found:
             organization_we_vote_ids_found.append(one_position.organization_we_vote_id)
-            new_organization_filter = Q(we_vote_id__iexact=one_position.organization_we_vote_id)
+            new_organization_filter = Q(we_vote_id=one_position.organization_we_vote_id)
             organization_filters.append(new_organization_filter)
 
     # PositionForFriends
@@ -703,7 +857,7 @@ def find_organizations_referenced_in_positions_for_this_voter(voter):
         if positive_value_exists(one_position.organization_we_vote_id) and \
                 one_position.organization_we_vote_id not in organization_we_vote_ids_found:
             organization_we_vote_ids_found.append(one_position.organization_we_vote_id)
-            new_organization_filter = Q(we_vote_id__iexact=one_position.organization_we_vote_id)
+            new_organization_filter = Q(we_vote_id=one_position.organization_we_vote_id)
             organization_filters.append(new_organization_filter)
 
     # Now that we have a list of all possible organization_id or organization_we_vote_id entries, retrieve all
@@ -842,6 +996,20 @@ def return_most_likely_data(from_position, to_position, attribute):
     return getattr(to_position, attribute)
 
 
+def position_filter_for_id_or_we_vote_id(id_field_name, id_value, we_vote_id_field_name, we_vote_id_value):
+    """
+    Build a filter that finds positions by either the id or the we_vote_id of the ballot item or speaker,
+    the way the retrieve_all_positions_for_* functions do.
+    :return: A Q object. Matches no positions if neither value exists.
+    """
+    position_filter = Q(pk__in=[])
+    if positive_value_exists(id_value):
+        position_filter |= Q(**{id_field_name: id_value})
+    if positive_value_exists(we_vote_id_value):
+        position_filter |= Q(**{we_vote_id_field_name: normalize_we_vote_id(we_vote_id_value)})
+    return position_filter
+
+
 def move_positions_to_another_candidate(from_candidate_id, from_candidate_we_vote_id,
                                         to_candidate_id, to_candidate_we_vote_id,
                                         public_or_private):
@@ -855,121 +1023,36 @@ def move_positions_to_another_candidate(from_candidate_id, from_candidate_we_vot
     :return:
     """
     status = ''
-    success = True
-    position_entries_moved = 0
-    position_entries_not_moved = 0
-    position_manager = PositionManager()
     position_list_manager = PositionListManager()
 
-    stance_we_are_looking_for = ANY_STANCE
-    most_recent_only = False
-    friends_we_vote_id_list = False
-    retrieve_all_admin_override = True
-
-    # Get all positions for the "from_candidate" that we are moving away from
-    from_position_list = position_list_manager.retrieve_all_positions_for_candidate_campaign(
-        public_or_private, from_candidate_id, from_candidate_we_vote_id, stance_we_are_looking_for,
-        most_recent_only, friends_we_vote_id_list, retrieve_all_admin_override=retrieve_all_admin_override)
-
-    # Get all positions for the "to_candidate" that we need to check
-    to_position_list = position_list_manager.retrieve_all_positions_for_candidate_campaign(
-        public_or_private, to_candidate_id, to_candidate_we_vote_id, stance_we_are_looking_for,
-        most_recent_only, friends_we_vote_id_list, retrieve_all_admin_override=retrieve_all_admin_override)
-
-    # Put the organization_we_vote_id's of the orgs that have opinions about this candidate in a simple array
-    # These are existing positions attached to the candidate we are going to keep
-    to_organization_we_vote_ids = []
-    to_voter_we_vote_ids = []
-    for position_object in to_position_list:
-        if positive_value_exists(position_object.organization_we_vote_id):
-            to_organization_we_vote_ids.append(position_object.organization_we_vote_id)
-        if positive_value_exists(position_object.voter_we_vote_id):
-            to_voter_we_vote_ids.append(position_object.voter_we_vote_id)
-
-    offices_dict = {}
-    candidates_dict = {}
-    measures_dict = {}
-    organizations_dict = {}
-    voters_by_linked_org_dict = {}
-    voters_dict = {}
-    for position_object in from_position_list:
-        # Check organization_we_vote_ids for duplicate positions
-        # This is a list of positions that we want to migrate to the candidate we are planning to keep
-
-        # If the position is friends only and doesn't have an organization_we_vote_id stored with it,
-        #  we want to check the voter record to see if there is a linked_organization_we_vote_id
-
-        if positive_value_exists(position_object.organization_we_vote_id) or \
-                positive_value_exists(position_object.voter_we_vote_id):
-            if position_object.organization_we_vote_id in to_organization_we_vote_ids:
-                # We have an existing position for the same organization already attached to the "to" candidate,
-                # so just delete the one from "from" candidate
-                # In the future we could see if one has a comment that needs to be saved.
-                try:
-                    position_object.delete()
-                    position_entries_not_moved += 1
-                except Exception:
-                    if public_or_private:
-                        status += \
-                            "MOVE_TO_ANOTHER_CANDIDATE-UNABLE_TO_DELETE_DUPLICATE_PUBLIC_POSITION-BY_ORGANIZATION "
-                    else:
-                        status += \
-                            "MOVE_TO_ANOTHER_CANDIDATE-UNABLE_TO_DELETE_DUPLICATE_FRIENDS_POSITION-BY_ORGANIZATION "
-                    success = False
-                    break  # stop merge, exit for loop
-            elif position_object.voter_we_vote_id in to_voter_we_vote_ids:
-                # We have an existing position for the same voter already attached to the "to" candidate,
-                # so just delete the one from "from" candidate
-                # In the future we could see if one has a comment that needs to be saved.
-                try:
-                    position_object.delete()
-                    position_entries_not_moved += 1
-                except Exception:
-                    if public_or_private:
-                        status += "MOVE_TO_ANOTHER_CANDIDATE-UNABLE_TO_DELETE_DUPLICATE_PUBLIC_POSITION-BY_VOTER "
-                    else:
-                        status += "MOVE_TO_ANOTHER_CANDIDATE-UNABLE_TO_DELETE_DUPLICATE_FRIENDS_POSITION-BY_VOTER "
-                    success = False
-                    break  # stop merge, exit for loop
-            else:
-                # Update candidate's ids for this position
-                position_object.candidate_campaign_id = to_candidate_id
-                position_object.candidate_campaign_we_vote_id = to_candidate_we_vote_id
-                try:
-                    position_object.save()
-                    position_entries_moved += 1
-                    # And finally, refresh the position to use the latest information
-                    force_update = True
-                    results = position_manager.refresh_cached_position_info(
-                        position_object, force_update,
-                        offices_dict=offices_dict,
-                        candidates_dict=candidates_dict,
-                        measures_dict=measures_dict,
-                        organizations_dict=organizations_dict,
-                        voters_by_linked_org_dict=voters_by_linked_org_dict,
-                        voters_dict=voters_dict)
-                    offices_dict = results['offices_dict']
-                    candidates_dict = results['candidates_dict']
-                    measures_dict = results['measures_dict']
-                    organizations_dict = results['organizations_dict']
-                    voters_by_linked_org_dict = results['voters_by_linked_org_dict']
-                    voters_dict = results['voters_dict']
-                except Exception:
-                    if public_or_private:
-                        status += "MOVE_TO_ANOTHER_CANDIDATE-UNABLE_TO_SAVE_NEW_PUBLIC_POSITION "
-                    else:
-                        status += "MOVE_TO_ANOTHER_CANDIDATE-UNABLE_TO_SAVE_NEW_FRIENDS_POSITION "
-                    success = False
-                    break  # stop merge, exit for loop
+    # If the "to_candidate" already has a position from the same organization or voter, we delete the one
+    # from the "from_candidate" instead of moving it.
+    # In the future we could see if one has a comment that needs to be saved.
+    move_results = position_list_manager.bulk_reassign_positions(
+        public_or_private,
+        from_filter=position_filter_for_id_or_we_vote_id(
+            'candidate_campaign_id', from_candidate_id, 'candidate_campaign_we_vote_id', from_candidate_we_vote_id),
+        to_filter=position_filter_for_id_or_we_vote_id(
+            'candidate_campaign_id', to_candidate_id, 'candidate_campaign_we_vote_id', to_candidate_we_vote_id),
+        new_values={
+            'candidate_campaign_id':            to_candidate_id,
+            'candidate_campaign_we_vote_id':    to_candidate_we_vote_id,
+        },
+        duplicate_match_field_list=['organization_we_vote_id', 'voter_we_vote_id'],
+        match_value_required=True)
+    status += move_results['status']
+    success = move_results['success']
+
+    if success and positive_value_exists(move_results['positions_moved']):
+        # And finally, refresh the moved positions to use the latest information
+        candidate_campaign_manager = CandidateCampaignManager()
+        if positive_value_exists(to_candidate_id):
+            candidate_results = candidate_campaign_manager.retrieve_candidate_campaign_from_id(to_candidate_id)
         else:
-            if public_or_private:
-                status += \
-                    "MOVE_TO_ANOTHER_CANDIDATE-UNABLE_TO_FIND_ORGANIZATION_OR_VOTER_WE_VOTE_ID_FOR_PUBLIC_POSITION "
-            else:
-                status += \
-                    "MOVE_TO_ANOTHER_CANDIDATE-UNABLE_TO_FIND_ORGANIZATION_OR_VOTER_WE_VOTE_ID_FOR_FRIENDS_POSITION "
-            success = False
-            break  # stop merge, exit for loop
+            candidate_results = candidate_campaign_manager.retrieve_candidate_campaign_from_we_vote_id(
+                to_candidate_we_vote_id)
+        if candidate_results['candidate_campaign_found']:
+            update_all_position_details_from_candidate(candidate_results['candidate_campaign'], in_background=False)
 
     results = {
         'status':                       status,
@@ -978,8 +1061,8 @@ def move_positions_to_another_candidate(from_candidate_id, from_candidate_we_vot
         'from_candidate_we_vote_id':    from_candidate_we_vote_id,
         'to_candidate_id':              to_candidate_id,
         'to_candidate_we_vote_id':      to_candidate_we_vote_id,
-        'position_entries_moved':       position_entries_moved,
-        'position_entries_not_moved':   position_entries_not_moved,
+        'position_entries_moved':       move_results['positions_moved'],
+        'position_entries_not_moved':   move_results['duplicates_removed'],
     }
     return results
 
@@ -987,122 +1070,36 @@ def move_positions_to_another_candidate(from_candidate_id, from_candidate_we_vot
 def move_positions_to_another_measure(from_contest_measure_id, from_contest_measure_we_vote_id,
                                       to_contest_measure_id, to_contest_measure_we_vote_id, public_or_private):
     status = ''
-    success = True
-    position_entries_moved = 0
-    position_entries_not_moved = 0
-    position_manager = PositionManager()
     position_list_manager = PositionListManager()
 
-    stance_we_are_looking_for = ANY_STANCE
-    most_recent_only = False
-    friends_we_vote_id_list = False
-
-    # Get all positions for the "from_office" that we are moving away from
-    from_position_list = position_list_manager.retrieve_all_positions_for_contest_measure(
-        public_or_private, from_contest_measure_id, from_contest_measure_we_vote_id, stance_we_are_looking_for,
-        most_recent_only, friends_we_vote_id_list)
-
-    # Get all positions for the "to_office" that we need to check
-    to_position_list = position_list_manager.retrieve_all_positions_for_contest_measure(
-        public_or_private, to_contest_measure_id, to_contest_measure_we_vote_id, stance_we_are_looking_for,
-        most_recent_only, friends_we_vote_id_list)
-
-    # Put the organization_we_vote_id's of the orgs that have opinions about this contest measure in a simple array
-    # These are existing positions attached to the contest_measure we are going to keep
-    to_organization_we_vote_ids = []
-    to_voter_we_vote_ids = []
-    for position_object in to_position_list:
-        if positive_value_exists(position_object.organization_we_vote_id):
-            to_organization_we_vote_ids.append(position_object.organization_we_vote_id)
-        if positive_value_exists(position_object.voter_we_vote_id):
-            to_voter_we_vote_ids.append(position_object.voter_we_vote_id)
-
-    offices_dict = {}
-    candidates_dict = {}
-    measures_dict = {}
-    organizations_dict = {}
-    voters_by_linked_org_dict = {}
-    voters_dict = {}
-    for position_object in from_position_list:
-        # Check organization_we_vote_ids for duplicate positions
-        # This is a list of positions that we want to migrate to the contest_measure we are planning to keep
-
-        # If the position is friends only and doesn't have an organization_we_vote_id stored with it,
-        #  we want to check the voter record to see if there is a linked_organization_we_vote_id
-
-        if positive_value_exists(position_object.organization_we_vote_id) or \
-                positive_value_exists(position_object.voter_we_vote_id):
-            if position_object.organization_we_vote_id in to_organization_we_vote_ids:
-                # We have an existing position for the same organization already attached to the "to" contest office,
-                # so just delete the one from "from" contest_measure
-                # In the future we could see if one has a comment that needs to be saved.
-                try:
-                    position_object.delete()
-                    position_entries_not_moved += 1
-                except Exception:
-                    if public_or_private:
-                        status += \
-                            "MOVE_TO_ANOTHER_CONTEST_MEASURE-UNABLE_TO_DELETE_DUPLICATE_PUBLIC_POSITION-BY_ORG "
-                    else:
-                        status += \
-                            "MOVE_TO_ANOTHER_CONTEST_MEASURE-UNABLE_TO_DELETE_DUPLICATE_FRIENDS_POSITION-BY_ORG "
-                    success = False
-                    break  # stop merge, exit for loop
-            elif position_object.voter_we_vote_id in to_voter_we_vote_ids:
-                # We have an existing position for the same voter already attached to the "to" contest_measure,
-                # so just delete the one from "from" contest_measure
-                # In the future we could see if one has a comment that needs to be saved.
-                try:
-                    position_object.delete()
-                    position_entries_not_moved += 1
-                except Exception:
-                    if public_or_private:
-                        status += "MOVE_TO_ANOTHER_CONTEST_MEASURE-UNABLE_TO_DELETE_DUPLICATE_PUBLIC_POSITION-BY_VOTER "
-                    else:
-                        status += "MOVE_TO_ANOTHER_CONTEST_MEASURE-UNABLE_TO_DELETE_DUPLICATE_FRNDS_POSITION-BY_VOTER "
-                    success = False
-                    break  # stop merge, exit for loop
-            else:
-                # Update contest_measure's ids for this position
-                position_object.contest_measure_id = to_contest_measure_id
-                position_object.contest_measure_we_vote_id = to_contest_measure_we_vote_id
-                try:
-                    position_object.save()
-                    position_entries_moved += 1
-                    # And finally, refresh the position to use the latest information
-                    force_update = True
-                    results = position_manager.refresh_cached_position_info(
-                        position_object, force_update,
-                        offices_dict=offices_dict,
-                        candidates_dict=candidates_dict,
-                        measures_dict=measures_dict,
-                        organizations_dict=organizations_dict,
-                        voters_by_linked_org_dict=voters_by_linked_org_dict,
-                        voters_dict=voters_dict)
-                    offices_dict = results['offices_dict']
-                    candidates_dict = results['candidates_dict']
-                    measures_dict = results['measures_dict']
-                    organizations_dict = results['organizations_dict']
-                    voters_by_linked_org_dict = results['voters_by_linked_org_dict']
-                    voters_dict = results['voters_dict']
-                except Exception:
-                    if public_or_private:
-                        status += "MOVE_TO_ANOTHER_CONTEST_MEASURE-UNABLE_TO_SAVE_NEW_PUBLIC_POSITION "
-                    else:
-                        status += "MOVE_TO_ANOTHER_CONTEST_MEASURE-UNABLE_TO_SAVE_NEW_FRIENDS_POSITION "
-                    success = False
-                    break  # stop merge, exit for loop
+    # If the "to_contest_measure" already has a position from the same organization or voter, we delete the one
+    # from the "from_contest_measure" instead of moving it
+    move_results = position_list_manager.bulk_reassign_positions(
+        public_or_private,
+        from_filter=position_filter_for_id_or_we_vote_id(
+            'contest_measure_id', from_contest_measure_id, 'contest_measure_we_vote_id',
+            from_contest_measure_we_vote_id),
+        to_filter=position_filter_for_id_or_we_vote_id(
+            'contest_measure_id', to_contest_measure_id, 'contest_measure_we_vote_id', to_contest_measure_we_vote_id),
+        new_values={
+            'contest_measure_id':           to_contest_measure_id,
+            'contest_measure_we_vote_id':   to_contest_measure_we_vote_id,
+        },
+        duplicate_match_field_list=['organization_we_vote_id', 'voter_we_vote_id'],
+        match_value_required=True)
+    status += move_results['status']
+    success = move_results['success']
+
+    if success and positive_value_exists(move_results['positions_moved']):
+        # And finally, refresh the moved positions to use the latest information
+        contest_measure_manager = ContestMeasureManager()
+        if positive_value_exists(to_contest_measure_id):
+            measure_results = contest_measure_manager.retrieve_contest_measure_from_id(to_contest_measure_id)
         else:
-            if public_or_private:
-                status += \
-                    "MOVE_TO_ANOTHER_CONTEST_MEASURE-UNABLE_TO_FIND_ORGANIZATION_OR_VOTER_WE_VOTE_ID_" \
-                    "FOR_PUBLIC_POSITION "
-            else:
-                status += \
-                    "MOVE_TO_ANOTHER_CONTEST_MEASURE-UNABLE_TO_FIND_ORGANIZATION_OR_VOTER_WE_VOTE_ID_" \
-                    "FOR_FRIENDS_POSITION "
-            success = False
-            break  # stop merge, exit for loop
+            measure_results = contest_measure_manager.retrieve_contest_measure_from_we_vote_id(
+                to_contest_measure_we_vote_id)
+        if measure_results['contest_measure_found']:
+            update_all_position_details_from_contest_measure(measure_results['contest_measure'], in_background=False)
 
     results = {
         'status':                           status,
@@ -1111,8 +1108,8 @@ def move_positions_to_another_measure(from_contest_measure_id, from_contest_meas
         'from_contest_measure_we_vote_id':  from_contest_measure_we_vote_id,
         'to_contest_measure_id':            to_contest_measure_id,
         'to_contest_measure_we_vote_id':    to_contest_measure_we_vote_id,
-        'position_entries_moved':           position_entries_moved,
-        'position_entries_not_moved':       position_entries_not_moved,
+        'position_entries_moved':           move_results['positions_moved'],
+        'position_entries_not_moved':       move_results['duplicates_removed'],
     }
     return results
 
@@ -1120,123 +1117,35 @@ def move_positions_to_another_measure(from_contest_measure_id, from_contest_meas
 def move_positions_to_another_office(from_contest_office_id, from_contest_office_we_vote_id,
                                      to_contest_office_id, to_contest_office_we_vote_id, public_or_private):
     status = ''
-    success = True
-    position_entries_moved = 0
-    position_entries_not_moved = 0
-    position_manager = PositionManager()
     position_list_manager = PositionListManager()
 
-    stance_we_are_looking_for = ANY_STANCE
-    most_recent_only = False
-    friends_we_vote_id_list = False
-
-    # Get all positions for the "from_office" that we are moving away from
-    from_position_list = position_list_manager.retrieve_all_positions_for_contest_office(
-        public_or_private, from_contest_office_id, from_contest_office_we_vote_id, stance_we_are_looking_for,
-        most_recent_only, friends_we_vote_id_list)
-
-    # Get all positions for the "to_office" that we need to check
-    to_position_list = position_list_manager.retrieve_all_positions_for_contest_office(
-        public_or_private, to_contest_office_id, to_contest_office_we_vote_id, stance_we_are_looking_for,
-        most_recent_only, friends_we_vote_id_list)
-
-    # Put the organization_we_vote_id's of the orgs that have opinions about this contest office in a simple array
-    # These are existing positions attached to the contest office we are going to keep
-    to_organization_we_vote_ids = []
-    to_voter_we_vote_ids = []
-    for position_object in to_position_list:
-        if positive_value_exists(position_object.organization_we_vote_id):
-            to_organization_we_vote_ids.append(position_object.organization_we_vote_id)
-        if positive_value_exists(position_object.voter_we_vote_id):
-            to_voter_we_vote_ids.append(position_object.voter_we_vote_id)
-
-    offices_dict = {}
-    candidates_dict = {}
-    measures_dict = {}
-    organizations_dict = {}
-    voters_by_linked_org_dict = {}
-    voters_dict = {}
-    for position_object in from_position_list:
-        # Check organization_we_vote_ids for duplicate positions
-        # This is a list of positions that we want to migrate to the contest office we are planning to keep
-
-        # If the position is friends only and doesn't have an organization_we_vote_id stored with it,
-        #  we want to check the voter record to see if there is a linked_organization_we_vote_id
-
-        if positive_value_exists(position_object.organization_we_vote_id) or \
-                positive_value_exists(position_object.voter_we_vote_id):
-            if position_object.organization_we_vote_id in to_organization_we_vote_ids:
-                # We have an existing position for the same organization already attached to the "to" contest office,
-                # so just delete the one from "from" contest office
-                # In the future we could see if one has a comment that needs to be saved.
-                try:
-                    position_object.delete()
-                    position_entries_not_moved += 1
-                except Exception:
-                    if public_or_private:
-                        status += \
-                            "MOVE_TO_ANOTHER_CONTEST_OFFICE-UNABLE_TO_DELETE_DUPLICATE_PUBLIC_POSITION-BY_ORGANIZATION "
-                    else:
-                        status += \
-                            "MOVE_TO_ANOTHER_CONTEST_OFFICE-UNABLE_TO_DELETE_DUPLICATE_FRIENDS_POSITION-" \
-                            "BY_ORGANIZATION "
-                    success = False
-                    break  # stop merge, exit for loop
-            elif position_object.voter_we_vote_id in to_voter_we_vote_ids:
-                # We have an existing position for the same voter already attached to the "to" contest office,
-                # so just delete the one from "from" contest office
-                # In the future we could see if one has a comment that needs to be saved.
-                try:
-                    position_object.delete()
-                    position_entries_not_moved += 1
-                except Exception:
-                    if public_or_private:
-                        status += "MOVE_TO_ANOTHER_CONTEST_OFFICE-UNABLE_TO_DELETE_DUPLICATE_PUBLIC_POSITION-BY_VOTER "
-                    else:
-                        status += "MOVE_TO_ANOTHER_CONTEST_OFFICE-UNABLE_TO_DELETE_DUPLICATE_FRIENDS_POSITION-BY_VOTER "
-                    success = False
-                    break  # stop merge, exit for loop
-            else:
-                # Update contest_office's ids for this position
-                position_object.contest_office_id = to_contest_office_id
-                position_object.contest_office_we_vote_id = to_contest_office_we_vote_id
-                try:
-                    position_object.save()
-                    position_entries_moved += 1
-                    # And finally, refresh the position to use the latest information
-                    force_update = True
-                    results = position_manager.refresh_cached_position_info(
-                        position_object, force_update,
-                        offices_dict=offices_dict,
-                        candidates_dict=candidates_dict,
-                        measures_dict=measures_dict,
-                        organizations_dict=organizations_dict,
-                        voters_by_linked_org_dict=voters_by_linked_org_dict,
-                        voters_dict=voters_dict)
-                    offices_dict = results['offices_dict']
-                    candidates_dict = results['candidates_dict']
-                    measures_dict = results['measures_dict']
-                    organizations_dict = results['organizations_dict']
-                    voters_by_linked_org_dict = results['voters_by_linked_org_dict']
-                    voters_dict = results['voters_dict']
-                except Exception:
-                    if public_or_private:
-                        status += "MOVE_TO_ANOTHER_CONTEST_OFFICE-UNABLE_TO_SAVE_NEW_PUBLIC_POSITION "
-                    else:
-                        status += "MOVE_TO_ANOTHER_CONTEST_OFFICE-UNABLE_TO_SAVE_NEW_FRIENDS_POSITION "
-                    success = False
-                    break  # stop merge, exit for loop
+    # If the "to_contest_office" already has a position from the same organization or voter, we delete the one
+    # from the "from_contest_office" instead of moving it
+    move_results = position_list_manager.bulk_reassign_positions(
+        public_or_private,
+        from_filter=position_filter_for_id_or_we_vote_id(
+            'contest_office_id', from_contest_office_id, 'contest_office_we_vote_id', from_contest_office_we_vote_id),
+        to_filter=position_filter_for_id_or_we_vote_id(
+            'contest_office_id', to_contest_office_id, 'contest_office_we_vote_id', to_contest_office_we_vote_id),
+        new_values={
+            'contest_office_id':            to_contest_office_id,
+            'contest_office_we_vote_id':    to_contest_office_we_vote_id,
+        },
+        duplicate_match_field_list=['organization_we_vote_id', 'voter_we_vote_id'],
+        match_value_required=True)
+    status += move_results['status']
+    success = move_results['success']
+
+    if success and positive_value_exists(move_results['positions_moved']):
+        # And finally, refresh the moved positions to use the latest information
+        contest_office_manager = ContestOfficeManager()
+        if positive_value_exists(to_contest_office_id):
+            office_results = contest_office_manager.retrieve_contest_office_from_id(to_contest_office_id)
         else:
-            if public_or_private:
-                status += \
-                    "MOVE_TO_ANOTHER_CONTEST_OFFICE-UNABLE_TO_FIND_ORGANIZATION_OR_VOTER_WE_VOTE_ID_" \
-                    "FOR_PUBLIC_POSITION "
-            else:
-                status += \
-                    "MOVE_TO_ANOTHER_CONTEST_OFFICE-UNABLE_TO_FIND_ORGANIZATION_OR_VOTER_WE_VOTE_ID_" \
-                    "FOR_FRIENDS_POSITION "
-            success = False
-            break  # stop merge, exit for loop
+            office_results = contest_office_manager.retrieve_contest_office_from_we_vote_id(
+                to_contest_office_we_vote_id)
+        if office_results['contest_office_found']:
+            update_all_position_details_from_contest_office(office_results['contest_office'], in_background=False)
 
     results = {
         'status':                           status,
@@ -1245,8 +1154,8 @@ def move_positions_to_another_office(from_contest_office_id, from_contest_office
         'from_contest_office_we_vote_id':   from_contest_office_we_vote_id,
         'to_contest_office_id':             to_contest_office_id,
         'to_contest_office_we_vote_id':     to_contest_office_we_vote_id,
-        'position_entries_moved':           position_entries_moved,
-        'position_entries_not_moved':       position_entries_not_moved,
+        'position_entries_moved':           move_results['positions_moved'],
+        'position_entries_not_moved':       move_results['duplicates_removed'],
     }
     return results
 
@@ -1255,10 +1164,9 @@ def move_positions_to_another_organization(from_organization_id, from_organizati
                                            to_organization_id, to_organization_we_vote_id,
                                            to_voter_id, to_voter_we_vote_id):
     status = ''
-    success = False
+    success = True
     position_entries_moved = 0
     position_entries_not_moved = 0
-    position_manager = PositionManager()
     position_list_manager = PositionListManager()
     organization_manager = OrganizationManager()
     to_organization_name = ""
@@ -1268,140 +1176,40 @@ def move_positions_to_another_organization(from_organization_id, from_organizati
             to_voter_organization = results['organization']
             to_organization_name = to_voter_organization.organization_name
 
-    # Find private positions for the "from_organization" that we are moving away from
-    stance_we_are_looking_for = ANY_STANCE
-    friends_vs_public = FRIENDS_ONLY
-
-    from_position_private_list = position_list_manager.retrieve_all_positions_for_organization(
-        from_organization_id, from_organization_we_vote_id,
-        stance_we_are_looking_for, friends_vs_public)
-
-    for from_position_entry in from_position_private_list:
-        # See if the "to_organization" already has the same entry
-        position_we_vote_id = ""
-        # We do not want the voter information to change this retrieve
-        empty_voter_id = 0
-        empty_voter_we_vote_id = ''
-
-        results = position_manager.retrieve_position_table_unknown(
-            position_we_vote_id, to_organization_id, to_organization_we_vote_id,
-            empty_voter_id,
-            from_position_entry.contest_office_id, from_position_entry.candidate_campaign_id,
-            from_position_entry.contest_measure_id,
-            empty_voter_we_vote_id,
-            from_position_entry.contest_office_we_vote_id,
-            from_position_entry.candidate_campaign_we_vote_id, from_position_entry.contest_measure_we_vote_id)
-
-        if results['position_found']:
-            # Look to see if there is a statement that can be preserved (i.e., moved from from_position to to_position
-            to_position_entry = results['position']
-            if not positive_value_exists(to_position_entry.statement_html):
-                # If the "to_position" does NOT have a statement_html, we look to see if the "from_position" has one
-                # we can use
-                if positive_value_exists(from_position_entry.statement_html):
-                    to_position_entry.statement_html = from_position_entry.statement_html
-            if not positive_value_exists(to_position_entry.statement_text):
-                # If the "to_position" does NOT have a statement_html, we look to see if the "from_position" has one
-                # we can use
-                if positive_value_exists(from_position_entry.statement_text):
-                    to_position_entry.statement_text = from_position_entry.statement_text
-            # Update the voter values to the new "to" voter
-            to_position_entry.voter_id = to_voter_id
-            to_position_entry.voter_we_vote_id = to_voter_we_vote_id
-            try:
-                to_position_entry.save()
-            except Exception as e:
-                pass
-        else:
-            # Change the position values to the new we_vote_id
-            try:
-                if positive_value_exists(to_organization_name):
-                    from_position_entry.speaker_display_name = to_organization_name
-                from_position_entry.organization_id = to_organization_id
-                from_position_entry.organization_we_vote_id = to_organization_we_vote_id
-                from_position_entry.voter_id = to_voter_id
-                from_position_entry.voter_we_vote_id = to_voter_we_vote_id
-                from_position_entry.save()
-                position_entries_moved += 1
-            except Exception as e:
-                position_entries_not_moved += 1
-
-    from_position_private_list_remaining = position_list_manager.retrieve_all_positions_for_organization(
-        from_organization_id, from_organization_we_vote_id,
-        stance_we_are_looking_for, friends_vs_public)
-    for from_position_entry in from_position_private_list_remaining:
-        # Delete the remaining position values
-        try:
-            from_position_entry.delete()
-        except Exception as e:
-            pass
-
-    # Find public positions for the "from_voter" that we are moving away from
-    stance_we_are_looking_for = ANY_STANCE
-    friends_vs_public = PUBLIC_ONLY
-    from_position_public_list = position_list_manager.retrieve_all_positions_for_organization(
-        from_organization_id, from_organization_we_vote_id,
-        stance_we_are_looking_for, friends_vs_public)
-
-    for from_position_entry in from_position_public_list:
-        # See if the "to_organization" already has the same entry
-        position_we_vote_id = ""
-        # We do not want the voter information to change this retrieve
-        empty_voter_id = 0
-        empty_voter_we_vote_id = ''
-        results = position_manager.retrieve_position_table_unknown(
-            position_we_vote_id, to_organization_id, to_organization_we_vote_id,
-            empty_voter_id,
-            from_position_entry.contest_office_id, from_position_entry.candidate_campaign_id,
-            from_position_entry.contest_measure_id,
-            empty_voter_we_vote_id,
-            from_position_entry.contest_office_we_vote_id,
-            from_position_entry.candidate_campaign_we_vote_id, from_position_entry.contest_measure_we_vote_id)
-
-        if results['position_found']:
-            # Look to see if there is a statement that can be preserved
-            to_position_entry = results['position']
-            if not positive_value_exists(to_position_entry.statement_html):
-                # If the "to_position" does NOT have a statement_html, we look to see if the "from_position" has one
-                # we can use
-                if positive_value_exists(from_position_entry.statement_html):
-                    to_position_entry.statement_html = from_position_entry.statement_html
-            if not positive_value_exists(to_position_entry.statement_text):
-                # If the "to_position" does NOT have a statement_html, we look to see if the "from_position" has one
-                # we can use
-                if positive_value_exists(from_position_entry.statement_text):
-                    to_position_entry.statement_text = from_position_entry.statement_text
-            # Update the voter values to the new "to" voter
-            to_position_entry.voter_id = to_voter_id
-            to_position_entry.voter_we_vote_id = to_voter_we_vote_id
-            try:
-                to_position_entry.save()
-            except Exception as e:
-                pass
-        else:
-            # Change the position values to the new we_vote_id
-            try:
-                if positive_value_exists(to_organization_name):
-                    from_position_entry.speaker_display_name = to_organization_name
-                from_position_entry.organization_id = to_organization_id
-                from_position_entry.organization_we_vote_id = to_organization_we_vote_id
-                from_position_entry.voter_id = to_voter_id
-                from_position_entry.voter_we_vote_id = to_voter_we_vote_id
-                from_position_entry.save()
-                position_entries_moved += 1
-            except Exception as e:
-                position_entries_not_moved += 1
-
-    from_position_public_list_remaining = position_list_manager.retrieve_all_positions_for_organization(
-        from_organization_id, from_organization_we_vote_id,
-        stance_we_are_looking_for, friends_vs_public)
-    for from_position_entry in from_position_public_list_remaining:
-        # Delete the remaining position values
-        try:
-            # Leave this turned off until testing is finished
-            from_position_entry.delete()
-        except Exception as e:
-            pass
+    new_values = {
+        'organization_id':          to_organization_id,
+        'organization_we_vote_id':  to_organization_we_vote_id,
+        'voter_id':                 to_voter_id,
+        'voter_we_vote_id':         to_voter_we_vote_id,
+    }
+    if positive_value_exists(to_organization_name):
+        new_values['speaker_display_name'] = to_organization_name
+
+    # Move the private positions first, then the public positions. If the "to_organization" already has a position
+    # on the same ballot item (in either table), we keep that one, preserve the "from" statement if the "to" position
+    # doesn't have one, and delete the "from" position.
+    for retrieve_public_positions in (False, True):
+        move_results = position_list_manager.bulk_reassign_positions(
+            retrieve_public_positions,
+            from_filter=position_filter_for_id_or_we_vote_id(
+                'organization_id', from_organization_id, 'organization_we_vote_id', from_organization_we_vote_id),
+            to_filter=position_filter_for_id_or_we_vote_id(
+                'organization_id', to_organization_id, 'organization_we_vote_id', to_organization_we_vote_id),
+            new_values=new_values,
+            duplicate_match_field_list=['candidate_campaign_we_vote_id', 'contest_measure_we_vote_id',
+                                        'contest_office_we_vote_id'],
+            match_on_first_value_only=True,
+            duplicate_in_either_table=True,
+            merge_duplicate_statements=True,
+            duplicate_values={
+                'voter_id':         to_voter_id,
+                'voter_we_vote_id': to_voter_we_vote_id,
+            })
+        status += move_results['status']
+        if not move_results['success']:
+            success = False
+        position_entries_moved += move_results['positions_moved']
+        position_entries_not_moved += move_results['duplicates_removed']
 
     results = {
         'status':                       status,
@@ -1423,7 +1231,6 @@ def move_positions_to_another_voter(from_voter_id, from_voter_we_vote_id,
     success = False
     position_entries_moved = 0
     position_entries_not_moved = 0
-    position_manager = PositionManager()
     position_list_manager = PositionListManager()
     organization_manager = OrganizationManager()
     to_organization_name = ""
@@ -1462,143 +1269,41 @@ def move_positions_to_another_voter(from_voter_id, from_voter_we_vote_id,
             to_voter_organization = results['organization']
             to_organization_name = to_voter_organization.organization_name
 
-    # Find private positions for the "from_voter" that we are moving away from
-    stance_we_are_looking_for = ANY_STANCE
-    friends_vs_public = FRIENDS_ONLY
-    from_position_private_list_results = position_list_manager.retrieve_all_positions_for_voter(
-        from_voter_id, from_voter_we_vote_id,
-        stance_we_are_looking_for, friends_vs_public)
-    from_position_private_list = from_position_private_list_results['position_list']
-
-    position_we_vote_id = ""
-    # We don't want the organization_id to affect the retrieve
-    empty_organization_id = 0
-    empty_organization_we_vote_id = 0
-    for from_position_entry in from_position_private_list:
-        # See if the "to_voter" already has the same entry
-        results = position_manager.retrieve_position_table_unknown(
-            position_we_vote_id, empty_organization_id, empty_organization_we_vote_id,
-            to_voter_id,
-            from_position_entry.contest_office_id, from_position_entry.candidate_campaign_id,
-            from_position_entry.contest_measure_id,
-            to_voter_we_vote_id,
-            from_position_entry.contest_office_we_vote_id,
-            from_position_entry.candidate_campaign_we_vote_id, from_position_entry.contest_measure_we_vote_id)
-
-        if results['position_found']:
-            # Look to see if there is a statement that can be preserved (i.e., moved from from_position to to_position
-            to_position_entry = results['position']
-            if not positive_value_exists(to_position_entry.statement_html):
-                # If the "to_position" does NOT have a statement_html, we look to see if the "from_position" has one
-                # we can use
-                if positive_value_exists(from_position_entry.statement_html):
-                    to_position_entry.statement_html = from_position_entry.statement_html
-            if not positive_value_exists(to_position_entry.statement_text):
-                # If the "to_position" does NOT have a statement_html, we look to see if the "from_position" has one
-                # we can use
-                if positive_value_exists(from_position_entry.statement_text):
-                    to_position_entry.statement_text = from_position_entry.statement_text
-            # Update the organization values
-            to_position_entry.organization_we_vote_id = to_voter_linked_organization_we_vote_id
-            to_position_entry.organization_id = to_voter_linked_organization_id
-            try:
-                to_position_entry.save()
-            except Exception as e:
-                status += "MOVE_TO_ANOTHER_VOTER-UNABLE_TO_SAVE_FRIENDS_ONLY_ORGANIZATION_UPDATE "
-        else:
-            # Change the position values to the new values
-            try:
-                if positive_value_exists(to_organization_name):
-                    from_position_entry.speaker_display_name = to_organization_name
-                from_position_entry.organization_id = to_voter_linked_organization_id
-                from_position_entry.organization_we_vote_id = to_voter_linked_organization_we_vote_id
-                from_position_entry.voter_id = to_voter_id
-                from_position_entry.voter_we_vote_id = to_voter_we_vote_id
-                from_position_entry.save()
-                position_entries_moved += 1
-            except Exception as e:
-                status += "MOVE_TO_ANOTHER_VOTER-UNABLE_TO_SAVE_FRIENDS_ONLY_ORGANIZATION_UPDATE2 "
-                position_entries_not_moved += 1
-
-    from_position_private_list_remaining_results = position_list_manager.retrieve_all_positions_for_voter(
-        from_voter_id, from_voter_we_vote_id,
-        stance_we_are_looking_for, friends_vs_public)
-    from_position_private_list_remaining = from_position_private_list_remaining_results['position_list']
-    for from_position_entry in from_position_private_list_remaining:
-        # Delete the remaining position values
-        try:
-            from_position_entry.delete()
-        except Exception as e:
-            pass
-
-    # Find public positions for the "from_voter" that we are moving away from
-    stance_we_are_looking_for = ANY_STANCE
-    friends_vs_public = PUBLIC_ONLY
-    from_position_public_results = position_list_manager.retrieve_all_positions_for_voter(
-        from_voter_id, from_voter_we_vote_id,
-        stance_we_are_looking_for, friends_vs_public)
-    from_position_public_list = from_position_public_results['position_list']
-
-    position_we_vote_id = ""
-    # We don't want the organization_id to affect the retrieve
-    empty_organization_id = 0
-    empty_organization_we_vote_id = 0
-    for from_position_entry in from_position_public_list:
-        # See if the "to_voter" already has the same entry
-        results = position_manager.retrieve_position_table_unknown(
-            position_we_vote_id, empty_organization_id, empty_organization_we_vote_id,
-            to_voter_id,
-            from_position_entry.contest_office_id, from_position_entry.candidate_campaign_id,
-            from_position_entry.contest_measure_id,
-            to_voter_we_vote_id,
-            from_position_entry.contest_office_we_vote_id,
-            from_position_entry.candidate_campaign_we_vote_id, from_position_entry.contest_measure_we_vote_id)
-
-        if results['position_found']:
-            # Look to see if there is a statement that can be preserved
-            to_position_entry = results['position']
-            if not positive_value_exists(to_position_entry.statement_html):
-                # If the "to_position" does NOT have a statement_html, we look to see if the "from_position" has one
-                # we can use
-                if positive_value_exists(from_position_entry.statement_html):
-                    to_position_entry.statement_html = from_position_entry.statement_html
-            if not positive_value_exists(to_position_entry.statement_text):
-                # If the "to_position" does NOT have a statement_html, we look to see if the "from_position" has one
-                # we can use
-                if positive_value_exists(from_position_entry.statement_text):
-                    to_position_entry.statement_text = from_position_entry.statement_text
-            # Update the organization values
-            to_position_entry.organization_we_vote_id = to_voter_linked_organization_we_vote_id
-            to_position_entry.organization_id = to_voter_linked_organization_id
-            try:
-                to_position_entry.save()
-            except Exception as e:
-                status += "MOVE_TO_ANOTHER_VOTER-UNABLE_TO_SAVE_PUBLIC_ORGANIZATION_UPDATE "
-        else:
-            # Change the position values to the new we_vote_id
-            try:
-                if positive_value_exists(to_organization_name):
-                    from_position_entry.speaker_display_name = to_organization_name
-                from_position_entry.organization_id = to_voter_linked_organization_id
-                from_position_entry.organization_we_vote_id = to_voter_linked_organization_we_vote_id
-                from_position_entry.voter_id = to_voter_id
-                from_position_entry.voter_we_vote_id = to_voter_we_vote_id
-                from_position_entry.save()
-                position_entries_moved += 1
-            except Exception as e:
-                position_entries_not_moved += 1
-                status += "MOVE_TO_ANOTHER_VOTER-UNABLE_TO_SAVE_PUBLIC_ORGANIZATION_UPDATE2 "
+    new_values = {
+        'organization_id':          to_voter_linked_organization_id,
+        'organization_we_vote_id':  to_voter_linked_organization_we_vote_id,
+        'voter_id':                 to_voter_id,
+        'voter_we_vote_id':         to_voter_we_vote_id,
+    }
+    if positive_value_exists(to_organization_name):
+        new_values['speaker_display_name'] = to_organization_name
 
-    from_position_public_results = position_list_manager.retrieve_all_positions_for_voter(
-        from_voter_id, from_voter_we_vote_id,
-        stance_we_are_looking_for, friends_vs_public)
-    from_position_public_list_remaining = from_position_public_results['position_list']
-    for from_position_entry in from_position_public_list_remaining:
-        # Delete the remaining position values
-        try:
-            from_position_entry.delete()
-        except Exception as e:
-            pass
+    # Move the private positions first, then the public positions. If the "to_voter" already has a position
+    # on the same ballot item (in either table), we keep that one, preserve the "from" statement if the "to" position
+    # doesn't have one, and delete the "from" position.
+    success = True
+    for retrieve_public_positions in (False, True):
+        move_results = position_list_manager.bulk_reassign_positions(
+            retrieve_public_positions,
+            from_filter=position_filter_for_id_or_we_vote_id(
+                'voter_id', from_voter_id, 'voter_we_vote_id', from_voter_we_vote_id),
+            to_filter=position_filter_for_id_or_we_vote_id(
+                'voter_id', to_voter_id, 'voter_we_vote_id', to_voter_we_vote_id),
+            new_values=new_values,
+            duplicate_match_field_list=['candidate_campaign_we_vote_id', 'contest_measure_we_vote_id',
+                                        'contest_office_we_vote_id'],
+            match_on_first_value_only=True,
+            duplicate_in_either_table=True,
+            merge_duplicate_statements=True,
+            duplicate_values={
+                'organization_id':          to_voter_linked_organization_id,
+                'organization_we_vote_id':  to_voter_linked_organization_we_vote_id,
+            })
+        status += move_results['status']
+        if not move_results['success']:
+            success = False
+        position_entries_moved += move_results['positions_moved']
+        position_entries_not_moved += move_results['duplicates_removed']
 
     results = {
         'status':                       status,
@@ -2149,11 +1854,7 @@ def position_list_for_ballot_item_for_api(voter_device_id, friends_vs_public,  #
         # there are any positions for this ballot_item (which would include both the id and we_vote_id),
         # we retrieve the following so we can get the ballot item's id and we_vote_id (per the request of
         # the WebApp team)
-        candidate_campaign_manager = CandidateCampaignManager()
-        if positive_value_exists(candidate_id):
-            results = candidate_campaign_manager.retrieve_candidate_campaign_from_id(candidate_id)
-        else:
-            results = candidate_campaign_manager.retrieve_candidate_campaign_from_we_vote_id(candidate_we_vote_id)
+        results = retrieve_candidate_campaign_from_snapshot(candidate_id, candidate_we_vote_id)
 
         if results['candidate_campaign_found']:
             candidate_campaign = results['candidate_campaign']
@@ -2200,11 +1901,7 @@ def position_list_for_ballot_item_for_api(voter_device_id, friends_vs_public,  #
         # Since we want to return the id and we_vote_id, and we don't know for sure that there are any positions
         # for this ballot_item, we retrieve the following so we can get the id and we_vote_id (per the request of
         # the WebApp team)
-        contest_measure_manager = ContestMeasureManager()
-        if positive_value_exists(measure_id):
-            results = contest_measure_manager.retrieve_contest_measure_from_id(measure_id)
-        else:
-            results = contest_measure_manager.retrieve_contest_measure_from_we_vote_id(measure_we_vote_id)
+        results = retrieve_contest_measure_from_snapshot(measure_id, measure_we_vote_id)
 
         if results['contest_measure_found']:
             contest_measure = results['contest_measure']
@@ -2250,11 +1947,7 @@ def position_list_for_ballot_item_for_api(voter_device_id, friends_vs_public,  #
         # there are any positions for this ballot_item (which would include both the id and we_vote_id),
         # we retrieve the following so we can get the ballot item's id and we_vote_id (per the request of
         # the WebApp team)
-        contest_office_manager = ContestOfficeManager()
-        if positive_value_exists(office_id):
-            results = contest_office_manager.retrieve_contest_office_from_id(office_id)
-        else:
-            results = contest_office_manager.retrieve_contest_office_from_we_vote_id(office_we_vote_id)
+        results = retrieve_contest_office_from_snapshot(office_id, office_we_vote_id)
 
         if results['contest_office_found']:
             contest_office = results['contest_office']
@@ -2316,21 +2009,26 @@ def position_list_for_ballot_item_for_api(voter_device_id, friends_vs_public,  #
     positions_count = len(position_objects)
 
     # We need the linked_organization_we_vote_id so we can remove the viewer's positions from the list.
-    linked_organization_we_vote_id = ""
-    if positive_value_exists(positions_count):
-        voter_manager = VoterManager()
-        results = voter_manager.retrieve_voter_by_id(voter_id)
-        if results['voter_found']:
-            voter = results['voter']
-            linked_organization_we_vote_id = voter.linked_organization_we_vote_id
+    # The voter was retrieved above, so we don't need to retrieve it again.
+    linked_organization_we_vote_id = voter.linked_organization_we_vote_id
+
+    # Retrieve the organizations, voters and ballot items needed to fill in missing cached information
+    # in one query per kind of object, instead of one query per position
+    positions_needing_refresh = [one_position for one_position in position_objects
+                                 if position_manager.cached_position_info_is_missing(one_position)]
+    if len(positions_needing_refresh):
+        cached_info_results = position_manager.retrieve_cached_position_info_dicts(positions_needing_refresh)
+        status += cached_info_results['status']
+    else:
+        cached_info_results = {}
+    offices_dict = cached_info_results.get('offices_dict', {})
+    candidates_dict = cached_info_results.get('candidates_dict', {})
+    measures_dict = cached_info_results.get('measures_dict', {})
+    organizations_dict = cached_info_results.get('organizations_dict', {})
+    voters_by_linked_org_dict = cached_info_results.get('voters_by_linked_org_dict', {})
+    voters_dict = cached_info_results.get('voters_dict', {})
 
     position_list = []
-    offices_dict = {}
-    candidates_dict = {}
-    measures_dict = {}
-    organizations_dict = {}
-    voters_by_linked_org_dict = {}
-    voters_dict = {}
     for one_position in position_objects:
         # Is there sufficient information in the position to display it?
         some_data_exists = True if one_position.is_support() \
@@ -2696,13 +2394,25 @@ def position_list_for_opinion_maker_for_api(voter_device_id,  # positionListForO
 
     position_list = []
     all_elections_that_have_positions = []
-    offices_dict = {}
-    candidates_dict = {}
-    measures_dict = {}
-    organizations_dict = {}
-    voters_by_linked_org_dict = {}
-    voters_dict = {}
     status += "POSITION_LIST_RAW_COUNT: " + str(len(position_list_raw)) + " "
+
+    # Retrieve the organizations, voters and ballot items needed to fill in missing cached information
+    # in one query per kind of object, instead of one query per position
+    positions_needing_refresh = [
+        one_position for one_position in position_list_raw
+        if position_manager.cached_position_info_is_missing(one_position)
+        or position_manager.position_speaker_name_needs_repair(one_position, opinion_maker_display_name)]
+    if len(positions_needing_refresh):
+        cached_info_results = position_manager.retrieve_cached_position_info_dicts(positions_needing_refresh)
+        status += cached_info_results['status']
+    else:
+        cached_info_results = {}
+    offices_dict = cached_info_results.get('offices_dict', {})
+    candidates_dict = cached_info_results.get('candidates_dict', {})
+    measures_dict = cached_info_results.get('measures_dict', {})
+    organizations_dict = cached_info_results.get('organizations_dict', {})
+    voters_by_linked_org_dict = cached_info_results.get('voters_by_linked_org_dict', {})
+    voters_dict = cached_info_results.get('voters_dict', {})
     for one_position in position_list_raw:
         # Whose position is it?
         missing_ballot_item_image = False
@@ -3485,7 +3195,8 @@ def voter_position_retrieve_for_api(voter_device_id, office_we_vote_id, candidat
 
 # We retrieve the position for this voter for all ballot items. Could just be the stance, but for now we are
 # retrieving the entire position
-def voter_all_positions_retrieve_for_api(voter_device_id, google_civic_election_id):  # voterAllPositionsRetrieve
+def voter_all_positions_retrieve_for_api(voter_device_id, google_civic_election_id,  # voterAllPositionsRetrieve
+                                         after_position_key='', page_size=0):
     results = is_voter_device_id_valid(voter_device_id)
     if not results['success']:
         json_data = {
@@ -3493,6 +3204,7 @@ def voter_all_positions_retrieve_for_api(voter_device_id, google_civic_election_
             'success':                  False,
             'position_list_found':      False,
             'position_list':            [],
+            'next_position_key':        '',
         }
         return HttpResponse(json.dumps(json_data), content_type='application/json')
 
@@ -3503,14 +3215,23 @@ def voter_all_positions_retrieve_for_api(voter_device_id, google_civic_election_
             'success':                  False,
             'position_list_found':      False,
             'position_list':            [],
+            'next_position_key':        '',
         }
         return HttpResponse(json.dumps(json_data), content_type='application/json')
 
     position_list_manager = PositionListManager()
     voter_we_vote_id = ''
+    # Paging is opt-in, so callers that don't ask for a page still get every position
+    if positive_value_exists(page_size):
+        page_size = min(convert_to_int(page_size), VOTER_POSITIONS_PAGE_SIZE)
+    elif positive_value_exists(after_position_key):
+        page_size = VOTER_POSITIONS_PAGE_SIZE
+    else:
+        page_size = 0
 
-    results = position_list_manager.retrieve_all_positions_for_voter_simple(voter_id, voter_we_vote_id,
-                                                                            google_civic_election_id)
+    results = position_list_manager.retrieve_all_positions_for_voter_simple(
+        voter_id, voter_we_vote_id, google_civic_election_id,
+        after_position_key=after_position_key, page_size=page_size)
 
     if results['position_list_found']:
         position_list = results['position_list']
@@ -3519,14 +3240,17 @@ def voter_all_positions_retrieve_for_api(voter_device_id, google_civic_election_
             'success':                  True,
             'position_list_found':      True,
             'position_list':            position_list,
+            'next_position_key':        results['next_position_key'],
         }
         return HttpResponse(json.dumps(json_data), content_type='application/json')
     else:
         json_data = {
-            'status':                   "VOTER_POSITIONS_NOT_FOUND-NONE_EXIST",
-            'success':                  True,
+            'status':                   "VOTER_POSITIONS_NOT_FOUND-NONE_EXIST" if results['success']
+            else results['status'],
+            'success':                  results['success'],
             'position_list_found':      False,
             'position_list':            [],
+            'next_position_key':        results['next_position_key'],
         }
         return HttpResponse(json.dumps(json_data), content_type='application/json')
 
@@ -3909,19 +3633,34 @@ def voter_position_visibility_save_for_api(  # voterPositionVisibilitySave
         return json_data
 
 
-def refresh_cached_position_info_for_election(google_civic_election_id, state_code=''):
+def refresh_cached_position_info_for_election(google_civic_election_id, state_code='', bulk_refresh=True):
+    """
+    :param google_civic_election_id:
+    :param state_code:
+    :param bulk_refresh: Update the cached columns with set-based UPDATEs, and only count rows that changed.
+      When False, refresh and save each position one at a time.
+    :return:
+    """
     google_civic_election_id = convert_to_int(google_civic_election_id)
 
     position_list_manager = PositionListManager()
 
-    results = position_list_manager.refresh_cached_position_info_for_election(google_civic_election_id, state_code)
+    if bulk_refresh:
+        results = position_list_manager.bulk_refresh_cached_position_info_for_election(
+            google_civic_election_id, state_code)
+    else:
+        results = position_list_manager.refresh_cached_position_info_for_election(
+            google_civic_election_id, state_code)
+    success = results['success']
     public_positions_updated = results['public_positions_updated']
     friends_only_positions_updated = results['friends_only_positions_updated']
 
     status = "REFRESH_CACHED_POSITION_INFO_FOR_ELECTION-public:" + str(public_positions_updated) + \
              ",friends_only:" + str(friends_only_positions_updated)
+    if not success:
+        status += " " + results['status']
     results = {
-        'success':                          True,
+        'success':                          success,
         'status':                           status,
         'public_positions_updated':         public_positions_updated,
         'friends_only_positions_updated':   friends_only_positions_updated,
@@ -3929,11 +3668,27 @@ def refresh_cached_position_info_for_election(google_civic_election_id, state_co
     return results
 
 
-def refresh_positions_with_candidate_details_for_election(google_civic_election_id, state_code):
+def refresh_positions_with_candidate_details_for_election(google_civic_election_id, state_code,
+                                                          bulk_refresh=True):
     update_all_positions_results = []
     positions_updated_count = 0
     google_civic_election_id = convert_to_int(google_civic_election_id)
 
+    if bulk_refresh and positive_value_exists(google_civic_election_id):
+        position_list_manager = PositionListManager()
+        bulk_results = position_list_manager.bulk_refresh_cached_position_info_for_election(
+            google_civic_election_id, state_code, refresh_candidates=True, refresh_offices=False,
+            refresh_measures=False, refresh_speakers=False)
+        positions_updated_count = bulk_results['rows_updated']['candidate']
+        results = {
+            'success':                      bulk_results['success'],
+            'status':                       "POSITION_WITH_CANDIDATE_DETAILS_BULK_UPDATED " +
+                                            bulk_results['status'],
+            'positions_updated_count':      positions_updated_count,
+            'update_all_positions_results': update_all_positions_results,
+        }
+        return results
+
     candidate_list_manager = CandidateCampaignListManager()
     return_list_of_objects = True
     candidates_results = candidate_list_manager.retrieve_all_candidates_for_upcoming_election(
@@ -3956,11 +3711,27 @@ def refresh_positions_with_candidate_details_for_election(google_civic_election_
     return results
 
 
-def refresh_positions_with_contest_office_details_for_election(google_civic_election_id, state_code):
+def refresh_positions_with_contest_office_details_for_election(google_civic_election_id, state_code,
+                                                               bulk_refresh=True):
     update_all_positions_results = []
     positions_updated_count = 0
     google_civic_election_id = convert_to_int(google_civic_election_id)
 
+    if bulk_refresh and positive_value_exists(google_civic_election_id):
+        position_list_manager = PositionListManager()
+        bulk_results = position_list_manager.bulk_refresh_cached_position_info_for_election(
+            google_civic_election_id, state_code, refresh_candidates=False, refresh_offices=True,
+            refresh_measures=False, refresh_speakers=False)
+        positions_updated_count = bulk_results['rows_updated']['office']
+        results = {
+            'success':                      bulk_results['success'],
+            'status':                       "POSITION_WITH_CONTEST_OFFICE_DETAILS_BULK_UPDATED " +
+                                            bulk_results['status'],
+            'positions_updated_count':      positions_updated_count,
+            'update_all_positions_results': update_all_positions_results,
+        }
+        return results
+
     contest_office_list_manager = ContestOfficeListManager()
     return_list_of_objects = True
     contest_offices_results = contest_office_list_manager.retrieve_all_offices_for_upcoming_election(
@@ -3983,11 +3754,27 @@ def refresh_positions_with_contest_office_details_for_election(google_civic_elec
     return results
 
 
-def refresh_positions_with_contest_measure_details_for_election(google_civic_election_id, state_code):
+def refresh_positions_with_contest_measure_details_for_election(google_civic_election_id, state_code,
+                                                                bulk_refresh=True):
     update_all_positions_results = []
     positions_updated_count = 0
     google_civic_election_id = convert_to_int(google_civic_election_id)
 
+    if bulk_refresh and positive_value_exists(google_civic_election_id):
+        position_list_manager = PositionListManager()
+        bulk_results = position_list_manager.bulk_refresh_cached_position_info_for_election(
+            google_civic_election_id, state_code, refresh_candidates=False, refresh_offices=False,
+            refresh_measures=True, refresh_speakers=False)
+        positions_updated_count = bulk_results['rows_updated']['measure']
+        results = {
+            'success':                      bulk_results['success'],
+            'status':                       "POSITION_WITH_CONTEST_MEASURE_DETAILS_BULK_UPDATED " +
+                                            bulk_results['status'],
+            'positions_updated_count':      positions_updated_count,
+            'update_all_positions_results': update_all_positions_results,
+        }
+        return results
+
     contest_measure_list_manager = ContestMeasureList()
     return_list_of_objects = True
     contest_measures_results = contest_measure_list_manager.retrieve_all_measures_for_upcoming_election(
@@ -4274,331 +4061,281 @@ def retrieve_ballot_item_we_vote_ids_for_organization_static(
     return results
 
 
-def reset_all_position_image_details_from_candidate(candidate_campaign, twitter_profile_image_url_https):
+def propagate_cached_values_to_positions(kind_of_source, source_id, source_we_vote_id, changed_values,
+                                         update_public_positions=True, update_friends_positions=True,
+                                         in_background=None):
+    """
+    Push changed candidate, office, measure, organization or voter values into the position tables, either now or
+    from the background task worker.
+    :param kind_of_source: CANDIDATE, OFFICE, MEASURE, ORGANIZATION or VOTER
+    :param source_id:
+    :param source_we_vote_id:
+    :param changed_values: key = position field name, value = new value
+    :param update_public_positions:
+    :param update_friends_positions:
+    :param in_background: Leave as None to use the POSITION_CACHE_PROPAGATION_IN_BACKGROUND setting
+    :return:
+    """
+    if in_background is None:
+        in_background = positive_value_exists(POSITION_CACHE_PROPAGATION_IN_BACKGROUND)
+    if in_background and len(changed_values):
+        propagate_cached_values_to_positions_task(
+            kind_of_source, source_id, source_we_vote_id, changed_values,
+            update_public_positions=update_public_positions, update_friends_positions=update_friends_positions)
+        results = {
+            'success':                      True,
+            'status':                       "PROPAGATE_CACHED_VALUES_QUEUED ",
+            'public_positions_updated':     0,
+            'friends_positions_updated':    0,
+            'positions_updated_count':      0,
+        }
+        return results
+
+    position_list_manager = PositionListManager()
+    return position_list_manager.propagate_cached_values_to_positions(
+        kind_of_source, source_id, source_we_vote_id, changed_values,
+        update_public_positions=update_public_positions, update_friends_positions=update_friends_positions)
+
+
+def reset_all_position_image_details_from_candidate(candidate_campaign, twitter_profile_image_url_https,
+                                                    in_background=None):
     """
     Reset all position image urls PositionEntered and PositionForFriends from candidate details
     :param candidate_campaign:
     :param twitter_profile_image_url_https
+    :param in_background:
     :return:
     """
-    position_list_manager = PositionListManager()
-    position_manager = PositionManager()
-    reset_all_position_image_urls_results = []
-
-    retrieve_public_positions = True
-    public_position_list = position_list_manager.retrieve_all_positions_for_candidate_campaign(
-        retrieve_public_positions, candidate_campaign.id, candidate_campaign.we_vote_id)
-    for position_object in public_position_list:
-        reset_position_image_urls_results = position_manager.reset_position_image_details(
-            position_object, twitter_profile_image_url_https)
-        reset_all_position_image_urls_results.append(reset_position_image_urls_results)
-
-    retrieve_public_positions = False
-    friends_position_list = position_list_manager.retrieve_all_positions_for_candidate_campaign(
-        retrieve_public_positions, candidate_campaign.id, candidate_campaign.we_vote_id,
-        retrieve_all_admin_override=True)
-    for position_object in friends_position_list:
-        reset_position_image_urls_results = position_manager.reset_position_image_details(
-            position_object, twitter_profile_image_url_https)
-        reset_all_position_image_urls_results.append(reset_position_image_urls_results)
+    changed_values = {}
+    if positive_value_exists(twitter_profile_image_url_https):
+        changed_values = {
+            'ballot_item_image_url_https':          twitter_profile_image_url_https,
+            'ballot_item_image_url_https_large':    '',
+            'ballot_item_image_url_https_medium':   '',
+            'ballot_item_image_url_https_tiny':     '',
+        }
+    propagate_results = propagate_cached_values_to_positions(
+        CANDIDATE, candidate_campaign.id, candidate_campaign.we_vote_id, changed_values, in_background=in_background)
 
     results = {
-        'success':                     True,
-        'reset_all_position_results':  reset_all_position_image_urls_results
+        'success':                     propagate_results['success'],
+        'reset_all_position_results':  [propagate_results],
     }
     return results
 
 
-def update_all_position_details_from_candidate(candidate_campaign):
+def update_all_position_details_from_candidate(candidate_campaign, in_background=None):
     """
     Update all position image urls PositionEntered and PositionForFriends from candidate details
     :param candidate_campaign:
+    :param in_background:
     :return:
     """
-    position_list_manager = PositionListManager()
-    position_manager = PositionManager()
-    positions_updated_count = 0
-    positions_not_updated_count = 0
-    update_all_position_image_urls_results = []
-    update_all_position_candidate_data_results = []
-
-    retrieve_public_positions = True
-    public_position_list = position_list_manager.retrieve_all_positions_for_candidate_campaign(
-        retrieve_public_positions, candidate_campaign.id, candidate_campaign.we_vote_id)
-    for position_object in public_position_list:
-        update_position_image_urls_results = position_manager.update_position_image_urls_from_candidate(
-            position_object, candidate_campaign)
-        update_all_position_image_urls_results.append(update_position_image_urls_results)
-        update_position_candidate_data_results = position_manager.update_position_ballot_data_from_candidate(
-            position_object, candidate_campaign)
-        update_all_position_candidate_data_results.append(update_position_candidate_data_results)
-        if update_position_image_urls_results['success'] and update_position_candidate_data_results['success']:
-            positions_updated_count += 1
-        else:
-            positions_not_updated_count += 1
-
-    retrieve_public_positions = False
-    friends_position_list = position_list_manager.retrieve_all_positions_for_candidate_campaign(
-        retrieve_public_positions, candidate_campaign.id, candidate_campaign.we_vote_id,
-        retrieve_all_admin_override=True)
-    for position_object in friends_position_list:
-        update_position_image_urls_results = position_manager.update_position_image_urls_from_candidate(
-            position_object, candidate_campaign)
-        update_all_position_image_urls_results.append(update_position_image_urls_results)
-        update_position_candidate_data_results = position_manager.update_position_ballot_data_from_candidate(
-            position_object, candidate_campaign)
-        update_all_position_candidate_data_results.append(update_position_candidate_data_results)
-        if update_position_image_urls_results['success'] and update_position_candidate_data_results['success']:
-            positions_updated_count += 1
-        else:
-            positions_not_updated_count += 1
-
-    update_all_position_results = [update_all_position_image_urls_results, update_all_position_candidate_data_results]
+    changed_values = {}
+    if positive_value_exists(candidate_campaign.candidate_photo_url()):
+        changed_values['ballot_item_image_url_https'] = candidate_campaign.candidate_photo_url()
+    if positive_value_exists(candidate_campaign.we_vote_hosted_profile_image_url_large):
+        changed_values['ballot_item_image_url_https_large'] = candidate_campaign.we_vote_hosted_profile_image_url_large
+    if positive_value_exists(candidate_campaign.we_vote_hosted_profile_image_url_medium):
+        changed_values['ballot_item_image_url_https_medium'] = \
+            candidate_campaign.we_vote_hosted_profile_image_url_medium
+    if positive_value_exists(candidate_campaign.we_vote_hosted_profile_image_url_tiny):
+        changed_values['ballot_item_image_url_https_tiny'] = candidate_campaign.we_vote_hosted_profile_image_url_tiny
+    if positive_value_exists(candidate_campaign.candidate_name):
+        changed_values['ballot_item_display_name'] = candidate_campaign.candidate_name
+    if positive_value_exists(candidate_campaign.candidate_twitter_handle):
+        changed_values['ballot_item_twitter_handle'] = candidate_campaign.candidate_twitter_handle
+    propagate_results = propagate_cached_values_to_positions(
+        CANDIDATE, candidate_campaign.id, candidate_campaign.we_vote_id, changed_values, in_background=in_background)
 
     results = {
-        'success':                      True,
-        'positions_updated_count':      positions_updated_count,
-        'positions_not_updated_count':  positions_not_updated_count,
-        'update_all_position_results':  update_all_position_results
+        'success':                      propagate_results['success'],
+        'positions_updated_count':      propagate_results['positions_updated_count'],
+        'positions_not_updated_count':  0,
+        'update_all_position_results':  [propagate_results],
     }
     return results
 
 
-def update_all_position_details_from_contest_office(contest_office):
+def update_all_position_details_from_contest_office(contest_office, in_background=None):
     """
     Update all position office name in PositionEntered and PositionForFriends from contest office details
     :param contest_office:
+    :param in_background:
     :return:
     """
-    position_list_manager = PositionListManager()
-    position_manager = PositionManager()
-    positions_updated_count = 0
-    positions_not_updated_count = 0
-    update_all_position_office_data_results = []
-
-    retrieve_public_positions = True
-    stance_we_are_looking_for = ANY_STANCE
-    public_position_list = position_list_manager.retrieve_all_positions_for_contest_office(
-        retrieve_public_positions, contest_office.id, contest_office.we_vote_id,
-        stance_we_are_looking_for, most_recent_only=True)
-    for position_object in public_position_list:
-        update_position_office_data_results = position_manager.update_position_office_data_from_contest_office(
-            position_object, contest_office)
-        if update_position_office_data_results['success']:
-            positions_updated_count += 1
-        else:
-            positions_not_updated_count += 1
-        update_all_position_office_data_results.append(update_position_office_data_results)
-
-    retrieve_public_positions = False
-    friends_position_list = position_list_manager.retrieve_all_positions_for_contest_office(
-        retrieve_public_positions, contest_office.id, contest_office.we_vote_id,
-        stance_we_are_looking_for, most_recent_only=True)
-    for position_object in friends_position_list:
-        update_position_office_data_results = position_manager.update_position_office_data_from_contest_office(
-            position_object, contest_office)
-        if update_position_office_data_results['success']:
-            positions_updated_count += 1
-        else:
-            positions_not_updated_count += 1
-        update_all_position_office_data_results.append(update_position_office_data_results)
+    changed_values = {}
+    if positive_value_exists(contest_office.office_name):
+        changed_values['contest_office_name'] = contest_office.office_name
+    if positive_value_exists(contest_office.we_vote_id):
+        changed_values['contest_office_we_vote_id'] = contest_office.we_vote_id
+    if positive_value_exists(contest_office.id):
+        changed_values['contest_office_id'] = contest_office.id
+    propagate_results = propagate_cached_values_to_positions(
+        OFFICE, contest_office.id, contest_office.we_vote_id, changed_values, in_background=in_background)
 
     results = {
-        'success':                      True,
-        'positions_updated_count':      positions_updated_count,
-        'positions_not_updated_count':  positions_not_updated_count,
-        'update_all_position_results':  update_all_position_office_data_results
+        'success':                      propagate_results['success'],
+        'positions_updated_count':      propagate_results['positions_updated_count'],
+        'positions_not_updated_count':  0,
+        'update_all_position_results':  [propagate_results],
     }
     return results
 
 
-def update_all_position_details_from_contest_measure(contest_measure):
+def update_all_position_details_from_contest_measure(contest_measure, in_background=None):
     """
     Update all position measure name in PositionEntered and PositionForFriends from contest measure details
     :param contest_measure:
+    :param in_background:
     :return:
     """
-    position_list_manager = PositionListManager()
-    position_manager = PositionManager()
-    positions_updated_count = 0
-    positions_not_updated_count = 0
-    update_all_position_measure_data_results = []
-
-    retrieve_public_positions = True
-    stance_we_are_looking_for = ANY_STANCE
-    public_position_list = position_list_manager.retrieve_all_positions_for_contest_measure(
-        retrieve_public_positions, contest_measure.id, contest_measure.we_vote_id,
-        stance_we_are_looking_for, most_recent_only=True)
-    for position_object in public_position_list:
-        update_position_measure_data_results = position_manager.update_position_measure_data_from_contest_measure(
-            position_object, contest_measure)
-        if update_position_measure_data_results['success']:
-            positions_updated_count += 1
-        else:
-            positions_not_updated_count += 1
-        update_all_position_measure_data_results.append(update_position_measure_data_results)
-
-    retrieve_public_positions = False
-    friends_position_list = position_list_manager.retrieve_all_positions_for_contest_measure(
-        retrieve_public_positions, contest_measure.id, contest_measure.we_vote_id,
-        stance_we_are_looking_for, most_recent_only=True)
-    for position_object in friends_position_list:
-        update_position_measure_data_results = position_manager.update_position_measure_data_from_contest_measure(
-            position_object, contest_measure)
-        if update_position_measure_data_results['success']:
-            positions_updated_count += 1
-        else:
-            positions_not_updated_count += 1
-        update_all_position_measure_data_results.append(update_position_measure_data_results)
+    changed_values = {}
+    if positive_value_exists(contest_measure.google_civic_measure_title):
+        changed_values['google_civic_measure_title'] = contest_measure.google_civic_measure_title
+    if positive_value_exists(contest_measure.we_vote_id):
+        changed_values['contest_measure_we_vote_id'] = contest_measure.we_vote_id
+    if positive_value_exists(contest_measure.id):
+        changed_values['contest_measure_id'] = contest_measure.id
+    propagate_results = propagate_cached_values_to_positions(
+        MEASURE, contest_measure.id, contest_measure.we_vote_id, changed_values, in_background=in_background)
 
     results = {
-        'success':                      True,
-        'positions_updated_count':      positions_updated_count,
-        'positions_not_updated_count':  positions_not_updated_count,
-        'update_all_position_results':  update_all_position_measure_data_results
+        'success':                      propagate_results['success'],
+        'positions_updated_count':      propagate_results['positions_updated_count'],
+        'positions_not_updated_count':  0,
+        'update_all_position_results':  [propagate_results],
     }
     return results
 
 
 def reset_position_entered_image_details_from_organization(organization, twitter_profile_image_url_https,
-                                                           facebook_profile_image_url_https):
+                                                           facebook_profile_image_url_https, in_background=None):
     """
     Reset all position image urls in PositionEntered from organization details
     :param organization:
     :param twitter_profile_image_url_https:
     :param facebook_profile_image_url_https:
+    :param in_background:
     :return:
     """
-    position_list_manager = PositionListManager()
-    position_manager = PositionManager()
-    reset_all_position_org_data_results = []
-    stance_we_are_looking_for = ANY_STANCE
-    friends_vs_public = PUBLIC_ONLY
     speaker_image_url_https = None
     if positive_value_exists(twitter_profile_image_url_https):
         speaker_image_url_https = twitter_profile_image_url_https
     elif positive_value_exists(facebook_profile_image_url_https):
         speaker_image_url_https = facebook_profile_image_url_https
 
-    public_position_list = position_list_manager.retrieve_all_positions_for_organization(
-        organization.id, organization.we_vote_id, stance_we_are_looking_for, friends_vs_public)
-    for position_object in public_position_list:
-        reset_position_image_urls_results = position_manager.reset_position_image_details(
-            position_object, speaker_image_url_https=speaker_image_url_https)
-        reset_all_position_org_data_results.append(reset_position_image_urls_results)
+    changed_values = {}
+    if positive_value_exists(speaker_image_url_https):
+        changed_values = {
+            'speaker_image_url_https':          speaker_image_url_https,
+            'speaker_image_url_https_large':    '',
+            'speaker_image_url_https_medium':   '',
+            'speaker_image_url_https_tiny':     '',
+        }
+    propagate_results = propagate_cached_values_to_positions(
+        ORGANIZATION, organization.id, organization.we_vote_id, changed_values,
+        update_public_positions=True, update_friends_positions=False, in_background=in_background)
 
     results = {
-        'success':                      True,
-        'reset_all_position_results':  reset_all_position_org_data_results
+        'success':                      propagate_results['success'],
+        'reset_all_position_results':  [propagate_results],
     }
     return results
 
 
-def update_position_entered_details_from_organization(organization):
+def update_position_entered_details_from_organization(organization, in_background=None):
     """
     Update all position image urls PositionEntered from organization details
     :param organization:
+    :param in_background:
     :return:
     """
-    position_list_manager = PositionListManager()
-    position_manager = PositionManager()
-    positions_updated_count = 0
-    positions_not_updated_count = 0
-    update_all_position_image_urls_results = []
-    update_all_position_org_data_results = []
-    stance_we_are_looking_for = ANY_STANCE
-    friends_vs_public = PUBLIC_ONLY
-
-    public_position_list = position_list_manager.retrieve_all_positions_for_organization(
-        organization.id, organization.we_vote_id, stance_we_are_looking_for, friends_vs_public)
-    for position_object in public_position_list:
-        update_position_image_urls_results = position_manager.update_position_image_urls_from_organization(
-            position_object, organization)
-        update_all_position_image_urls_results.append(update_position_image_urls_results)
-        update_position_org_data_results = position_manager.update_position_speaker_data_from_organization(
-            position_object, organization)
-        update_all_position_org_data_results.append(update_position_org_data_results)
-        if update_position_image_urls_results['success'] and update_position_org_data_results['success']:
-            positions_updated_count += 1
-        else:
-            positions_not_updated_count += 1
+    changed_values = {}
+    if positive_value_exists(organization.organization_photo_url()):
+        changed_values['speaker_image_url_https'] = organization.organization_photo_url()
+    if positive_value_exists(organization.we_vote_hosted_profile_image_url_large):
+        changed_values['speaker_image_url_https_large'] = organization.we_vote_hosted_profile_image_url_large
+    if positive_value_exists(organization.we_vote_hosted_profile_image_url_medium):
+        changed_values['speaker_image_url_https_medium'] = organization.we_vote_hosted_profile_image_url_medium
+    if positive_value_exists(organization.we_vote_hosted_profile_image_url_tiny):
+        changed_values['speaker_image_url_https_tiny'] = organization.we_vote_hosted_profile_image_url_tiny
+    if positive_value_exists(organization.organization_name):
+        changed_values['speaker_display_name'] = organization.organization_name
+    if positive_value_exists(organization.organization_twitter_handle):
+        changed_values['speaker_twitter_handle'] = organization.organization_twitter_handle
+    propagate_results = propagate_cached_values_to_positions(
+        ORGANIZATION, organization.id, organization.we_vote_id, changed_values,
+        update_public_positions=True, update_friends_positions=False, in_background=in_background)
 
-    update_all_position_results = [update_all_position_image_urls_results, update_all_position_org_data_results]
     results = {
-        'success':                      True,
-        'positions_updated_count':      positions_updated_count,
-        'positions_not_updated_count':  positions_not_updated_count,
-        'update_all_position_results':  update_all_position_results
+        'success':                      propagate_results['success'],
+        'positions_updated_count':      propagate_results['positions_updated_count'],
+        'positions_not_updated_count':  0,
+        'update_all_position_results':  [propagate_results],
     }
     return results
 
 
 def reset_position_for_friends_image_details_from_voter(voter, twitter_profile_image_url_https,
-                                                        facebook_profile_image_url_https):
+                                                        facebook_profile_image_url_https, in_background=None):
     """
     Reset all position image urls in PositionForFriends from we vote image details
     :param voter:
     :param twitter_profile_image_url_https:
     :param facebook_profile_image_url_https:
+    :param in_background:
     :return:
     """
-    position_list_manager = PositionListManager()
-    position_manager = PositionManager()
-    stance_we_are_looking_for = ANY_STANCE
-    friends_vs_public = FRIENDS_ONLY
     speaker_image_url_https = None
-    reset_all_position_image_urls_results = []
     if positive_value_exists(twitter_profile_image_url_https):
         speaker_image_url_https = twitter_profile_image_url_https
     elif positive_value_exists(facebook_profile_image_url_https):
         speaker_image_url_https = facebook_profile_image_url_https
 
-    positions_for_voter_results = position_list_manager.retrieve_all_positions_for_voter(
-        voter.id, voter.we_vote_id, stance_we_are_looking_for, friends_vs_public)
-    if positions_for_voter_results['position_list_found']:
-        friends_position_list = positions_for_voter_results['position_list']
-        for position_object in friends_position_list:
+    changed_values = {}
+    if positive_value_exists(speaker_image_url_https):
+        changed_values = {
+            'speaker_image_url_https':          speaker_image_url_https,
+            'speaker_image_url_https_large':    '',
+            'speaker_image_url_https_medium':   '',
+            'speaker_image_url_https_tiny':     '',
+        }
+    propagate_results = propagate_cached_values_to_positions(
+        VOTER, voter.id, voter.we_vote_id, changed_values,
+        update_public_positions=False, update_friends_positions=True, in_background=in_background)
 
-            reset_position_image_urls_results = position_manager.reset_position_image_details(
-                position_object, speaker_image_url_https=speaker_image_url_https)
-            reset_all_position_image_urls_results.append(reset_position_image_urls_results)
     results = {
-        'success':                      True,
-        'reset_all_position_results':   reset_all_position_image_urls_results
+        'success':                      propagate_results['success'],
+        'reset_all_position_results':   [propagate_results],
     }
     return results
 
 
-def update_position_for_friends_details_from_voter(voter):
+def update_position_for_friends_details_from_voter(voter, in_background=None):
     """
     Update all position image urls PositionForFriends from voter details
     :param voter:
+    :param in_background:
     :return:
     """
-    position_list_manager = PositionListManager()
-    position_manager = PositionManager()
-    stance_we_are_looking_for = ANY_STANCE
-    friends_vs_public = FRIENDS_ONLY
-    positions_updated_count = 0
-    positions_not_updated_count = 0
-
-    positions_for_voter_results = position_list_manager.retrieve_all_positions_for_voter(
-        voter.id, voter.we_vote_id, stance_we_are_looking_for, friends_vs_public)
-
-    if positions_for_voter_results['position_list_found']:
-        friends_position_list = positions_for_voter_results['position_list']
-        for position_object in friends_position_list:
-            update_position_image_urls_results = position_manager.update_position_image_urls_from_voter(
-                position_object, voter)
-            if update_position_image_urls_results['success']:
-                positions_updated_count += 1
-            else:
-                positions_not_updated_count += 1
+    changed_values = {}
+    if positive_value_exists(voter.voter_photo_url()):
+        changed_values['speaker_image_url_https'] = voter.voter_photo_url()
+    if positive_value_exists(voter.we_vote_hosted_profile_image_url_large):
+        changed_values['speaker_image_url_https_large'] = voter.we_vote_hosted_profile_image_url_large
+    if positive_value_exists(voter.we_vote_hosted_profile_image_url_medium):
+        changed_values['speaker_image_url_https_medium'] = voter.we_vote_hosted_profile_image_url_medium
+    if positive_value_exists(voter.we_vote_hosted_profile_image_url_tiny):
+        changed_values['speaker_image_url_https_tiny'] = voter.we_vote_hosted_profile_image_url_tiny
+    propagate_results = propagate_cached_values_to_positions(
+        VOTER, voter.id, voter.we_vote_id, changed_values,
+        update_public_positions=False, update_friends_positions=True, in_background=in_background)
 
     results = {
-        'success':                      True,
-        'positions_updated_count':      positions_updated_count,
-        'positions_not_updated_count':  positions_not_updated_count,
+        'success':                      propagate_results['success'],
+        'positions_updated_count':      propagate_results['positions_updated_count'],
+        'positions_not_updated_count':  0,
     }
     return results
 
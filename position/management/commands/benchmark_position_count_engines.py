@@ -0,0 +1,61 @@
+import time
+from django.core.management.base import BaseCommand
+from position.controllers import count_for_all_ballot_items_from_position_index_for_api, \
+    count_for_all_ballot_items_from_position_network_score_for_api
+from position.position_index import clear_election_position_index
+
+
+class Command(BaseCommand):
+    help = 'Times positionsCountForAllBallotItems with the PositionNetworkScore table and with the read-time ' \
+           'position index, and reports any ballot items where the two engines disagree.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('voter_device_id', nargs='+', help='One or more voter_device_ids to count for')
+        parser.add_argument('--google_civic_election_id', type=int, default=0)
+        parser.add_argument('--iterations', type=int, default=10)
+
+    def time_engine(self, count_function, voter_device_id_list, google_civic_election_id, iterations):
+        results_by_voter = {}
+        start = time.perf_counter()
+        for iteration in range(iterations):
+            for voter_device_id in voter_device_id_list:
+                results_by_voter[voter_device_id] = count_function(voter_device_id, google_civic_election_id)
+        elapsed = time.perf_counter() - start
+        return results_by_voter, elapsed * 1000 / (iterations * len(voter_device_id_list))
+
+    def handle(self, *args, **options):
+        voter_device_id_list = options['voter_device_id']
+        google_civic_election_id = options['google_civic_election_id']
+        iterations = max(options['iterations'], 1)
+
+        table_results, table_milliseconds = self.time_engine(
+            count_for_all_ballot_items_from_position_network_score_for_api,
+            voter_device_id_list, google_civic_election_id, iterations)
+
+        # Time the first call (which builds the index) separately from the calls that reuse it
+        clear_election_position_index()
+        start = time.perf_counter()
+        count_for_all_ballot_items_from_position_index_for_api(voter_device_id_list[0], google_civic_election_id)
+        index_build_milliseconds = (time.perf_counter() - start) * 1000
+        index_results, index_milliseconds = self.time_engine(
+            count_for_all_ballot_items_from_position_index_for_api,
+            voter_device_id_list, google_civic_election_id, iterations)
+
+        self.stdout.write('NETWORK_SCORE_TABLE: {:.1f} ms per call'.format(table_milliseconds))
+        self.stdout.write('READ_TIME_INDEX: {:.1f} ms per call ({:.1f} ms for the first call, which builds the '
+                          'index)'.format(index_milliseconds, index_build_milliseconds))
+
+        for voter_device_id in voter_device_id_list:
+            table_counts = {one_count['ballot_item_we_vote_id']: (one_count['support_count'],
+                                                                  one_count['oppose_count'])
+                            for one_count in table_results[voter_device_id]['position_counts_list']}
+            index_counts = {one_count['ballot_item_we_vote_id']: (one_count['support_count'],
+                                                                  one_count['oppose_count'])
+                            for one_count in index_results[voter_device_id]['position_counts_list']}
+            differences = [ballot_item_we_vote_id for ballot_item_we_vote_id in set(table_counts) | set(index_counts)
+                           if table_counts.get(ballot_item_we_vote_id) != index_counts.get(ballot_item_we_vote_id)]
+            if differences:
+                self.stdout.write('{}: counts differ for {} ballot items, for example {}'.format(
+                    voter_device_id, len(differences), sorted(differences)[:5]))
+            else:
+                self.stdout.write('{}: counts match for {} ballot items'.format(voter_device_id, len(table_counts)))
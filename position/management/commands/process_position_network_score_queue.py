@@ -0,0 +1,46 @@
+import time
+from django.core.management.base import BaseCommand
+from django.utils.timezone import now
+from position.models import PositionListManager
+
+
+class Command(BaseCommand):
+    help = 'Fans queued position changes out to the PositionNetworkScore entries of followers and friends. ' \
+           'Requires POSITION_NETWORK_SCORE_QUEUE_ON so that positionSave queues the work.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch_size', type=int, default=100,
+                            help='Number of queued positions to claim at a time')
+        parser.add_argument('--sleep', type=float, default=2.0,
+                            help='Seconds to wait when the queue is empty')
+        parser.add_argument('--once', action='store_true',
+                            help='Work through the queue once and exit, instead of running continuously. '
+                                 'Entries that fail are left for a later run.')
+        parser.add_argument('--metrics', action='store_true',
+                            help='Print the queue lag metrics and exit')
+
+    def print_metrics(self, position_list_manager):
+        metrics = position_list_manager.fetch_position_network_score_queue_metrics()
+        self.stdout.write('pending: {pending_count}, claimed: {claimed_count}, failing: {failing_count}, '
+                          'dead letters: {dead_letter_count}, lag: {lag_seconds:.1f} seconds'.format(**metrics))
+
+    def handle(self, *args, **options):
+        position_list_manager = PositionListManager()
+        if options['metrics']:
+            self.print_metrics(position_list_manager)
+            return
+
+        pass_started = now()
+        while True:
+            # Entries that fail wait before they are retried, so they aren't claimed again within this pass
+            results = position_list_manager.process_position_network_score_queue(
+                batch_size=options['batch_size'], retry_due_before=pass_started)
+            if results['positions_processed'] or results['positions_failed']:
+                self.stdout.write(results['status'])
+                continue
+            if options['once']:
+                break
+            time.sleep(options['sleep'])
+            pass_started = now()
+
+        self.print_metrics(position_list_manager)
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from position.models import PositionListManager
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the PositionCount support/oppose counters from PositionEntered and PositionForFriends.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('ballot_item_we_vote_id', nargs='*',
+                            help='Only recount these candidates, measures or offices (default: everything)')
+
+    def handle(self, *args, **options):
+        ballot_item_we_vote_id_list = options['ballot_item_we_vote_id'] or None
+        results = PositionListManager().recount_positions_for_ballot_items(ballot_item_we_vote_id_list)
+        self.stdout.write(results['status'] + "POSITION_COUNTS_SAVED: " + str(results['position_counts_saved']))
@@ -6,23 +6,29 @@
 from analytics.models import ACTION_POSITION_TAKEN, AnalyticsManager
 from candidate.models import CandidateCampaign, CandidateCampaignManager
 from ballot.controllers import figure_out_google_civic_election_id_voter_is_watching
+from ballot.models import CANDIDATE, MEASURE, OFFICE
+from config.base import get_environment_variable_default
+from datetime import timedelta
 from django.core.exceptions import ObjectDoesNotExist, MultipleObjectsReturned
-from django.db import models
-from django.db.models import Q
+from django.db import connection, IntegrityError, models, transaction
+from django.db.models import Count, F, Min, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Lower, Substr
+from django.utils.timezone import now
 from election.models import Election
 from exception.models import handle_exception, handle_record_found_more_than_one_exception,\
     handle_record_not_found_exception, handle_record_not_saved_exception, print_to_log
-from follow.models import FollowOrganizationManager, FollowOrganizationList
-from friend.models import FriendManager
+from follow.models import FollowOrganization, FollowOrganizationManager, FOLLOWING
+from friend.models import fetch_friend_adjacency, FriendManager
 from measure.models import ContestMeasure, ContestMeasureManager
-from office.models import ContestOfficeManager
+from office.models import ContestOffice, ContestOfficeManager
 from organization.models import Organization, OrganizationManager
 import robot_detection
-from twitter.models import TwitterUser
+from twitter.models import TwitterLinkToOrganization, TwitterLinkToVoter, TwitterUser
 from voter.models import fetch_voter_id_from_voter_we_vote_id, fetch_voter_we_vote_id_from_voter_id, Voter, VoterManager
 from voter_guide.models import VoterGuideManager
 import wevote_functions.admin
-from wevote_functions.functions import convert_to_int, positive_value_exists
+from wevote_functions.functions import convert_to_int, normalize_we_vote_id, positive_value_exists, \
+    ORGANIZATION, VOTER
 from wevote_settings.models import fetch_next_we_vote_id_position_integer, fetch_site_unique_id_prefix
 
 
@@ -58,6 +64,21 @@ POSITION = 'POSITION'
 
 logger = wevote_functions.admin.get_logger(__name__)
 
+# When True, saving a position only queues the PositionNetworkScore fan-out, and the
+# process_position_network_score_queue management command does the work
+POSITION_NETWORK_SCORE_QUEUE_ON = get_environment_variable_default("POSITION_NETWORK_SCORE_QUEUE_ON", False)
+# A worker that claimed a queue entry but didn't finish within this many seconds is assumed to have died
+POSITION_NETWORK_SCORE_QUEUE_CLAIM_TIMEOUT = 600
+# A queued position whose fan-out failed is retried after this many seconds, doubled after each further failure
+# (up to an hour), and set aside as a dead letter once it has failed this many times
+POSITION_NETWORK_SCORE_QUEUE_RETRY_SECONDS = \
+    convert_to_int(get_environment_variable_default("POSITION_NETWORK_SCORE_QUEUE_RETRY_SECONDS", 30))
+POSITION_NETWORK_SCORE_QUEUE_MAXIMUM_RETRY_SECONDS = 3600
+POSITION_NETWORK_SCORE_QUEUE_MAXIMUM_ATTEMPTS = \
+    convert_to_int(get_environment_variable_default("POSITION_NETWORK_SCORE_QUEUE_MAXIMUM_ATTEMPTS", 5))
+# The largest number of positions returned in one page of a voter's positions (see encode_voter_position_key)
+VOTER_POSITIONS_PAGE_SIZE = convert_to_int(get_environment_variable_default("VOTER_POSITIONS_PAGE_SIZE", 1000))
+
 
 # TODO DALE Consider adding vote_smart_sig_id and vote_smart_candidate_id fields so we can export them and to prevent
 # duplicate position entries from Vote Smart
@@ -241,6 +262,8 @@ class PositionEntered(models.Model):
 
     class Meta:
         ordering = ('date_entered',)
+        # For paging through one voter's positions in the order of retrieve_next_page_of_voter_positions
+        index_together = (('voter_id', 'id'),)
 
     # We override the save function so we can auto-generate we_vote_id
     def save(self, *args, **kwargs):
@@ -249,7 +272,19 @@ class PositionEntered(models.Model):
             self.we_vote_id = self.we_vote_id.strip().lower()
         if self.we_vote_id == "" or self.we_vote_id is None:  # If there isn't a value...
             self.generate_new_we_vote_id()
-        super(PositionEntered, self).save(*args, **kwargs)
+        # PositionCount is updated in the same transaction, from what the position was counted as before the save
+        with transaction.atomic():
+            previous_values = fetch_saved_position_count_values(PositionEntered, self.id)
+            super(PositionEntered, self).save(*args, **kwargs)
+            update_position_counts_for_saved_position(self, previous_values, is_public_position=True)
+
+    def delete(self, *args, **kwargs):
+        # queryset.delete() skips this, so call recount_positions_for_ballot_items after deleting that way
+        with transaction.atomic():
+            previous_values = fetch_saved_position_count_values(PositionEntered, self.id)
+            delete_results = super(PositionEntered, self).delete(*args, **kwargs)
+            update_position_counts_for_deleted_position(previous_values, is_public_position=True)
+        return delete_results
 
     def generate_new_we_vote_id(self):
         # ...generate a new id
@@ -624,6 +659,8 @@ class PositionForFriends(models.Model):
 
     class Meta:
         ordering = ('date_entered',)
+        # For paging through one voter's positions in the order of retrieve_next_page_of_voter_positions
+        index_together = (('voter_id', 'id'),)
 
     # We override the save function so we can auto-generate we_vote_id
     def save(self, *args, **kwargs):
@@ -632,7 +669,19 @@ class PositionForFriends(models.Model):
             self.we_vote_id = self.we_vote_id.strip().lower()
         if self.we_vote_id == "" or self.we_vote_id is None:  # If there isn't a value...
             self.generate_new_we_vote_id()
-        super(PositionForFriends, self).save(*args, **kwargs)
+        # PositionCount is updated in the same transaction, from what the position was counted as before the save
+        with transaction.atomic():
+            previous_values = fetch_saved_position_count_values(PositionForFriends, self.id)
+            super(PositionForFriends, self).save(*args, **kwargs)
+            update_position_counts_for_saved_position(self, previous_values, is_public_position=False)
+
+    def delete(self, *args, **kwargs):
+        # queryset.delete() skips this, so call recount_positions_for_ballot_items after deleting that way
+        with transaction.atomic():
+            previous_values = fetch_saved_position_count_values(PositionForFriends, self.id)
+            delete_results = super(PositionForFriends, self).delete(*args, **kwargs)
+            update_position_counts_for_deleted_position(previous_values, is_public_position=False)
+        return delete_results
 
     def generate_new_we_vote_id(self):
         # ...generate a new id
@@ -875,6 +924,46 @@ class PositionNetworkScore(models.Model):
         return ""
 
 
+class PositionNetworkScoreQueue(models.Model):
+    """
+    One entry per position whose PositionNetworkScore fan-out (to the voters following the organization, or to the
+    voter's friends) is waiting to be done. Saving the same position again before the worker runs only updates
+    date_queued, so repeated edits are coalesced.
+    """
+    position_we_vote_id = models.CharField(max_length=255, null=False, unique=True)
+    is_public_position = models.BooleanField(default=True)
+    # The speaker and ballot item, so the PositionNetworkScore entries can still be removed if the position is deleted
+    # before the worker gets to it
+    organization_we_vote_id = models.CharField(max_length=255, null=True, blank=True)
+    voter_we_vote_id = models.CharField(max_length=255, null=True, blank=True)
+    candidate_we_vote_id = models.CharField(max_length=255, null=True, blank=True)
+    measure_we_vote_id = models.CharField(max_length=255, null=True, blank=True)
+    date_queued = models.DateTimeField(null=False, db_index=True)
+    # Set when a worker picks up this entry, and cleared when it is done with it
+    date_claimed = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.CharField(max_length=255, null=True, blank=True)
+    # After a failure, the entry isn't claimed again until this time
+    date_next_attempt = models.DateTimeField(null=True, blank=True, db_index=True)
+    # Failed POSITION_NETWORK_SCORE_QUEUE_MAXIMUM_ATTEMPTS times, and is only tried again if the position is saved again
+    dead_letter = models.BooleanField(default=False, db_index=True)
+
+
+class PositionCount(models.Model):
+    """
+    The number of positions for each ballot item (candidate, measure or office), stance and visibility. These are
+    kept up to date as positions are saved and deleted, so the public position counts don't need a COUNT query
+    against PositionEntered. Rebuild from scratch with the rebuild_position_counts management command.
+    """
+    ballot_item_we_vote_id = models.CharField(max_length=255, null=False, db_index=True)
+    stance = models.CharField(max_length=15, choices=POSITION_CHOICES, default=NO_STANCE)
+    is_public_position = models.BooleanField(default=True)
+    positions_count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('ballot_item_we_vote_id', 'stance', 'is_public_position')
+
+
 class PositionListManager(models.Model):
     # 2018-05 We now have an "is_public_position()" function
     # def add_is_public_position(self, incoming_position_list, is_public_position):
@@ -885,6 +974,187 @@ class PositionListManager(models.Model):
     #
     #     return outgoing_position_list
 
+    def bulk_recompute_position_network_scores_for_voter(
+            self, viewing_voter_id, viewing_voter_we_vote_id, google_civic_election_id,
+            candidate_we_vote_id_list, measure_we_vote_id_list,
+            organizations_followed_we_vote_id_list, friends_we_vote_id_list):
+        """
+        Set-based replacement for deleting and re-creating PositionNetworkScore entries one ballot item at a time.
+        We retrieve the public positions (from organizations the voter follows) and the friends-only positions
+        (from the voter's friends) for all of these ballot items with one query each, figure out in memory which
+        score entries should exist, and then apply only the difference inside one transaction.
+        :param viewing_voter_id:
+        :param viewing_voter_we_vote_id:
+        :param google_civic_election_id:
+        :param candidate_we_vote_id_list: All candidates on the voter's ballot
+        :param measure_we_vote_id_list: All measures on the voter's ballot
+        :param organizations_followed_we_vote_id_list:
+        :param friends_we_vote_id_list: Should include the viewing voter so their own opinions are counted
+        :return:
+        """
+        status = ""
+        success = True
+        support_or_oppose_exists = False
+        position_network_scores_created = 0
+        position_network_scores_updated = 0
+        position_network_scores_deleted = 0
+
+        if not positive_value_exists(viewing_voter_id) or not positive_value_exists(viewing_voter_we_vote_id):
+            status += "BULK_RECOMPUTE_POSITION_NETWORK_SCORES-MISSING_VOTER_ID "
+            results = {
+                'success':                          False,
+                'status':                           status,
+                'support_or_oppose_exists':         support_or_oppose_exists,
+                'position_network_scores_created':  position_network_scores_created,
+                'position_network_scores_updated':  position_network_scores_updated,
+                'position_network_scores_deleted':  position_network_scores_deleted,
+            }
+            return results
+
+        candidate_we_vote_id_list = list(set(filter(None, candidate_we_vote_id_list)))
+        measure_we_vote_id_list = list(set(filter(None, measure_we_vote_id_list)))
+        organizations_followed_we_vote_id_list = list(set(filter(None, organizations_followed_we_vote_id_list)))
+        friends_we_vote_id_list = list(set(filter(None, friends_we_vote_id_list)))
+
+        ballot_item_filter = Q(candidate_campaign_we_vote_id__in=candidate_we_vote_id_list) | \
+            Q(contest_measure_we_vote_id__in=measure_we_vote_id_list)
+        position_fields = ('speaker_display_name', 'candidate_campaign_we_vote_id', 'contest_measure_we_vote_id',
+                           'stance')
+
+        # desired_scores is keyed on (organization_we_vote_id, friend_voter_we_vote_id, candidate, measure), which
+        # matches the lookup used by PositionManager.update_or_create_position_network_score
+        # Only SUPPORT and OPPOSE count. Like the ballot item by ballot item refresh (retrieve_all_positions_for_...
+        # excludes PERCENT_RATING since Aug 2018), no rating ever reaches is_support_or_positive_rating here.
+        desired_scores = {}
+        try:
+            if len(candidate_we_vote_id_list) or len(measure_we_vote_id_list):
+                if len(organizations_followed_we_vote_id_list):
+                    # Ordered oldest first so the most recent position from each speaker wins
+                    public_position_query = PositionEntered.objects.using('readonly').filter(ballot_item_filter)
+                    public_position_query = public_position_query.filter(
+                        organization_we_vote_id__in=organizations_followed_we_vote_id_list)
+                    public_position_query = public_position_query.filter(stance__in=(SUPPORT, OPPOSE))
+                    public_position_query = public_position_query.order_by('date_entered', 'id')
+                    for organization_we_vote_id, speaker_display_name, candidate_we_vote_id, measure_we_vote_id, \
+                            stance in public_position_query.values_list('organization_we_vote_id', *position_fields):
+                        if positive_value_exists(candidate_we_vote_id):
+                            measure_we_vote_id = None
+                        else:
+                            candidate_we_vote_id = None
+                        key = (organization_we_vote_id, None, candidate_we_vote_id, measure_we_vote_id)
+                        desired_scores[key] = (speaker_display_name, stance == SUPPORT)
+
+                if len(friends_we_vote_id_list):
+                    friends_position_query = PositionForFriends.objects.using('readonly').filter(ballot_item_filter)
+                    friends_position_query = friends_position_query.filter(voter_we_vote_id__in=friends_we_vote_id_list)
+                    friends_position_query = friends_position_query.filter(stance__in=(SUPPORT, OPPOSE))
+                    friends_position_query = friends_position_query.order_by('date_entered', 'id')
+                    for friend_voter_we_vote_id, speaker_display_name, candidate_we_vote_id, measure_we_vote_id, \
+                            stance in friends_position_query.values_list('voter_we_vote_id', *position_fields):
+                        if positive_value_exists(candidate_we_vote_id):
+                            measure_we_vote_id = None
+                        else:
+                            candidate_we_vote_id = None
+                        # If we are saving the voter's own position, and they have a fabricated name, replace with "You"
+                        if friend_voter_we_vote_id == viewing_voter_we_vote_id and speaker_display_name \
+                                and speaker_display_name.startswith("Voter-"):
+                            speaker_display_name = "You"
+                        key = (None, friend_voter_we_vote_id, candidate_we_vote_id, measure_we_vote_id)
+                        desired_scores[key] = (speaker_display_name, stance == SUPPORT)
+        except Exception as e:
+            status += 'FAILED bulk_recompute_position_network_scores_for_voter-POSITIONS ' \
+                      '{error} [type: {error_type}]'.format(error=e, error_type=type(e))
+            handle_exception(e, logger=logger, exception_message=status)
+            results = {
+                'success':                          False,
+                'status':                           status,
+                'support_or_oppose_exists':         support_or_oppose_exists,
+                'position_network_scores_created':  position_network_scores_created,
+                'position_network_scores_updated':  position_network_scores_updated,
+                'position_network_scores_deleted':  position_network_scores_deleted,
+            }
+            return results
+
+        support_or_oppose_exists = len(desired_scores) > 0
+
+        try:
+            with transaction.atomic():
+                score_queryset = PositionNetworkScore.objects.select_for_update().filter(
+                    Q(viewing_voter_id=viewing_voter_id) | Q(viewing_voter_we_vote_id=viewing_voter_we_vote_id))
+                score_queryset = score_queryset.filter(
+                    Q(candidate_we_vote_id__in=candidate_we_vote_id_list) |
+                    Q(measure_we_vote_id__in=measure_we_vote_id_list))
+
+                # Rows that are no longer wanted, or whose values changed, are removed and (re)inserted below
+                score_ids_to_delete = []
+                keys_already_current = set()
+                keys_changed = set()
+                for one_score in score_queryset.only(
+                        'id', 'viewing_voter_id', 'viewing_voter_we_vote_id', 'google_civic_election_id',
+                        'organization_we_vote_id', 'friend_voter_we_vote_id', 'speaker_display_name',
+                        'candidate_we_vote_id', 'measure_we_vote_id', 'is_support', 'is_oppose'):
+                    key = (one_score.organization_we_vote_id or None, one_score.friend_voter_we_vote_id or None,
+                           one_score.candidate_we_vote_id or None, one_score.measure_we_vote_id or None)
+                    if key in keys_already_current or key not in desired_scores:
+                        score_ids_to_delete.append(one_score.id)
+                        continue
+                    speaker_display_name, is_support = desired_scores[key]
+                    if one_score.viewing_voter_id == viewing_voter_id \
+                            and one_score.viewing_voter_we_vote_id == viewing_voter_we_vote_id \
+                            and one_score.google_civic_election_id == convert_to_int(google_civic_election_id) \
+                            and one_score.speaker_display_name == speaker_display_name \
+                            and one_score.is_support == is_support and one_score.is_oppose != is_support:
+                        keys_already_current.add(key)
+                    else:
+                        keys_changed.add(key)
+                        score_ids_to_delete.append(one_score.id)
+
+                if len(score_ids_to_delete):
+                    PositionNetworkScore.objects.filter(id__in=score_ids_to_delete).delete()
+
+                new_score_list = []
+                for key, (speaker_display_name, is_support) in desired_scores.items():
+                    if key in keys_already_current:
+                        continue
+                    organization_we_vote_id, friend_voter_we_vote_id, candidate_we_vote_id, measure_we_vote_id = key
+                    new_score_list.append(PositionNetworkScore(
+                        viewing_voter_id=viewing_voter_id,
+                        viewing_voter_we_vote_id=viewing_voter_we_vote_id,
+                        google_civic_election_id=google_civic_election_id,
+                        organization_we_vote_id=organization_we_vote_id,
+                        friend_voter_we_vote_id=friend_voter_we_vote_id,
+                        speaker_display_name=speaker_display_name,
+                        candidate_we_vote_id=candidate_we_vote_id,
+                        measure_we_vote_id=measure_we_vote_id,
+                        is_support=is_support,
+                        is_oppose=not is_support))
+                if len(new_score_list):
+                    PositionNetworkScore.objects.bulk_create(new_score_list, batch_size=1000)
+
+            # A changed row is deleted and re-inserted, so we count it once as "updated"
+            keys_changed -= keys_already_current
+            position_network_scores_updated = len(keys_changed)
+            position_network_scores_created = len(new_score_list) - position_network_scores_updated
+            position_network_scores_deleted = len(score_ids_to_delete) - position_network_scores_updated
+            status += "BULK_RECOMPUTE_POSITION_NETWORK_SCORES-CREATED:" + str(position_network_scores_created) + \
+                " UPDATED:" + str(position_network_scores_updated) + \
+                " DELETED:" + str(position_network_scores_deleted) + " "
+        except Exception as e:
+            success = False
+            status += 'FAILED bulk_recompute_position_network_scores_for_voter ' \
+                      '{error} [type: {error_type}]'.format(error=e, error_type=type(e))
+            handle_exception(e, logger=logger, exception_message=status)
+
+        results = {
+            'success':                          success,
+            'status':                           status,
+            'support_or_oppose_exists':         support_or_oppose_exists,
+            'position_network_scores_created':  position_network_scores_created,
+            'position_network_scores_updated':  position_network_scores_updated,
+            'position_network_scores_deleted':  position_network_scores_deleted,
+        }
+        return results
+
     def calculate_positions_followed_by_voter(
             self, voter_id, all_positions_list, organizations_followed_by_voter_by_id, voter_friend_list=[]):
         """
@@ -1071,7 +1341,7 @@ class PositionListManager(models.Model):
                 public_position_list = public_position_list.filter(candidate_campaign_id=candidate_campaign_id)
             else:
                 public_position_list = public_position_list.filter(
-                    candidate_campaign_we_vote_id__iexact=candidate_campaign_we_vote_id)
+                    candidate_campaign_we_vote_id=normalize_we_vote_id(candidate_campaign_we_vote_id))
             # SUPPORT, STILL_DECIDING, INFORMATION_ONLY, NO_STANCE, OPPOSE, PERCENT_RATING
             # if stance_we_are_looking_for != ANY_STANCE:
             #     # If we passed in the stance "ANY_STANCE" it means we want to not filter down the list
@@ -1117,7 +1387,7 @@ class PositionListManager(models.Model):
                     candidate_campaign_id=candidate_campaign_id)
             else:
                 friends_only_position_list = friends_only_position_list.filter(
-                    candidate_campaign_we_vote_id__iexact=candidate_campaign_we_vote_id)
+                    candidate_campaign_we_vote_id=normalize_we_vote_id(candidate_campaign_we_vote_id))
             # SUPPORT, STILL_DECIDING, INFORMATION_ONLY, NO_STANCE, OPPOSE, PERCENT_RATING
             # if stance_we_are_looking_for != ANY_STANCE:
             #     # If we passed in the stance "ANY_STANCE" it means we want to not filter down the list
@@ -1186,7 +1456,7 @@ class PositionListManager(models.Model):
                 public_position_list = public_position_list.filter(contest_measure_id=contest_measure_id)
             else:
                 public_position_list = public_position_list.filter(
-                    contest_measure_we_vote_id__iexact=contest_measure_we_vote_id)
+                    contest_measure_we_vote_id=normalize_we_vote_id(contest_measure_we_vote_id))
             # SUPPORT, STILL_DECIDING, INFORMATION_ONLY, NO_STANCE, OPPOSE, PERCENT_RATING
             # if stance_we_are_looking_for != ANY_STANCE:
             #     # If we passed in the stance "ANY_STANCE" it means we want to not filter down the list
@@ -1232,7 +1502,7 @@ class PositionListManager(models.Model):
                 friends_only_position_list = friends_only_position_list.filter(contest_measure_id=contest_measure_id)
             else:
                 friends_only_position_list = friends_only_position_list.filter(
-                    contest_measure_we_vote_id__iexact=contest_measure_we_vote_id)
+                    contest_measure_we_vote_id=normalize_we_vote_id(contest_measure_we_vote_id))
             # SUPPORT, STILL_DECIDING, INFORMATION_ONLY, NO_STANCE, OPPOSE, PERCENT_RATING
             # if stance_we_are_looking_for != ANY_STANCE:
             #     # If we passed in the stance "ANY_STANCE" it means we want to not filter down the list
@@ -1380,7 +1650,7 @@ class PositionListManager(models.Model):
             position_on_stage_starter = PositionForFriends
 
             position_list = position_on_stage_starter.objects.using('readonly').all()
-            position_list = position_list.filter(voter_we_vote_id__iexact=voter_we_vote_id)
+            position_list = position_list.filter(voter_we_vote_id=normalize_we_vote_id(voter_we_vote_id))
             position_count = position_list.count()
         except Exception as e:
             pass
@@ -1392,7 +1662,7 @@ class PositionListManager(models.Model):
             position_on_stage_starter = PositionEntered
 
             position_list = position_on_stage_starter.objects.using('readonly').all()
-            position_list = position_list.filter(voter_we_vote_id__iexact=voter_we_vote_id)
+            position_list = position_list.filter(voter_we_vote_id=normalize_we_vote_id(voter_we_vote_id))
             position_count = position_list.count()
         except Exception as e:
             pass
@@ -1556,7 +1826,7 @@ class PositionListManager(models.Model):
             # Retrieve by voter_we_vote_id
             public_positions_list_query = PositionEntered.objects.all()
             public_positions_list_query = public_positions_list_query.filter(
-                voter_we_vote_id__iexact=voter_we_vote_id)
+                voter_we_vote_id=normalize_we_vote_id(voter_we_vote_id))
             public_positions_list = list(public_positions_list_query)  # Force the query to run
             for public_position in public_positions_list:
                 public_position_to_be_saved = False
@@ -1611,7 +1881,7 @@ class PositionListManager(models.Model):
             # Retrieve by organization_we_vote_id
             public_positions_list_query = PositionEntered.objects.all()
             public_positions_list_query = public_positions_list_query.filter(
-                organization_we_vote_id__iexact=organization_we_vote_id)
+                organization_we_vote_id=normalize_we_vote_id(organization_we_vote_id))
             # As of Aug 2018 we are no longer using PERCENT_RATING
             public_positions_list_query = public_positions_list_query.exclude(stance__iexact=PERCENT_RATING)
             public_positions_list = list(public_positions_list_query)  # Force the query to run
@@ -1677,7 +1947,7 @@ class PositionListManager(models.Model):
             # Retrieve by voter_we_vote_id
             friends_positions_list_query = PositionForFriends.objects.all()
             friends_positions_list_query = friends_positions_list_query.filter(
-                voter_we_vote_id__iexact=voter_we_vote_id)
+                voter_we_vote_id=normalize_we_vote_id(voter_we_vote_id))
             friends_positions_list = list(friends_positions_list_query)  # Force the query to run
             for friends_position in friends_positions_list:
                 friends_position_to_be_saved = False
@@ -1730,7 +2000,7 @@ class PositionListManager(models.Model):
             # Retrieve by organization_we_vote_id
             friends_positions_list_query = PositionForFriends.objects.all()
             friends_positions_list_query = friends_positions_list_query.filter(
-                organization_we_vote_id__iexact=organization_we_vote_id)
+                organization_we_vote_id=normalize_we_vote_id(organization_we_vote_id))
             friends_positions_list = list(friends_positions_list_query)  # Force the query to run
             for friends_position in friends_positions_list:
                 friends_position_to_be_saved = False
@@ -1855,7 +2125,7 @@ class PositionListManager(models.Model):
                 position_list_query = position_list_query.filter(candidate_campaign_id=candidate_campaign_id)
             else:
                 position_list_query = position_list_query.filter(
-                    candidate_campaign_we_vote_id__iexact=candidate_campaign_we_vote_id)
+                    candidate_campaign_we_vote_id=normalize_we_vote_id(candidate_campaign_we_vote_id))
             # SUPPORT, STILL_DECIDING, INFORMATION_ONLY, NO_STANCE, OPPOSE, PERCENT_RATING
             # if stance_we_are_looking_for != ANY_STANCE:
             #     # If we passed in the stance "ANY_STANCE" it means we want to not filter down the list
@@ -1873,7 +2143,7 @@ class PositionListManager(models.Model):
                     # Find positions from friends. Look for we_vote_id case insensitive.
                     we_vote_id_filter = Q()
                     for we_vote_id in friends_we_vote_id_list:
-                        we_vote_id_filter |= Q(voter_we_vote_id__iexact=we_vote_id)
+                        we_vote_id_filter |= Q(voter_we_vote_id=normalize_we_vote_id(we_vote_id))
                     position_list_query = position_list_query.filter(we_vote_id_filter)
             if retrieve_public_positions and organizations_followed_we_vote_id_list:
                 if type(organizations_followed_we_vote_id_list) is list \
@@ -1881,10 +2151,13 @@ class PositionListManager(models.Model):
                     # Find positions from organizations voter follows.
                     we_vote_id_filter = Q()
                     for we_vote_id in organizations_followed_we_vote_id_list:
-                        we_vote_id_filter |= Q(organization_we_vote_id__iexact=we_vote_id)
+                        we_vote_id_filter |= Q(organization_we_vote_id=normalize_we_vote_id(we_vote_id))
                     position_list_query = position_list_query.filter(we_vote_id_filter)
             # Limit to positions in the last x years - currently we are not limiting
             # position_list = position_list.filter(election_id=election_id)
+            if most_recent_only:
+                # If we have multiple positions for one org, we only want to show the most recent
+                position_list_query = self.filter_to_most_recent_position_for_each_org(position_list_query)
             position_list = list(position_list_query)
 
             # Now filter out the positions that have a percent rating that doesn't match the stance_we_are_looking_for
@@ -1910,23 +2183,11 @@ class PositionListManager(models.Model):
         except Exception as e:
             handle_record_not_found_exception(e, logger=logger)
 
-        # If we have multiple positions for one org, we only want to show the most recent.
-        if most_recent_only:
-            if position_list_found:
-                if len(position_list) > 1:
-                    position_list_filtered = self.remove_older_positions_for_each_org(position_list)
-                else:
-                    position_list_filtered = position_list
-            else:
-                position_list_filtered = []
-        else:
-            position_list_filtered = position_list
-
         if position_list_found:
-            return position_list_filtered
+            return position_list
         else:
-            position_list_filtered = []
-            return position_list_filtered
+            position_list = []
+            return position_list
 
     def retrieve_all_positions_for_contest_measure(self, retrieve_public_positions,
                                                    contest_measure_id, contest_measure_we_vote_id,
@@ -2004,7 +2265,7 @@ class PositionListManager(models.Model):
                 position_list_query = position_list_query.filter(contest_measure_id=contest_measure_id)
             else:
                 position_list_query = position_list_query.filter(
-                    contest_measure_we_vote_id__iexact=contest_measure_we_vote_id)
+                    contest_measure_we_vote_id=normalize_we_vote_id(contest_measure_we_vote_id))
             # SUPPORT, STILL_DECIDING, INFORMATION_ONLY, NO_STANCE, OPPOSE, PERCENT_RATING
             if stance_we_are_looking_for != ANY_STANCE:
                 # If we passed in the stance "ANY" it means we want to not filter down the list
@@ -2019,42 +2280,33 @@ class PositionListManager(models.Model):
                 # Find positions from friends. Look for we_vote_id case insensitive.
                 we_vote_id_filter = Q()
                 for we_vote_id in friends_we_vote_id_list:
-                    we_vote_id_filter |= Q(voter_we_vote_id__iexact=we_vote_id)
+                    we_vote_id_filter |= Q(voter_we_vote_id=normalize_we_vote_id(we_vote_id))
                 position_list_query = position_list_query.filter(we_vote_id_filter)
             if retrieve_public_positions and organizations_followed_we_vote_id_list is not False:
                 # Find positions from organizations voter follows.
                 we_vote_id_filter = Q()
                 for we_vote_id in organizations_followed_we_vote_id_list:
-                    we_vote_id_filter |= Q(organization_we_vote_id__iexact=we_vote_id)
+                    we_vote_id_filter |= Q(organization_we_vote_id=normalize_we_vote_id(we_vote_id))
                 position_list_query = position_list_query.filter(we_vote_id_filter)
             # Limit to positions in the last x years - currently we are not limiting
             # position_list = position_list.filter(election_id=election_id)
 
             # We don't need to filter out the positions that have a percent rating that doesn't match
             # the stance_we_are_looking_for (like we do for candidates)
+            if most_recent_only:
+                # If we have multiple positions for one org, we only want to show the most recent
+                position_list_query = self.filter_to_most_recent_position_for_each_org(position_list_query)
             position_list = list(position_list_query)
             if len(position_list):
                 position_list_found = True
         except Exception as e:
             handle_record_not_found_exception(e, logger=logger)
 
-        # If we have multiple positions for one org, we only want to show the most recent.
-        if most_recent_only:
-            if position_list_found:
-                if len(position_list) > 1:
-                    position_list_filtered = self.remove_older_positions_for_each_org(position_list)
-                else:
-                    position_list_filtered = position_list
-            else:
-                position_list_filtered = []
-        else:
-            position_list_filtered = position_list
-
         if position_list_found:
-            return position_list_filtered
+            return position_list
         else:
-            position_list_filtered = []
-            return position_list_filtered
+            position_list = []
+            return position_list
 
     def retrieve_all_positions_for_contest_office(self, retrieve_public_positions,
                                                   contest_office_id, contest_office_we_vote_id,
@@ -2106,7 +2358,7 @@ class PositionListManager(models.Model):
 
             if positive_value_exists(contest_office_we_vote_id):
                 position_list_query = position_list_query.filter(
-                    contest_office_we_vote_id__iexact=contest_office_we_vote_id)
+                    contest_office_we_vote_id=normalize_we_vote_id(contest_office_we_vote_id))
             else:
                 position_list_query = position_list_query.filter(contest_office_id=contest_office_id)
             # SUPPORT, STILL_DECIDING, INFORMATION_ONLY, NO_STANCE, OPPOSE, PERCENT_RATING
@@ -2121,33 +2373,27 @@ class PositionListManager(models.Model):
                 # Find positions from friends. Look for we_vote_id case insensitive.
                 we_vote_id_filter = Q()
                 for we_vote_id in friends_we_vote_id_list:
-                    we_vote_id_filter |= Q(voter_we_vote_id__iexact=we_vote_id)
+                    we_vote_id_filter |= Q(voter_we_vote_id=normalize_we_vote_id(we_vote_id))
                     position_list_query = position_list_query.filter(we_vote_id_filter)
             # Limit to positions in the last x years - currently we are not limiting
             # position_list = position_list.filter(election_id=election_id)
 
             # We don't need to filter out the positions that have a percent rating that doesn't match
             # the stance_we_are_looking_for (like we do for candidates)
+            if most_recent_only:
+                # If we have multiple positions for one org, we only want to show the most recent
+                position_list_query = self.filter_to_most_recent_position_for_each_org(position_list_query)
             position_list = list(position_list_query)
             if len(position_list):
                 position_list_found = True
         except Exception as e:
             handle_record_not_found_exception(e, logger=logger)
 
-        # If we have multiple positions for one org, we only want to show the most recent.
-        if most_recent_only:
-            if position_list_found:
-                position_list_filtered = self.remove_older_positions_for_each_org(position_list)
-            else:
-                position_list_filtered = []
-        else:
-            position_list_filtered = position_list
-
         if position_list_found:
-            return position_list_filtered
+            return position_list
         else:
-            position_list_filtered = []
-            return position_list_filtered
+            position_list = []
+            return position_list
 
     def refresh_cached_position_info_for_election(self, google_civic_election_id, state_code=''):
         position_manager = PositionManager()
@@ -2214,6 +2460,446 @@ class PositionListManager(models.Model):
         }
         return results
 
+    def bulk_refresh_cached_position_info_for_election(self, google_civic_election_id, state_code='',
+                                                       refresh_candidates=True, refresh_offices=True,
+                                                       refresh_measures=True, refresh_speakers=True):
+        """
+        Set-based version of refresh_cached_position_info_for_election. Instead of refreshing and saving one
+        position at a time, we compute the cached values once per candidate, office, measure, organization and voter
+        referenced in this election, and copy them into both position tables with a few UPDATE ... FROM (VALUES ...)
+        statements per source table. Only rows where a value actually changes are written.
+        Like update_all_position_details_from_candidate, every position about one of the election's candidates,
+        offices or measures is refreshed, even if the position's google_civic_election_id is blank or different.
+        Organizations and voters are only refreshed in the positions from this election.
+        :param google_civic_election_id:
+        :param state_code: When provided, only candidates, offices and measures from this state are refreshed
+        :param refresh_candidates:
+        :param refresh_offices:
+        :param refresh_measures:
+        :param refresh_speakers: Organizations and voters
+        :return:
+        """
+        success = True
+        status = ""
+        rows_updated = {
+            'candidate': 0,
+            'office': 0,
+            'measure': 0,
+            'organization': 0,
+            'voter': 0,
+        }
+        public_positions_updated = 0
+        friends_only_positions_updated = 0
+
+        if not positive_value_exists(google_civic_election_id):
+            results = {
+                'success':                          False,
+                'status':                           "BULK_REFRESH_MISSING_GOOGLE_CIVIC_ELECTION_ID ",
+                'public_positions_updated':         public_positions_updated,
+                'friends_only_positions_updated':   friends_only_positions_updated,
+                'rows_updated':                     rows_updated,
+            }
+            return results
+
+        google_civic_election_id = str(convert_to_int(google_civic_election_id))
+        no_candidate_sql = "AND (p.candidate_campaign_we_vote_id IS NULL OR p.candidate_campaign_we_vote_id = '') "
+        no_organization_sql = "AND (p.organization_we_vote_id IS NULL OR p.organization_we_vote_id = '') "
+
+        try:
+            # Candidates first, since they fill in the contest_office_we_vote_id that the office update joins on
+            if refresh_candidates:
+                candidate_query = CandidateCampaign.objects.filter(
+                    we_vote_id__in=self.fetch_ballot_item_we_vote_ids_for_election(
+                        google_civic_election_id, CandidateCampaign, 'candidate_campaign_we_vote_id'))
+                if positive_value_exists(state_code):
+                    candidate_query = candidate_query.filter(state_code__iexact=state_code)
+                candidate_list = list(candidate_query)
+                # Offices referenced before the update, so their PositionCount entries can be recounted if the
+                # candidate update moves positions to another office
+                office_we_vote_ids_before_update = self.fetch_we_vote_ids_referenced_by_positions(
+                    'candidate_campaign_we_vote_id', [candidate.we_vote_id for candidate in candidate_list],
+                    'contest_office_we_vote_id')
+                values_list = [(candidate.we_vote_id, candidate.contest_office_id, candidate.contest_office_we_vote_id,
+                                candidate.display_candidate_name(), candidate.candidate_photo_url(),
+                                candidate.we_vote_hosted_profile_image_url_large,
+                                candidate.we_vote_hosted_profile_image_url_medium,
+                                candidate.we_vote_hosted_profile_image_url_tiny,
+                                candidate.candidate_twitter_handle, candidate.get_candidate_state(),
+                                candidate.political_party_display(), candidate.politician_id,
+                                candidate.politician_we_vote_id)
+                               for candidate in candidate_list]
+                results = self.update_positions_from_values(
+                    0, 'candidate_campaign_we_vote_id',
+                    [('contest_office_id', 'bigint', False),
+                     ('contest_office_we_vote_id', 'text', False),
+                     ('ballot_item_display_name', 'text', False),
+                     ('ballot_item_image_url_https', 'text', False),
+                     ('ballot_item_image_url_https_large', 'text', False),
+                     ('ballot_item_image_url_https_medium', 'text', False),
+                     ('ballot_item_image_url_https_tiny', 'text', False),
+                     ('ballot_item_twitter_handle', 'text', False),
+                     ('state_code', 'text', False),
+                     ('political_party', 'text', False),
+                     ('politician_id', 'bigint', False),
+                     ('politician_we_vote_id', 'text', False)],
+                    values_list)
+                rows_updated['candidate'] = results['public_rows_updated'] + results['friends_rows_updated']
+                public_positions_updated += results['public_rows_updated']
+                friends_only_positions_updated += results['friends_rows_updated']
+                if positive_value_exists(rows_updated['candidate']):
+                    # Bulk updates don't go through save(), which keeps PositionCount current
+                    office_we_vote_ids_to_recount = set(office_we_vote_ids_before_update)
+                    office_we_vote_ids_to_recount.update(
+                        one_row[2] for one_row in values_list if positive_value_exists(one_row[2]))
+                    self.recount_positions_for_ballot_items(list(office_we_vote_ids_to_recount))
+
+            if refresh_offices:
+                office_query = ContestOffice.objects.filter(
+                    we_vote_id__in=self.fetch_ballot_item_we_vote_ids_for_election(
+                        google_civic_election_id, ContestOffice, 'contest_office_we_vote_id'))
+                if positive_value_exists(state_code):
+                    office_query = office_query.filter(state_code__iexact=state_code)
+                values_list = [(office.we_vote_id, office.id, office.office_name) for office in office_query]
+                results = self.update_positions_from_values(
+                    0, 'contest_office_we_vote_id',
+                    [('contest_office_id', 'bigint', False),
+                     ('contest_office_name', 'text', False)],
+                    values_list)
+                rows_updated['office'] = results['public_rows_updated'] + results['friends_rows_updated']
+                public_positions_updated += results['public_rows_updated']
+                friends_only_positions_updated += results['friends_rows_updated']
+
+            if refresh_measures:
+                measure_query = ContestMeasure.objects.filter(
+                    we_vote_id__in=self.fetch_ballot_item_we_vote_ids_for_election(
+                        google_civic_election_id, ContestMeasure, 'contest_measure_we_vote_id'))
+                if positive_value_exists(state_code):
+                    measure_query = measure_query.filter(state_code__iexact=state_code)
+                # Measures don't have images or twitter handles, so those are cleared
+                values_list = [(contest_measure.we_vote_id, contest_measure.id, contest_measure.measure_title,
+                                contest_measure.google_civic_measure_title, contest_measure.state_code, '', '')
+                               for contest_measure in measure_query]
+                results = self.update_positions_from_values(
+                    0, 'contest_measure_we_vote_id',
+                    [('contest_measure_id', 'bigint', False),
+                     ('ballot_item_display_name', 'text', False),
+                     ('google_civic_measure_title', 'text', False),
+                     ('state_code', 'text', False),
+                     ('ballot_item_image_url_https', 'text', True),
+                     ('ballot_item_twitter_handle', 'text', True)],
+                    values_list, only_where_sql=no_candidate_sql)
+                rows_updated['measure'] = results['public_rows_updated'] + results['friends_rows_updated']
+                public_positions_updated += results['public_rows_updated']
+                friends_only_positions_updated += results['friends_rows_updated']
+
+            if refresh_speakers:
+                organization_list = list(Organization.objects.filter(
+                    we_vote_id__in=self.fetch_we_vote_ids_referenced_in_election(
+                        google_civic_election_id, 'organization_we_vote_id')))
+                twitter_handle_by_organization = {}
+                twitter_id_by_organization = dict(TwitterLinkToOrganization.objects.filter(
+                    organization_we_vote_id__in=[organization.we_vote_id for organization in organization_list])
+                    .values_list('organization_we_vote_id', 'twitter_id'))
+                if len(twitter_id_by_organization):
+                    twitter_handle_by_twitter_id = dict(TwitterUser.objects.filter(
+                        twitter_id__in=twitter_id_by_organization.values()).values_list('twitter_id', 'twitter_handle'))
+                    for organization_we_vote_id, twitter_id in twitter_id_by_organization.items():
+                        twitter_handle_by_organization[organization_we_vote_id] = \
+                            twitter_handle_by_twitter_id.get(twitter_id, '')
+                values_list = [(organization.we_vote_id, organization.id, organization.organization_name,
+                                organization.organization_photo_url(),
+                                organization.we_vote_hosted_profile_image_url_large,
+                                organization.we_vote_hosted_profile_image_url_medium,
+                                organization.we_vote_hosted_profile_image_url_tiny,
+                                twitter_handle_by_organization.get(organization.we_vote_id, ''))
+                               for organization in organization_list]
+                results = self.update_positions_from_values(
+                    google_civic_election_id, 'organization_we_vote_id',
+                    [('organization_id', 'bigint', False),
+                     ('speaker_display_name', 'text', False),
+                     ('speaker_image_url_https', 'text', False),
+                     ('speaker_image_url_https_large', 'text', False),
+                     ('speaker_image_url_https_medium', 'text', False),
+                     ('speaker_image_url_https_tiny', 'text', False),
+                     ('speaker_twitter_handle', 'text', False)],
+                    values_list)
+                rows_updated['organization'] = results['public_rows_updated'] + results['friends_rows_updated']
+                public_positions_updated += results['public_rows_updated']
+                friends_only_positions_updated += results['friends_rows_updated']
+
+                # Voters are only the speaker when the position isn't linked to an organization
+                voter_list = list(Voter.objects.filter(
+                    we_vote_id__in=self.fetch_we_vote_ids_referenced_in_election(
+                        google_civic_election_id, 'voter_we_vote_id')))
+                twitter_handle_by_voter = {}
+                twitter_id_by_voter = dict(TwitterLinkToVoter.objects.filter(
+                    voter_we_vote_id__in=[voter.we_vote_id for voter in voter_list])
+                    .values_list('voter_we_vote_id', 'twitter_id'))
+                if len(twitter_id_by_voter):
+                    twitter_handle_by_twitter_id = dict(TwitterUser.objects.filter(
+                        twitter_id__in=twitter_id_by_voter.values()).values_list('twitter_id', 'twitter_handle'))
+                    for voter_we_vote_id, twitter_id in twitter_id_by_voter.items():
+                        twitter_handle_by_voter[voter_we_vote_id] = twitter_handle_by_twitter_id.get(twitter_id, '')
+                values_list = [(voter.we_vote_id, voter.id, voter.get_full_name(), voter.voter_photo_url(),
+                                voter.we_vote_hosted_profile_image_url_large,
+                                voter.we_vote_hosted_profile_image_url_medium,
+                                voter.we_vote_hosted_profile_image_url_tiny,
+                                twitter_handle_by_voter.get(voter.we_vote_id, ''))
+                               for voter in voter_list]
+                results = self.update_positions_from_values(
+                    google_civic_election_id, 'voter_we_vote_id',
+                    [('voter_id', 'bigint', False),
+                     ('speaker_display_name', 'text', False),
+                     ('speaker_image_url_https', 'text', False),
+                     ('speaker_image_url_https_large', 'text', False),
+                     ('speaker_image_url_https_medium', 'text', False),
+                     ('speaker_image_url_https_tiny', 'text', False),
+                     ('speaker_twitter_handle', 'text', False)],
+                    values_list, only_where_sql=no_organization_sql)
+                rows_updated['voter'] = results['public_rows_updated'] + results['friends_rows_updated']
+                public_positions_updated += results['public_rows_updated']
+                friends_only_positions_updated += results['friends_rows_updated']
+
+            status += "BULK_REFRESH_CACHED_POSITION_INFO_FOR_ELECTION "
+        except Exception as e:
+            success = False
+            status += "BULK_REFRESH_CACHED_POSITION_INFO_FOR_ELECTION_FAILED " + str(e) + " "
+            handle_exception(e, logger=logger, exception_message=status)
+
+        results = {
+            'success':                          success,
+            'status':                           status,
+            'public_positions_updated':         public_positions_updated,
+            'friends_only_positions_updated':   friends_only_positions_updated,
+            'rows_updated':                     rows_updated,
+        }
+        return results
+
+    def fetch_we_vote_ids_referenced_in_election(self, google_civic_election_id, position_field_name):
+        """
+        The distinct values of one we_vote_id column, across both position tables, for one election
+        :param google_civic_election_id:
+        :param position_field_name:
+        :return:
+        """
+        we_vote_id_set = set()
+        for position_model in (PositionEntered, PositionForFriends):
+            position_query = position_model.objects.using('readonly').filter(
+                google_civic_election_id=google_civic_election_id)
+            position_query = position_query.exclude(**{position_field_name + '__isnull': True})
+            position_query = position_query.exclude(**{position_field_name: ''})
+            we_vote_id_set.update(position_query.values_list(position_field_name, flat=True).distinct())
+        return list(we_vote_id_set)
+
+    def fetch_ballot_item_we_vote_ids_for_election(self, google_civic_election_id, ballot_item_model,
+                                                   position_field_name):
+        """
+        The we_vote_ids of the candidates, offices or measures in one election, along with the ones referenced by
+        this election's positions
+        :param google_civic_election_id:
+        :param ballot_item_model: CandidateCampaign, ContestOffice or ContestMeasure
+        :param position_field_name: The position column that references ballot_item_model
+        :return:
+        """
+        we_vote_id_set = set(ballot_item_model.objects.using('readonly').filter(
+            google_civic_election_id=google_civic_election_id).values_list('we_vote_id', flat=True))
+        we_vote_id_set.update(self.fetch_we_vote_ids_referenced_in_election(google_civic_election_id,
+                                                                            position_field_name))
+        we_vote_id_set.discard(None)
+        we_vote_id_set.discard('')
+        return list(we_vote_id_set)
+
+    def fetch_we_vote_ids_referenced_by_positions(self, filter_field_name, filter_we_vote_id_list,
+                                                  position_field_name):
+        """
+        The distinct values of one we_vote_id column, across both position tables, in the positions where
+        filter_field_name is one of filter_we_vote_id_list
+        :param filter_field_name:
+        :param filter_we_vote_id_list:
+        :param position_field_name:
+        :return:
+        """
+        we_vote_id_set = set()
+        if not len(filter_we_vote_id_list):
+            return []
+        for position_model in (PositionEntered, PositionForFriends):
+            position_query = position_model.objects.using('readonly').filter(
+                **{filter_field_name + '__in': filter_we_vote_id_list})
+            position_query = position_query.exclude(**{position_field_name + '__isnull': True})
+            position_query = position_query.exclude(**{position_field_name: ''})
+            we_vote_id_set.update(position_query.values_list(position_field_name, flat=True).distinct())
+        return list(we_vote_id_set)
+
+    def update_positions_from_values(self, google_civic_election_id, join_field_name, column_list, values_list,
+                                     only_where_sql=''):
+        """
+        Copy values from a source table into the cached columns of both position tables, with one
+        UPDATE ... FROM (VALUES ...) statement per position table and batch of source rows.
+        :param google_civic_election_id: Only update the positions in this election. 0 to update every position
+          that references one of the source rows.
+        :param join_field_name: The position column matched against the first value in each row of values_list
+        :param column_list: (position_column, 'text' or 'bigint', overwrite_with_empty_value) for each other value
+        :param values_list: One tuple per source row: (we_vote_id, value for each column in column_list)
+        :param only_where_sql: Additional conditions on the position row "p"
+        :return:
+        """
+        public_rows_updated = 0
+        friends_rows_updated = 0
+        if not len(values_list):
+            results = {
+                'public_rows_updated':  public_rows_updated,
+                'friends_rows_updated': friends_rows_updated,
+            }
+            return results
+
+        set_expression_list = []
+        for column_name, column_type, overwrite_with_empty_value in column_list:
+            if overwrite_with_empty_value:
+                set_expression_list.append((column_name, "source.{}".format(column_name)))
+            elif column_type == 'text':
+                # Don't replace a cached value with an empty one
+                set_expression_list.append((column_name, "COALESCE(NULLIF(source.{column}, ''), p.{column})".format(
+                    column=column_name)))
+            else:
+                set_expression_list.append((column_name, "COALESCE(source.{column}, p.{column})".format(
+                    column=column_name)))
+        value_placeholders = "(%s::text, " + ", ".join(
+            "%s::" + column_type for column_name, column_type, overwrite in column_list) + ")"
+        source_column_names = ", ".join(["source_we_vote_id"] + [column[0] for column in column_list])
+        set_sql = ", ".join("{} = {}".format(column_name, expression)
+                            for column_name, expression in set_expression_list)
+        changed_sql = " OR ".join("p.{} IS DISTINCT FROM {}".format(column_name, expression)
+                                  for column_name, expression in set_expression_list)
+
+        if positive_value_exists(google_civic_election_id):
+            election_sql = "AND p.google_civic_election_id = %s "
+            election_params = [str(google_civic_election_id)]
+        else:
+            election_sql = ""
+            election_params = []
+
+        batch_size = 1000
+        for position_model in (PositionEntered, PositionForFriends):
+            for start in range(0, len(values_list), batch_size):
+                values_batch = values_list[start:start + batch_size]
+                sql = "UPDATE {table} AS p SET {set_sql} " \
+                      "FROM (VALUES {values_sql}) AS source ({source_column_names}) " \
+                      "WHERE p.{join_field_name} = source.source_we_vote_id " \
+                      "{election_sql}{only_where_sql}" \
+                      "AND ({changed_sql})".format(
+                          table=position_model._meta.db_table,
+                          set_sql=set_sql,
+                          values_sql=", ".join([value_placeholders] * len(values_batch)),
+                          source_column_names=source_column_names,
+                          join_field_name=join_field_name,
+                          election_sql=election_sql,
+                          only_where_sql=only_where_sql,
+                          changed_sql=changed_sql)
+                params = [value for one_row in values_batch for value in one_row] + election_params
+                with connection.cursor() as cursor:
+                    cursor.execute(sql, params)
+                    if position_model is PositionEntered:
+                        public_rows_updated += cursor.rowcount
+                    else:
+                        friends_rows_updated += cursor.rowcount
+
+        results = {
+            'public_rows_updated':  public_rows_updated,
+            'friends_rows_updated': friends_rows_updated,
+        }
+        return results
+
+    def propagate_cached_values_to_positions(self, kind_of_source, source_id, source_we_vote_id, changed_values,
+                                             update_public_positions=True, update_friends_positions=True):
+        """
+        Copy values that changed on a candidate, office, measure, organization or voter into the columns the
+        position tables cache from it, with one queryset.update() per position table instead of saving each position.
+        Only positions where at least one of the values is different are written.
+        :param kind_of_source: CANDIDATE, OFFICE, MEASURE, ORGANIZATION or VOTER
+        :param source_id:
+        :param source_we_vote_id:
+        :param changed_values: key = position field name, value = new value
+        :param update_public_positions:
+        :param update_friends_positions:
+        :return:
+        """
+        status = ""
+        success = True
+        public_positions_updated = 0
+        friends_positions_updated = 0
+
+        source_id_field_name, source_we_vote_id_field_name = {
+            CANDIDATE:      ('candidate_campaign_id', 'candidate_campaign_we_vote_id'),
+            OFFICE:         ('contest_office_id', 'contest_office_we_vote_id'),
+            MEASURE:        ('contest_measure_id', 'contest_measure_we_vote_id'),
+            ORGANIZATION:   ('organization_id', 'organization_we_vote_id'),
+            VOTER:          ('voter_id', 'voter_we_vote_id'),
+        }.get(kind_of_source, (None, None))
+        if source_id_field_name is None:
+            status += "PROPAGATE_CACHED_VALUES-UNKNOWN_KIND_OF_SOURCE: " + str(kind_of_source) + " "
+            success = False
+        elif not positive_value_exists(source_id) and not positive_value_exists(source_we_vote_id):
+            status += "PROPAGATE_CACHED_VALUES-MISSING_SOURCE_ID "
+            success = False
+        elif not len(changed_values):
+            status += "PROPAGATE_CACHED_VALUES-NOTHING_TO_CHANGE "
+
+        if success and len(changed_values):
+            # Same lookup as the retrieve_all_positions_for_* functions: the id if we have it, otherwise the we_vote_id
+            if positive_value_exists(source_id):
+                position_filter = Q(**{source_id_field_name: source_id})
+            else:
+                position_filter = Q(**{source_we_vote_id_field_name: normalize_we_vote_id(source_we_vote_id)})
+            value_changed_filter = Q()
+            for field_name, new_value in changed_values.items():
+                value_changed_filter |= ~Q(**{field_name: new_value})
+
+            ballot_item_we_vote_id_changes = kind_of_source in (CANDIDATE, OFFICE, MEASURE) \
+                and source_we_vote_id_field_name in changed_values
+            try:
+                # The positions are counted under the we_vote_id they have now, which is about to change
+                ballot_item_we_vote_id_list = []
+                if ballot_item_we_vote_id_changes:
+                    ballot_item_we_vote_id_list.append(changed_values[source_we_vote_id_field_name])
+                    for position_model, update_positions in ((PositionEntered, update_public_positions),
+                                                             (PositionForFriends, update_friends_positions)):
+                        if update_positions:
+                            ballot_item_we_vote_id_list += position_model.objects.filter(position_filter)\
+                                .values_list(source_we_vote_id_field_name, flat=True).distinct()
+                if update_public_positions:
+                    public_positions_updated = PositionEntered.objects.filter(position_filter)\
+                        .filter(value_changed_filter).update(**changed_values)
+                if update_friends_positions:
+                    friends_positions_updated = PositionForFriends.objects.filter(position_filter)\
+                        .filter(value_changed_filter).update(**changed_values)
+                if ballot_item_we_vote_id_changes \
+                        and positive_value_exists(public_positions_updated + friends_positions_updated):
+                    # queryset.update() doesn't go through save(), which keeps PositionCount current. Both the old
+                    # and the new we_vote_id are recounted, since the positions moved from one to the other.
+                    self.recount_positions_for_ballot_items(ballot_item_we_vote_id_list)
+                if kind_of_source == ORGANIZATION and 'speaker_display_name' in changed_values:
+                    # PositionNetworkScore caches the organization name too
+                    network_score_query = PositionNetworkScore.objects.filter(
+                        organization_we_vote_id=normalize_we_vote_id(source_we_vote_id))
+                    network_score_query = network_score_query.exclude(
+                        speaker_display_name=changed_values['speaker_display_name'])
+                    network_score_query.update(speaker_display_name=changed_values['speaker_display_name'])
+                status += "PROPAGATE_CACHED_VALUES-public:" + str(public_positions_updated) + \
+                          ",friends_only:" + str(friends_positions_updated) + " "
+            except Exception as e:
+                success = False
+                status += "PROPAGATE_CACHED_VALUES_FAILED " + str(e) + " "
+                handle_exception(e, logger=logger, exception_message=status)
+
+        results = {
+            'success':                      success,
+            'status':                       status,
+            'public_positions_updated':     public_positions_updated,
+            'friends_positions_updated':    friends_positions_updated,
+            'positions_updated_count':      public_positions_updated + friends_positions_updated,
+        }
+        return results
+
     def refresh_cached_position_info_for_organization(self, organization_we_vote_id):
         position_manager = PositionManager()
         force_update = True
@@ -2226,7 +2912,8 @@ class PositionListManager(models.Model):
 
         # Visible to the Public
         public_positions_list = PositionEntered.objects.all()
-        public_positions_list = public_positions_list.filter(organization_we_vote_id__iexact=organization_we_vote_id)
+        public_positions_list = public_positions_list.filter(
+            organization_we_vote_id=normalize_we_vote_id(organization_we_vote_id))
         for one_position in public_positions_list:
             results = position_manager.refresh_cached_position_info(
                 one_position, force_update,
@@ -2246,7 +2933,7 @@ class PositionListManager(models.Model):
         # Visible to We Vote friends only
         friends_only_positions_list = PositionForFriends.objects.all()
         friends_only_positions_list = friends_only_positions_list.filter(
-            organization_we_vote_id__iexact=organization_we_vote_id)
+            organization_we_vote_id=normalize_we_vote_id(organization_we_vote_id))
         for one_position in friends_only_positions_list:
             results = position_manager.refresh_cached_position_info(
                 one_position, force_update,
@@ -2340,7 +3027,7 @@ class PositionListManager(models.Model):
                     public_positions_list = public_positions_list.filter(organization_id=organization_id)
                 else:
                     public_positions_list = public_positions_list.filter(
-                        organization_we_vote_id__iexact=organization_we_vote_id)
+                        organization_we_vote_id=normalize_we_vote_id(organization_we_vote_id))
                 # SUPPORT, STILL_DECIDING, INFORMATION_ONLY, NO_STANCE, OPPOSE, PERCENT_RATING
                 # if stance_we_are_looking_for != ANY_STANCE:
                 #     # If we passed in the stance "ANY_STANCE" it means we want to not filter down the list
@@ -2475,7 +3162,7 @@ class PositionListManager(models.Model):
                             voter_id=organization_voter_local_id)
                     else:
                         friends_positions_list = friends_positions_list.filter(
-                            voter_we_vote_id__iexact=organization_voter_we_vote_id)
+                            voter_we_vote_id=normalize_we_vote_id(organization_voter_we_vote_id))
 
                     # SUPPORT, STILL_DECIDING, INFORMATION_ONLY, NO_STANCE, OPPOSE, PERCENT_RATING
                     # if stance_we_are_looking_for != ANY_STANCE:
@@ -2597,9 +3284,63 @@ class PositionListManager(models.Model):
         position_list = []
         return position_list
 
+    def retrieve_next_page_of_voter_positions(self, public_positions_query=None, friends_positions_query=None,
+                                              after_position_key='', page_size=VOTER_POSITIONS_PAGE_SIZE,
+                                              field_list=None):
+        """
+        Keyset pagination over one voter's public and friends-only positions together, so the time and memory
+        needed for one page doesn't grow with the voter's history. The public positions come first, then the
+        friends-only positions, each in id order using the (voter_id, id) index. A position's id never changes, so
+        saving a position while the voter pages doesn't move it to another page.
+        :param public_positions_query: A filtered PositionEntered query, or None to leave out public positions
+        :param friends_positions_query: A filtered PositionForFriends query, or None to leave out friends positions
+        :param after_position_key: The next_position_key from the previous page, or '' for the first page
+        :param page_size:
+        :param field_list: If provided, return dicts with only these fields (plus is_public_position) instead of
+          position objects
+        :return:
+        """
+        page_size = max(convert_to_int(page_size), 1)
+        after_position_key_values = decode_voter_position_key(after_position_key)
+        page_position_list = []  # (is_public_position, position) tuples
+        for is_public_position, position_query in ((True, public_positions_query), (False, friends_positions_query)):
+            if position_query is None:
+                continue
+            if after_position_key_values:
+                key_is_public_position, key_position_id = after_position_key_values
+                if key_is_public_position == is_public_position:
+                    position_query = position_query.filter(id__gt=key_position_id)
+                elif not key_is_public_position:
+                    # Every public position came before the key
+                    continue
+            position_query = position_query.order_by('id')
+            if field_list:
+                position_query = position_query.values('id', *field_list)
+            # One more than the rest of the page, so we know whether there is another page
+            for one_position in position_query[:page_size + 1 - len(page_position_list)]:
+                if field_list:
+                    one_position['is_public_position'] = is_public_position
+                page_position_list.append((is_public_position, one_position))
+            if len(page_position_list) > page_size:
+                break
+
+        next_position_key = ''
+        if len(page_position_list) > page_size:
+            page_position_list = page_position_list[:page_size]
+            is_public_position, last_position = page_position_list[-1]
+            next_position_key = encode_voter_position_key(
+                is_public_position, last_position['id'] if field_list else last_position.id)
+
+        results = {
+            'position_list':        [one_position for is_public_position, one_position in page_position_list],
+            'next_position_key':    next_position_key,
+        }
+        return results
+
     def retrieve_all_positions_for_voter(self, voter_id=0, voter_we_vote_id='',
                                          stance_we_are_looking_for=ANY_STANCE, friends_vs_public=FRIENDS_AND_PUBLIC,
-                                         google_civic_election_id=0, this_election_vs_others='', state_code=''):
+                                         google_civic_election_id=0, this_election_vs_others='', state_code='',
+                                         after_position_key='', page_size=0):
         """
         We want the voter's position information for display prior to sign in
         :param voter_id:
@@ -2610,6 +3351,9 @@ class PositionListManager(models.Model):
         :param google_civic_election_id:
         :param this_election_vs_others:
         :param state_code:
+        :param after_position_key: With page_size, the next_position_key from the previous page
+        :param page_size: If provided, return one page of positions, ordered by id instead of
+          google_civic_election_id
         :return:
         """
         if not positive_value_exists(voter_id) and not positive_value_exists(voter_we_vote_id):
@@ -2651,7 +3395,10 @@ class PositionListManager(models.Model):
         # Retrieve public positions for this organization
         public_positions_list = []
         friends_positions_list = []
+        public_positions_query_for_page = None
+        friends_positions_query_for_page = None
         position_list_found = False
+        next_position_key = ''
 
         if retrieve_public_positions:
             ############################
@@ -2666,7 +3413,7 @@ class PositionListManager(models.Model):
                     public_positions_list_query = public_positions_list_query.filter(voter_id=voter_id)
                 elif positive_value_exists(voter_we_vote_id):
                     public_positions_list_query = public_positions_list_query.filter(
-                        voter_we_vote_id__iexact=voter_we_vote_id)
+                        voter_we_vote_id=normalize_we_vote_id(voter_we_vote_id))
                 if retrieve_this_election_only:
                     public_positions_list_query = public_positions_list_query.filter(
                         google_civic_election_id=google_civic_election_id)
@@ -2690,9 +3437,12 @@ class PositionListManager(models.Model):
                     public_positions_list_query = public_positions_list_query.filter(
                         stance=stance_we_are_looking_for)
 
-                # Force the position for the most recent election to show up last
-                public_positions_list_query = public_positions_list_query.order_by('google_civic_election_id')
-                public_positions_list = list(public_positions_list_query)  # Force the query to run
+                if positive_value_exists(page_size):
+                    public_positions_query_for_page = public_positions_list_query
+                else:
+                    # Force the position for the most recent election to show up last
+                    public_positions_list_query = public_positions_list_query.order_by('google_civic_election_id')
+                    public_positions_list = list(public_positions_list_query)  # Force the query to run
             except Exception as e:
                 position_list = []
                 results = {
@@ -2716,7 +3466,7 @@ class PositionListManager(models.Model):
                     friends_positions_list_query = friends_positions_list_query.filter(voter_id=voter_id)
                 elif positive_value_exists(voter_we_vote_id):
                     friends_positions_list_query = friends_positions_list_query.filter(
-                        voter_we_vote_id__iexact=voter_we_vote_id)
+                        voter_we_vote_id=normalize_we_vote_id(voter_we_vote_id))
                 if retrieve_this_election_only:
                     friends_positions_list_query = friends_positions_list_query.filter(
                         google_civic_election_id=google_civic_election_id)
@@ -2740,9 +3490,12 @@ class PositionListManager(models.Model):
                     friends_positions_list_query = friends_positions_list_query.filter(
                         stance=stance_we_are_looking_for)
 
-                # Force the position for the most recent election to show up last
-                friends_positions_list_query = friends_positions_list_query.order_by('google_civic_election_id')
-                friends_positions_list = list(friends_positions_list_query)  # Force the query to run
+                if positive_value_exists(page_size):
+                    friends_positions_query_for_page = friends_positions_list_query
+                else:
+                    # Force the position for the most recent election to show up last
+                    friends_positions_list_query = friends_positions_list_query.order_by('google_civic_election_id')
+                    friends_positions_list = list(friends_positions_list_query)  # Force the query to run
             except Exception as e:
                 position_list = []
                 results = {
@@ -2770,7 +3523,24 @@ class PositionListManager(models.Model):
         #     revised_position_list.append(one_position)
         # friends_positions_list = revised_position_list
 
-        position_list = public_positions_list + friends_positions_list
+        if positive_value_exists(page_size):
+            try:
+                page_results = self.retrieve_next_page_of_voter_positions(
+                    public_positions_query_for_page, friends_positions_query_for_page,
+                    after_position_key=after_position_key, page_size=page_size)
+            except Exception as e:
+                position_list = []
+                results = {
+                    'status':               'VOTER_POSITION_PAGE_SEARCH_FAILED',
+                    'success':              False,
+                    'position_list_found':  False,
+                    'position_list':        position_list,
+                }
+                return results
+            position_list = page_results['position_list']
+            next_position_key = page_results['next_position_key']
+        else:
+            position_list = public_positions_list + friends_positions_list
 
         # Now filter out the positions that have a percent rating that doesn't match the stance_we_are_looking_for
         if stance_we_are_looking_for == SUPPORT or stance_we_are_looking_for == OPPOSE:
@@ -2811,6 +3581,7 @@ class PositionListManager(models.Model):
                 'success':              True,
                 'position_list_found':  True,
                 'position_list':        enhanced_position_list,
+                'next_position_key':    next_position_key,
             }
             return results
         else:
@@ -2820,15 +3591,20 @@ class PositionListManager(models.Model):
                 'success':              True,
                 'position_list_found':  False,
                 'position_list':        position_list,
+                'next_position_key':    next_position_key,
             }
             return results
 
-    def retrieve_all_positions_for_voter_simple(self, voter_id=0, voter_we_vote_id='', google_civic_election_id=0):
+    def retrieve_all_positions_for_voter_simple(self, voter_id=0, voter_we_vote_id='', google_civic_election_id=0,
+                                                after_position_key='', page_size=0):
         """
         We just want the barest of information.
         :param voter_id:
         :param voter_we_vote_id:
         :param google_civic_election_id:
+        :param after_position_key: With page_size, the next_position_key from the previous page
+        :param page_size: If provided, return one page of positions, ordered by id instead of
+          google_civic_election_id (see retrieve_next_page_of_voter_positions)
         :return:
         """
         if not positive_value_exists(voter_id) and not positive_value_exists(voter_we_vote_id):
@@ -2838,111 +3614,80 @@ class PositionListManager(models.Model):
                 'success':              False,
                 'position_list_found':  False,
                 'position_list':        position_list,
+                'next_position_key':    '',
             }
             return results
 
         # Retrieve all positions for this voter -- if here we know that either voter_id or voter_we_vote_id exist
-
-        ############################
-        # Retrieve public positions
-        try:
-            public_positions_list_query = PositionEntered.objects.all()
+        position_queries = []
+        for position_model in (PositionEntered, PositionForFriends):
+            position_list_query = position_model.objects.all()
 
             # As of Aug 2018 we are no longer using PERCENT_RATING
-            public_positions_list_query = public_positions_list_query.exclude(stance__iexact=PERCENT_RATING)
+            position_list_query = position_list_query.exclude(stance__iexact=PERCENT_RATING)
 
             if positive_value_exists(voter_id):
-                public_positions_list_query = public_positions_list_query.filter(voter_id=voter_id)
+                position_list_query = position_list_query.filter(voter_id=voter_id)
             elif positive_value_exists(voter_we_vote_id):
-                public_positions_list_query = public_positions_list_query.filter(
-                    voter_we_vote_id__iexact=voter_we_vote_id)
+                position_list_query = position_list_query.filter(
+                    voter_we_vote_id=normalize_we_vote_id(voter_we_vote_id))
             if positive_value_exists(google_civic_election_id):
-                public_positions_list_query = public_positions_list_query.filter(
-                    google_civic_election_id=google_civic_election_id)
-            # Force the position for the most recent election to show up last
-            public_positions_list_query = public_positions_list_query.order_by('google_civic_election_id')
-            public_positions_list = list(public_positions_list_query)  # Force the query to run
-        except Exception as e:
-            position_list = []
-            results = {
-                'status':               'VOTER_POSITION_FOR_PUBLIC_SEARCH_FAILED',
-                'success':              False,
-                'position_list_found':  False,
-                'position_list':        position_list,
-            }
-            return results
+                position_list_query = position_list_query.filter(google_civic_election_id=google_civic_election_id)
+            position_queries.append(position_list_query)
 
-        ############################
-        # Retrieve positions meant for friends only
+        field_list = ['candidate_campaign_we_vote_id', 'contest_measure_we_vote_id', 'stance', 'statement_text']
         try:
-            friends_positions_list_query = PositionForFriends.objects.all()
-
-            # As of Aug 2018 we are no longer using PERCENT_RATING
-            friends_positions_list_query = friends_positions_list_query.exclude(stance__iexact=PERCENT_RATING)
-
-            if positive_value_exists(voter_id):
-                friends_positions_list_query = friends_positions_list_query.filter(voter_id=voter_id)
-            elif positive_value_exists(voter_we_vote_id):
-                friends_positions_list_query = friends_positions_list_query.filter(
-                    voter_we_vote_id__iexact=voter_we_vote_id)
-            if positive_value_exists(google_civic_election_id):
-                friends_positions_list_query = friends_positions_list_query.filter(
-                    google_civic_election_id=google_civic_election_id)
-            # Force the position for the most recent election to show up last
-            friends_positions_list_query = friends_positions_list_query.order_by('google_civic_election_id')
-            friends_positions_list = list(friends_positions_list_query)  # Force the query to run
+            if positive_value_exists(page_size):
+                page_results = self.retrieve_next_page_of_voter_positions(
+                    position_queries[0], position_queries[1], after_position_key=after_position_key,
+                    page_size=page_size, field_list=field_list)
+            else:
+                # Public positions, then positions for friends, with the most recent election last in each
+                page_results = {
+                    'position_list':        [],
+                    'next_position_key':    '',
+                }
+                for is_public_position, position_list_query in zip((True, False), position_queries):
+                    for one_position in position_list_query.order_by('google_civic_election_id').values(*field_list):
+                        one_position['is_public_position'] = is_public_position
+                        page_results['position_list'].append(one_position)
         except Exception as e:
             position_list = []
             results = {
-                'status':               'VOTER_POSITION_FOR_FRIENDS_SEARCH_FAILED',
+                'status':               'VOTER_POSITION_SEARCH_FAILED',
                 'success':              False,
                 'position_list_found':  False,
                 'position_list':        position_list,
+                'next_position_key':    '',
             }
             return results
 
-        # 2018-05 We now have an "is_public_position()" function
-        # # Mark these positions as "is_public_position"
-        # public_positions_list2 = []
-        # for one_public_position in public_positions_list:
-        #     one_public_position.is_public_position = True
-        #     public_positions_list2.append(one_public_position)
-        #
-        # # Mark these positions as NOT "is_public_position"
-        # friends_positions_list2 = []
-        # for one_friends_position in friends_positions_list:
-        #     one_friends_position.is_public_position = False
-        #     friends_positions_list2.append(one_friends_position)
-
-        # Merge public positions and "For friends" positions
-        position_list = public_positions_list + friends_positions_list
-        position_list_found = len(position_list)
-
-        if position_list_found:
-            simple_position_list = []
-            for position in position_list:
-                # Make sure we have a ballot_item_we_vote_id
-                if positive_value_exists(position.candidate_campaign_we_vote_id):
-                    ballot_item_we_vote_id = position.candidate_campaign_we_vote_id
-                elif positive_value_exists(position.contest_measure_we_vote_id):
-                    ballot_item_we_vote_id = position.contest_measure_we_vote_id
-                else:
-                    continue
-
-                one_position = {
-                    'ballot_item_we_vote_id':   ballot_item_we_vote_id,
-                    'is_support':               position.is_support(),
-                    'is_oppose':                position.is_oppose(),
-                    'statement_text':           position.statement_text,
-                    'is_public_position':       position.is_public_position(),
-                }
-                simple_position_list.append(one_position)
+        simple_position_list = []
+        for position in page_results['position_list']:
+            # Make sure we have a ballot_item_we_vote_id
+            if positive_value_exists(position['candidate_campaign_we_vote_id']):
+                ballot_item_we_vote_id = position['candidate_campaign_we_vote_id']
+            elif positive_value_exists(position['contest_measure_we_vote_id']):
+                ballot_item_we_vote_id = position['contest_measure_we_vote_id']
+            else:
+                continue
+
+            one_position = {
+                'ballot_item_we_vote_id':   ballot_item_we_vote_id,
+                'is_support':               position['stance'] == SUPPORT,
+                'is_oppose':                position['stance'] == OPPOSE,
+                'statement_text':           position['statement_text'],
+                'is_public_position':       position['is_public_position'],
+            }
+            simple_position_list.append(one_position)
 
+        if len(simple_position_list):
             results = {
                 'status':               'VOTER_POSITION_LIST_FOUND',
                 'success':              True,
                 'position_list_found':  True,
                 'position_list':        simple_position_list,
+                'next_position_key':    page_results['next_position_key'],
             }
             return results
         else:
@@ -2952,6 +3697,7 @@ class PositionListManager(models.Model):
                 'success':              True,
                 'position_list_found':  False,
                 'position_list':        position_list,
+                'next_position_key':    page_results['next_position_key'],
             }
             return results
 
@@ -3014,46 +3760,282 @@ class PositionListManager(models.Model):
             position_list = []
             return position_list
 
-    def remove_older_positions_for_each_org(self, position_list):
-        # If we have multiple positions for one org, we only want to show the most recent
-        organization_already_reviewed = []
-        organization_with_multiple_positions = []
-        newest_position_for_org = {}  # Figure out the newest position per org that we should show
-        for one_position in position_list:
-            if one_position.organization_we_vote_id:
-                if one_position.organization_we_vote_id not in organization_already_reviewed:
-                    organization_already_reviewed.append(one_position.organization_we_vote_id)
-                # Are we dealing with a time span (instead of google_civic_election_id)?
-                if positive_value_exists(one_position.vote_smart_time_span):
-                    # Take the first four digits of one_position.vote_smart_time_span
-                    first_four_digits = convert_to_int(one_position.vote_smart_time_span[:4])
-                    # And figure out the newest position for each org
-                    if one_position.organization_we_vote_id in newest_position_for_org:
-                        # If we are here, it means we have seen this organization once already
-                        if one_position.organization_we_vote_id not in organization_with_multiple_positions:
-                            organization_with_multiple_positions.append(one_position.organization_we_vote_id)
-                        # If this position is newer than the one already looked at, update newest_position_for_org
-                        if first_four_digits > newest_position_for_org[one_position.organization_we_vote_id]:
-                            newest_position_for_org[one_position.organization_we_vote_id] = first_four_digits
-                    else:
-                        newest_position_for_org[one_position.organization_we_vote_id] = first_four_digits
+    def filter_to_most_recent_position_for_each_org(self, position_list_query):
+        """
+        If an org has multiple Vote Smart ratings (positions with a vote_smart_time_span), we only want to show the
+        most recent one: the one whose time span starts in the latest year, and then the newest by date_entered. For
+        those orgs, that is the only position kept. Positions from every other org, and positions without an
+        organization_we_vote_id, are all kept. This is done in the database (with a Postgres DISTINCT ON subquery),
+        so we don't transfer the older ratings.
+        :param position_list_query:
+        :return:
+        """
+        time_span_positions_query = position_list_query.exclude(organization_we_vote_id__isnull=True)
+        time_span_positions_query = time_span_positions_query.exclude(organization_we_vote_id='')
+        time_span_positions_query = time_span_positions_query.exclude(vote_smart_time_span__isnull=True)
+        time_span_positions_query = time_span_positions_query.exclude(vote_smart_time_span='')
+        organizations_with_multiple_query = time_span_positions_query.order_by().values('organization_we_vote_id')\
+            .annotate(time_span_positions_count=Count('id')).filter(time_span_positions_count__gt=1)\
+            .values('organization_we_vote_id')
+        # The first four digits of the time span are the year it starts
+        most_recent_position_ids_query = time_span_positions_query.filter(
+            organization_we_vote_id__in=organizations_with_multiple_query)\
+            .annotate(time_span_start_year=Substr('vote_smart_time_span', 1, 4))\
+            .order_by('organization_we_vote_id', F('time_span_start_year').desc(nulls_last=True), '-date_entered',
+                      '-id')\
+            .distinct('organization_we_vote_id').values('id')
+        return position_list_query.filter(
+            Q(organization_we_vote_id__isnull=True) | Q(organization_we_vote_id='') |
+            ~Q(organization_we_vote_id__in=organizations_with_multiple_query) |
+            Q(id__in=most_recent_position_ids_query))
 
-        position_list_filtered = []
-        position_included_for_this_org = {}
-        for one_position in position_list:
-            if one_position.organization_we_vote_id in organization_with_multiple_positions:
-                if positive_value_exists(one_position.vote_smart_time_span):
-                    first_four_digits = convert_to_int(one_position.vote_smart_time_span[:4])
-                    if (newest_position_for_org[one_position.organization_we_vote_id] == first_four_digits) and \
-                            (one_position.organization_we_vote_id not in position_included_for_this_org):
-                        # If this position is the newest from among the organization's positions, include in results
-                        position_list_filtered.append(one_position)
-                        # Only add one position to position_list_filtered once
-                        position_included_for_this_org[one_position.organization_we_vote_id] = True
+    @staticmethod
+    def fetch_materialized_positions_count(ballot_item_we_vote_id, stance_we_are_looking_for=ANY_STANCE,
+                                           public_or_private=PUBLIC_ONLY):
+        """
+        Read the number of positions for one ballot item from PositionCount instead of counting positions.
+        :param ballot_item_we_vote_id: candidate, measure or office we_vote_id
+        :param stance_we_are_looking_for:
+        :param public_or_private:
+        :return:
+        """
+        if not positive_value_exists(ballot_item_we_vote_id):
+            return 0
+
+        position_count = 0
+        try:
+            count_query = PositionCount.objects.using('readonly').filter(
+                ballot_item_we_vote_id=ballot_item_we_vote_id.lower(),
+                is_public_position=public_or_private != FRIENDS_ONLY)
+            if stance_we_are_looking_for != ANY_STANCE:
+                count_query = count_query.filter(stance=stance_we_are_looking_for.upper())
             else:
-                position_list_filtered.append(one_position)
+                # As of Aug 2018 we are no longer using PERCENT_RATING
+                count_query = count_query.exclude(stance=PERCENT_RATING)
+            position_count = count_query.aggregate(total=Sum('positions_count'))['total'] or 0
+        except Exception as e:
+            handle_record_not_found_exception(e, logger=logger)
+
+        return position_count
+
+    def bulk_reassign_positions(self, retrieve_public_positions, from_filter, to_filter, new_values,
+                                duplicate_match_field_list, match_on_first_value_only=False,
+                                match_value_required=False, duplicate_in_either_table=False,
+                                merge_duplicate_statements=False, duplicate_values=None):
+        """
+        Move a set of positions (for example all of one candidate's positions, or all of one voter's positions)
+        to another candidate, measure, office, organization or voter in one transaction, with a constant number of
+        queries no matter how many positions are moved.
+        First we find, with one query, the positions that would be duplicates once they are moved, because the
+        destination already has a position from the same speaker (or on the same ballot item). Those duplicates are
+        deleted, optionally after copying their statement into the position that is kept. The remaining positions are
+        moved with one UPDATE.
+        :param retrieve_public_positions: True to move PositionEntered entries, False for PositionForFriends
+        :param from_filter: Q that finds the positions to move
+        :param to_filter: Q that finds the positions already at the destination
+        :param new_values: Field values that move a position to the destination
+        :param duplicate_match_field_list: A position is a duplicate if a destination position has the same value
+          in one of these fields
+        :param match_on_first_value_only: Only compare the first field in duplicate_match_field_list that has a value,
+          instead of any of them
+        :param match_value_required: Fail (and move nothing) if a position has no value in any of the match fields
+        :param duplicate_in_either_table: Also treat a destination position in the other position table as a duplicate
+        :param merge_duplicate_statements: Copy statement_text and statement_html from a duplicate into the position we
+          keep, when the position we keep doesn't have one
+        :param duplicate_values: Field values to save on the positions we keep in place of a duplicate
+        :return:
+        """
+        status = ""
+        success = True
+        positions_moved = 0
+        duplicates_removed = 0
+        ballot_item_we_vote_ids_changed = set()
+        if retrieve_public_positions:
+            position_model = PositionEntered
+            other_position_model = PositionForFriends
+        else:
+            position_model = PositionForFriends
+            other_position_model = PositionEntered
+        to_position_model_list = [position_model]
+        if duplicate_in_either_table:
+            to_position_model_list.append(other_position_model)
+        ballot_item_field_list = ['candidate_campaign_we_vote_id', 'contest_measure_we_vote_id',
+                                  'contest_office_we_vote_id']
+
+        try:
+            with transaction.atomic():
+                # For each match field, the id of a destination position with the same value, in each table
+                duplicate_annotations = {}
+                for model_index, to_position_model in enumerate(to_position_model_list):
+                    to_query = to_position_model.objects.filter(to_filter)
+                    for field_name in duplicate_match_field_list:
+                        duplicate_to_query = to_query.exclude(**{field_name + '__isnull': True})
+                        duplicate_to_query = duplicate_to_query.exclude(**{field_name: ''})
+                        duplicate_annotations['duplicate_{}_of_{}'.format(model_index, field_name)] = Subquery(
+                            duplicate_to_query.filter(**{field_name: OuterRef(field_name)})
+                            .order_by('-date_entered').values('id')[:1])
+                from_query = position_model.objects.select_for_update().filter(from_filter)
+                from_query = from_query.exclude(to_filter).annotate(**duplicate_annotations)
+                from_position_list = list(from_query.values(
+                    'id', *(set(duplicate_match_field_list) | set(ballot_item_field_list)),
+                    *duplicate_annotations.keys()))
+
+                position_ids_to_move = []
+                # key = index in to_position_model_list, value = list of (from position id, to position id)
+                duplicate_pairs_by_model = {model_index: [] for model_index in range(len(to_position_model_list))}
+                for from_position in from_position_list:
+                    duplicate_found = False
+                    match_value_found = False
+                    for field_name in duplicate_match_field_list:
+                        if not positive_value_exists(from_position[field_name]):
+                            continue
+                        match_value_found = True
+                        for model_index in range(len(to_position_model_list)):
+                            duplicate_of_id = from_position['duplicate_{}_of_{}'.format(model_index, field_name)]
+                            if duplicate_of_id:
+                                duplicate_pairs_by_model[model_index].append((from_position['id'], duplicate_of_id))
+                                duplicate_found = True
+                                break
+                        if duplicate_found or match_on_first_value_only:
+                            break
+                    if match_value_required and not match_value_found:
+                        raise ValueError("position " + str(from_position['id']) + " has no " +
+                                         " or ".join(duplicate_match_field_list))
+                    if not duplicate_found:
+                        position_ids_to_move.append(from_position['id'])
+                    for field_name in ballot_item_field_list:
+                        if positive_value_exists(from_position[field_name]):
+                            ballot_item_we_vote_ids_changed.add(from_position[field_name])
+
+                for model_index, to_position_model in enumerate(to_position_model_list):
+                    duplicate_pairs = duplicate_pairs_by_model[model_index]
+                    if not len(duplicate_pairs):
+                        continue
+                    if merge_duplicate_statements:
+                        with connection.cursor() as cursor:
+                            cursor.execute(
+                                "UPDATE {to_table} AS to_position SET "
+                                "statement_text = CASE WHEN COALESCE(to_position.statement_text, '') = '' "
+                                "THEN from_position.statement_text ELSE to_position.statement_text END, "
+                                "statement_html = CASE WHEN COALESCE(to_position.statement_html, '') = '' "
+                                "THEN from_position.statement_html ELSE to_position.statement_html END "
+                                "FROM {from_table} AS from_position, (VALUES {pairs}) AS pair (from_id, to_id) "
+                                "WHERE to_position.id = pair.to_id AND from_position.id = pair.from_id "
+                                "AND ((COALESCE(to_position.statement_text, '') = '' "
+                                "AND COALESCE(from_position.statement_text, '') != '') "
+                                "OR (COALESCE(to_position.statement_html, '') = '' "
+                                "AND COALESCE(from_position.statement_html, '') != ''))".format(
+                                    to_table=to_position_model._meta.db_table,
+                                    from_table=position_model._meta.db_table,
+                                    pairs=", ".join(["(%s::bigint, %s::bigint)"] * len(duplicate_pairs))),
+                                [one_id for one_pair in duplicate_pairs for one_id in one_pair])
+                    if duplicate_values:
+                        to_position_model.objects.filter(id__in=[to_id for from_id, to_id in duplicate_pairs])\
+                            .update(**duplicate_values)
+
+                duplicate_ids = [from_id for model_index in duplicate_pairs_by_model
+                                 for from_id, to_id in duplicate_pairs_by_model[model_index]]
+                if len(duplicate_ids):
+                    # Deleted without delete(), since PositionCount is recounted below
+                    with connection.cursor() as cursor:
+                        cursor.execute("DELETE FROM {table} WHERE id = ANY(%s)".format(
+                            table=position_model._meta.db_table), [duplicate_ids])
+                        duplicates_removed = cursor.rowcount
+
+                if len(position_ids_to_move):
+                    positions_moved = position_model.objects.filter(id__in=position_ids_to_move).update(**new_values)
+            status += "BULK_REASSIGN_POSITIONS-moved:" + str(positions_moved) + \
+                      ",duplicates_removed:" + str(duplicates_removed) + " "
+        except Exception as e:
+            success = False
+            positions_moved = 0
+            duplicates_removed = 0
+            status += "BULK_REASSIGN_POSITIONS_FAILED " + str(e) + " "
+            handle_exception(e, logger=logger, exception_message=status)
+
+        if success:
+            # queryset.update() and the DELETE above don't go through the save() and delete() that keep PositionCount
+            # current
+            for field_name in ballot_item_field_list:
+                if positive_value_exists(new_values.get(field_name)):
+                    ballot_item_we_vote_ids_changed.add(new_values[field_name])
+            if len(ballot_item_we_vote_ids_changed):
+                self.recount_positions_for_ballot_items(list(ballot_item_we_vote_ids_changed))
+
+        results = {
+            'success':              success,
+            'status':               status,
+            'positions_moved':      positions_moved,
+            'duplicates_removed':   duplicates_removed,
+        }
+        return results
+
+    def recount_positions_for_ballot_items(self, ballot_item_we_vote_id_list=None):
+        """
+        Rebuild PositionCount from PositionEntered and PositionForFriends, either for a list of ballot items
+        (after a bulk change that doesn't go through save() or delete()) or, when ballot_item_we_vote_id_list is None,
+        for everything.
+        :param ballot_item_we_vote_id_list:
+        :return:
+        """
+        status = ""
+        success = True
+        position_counts_saved = 0
+        if ballot_item_we_vote_id_list is not None:
+            ballot_item_we_vote_id_list = list(set(
+                one_we_vote_id.lower() for one_we_vote_id in ballot_item_we_vote_id_list
+                if positive_value_exists(one_we_vote_id)))
+            if not len(ballot_item_we_vote_id_list):
+                status += "RECOUNT_POSITIONS-NO_BALLOT_ITEMS "
+                results = {
+                    'success':                  success,
+                    'status':                   status,
+                    'position_counts_saved':    position_counts_saved,
+                }
+                return results
+
+        try:
+            position_count_totals = {}
+            for position_model, is_public_position in ((PositionEntered, True), (PositionForFriends, False)):
+                for ballot_item_field in ('candidate_campaign_we_vote_id', 'contest_measure_we_vote_id',
+                                          'contest_office_we_vote_id'):
+                    count_query = position_model.objects.annotate(ballot_item_we_vote_id=Lower(ballot_item_field))
+                    if ballot_item_we_vote_id_list is not None:
+                        count_query = count_query.filter(ballot_item_we_vote_id__in=ballot_item_we_vote_id_list)
+                    else:
+                        count_query = count_query.exclude(**{ballot_item_field + '__isnull': True})
+                        count_query = count_query.exclude(**{ballot_item_field: ''})
+                    count_query = count_query.values('ballot_item_we_vote_id', 'stance').annotate(
+                        positions_count=Count('id')).order_by()
+                    for one_total in count_query:
+                        key = (one_total['ballot_item_we_vote_id'], one_total['stance'], is_public_position)
+                        position_count_totals[key] = \
+                            position_count_totals.get(key, 0) + one_total['positions_count']
+
+            with transaction.atomic():
+                if ballot_item_we_vote_id_list is not None:
+                    PositionCount.objects.filter(ballot_item_we_vote_id__in=ballot_item_we_vote_id_list).delete()
+                else:
+                    PositionCount.objects.all().delete()
+                PositionCount.objects.bulk_create([
+                    PositionCount(ballot_item_we_vote_id=ballot_item_we_vote_id, stance=stance,
+                                  is_public_position=is_public_position, positions_count=positions_count)
+                    for (ballot_item_we_vote_id, stance, is_public_position), positions_count
+                    in position_count_totals.items()], batch_size=1000)
+            position_counts_saved = len(position_count_totals)
+            status += "POSITION_COUNTS_REBUILT "
+        except Exception as e:
+            success = False
+            status += 'FAILED recount_positions_for_ballot_items ' \
+                      '{error} [type: {error_type}] '.format(error=e, error_type=type(e))
+            handle_exception(e, logger=logger, exception_message=status)
 
-        return position_list_filtered
+        results = {
+            'success':                  success,
+            'status':                   status,
+            'position_counts_saved':    position_counts_saved,
+        }
+        return results
 
     def fetch_public_positions_count_for_candidate_campaign(self, candidate_campaign_id,
                                                             candidate_campaign_we_vote_id,
@@ -3089,6 +4071,15 @@ class PositionListManager(models.Model):
                 positive_value_exists(candidate_campaign_we_vote_id):
             return 0
 
+        if friends_we_vote_id_list is False and organizations_followed_we_vote_id_list is False:
+            # Counting all positions, which PositionCount already has
+            if not positive_value_exists(candidate_campaign_we_vote_id):
+                candidate_campaign_manager = CandidateCampaignManager()
+                candidate_campaign_we_vote_id = \
+                    candidate_campaign_manager.fetch_candidate_campaign_we_vote_id_from_id(candidate_campaign_id)
+            return PositionListManager.fetch_materialized_positions_count(
+                candidate_campaign_we_vote_id, stance_we_are_looking_for, public_or_private)
+
         retrieve_friends_positions = False
         retrieve_public_positions = False
         if public_or_private not in(PUBLIC_ONLY, FRIENDS_ONLY):
@@ -3120,7 +4111,7 @@ class PositionListManager(models.Model):
                 position_list_query = position_list_query.filter(candidate_campaign_id=candidate_campaign_id)
             else:
                 position_list_query = position_list_query.filter(
-                    candidate_campaign_we_vote_id__iexact=candidate_campaign_we_vote_id)
+                    candidate_campaign_we_vote_id=normalize_we_vote_id(candidate_campaign_we_vote_id))
             # SUPPORT, STILL_DECIDING, INFORMATION_ONLY, NO_STANCE, OPPOSE, PERCENT_RATING
             if stance_we_are_looking_for != ANY_STANCE:
                 # # If we passed in the stance "ANY_STANCE" it means we want to not filter down the list
@@ -3153,13 +4144,13 @@ class PositionListManager(models.Model):
                 # Find positions from friends. Look for we_vote_id case insensitive.
                 we_vote_id_filter = Q()
                 for we_vote_id in friends_we_vote_id_list:
-                    we_vote_id_filter |= Q(voter_we_vote_id__iexact=we_vote_id)
+                    we_vote_id_filter |= Q(voter_we_vote_id=normalize_we_vote_id(we_vote_id))
                 position_list_query = position_list_query.filter(we_vote_id_filter)
             if retrieve_public_positions and organizations_followed_we_vote_id_list is not False:
                 # Find positions from organizations voter follows.
                 we_vote_id_filter = Q()
                 for we_vote_id in organizations_followed_we_vote_id_list:
-                    we_vote_id_filter |= Q(organization_we_vote_id__iexact=we_vote_id)
+                    we_vote_id_filter |= Q(organization_we_vote_id=normalize_we_vote_id(we_vote_id))
                 position_list_query = position_list_query.filter(we_vote_id_filter)
 
             # Limit to positions in the last x years - currently we are not limiting
@@ -3207,48 +4198,13 @@ class PositionListManager(models.Model):
 
         if public_or_private not in(PUBLIC_ONLY, FRIENDS_ONLY):
             public_or_private = PUBLIC_ONLY
-        if public_or_private == FRIENDS_ONLY:
-            position_list_query = PositionForFriends.objects.using('readonly').all()
-        else:
-            position_list_query = PositionEntered.objects.using('readonly').all()
-
-        # As of Aug 2018 we are no longer using PERCENT_RATING
-        position_list_query = position_list_query.exclude(stance__iexact=PERCENT_RATING)
-
-        # Retrieve the support positions for this contest_office_id
-        position_count = 0
-        try:
-            if positive_value_exists(contest_office_id):
-                position_list_query = position_list_query.filter(contest_office_id=contest_office_id)
-            else:
-                position_list_query = position_list_query.filter(
-                    contest_office_we_vote_id__iexact=contest_office_we_vote_id)
-            # SUPPORT, STILL_DECIDING, INFORMATION_ONLY, NO_STANCE, OPPOSE, PERCENT_RATING
-            if stance_we_are_looking_for != ANY_STANCE:
-                # If we passed in the stance "ANY_STANCE" it means we want to not filter down the list
-                # if stance_we_are_looking_for == SUPPORT:
-                #     position_list_query = position_list_query.filter(
-                #         Q(stance=stance_we_are_looking_for) |  # Matches "is_support"
-                #         (Q(stance=PERCENT_RATING) & Q(vote_smart_rating_integer__gte=66))  # "is_positive_rating"
-                #     )  # | Q(stance=GRADE_RATING))
-                # elif stance_we_are_looking_for == OPPOSE:
-                #     position_list_query = position_list_query.filter(
-                #         Q(stance=stance_we_are_looking_for) |  # Matches "is_oppose"
-                #         (Q(stance=PERCENT_RATING) & Q(vote_smart_rating_integer__lte=33))  # "is_negative_rating"
-                #     )  # | Q(stance=GRADE_RATING))
-                # else:
-                #     position_list_query = position_list_query.filter(stance=stance_we_are_looking_for)
-
-                position_list_query = position_list_query.filter(stance__iexact=stance_we_are_looking_for)
-
-            # Limit to positions in the last x years - currently we are not limiting
-            # position_list = position_list.filter(election_id=election_id)
 
-            position_count = position_list_query.count()
-        except Exception as e:
-            handle_record_not_found_exception(e, logger=logger)
-
-        return position_count
+        if not positive_value_exists(contest_office_we_vote_id):
+            contest_office_manager = ContestOfficeManager()
+            contest_office_we_vote_id = contest_office_manager.fetch_contest_office_we_vote_id_from_id(
+                contest_office_id)
+        return PositionListManager.fetch_materialized_positions_count(
+            contest_office_we_vote_id, stance_we_are_looking_for, public_or_private)
 
     def fetch_public_positions_count_for_contest_measure(self, contest_measure_id,
                                                          contest_measure_we_vote_id,
@@ -3284,47 +4240,13 @@ class PositionListManager(models.Model):
 
         if public_or_private not in(PUBLIC_ONLY, FRIENDS_ONLY):
             public_or_private = PUBLIC_ONLY
-        if public_or_private == FRIENDS_ONLY:
-            position_list_query = PositionForFriends.objects.using('readonly').all()
-        else:
-            position_list_query = PositionEntered.objects.using('readonly').all()
-
-        # As of Aug 2018 we are no longer using PERCENT_RATING
-        position_list_query = position_list_query.exclude(stance__iexact=PERCENT_RATING)
-
-        # Retrieve the support positions for this contest_measure_id
-        position_count = 0
-        try:
-            if positive_value_exists(contest_measure_id):
-                position_list_query = position_list_query.filter(contest_measure_id=contest_measure_id)
-            else:
-                position_list_query = position_list_query.filter(
-                    contest_measure_we_vote_id__iexact=contest_measure_we_vote_id)
-            # SUPPORT, STILL_DECIDING, INFORMATION_ONLY, NO_STANCE, OPPOSE, PERCENT_RATING
-            if stance_we_are_looking_for != ANY_STANCE:
-                # # If we passed in the stance "ANY_STANCE" it means we want to not filter down the list
-                # if stance_we_are_looking_for == SUPPORT:
-                #     position_list_query = position_list_query.filter(
-                #         Q(stance=stance_we_are_looking_for) |  # Matches "is_support"
-                #         (Q(stance=PERCENT_RATING) & Q(vote_smart_rating_integer__gte=66))  # "is_positive_rating"
-                #     )  # | Q(stance=GRADE_RATING))
-                # elif stance_we_are_looking_for == OPPOSE:
-                #     position_list_query = position_list_query.filter(
-                #         Q(stance=stance_we_are_looking_for) |  # Matches "is_oppose"
-                #         (Q(stance=PERCENT_RATING) & Q(vote_smart_rating_integer__lte=33))  # "is_negative_rating"
-                #     )  # | Q(stance=GRADE_RATING))
-                # else:
-                #     position_list_query = position_list_query.filter(stance=stance_we_are_looking_for)
-                position_list_query = position_list_query.filter(stance__iexact=stance_we_are_looking_for)
-
-            # Limit to positions in the last x years - currently we are not limiting
-            # position_list = position_list.filter(election_id=election_id)
-
-            position_count = position_list_query.count()
-        except Exception as e:
-            handle_record_not_found_exception(e, logger=logger)
 
-        return position_count
+        if not positive_value_exists(contest_measure_we_vote_id):
+            contest_measure_manager = ContestMeasureManager()
+            contest_measure_we_vote_id = contest_measure_manager.fetch_contest_measure_we_vote_id_from_id(
+                contest_measure_id)
+        return PositionListManager.fetch_materialized_positions_count(
+            contest_measure_we_vote_id, stance_we_are_looking_for, public_or_private)
 
     def retrieve_possible_duplicate_positions(self, google_civic_election_id, organization_we_vote_id,
                                               candidate_we_vote_id, measure_we_vote_id,
@@ -3346,18 +4268,19 @@ class PositionListManager(models.Model):
 
             # Ignore entries with we_vote_id coming in from master server
             if positive_value_exists(we_vote_id_from_master):
-                position_queryset = position_queryset.filter(~Q(we_vote_id__iexact=we_vote_id_from_master))
+                position_queryset = position_queryset.filter(
+                    ~Q(we_vote_id=normalize_we_vote_id(we_vote_id_from_master)))
 
             # Situation 1 organization_we_vote_id + candidate_we_vote_id matches an entry already in the db
             if positive_value_exists(organization_we_vote_id) and positive_value_exists(candidate_we_vote_id):
-                new_filter = (Q(organization_we_vote_id__iexact=organization_we_vote_id) &
-                              Q(candidate_campaign_we_vote_id__iexact=candidate_we_vote_id))
+                new_filter = (Q(organization_we_vote_id=normalize_we_vote_id(organization_we_vote_id)) &
+                              Q(candidate_campaign_we_vote_id=normalize_we_vote_id(candidate_we_vote_id)))
                 filters.append(new_filter)
 
             # Situation 2 organization_we_vote_id + measure_we_vote_id matches an entry already in the db
             if positive_value_exists(organization_we_vote_id) and positive_value_exists(measure_we_vote_id):
-                new_filter = (Q(organization_we_vote_id__iexact=organization_we_vote_id) &
-                              Q(contest_measure_we_vote_id__iexact=measure_we_vote_id))
+                new_filter = (Q(organization_we_vote_id=normalize_we_vote_id(organization_we_vote_id)) &
+                              Q(contest_measure_we_vote_id=normalize_we_vote_id(measure_we_vote_id)))
                 filters.append(new_filter)
 
             # Add the first query
@@ -3459,13 +4382,31 @@ class PositionListManager(models.Model):
         }
         return json_data
 
-    def update_position_network_scores_for_one_position(self, one_position):
+    def update_position_network_scores_for_one_position(self, one_position, use_queue=None):
+        """
+        When one position changes, update all of the PositionNetworkScore entries needed for rapid score counts.
+        When the fan-out queue is turned on (POSITION_NETWORK_SCORE_QUEUE_ON), we only record that this position
+        changed, and the process_position_network_score_queue management command does the work outside of the request.
+        :param one_position:
+        :param use_queue: Leave as None to use the POSITION_NETWORK_SCORE_QUEUE_ON setting
+        :return:
+        """
+        if use_queue is None:
+            use_queue = positive_value_exists(POSITION_NETWORK_SCORE_QUEUE_ON)
+        if use_queue and hasattr(one_position, "voter_entering_position"):
+            return self.queue_position_network_scores_update(one_position)
+        return self.fan_out_position_network_scores_for_one_position(one_position)
+
+    def fan_out_position_network_scores_for_one_position(self, one_position):
         """
-        When one position changes, update all of the PositionNetworkScore entries needed for rapid score counts
+        Update the PositionNetworkScore entries of every voter who can see this position. Instead of one
+        update_or_create per follower or friend, we look up all of the viewing voters with one query, then replace
+        their score entries for this speaker + ballot item with a bulk delete and a bulk insert.
         :param one_position:
         :return:
         """
         status = "UPDATE_POSITION_NETWORK_SCORES_FOR_ONE_POSITION "
+        success = True
         public_positions_updated = 0
         friends_only_positions_updated = 0
 
@@ -3482,6 +4423,23 @@ class PositionListManager(models.Model):
         position_manager = PositionManager()
         voter_manager = VoterManager()
 
+        candidate_we_vote_id = None
+        measure_we_vote_id = None
+        critical_variables_exist = True
+        if positive_value_exists(one_position.candidate_campaign_we_vote_id):
+            candidate_we_vote_id = one_position.candidate_campaign_we_vote_id
+        elif positive_value_exists(one_position.contest_measure_we_vote_id):
+            measure_we_vote_id = one_position.contest_measure_we_vote_id
+        else:
+            critical_variables_exist = False
+
+        # support_or_oppose stays None if the position is neither, which means prior entries should be deleted
+        support_or_oppose = None
+        if one_position.is_support_or_positive_rating():
+            support_or_oppose = True
+        elif one_position.is_oppose_or_negative_rating():
+            support_or_oppose = False
+
         voter_with_position_id = one_position.voter_id
         voter_with_position_we_vote_id = one_position.voter_we_vote_id
         voter_with_position_results = voter_manager.retrieve_voter_by_id(voter_with_position_id)
@@ -3497,44 +4455,20 @@ class PositionListManager(models.Model):
             if not positive_value_exists(voter_with_position_we_vote_id):
                 voter_with_position_we_vote_id = voter_with_position.we_vote_id
 
-            # If a voter_with_position exists for this position, create an entry
-            if positive_value_exists(voter_with_position_we_vote_id):
-                # Add entry to position_network_score table as a friend entry
-                save_for_position_holder = True
-                delete_for_position_holder = False
+            # The voter who holds this position sees it as a "friend" of themselves
+            if positive_value_exists(voter_with_position_we_vote_id) and critical_variables_exist:
                 ignore_organization_voter_we_vote_id = None
-                candidate_we_vote_id = None
-                measure_we_vote_id = None
-                if positive_value_exists(one_position.candidate_campaign_we_vote_id):
-                    candidate_we_vote_id = one_position.candidate_campaign_we_vote_id
-                elif positive_value_exists(one_position.contest_measure_we_vote_id):
-                    measure_we_vote_id = one_position.contest_measure_we_vote_id
-                else:
-                    save_for_position_holder = False
-
-                support_or_oppose = None
-                if one_position.is_support_or_positive_rating():
-                    support_or_oppose = True
-                elif one_position.is_oppose_or_negative_rating():
-                    support_or_oppose = False
-                else:
-                    # If not support or oppose, don't save
-                    save_for_position_holder = False
-                    delete_for_position_holder = True
-
-                if save_for_position_holder:
-                    # Save the entry as a "friend" of yourself
-                    voter_with_position_speaker_display_name = one_position.speaker_display_name
+                if support_or_oppose is not None:
                     update_results = position_manager.update_or_create_position_network_score(
                         voter_with_position_id, voter_with_position_we_vote_id,
                         one_position.google_civic_election_id,
                         ignore_organization_voter_we_vote_id, voter_with_position_we_vote_id,
-                        voter_with_position_speaker_display_name,
+                        one_position.speaker_display_name,
                         candidate_we_vote_id, measure_we_vote_id,
                         support_or_oppose)
                     if update_results['position_network_score_updated']:
                         friends_only_positions_updated += 1
-                elif delete_for_position_holder:
+                else:
                     # Delete any previous entry for yourself since you may have removed support or oppose
                     delete_results = position_manager.delete_one_position_network_score(
                         voter_with_position_id, voter_with_position_we_vote_id,
@@ -3544,150 +4478,312 @@ class PositionListManager(models.Model):
                     if delete_results['position_network_score_deleted']:
                         friends_only_positions_updated += 1
 
+        if not critical_variables_exist:
+            status += "MISSING_CANDIDATE_AND_MEASURE "
+            json_data = {
+                'success':                          True,
+                'status':                           status,
+                'friends_only_positions_updated':   friends_only_positions_updated,
+                'public_positions_updated':         public_positions_updated,
+            }
+            return json_data
+
         # Public Positions
         if one_position.is_public_position() and positive_value_exists(one_position.organization_we_vote_id):
-            # Find all of the voter's following this organization
-            follow_organization_list_manager = FollowOrganizationList()
-            voters_following_list = \
-                follow_organization_list_manager.retrieve_follow_organization_by_organization_we_vote_id(
-                    one_position.organization_we_vote_id)
-
-            critical_variables_exist = True
-            save_public_position = True
-            delete_public_position = False
-            ignore_friend_voter_we_vote_id = None
-            candidate_we_vote_id = None
-            measure_we_vote_id = None
-            support_or_oppose = None
-            if positive_value_exists(one_position.candidate_campaign_we_vote_id):
-                candidate_we_vote_id = one_position.candidate_campaign_we_vote_id
-            elif positive_value_exists(one_position.contest_measure_we_vote_id):
-                measure_we_vote_id = one_position.contest_measure_we_vote_id
-            else:
-                # If not candidate or measure, do not save
-                save_public_position = False
-                critical_variables_exist = False
-
-            if one_position.is_support_or_positive_rating():
-                support_or_oppose = True
-            elif one_position.is_oppose_or_negative_rating():
-                support_or_oppose = False
-            else:
-                # If not support or oppose, do not save, and also delete prior entries
-                save_public_position = False
-                delete_public_position = True
-
+            # If this is your own position, do not save it as a public position
             organization_belongs_to_voter_with_position = \
                 one_position.organization_we_vote_id == linked_organization_we_vote_id
-
-            if critical_variables_exist and (save_public_position or delete_public_position):
-                for follow_organization in voters_following_list:
-                    voter_that_is_following_id = follow_organization.voter_id
-                    voter_that_is_following_we_vote_id = follow_organization.voter_we_vote_id()
-
-                    voter_ids_match = voter_with_position_we_vote_id == voter_that_is_following_we_vote_id
-
-                    if one_position.is_public_position():
-                        # If this is your own position, do not save it as a public position
-                        if not organization_belongs_to_voter_with_position and not voter_ids_match:
-                            if save_public_position:
-                                # Add entry to position_network_score table
-                                update_results = position_manager.update_or_create_position_network_score(
-                                    voter_that_is_following_id, voter_that_is_following_we_vote_id,
-                                    one_position.google_civic_election_id,
-                                    one_position.organization_we_vote_id, ignore_friend_voter_we_vote_id,
-                                    one_position.speaker_display_name,
-                                    candidate_we_vote_id, measure_we_vote_id,
-                                    support_or_oppose)
-                                if update_results['position_network_score_updated']:
-                                    public_positions_updated += 1
-                            elif delete_public_position:
-                                delete_results = position_manager.delete_one_position_network_score(
-                                    voter_that_is_following_id, voter_that_is_following_we_vote_id,
-                                    one_position.google_civic_election_id,
-                                    one_position.organization_we_vote_id, ignore_friend_voter_we_vote_id,
-                                    candidate_we_vote_id, measure_we_vote_id)
-                                if delete_results['position_network_score_deleted']:
-                                    public_positions_updated += 1
-                    else:
-                        # Make sure to delete entries for this position since it is no longer public
-                        delete_results = position_manager.delete_one_position_network_score(
-                            voter_that_is_following_id, voter_that_is_following_we_vote_id,
-                            one_position.google_civic_election_id,
-                            one_position.organization_we_vote_id, ignore_friend_voter_we_vote_id,
-                            candidate_we_vote_id, measure_we_vote_id)
-                        if delete_results['position_network_score_deleted']:
-                            public_positions_updated += 1
+            if not organization_belongs_to_voter_with_position:
+                try:
+                    follower_voter_id_list = list(FollowOrganization.objects.using('readonly').filter(
+                        organization_we_vote_id=one_position.organization_we_vote_id,
+                        following_status=FOLLOWING).values_list('voter_id', flat=True))
+                    viewing_voter_list = list(Voter.objects.using('readonly').filter(
+                        id__in=follower_voter_id_list).values_list('id', 'we_vote_id'))
+                    viewing_voter_list = [(voter_id, voter_we_vote_id)
+                                          for voter_id, voter_we_vote_id in viewing_voter_list
+                                          if voter_we_vote_id != voter_with_position_we_vote_id]
+                    public_positions_updated += self.replace_position_network_scores_for_viewing_voters(
+                        viewing_voter_list, one_position.google_civic_election_id,
+                        one_position.organization_we_vote_id, None, one_position.speaker_display_name,
+                        candidate_we_vote_id, measure_we_vote_id, support_or_oppose)
+                except Exception as e:
+                    success = False
+                    status += 'FAILED fan_out_position_network_scores_for_one_position-PUBLIC ' \
+                              '{error} [type: {error_type}] '.format(error=e, error_type=type(e))
+                    handle_exception(e, logger=logger, exception_message=status)
 
         # Friends-only positions
         if one_position.is_friends_only_position() and positive_value_exists(one_position.voter_we_vote_id):
-            friend_manager = FriendManager()
-            friend_results = friend_manager.retrieve_friends_we_vote_id_list(one_position.voter_we_vote_id)
-            friends_we_vote_id_list = []
-            if friend_results['friends_we_vote_id_list_found']:
-                friends_we_vote_id_list = friend_results['friends_we_vote_id_list']
-
-            critical_variables_exist = True
-            save_for_friends = True
-            delete_for_friends = False
-            ignore_organization_voter_we_vote_id = None
-            candidate_we_vote_id = None
-            measure_we_vote_id = None
-            support_or_oppose = None
-
-            # Don't try to
-            if positive_value_exists(one_position.candidate_campaign_we_vote_id):
-                candidate_we_vote_id = one_position.candidate_campaign_we_vote_id
-            elif positive_value_exists(one_position.contest_measure_we_vote_id):
-                measure_we_vote_id = one_position.contest_measure_we_vote_id
-            else:
-                save_for_friends = False
-                critical_variables_exist = False
-
-            if one_position.is_support_or_positive_rating():
-                support_or_oppose = True
-            elif one_position.is_oppose_or_negative_rating():
-                support_or_oppose = False
-            else:
-                # If not support or oppose, continue to next position
-                save_for_friends = False
-                delete_for_friends = True
-
-            if critical_variables_exist and (save_for_friends or delete_for_friends):
-                for voter_friend_we_vote_id in friends_we_vote_id_list:
-                    voter_friend_id = voter_manager.fetch_local_id_from_we_vote_id(voter_friend_we_vote_id)
-
-                    voter_ids_match = voter_with_position_id == voter_friend_id
-
-                    if not voter_ids_match:
-                        if save_for_friends:
-                            # Add entry to position_network_score table
-                            update_results = position_manager.update_or_create_position_network_score(
-                                voter_friend_id, voter_friend_we_vote_id,
-                                one_position.google_civic_election_id,
-                                ignore_organization_voter_we_vote_id, voter_with_position_we_vote_id,
-                                one_position.speaker_display_name,
-                                candidate_we_vote_id, measure_we_vote_id,
-                                support_or_oppose)
-                            if update_results['position_network_score_updated']:
-                                friends_only_positions_updated += 1
-                        elif delete_for_friends:
-                            delete_results = position_manager.delete_one_position_network_score(
-                                voter_friend_id, voter_friend_we_vote_id,
-                                one_position.google_civic_election_id,
-                                ignore_organization_voter_we_vote_id, voter_with_position_we_vote_id,
-                                candidate_we_vote_id, measure_we_vote_id)
-                            if delete_results['position_network_score_deleted']:
-                                friends_only_positions_updated += 1
+            # The friends' local ids come along with their we_vote_ids, from the friend graph cache
+            friend_adjacency = fetch_friend_adjacency(one_position.voter_we_vote_id)
+            if friend_adjacency is None:
+                success = False
+                status += "FAILED fan_out_position_network_scores_for_one_position-FRIENDS_NOT_READ "
+            elif len(friend_adjacency.friend_we_vote_id_list):
+                try:
+                    viewing_voter_list = [(voter_id, voter_we_vote_id)
+                                          for voter_we_vote_id, voter_id
+                                          in friend_adjacency.friend_voter_id_by_we_vote_id.items()
+                                          if voter_id != voter_with_position_id]
+                    friends_only_positions_updated += self.replace_position_network_scores_for_viewing_voters(
+                        viewing_voter_list, one_position.google_civic_election_id,
+                        None, voter_with_position_we_vote_id, one_position.speaker_display_name,
+                        candidate_we_vote_id, measure_we_vote_id, support_or_oppose)
+                except Exception as e:
+                    success = False
+                    status += 'FAILED fan_out_position_network_scores_for_one_position-FRIENDS ' \
+                              '{error} [type: {error_type}] '.format(error=e, error_type=type(e))
+                    handle_exception(e, logger=logger, exception_message=status)
 
         json_data = {
-            'success':                          True,
+            'success':                          success,
             'status':                           status,
             'friends_only_positions_updated':   friends_only_positions_updated,
             'public_positions_updated':         public_positions_updated,
         }
         return json_data
 
+    def replace_position_network_scores_for_viewing_voters(
+            self, viewing_voter_list, google_civic_election_id,
+            organization_we_vote_id, friend_voter_we_vote_id, speaker_display_name,
+            candidate_we_vote_id, measure_we_vote_id, support_or_oppose, batch_size=1000):
+        """
+        Replace the score entries from one speaker about one ballot item for many viewing voters at once.
+        :param viewing_voter_list: List of (voter_id, voter_we_vote_id) tuples
+        :param google_civic_election_id:
+        :param organization_we_vote_id: Either organization_we_vote_id or friend_voter_we_vote_id
+        :param friend_voter_we_vote_id:
+        :param speaker_display_name:
+        :param candidate_we_vote_id: Either candidate_we_vote_id or measure_we_vote_id
+        :param measure_we_vote_id:
+        :param support_or_oppose: True for support, False for oppose, None to only delete prior entries
+        :param batch_size:
+        :return: The number of viewing voters whose entries were replaced
+        """
+        viewing_voters_updated = 0
+        for start in range(0, len(viewing_voter_list), batch_size):
+            viewing_voter_batch = viewing_voter_list[start:start + batch_size]
+            with transaction.atomic():
+                score_queryset = PositionNetworkScore.objects.filter(
+                    viewing_voter_id__in=[voter_id for voter_id, voter_we_vote_id in viewing_voter_batch])
+                if positive_value_exists(organization_we_vote_id):
+                    score_queryset = score_queryset.filter(organization_we_vote_id=organization_we_vote_id)
+                else:
+                    score_queryset = score_queryset.filter(friend_voter_we_vote_id=friend_voter_we_vote_id)
+                if positive_value_exists(candidate_we_vote_id):
+                    score_queryset = score_queryset.filter(candidate_we_vote_id=candidate_we_vote_id)
+                else:
+                    score_queryset = score_queryset.filter(measure_we_vote_id=measure_we_vote_id)
+                score_queryset.delete()
+
+                if support_or_oppose is not None:
+                    PositionNetworkScore.objects.bulk_create([
+                        PositionNetworkScore(
+                            viewing_voter_id=voter_id,
+                            viewing_voter_we_vote_id=voter_we_vote_id,
+                            google_civic_election_id=google_civic_election_id,
+                            organization_we_vote_id=organization_we_vote_id,
+                            friend_voter_we_vote_id=friend_voter_we_vote_id,
+                            speaker_display_name=speaker_display_name,
+                            candidate_we_vote_id=candidate_we_vote_id,
+                            measure_we_vote_id=measure_we_vote_id,
+                            is_support=support_or_oppose,
+                            is_oppose=not support_or_oppose)
+                        for voter_id, voter_we_vote_id in viewing_voter_batch])
+            viewing_voters_updated += len(viewing_voter_batch)
+        return viewing_voters_updated
+
+    def queue_position_network_scores_update(self, one_position):
+        """
+        Record that this position changed. Repeated edits to the same position before the worker gets to it
+        are coalesced into one queue entry.
+        :param one_position:
+        :return:
+        """
+        status = "QUEUE_POSITION_NETWORK_SCORES_UPDATE "
+        success = False
+        try:
+            PositionNetworkScoreQueue.objects.update_or_create(
+                position_we_vote_id=one_position.we_vote_id,
+                defaults={
+                    'is_public_position':       one_position.is_public_position(),
+                    'organization_we_vote_id':  one_position.organization_we_vote_id,
+                    'voter_we_vote_id':         one_position.voter_we_vote_id,
+                    'candidate_we_vote_id':     one_position.candidate_campaign_we_vote_id,
+                    'measure_we_vote_id':       one_position.contest_measure_we_vote_id,
+                    'date_queued':              now(),
+                    # A new edit gets a fresh set of attempts, even if the last one ended up as a dead letter
+                    'attempts':                 0,
+                    'date_next_attempt':        None,
+                    'dead_letter':              False,
+                })
+            success = True
+            status += "QUEUED "
+        except Exception as e:
+            status += 'FAILED queue_position_network_scores_update ' \
+                      '{error} [type: {error_type}] '.format(error=e, error_type=type(e))
+            handle_exception(e, logger=logger, exception_message=status)
+
+        if not success:
+            # Fall back to doing the work now, so the change isn't lost
+            return self.fan_out_position_network_scores_for_one_position(one_position)
+
+        json_data = {
+            'success':                          success,
+            'status':                           status,
+            'friends_only_positions_updated':   0,
+            'public_positions_updated':         0,
+        }
+        return json_data
+
+    def process_position_network_score_queue(self, batch_size=100, retry_due_before=None):
+        """
+        Claim a batch of queued positions, fan each of them out to PositionNetworkScore, and remove the queue
+        entries that weren't edited again while we were working on them. A failed entry is retried later, waiting
+        longer after each failure, and becomes a dead letter after POSITION_NETWORK_SCORE_QUEUE_MAXIMUM_ATTEMPTS.
+        :param batch_size:
+        :param retry_due_before: Only retry failed entries due by this time (defaults to now). Passing the time a
+         pass started keeps the entries that fail during the pass from being claimed again in the same pass.
+        :return:
+        """
+        status = "PROCESS_POSITION_NETWORK_SCORE_QUEUE "
+        positions_processed = 0
+        positions_failed = 0
+        position_manager = PositionManager()
+        if retry_due_before is None:
+            retry_due_before = now()
+
+        claim_expired_before = now() - timedelta(seconds=POSITION_NETWORK_SCORE_QUEUE_CLAIM_TIMEOUT)
+        with transaction.atomic():
+            queue_query = PositionNetworkScoreQueue.objects.select_for_update(skip_locked=True)
+            queue_query = queue_query.filter(dead_letter=False)
+            queue_query = queue_query.filter(Q(date_claimed__isnull=True) | Q(date_claimed__lt=claim_expired_before))
+            queue_query = queue_query.filter(
+                Q(date_next_attempt__isnull=True) | Q(date_next_attempt__lte=retry_due_before))
+            queue_query = queue_query.order_by('date_queued')
+            queue_entry_list = list(queue_query[:batch_size])
+            PositionNetworkScoreQueue.objects.filter(
+                id__in=[queue_entry.id for queue_entry in queue_entry_list]).update(date_claimed=now())
+
+        for queue_entry in queue_entry_list:
+            error_message = None
+            try:
+                position_results = position_manager.retrieve_position_from_we_vote_id(queue_entry.position_we_vote_id)
+                if position_results['position_found']:
+                    fan_out_results = self.fan_out_position_network_scores_for_one_position(
+                        position_results['position'])
+                elif position_results['success']:
+                    # The position was deleted after it was queued
+                    fan_out_results = self.delete_position_network_scores_for_queue_entry(queue_entry)
+                else:
+                    fan_out_results = position_results
+                if not fan_out_results['success']:
+                    error_message = fan_out_results['status']
+            except Exception as e:
+                error_message = str(e)
+                handle_exception(e, logger=logger, exception_message="FAILED process_position_network_score_queue")
+
+            if error_message is None:
+                # Only remove the entry if the position wasn't queued again while we were working
+                PositionNetworkScoreQueue.objects.filter(
+                    id=queue_entry.id, date_queued=queue_entry.date_queued).delete()
+                PositionNetworkScoreQueue.objects.filter(id=queue_entry.id).update(date_claimed=None)
+                positions_processed += 1
+            else:
+                positions_failed += 1
+                attempts = queue_entry.attempts + 1
+                retry_seconds = min(POSITION_NETWORK_SCORE_QUEUE_RETRY_SECONDS * 2 ** (attempts - 1),
+                                    POSITION_NETWORK_SCORE_QUEUE_MAXIMUM_RETRY_SECONDS)
+                # If the position was queued again while we were working, that edit gets its own fresh attempts
+                PositionNetworkScoreQueue.objects.filter(id=queue_entry.id, date_queued=queue_entry.date_queued) \
+                    .update(attempts=attempts, last_error=error_message[:255],
+                            date_next_attempt=now() + timedelta(seconds=retry_seconds),
+                            dead_letter=attempts >= POSITION_NETWORK_SCORE_QUEUE_MAXIMUM_ATTEMPTS)
+                PositionNetworkScoreQueue.objects.filter(id=queue_entry.id).update(date_claimed=None)
+                if attempts >= POSITION_NETWORK_SCORE_QUEUE_MAXIMUM_ATTEMPTS:
+                    status += "DEAD_LETTER:" + str(queue_entry.position_we_vote_id) + " "
+
+        status += "PROCESSED:" + str(positions_processed) + " FAILED:" + str(positions_failed) + " "
+        results = {
+            'success':              positions_failed == 0,
+            'status':               status,
+            'positions_processed':  positions_processed,
+            'positions_failed':     positions_failed,
+        }
+        return results
+
+    def delete_position_network_scores_for_queue_entry(self, queue_entry):
+        """
+        The position behind this queue entry was deleted, so remove the PositionNetworkScore entries from its speaker
+        about its ballot item: the public ones (from the organization), and the friends-only ones (including the
+        voter's own entry)
+        :param queue_entry:
+        :return:
+        """
+        status = "DELETE_POSITION_NETWORK_SCORES_FOR_DELETED_POSITION "
+        success = True
+        position_network_scores_deleted = 0
+        if positive_value_exists(queue_entry.candidate_we_vote_id):
+            ballot_item_filter = Q(candidate_we_vote_id=queue_entry.candidate_we_vote_id)
+        elif positive_value_exists(queue_entry.measure_we_vote_id):
+            ballot_item_filter = Q(measure_we_vote_id=queue_entry.measure_we_vote_id)
+        else:
+            # Queued before the speaker and ballot item were recorded
+            ballot_item_filter = None
+        speaker_filter = Q()
+        if queue_entry.is_public_position and positive_value_exists(queue_entry.organization_we_vote_id):
+            speaker_filter |= Q(organization_we_vote_id=queue_entry.organization_we_vote_id)
+        if positive_value_exists(queue_entry.voter_we_vote_id):
+            if queue_entry.is_public_position:
+                speaker_filter |= Q(friend_voter_we_vote_id=queue_entry.voter_we_vote_id,
+                                    viewing_voter_we_vote_id=queue_entry.voter_we_vote_id)
+            else:
+                speaker_filter |= Q(friend_voter_we_vote_id=queue_entry.voter_we_vote_id)
+
+        if ballot_item_filter is None or not speaker_filter:
+            status += "SPEAKER_OR_BALLOT_ITEM_NOT_RECORDED "
+        else:
+            try:
+                position_network_scores_deleted, deleted_count_by_model = \
+                    PositionNetworkScore.objects.filter(ballot_item_filter).filter(speaker_filter).delete()
+            except Exception as e:
+                success = False
+                status += 'FAILED delete_position_network_scores_for_queue_entry ' \
+                          '{error} [type: {error_type}] '.format(error=e, error_type=type(e))
+                handle_exception(e, logger=logger, exception_message=status)
+
+        results = {
+            'success':                          success,
+            'status':                           status,
+            'position_network_scores_deleted':  position_network_scores_deleted,
+        }
+        return results
+
+    def fetch_position_network_score_queue_metrics(self):
+        """
+        How far behind is the fan-out worker?
+        :return:
+        """
+        queue_query = PositionNetworkScoreQueue.objects.using('readonly').all()
+        queue_totals = queue_query.aggregate(
+            oldest_date_queued=Min('date_queued', filter=Q(dead_letter=False)),
+            pending_count=Count('id', filter=Q(dead_letter=False)),
+            claimed_count=Count('date_claimed'),
+            failing_count=Count('id', filter=Q(attempts__gt=0, dead_letter=False)),
+            dead_letter_count=Count('id', filter=Q(dead_letter=True)))
+        oldest_date_queued = queue_totals['oldest_date_queued']
+        lag_seconds = (now() - oldest_date_queued).total_seconds() if oldest_date_queued else 0
+        metrics = {
+            'pending_count':        queue_totals['pending_count'],
+            'claimed_count':        queue_totals['claimed_count'],
+            'failing_count':        queue_totals['failing_count'],
+            'dead_letter_count':    queue_totals['dead_letter_count'],
+            'oldest_date_queued':   oldest_date_queued,
+            'lag_seconds':          lag_seconds,
+        }
+        return metrics
+
 
 class PositionManager(models.Model):
 
@@ -4297,7 +5393,7 @@ class PositionManager(models.Model):
             if positive_value_exists(position_we_vote_id):
                 status += "MERGE_POSITION_DUPLICATES_WITH_WE_VOTE_ID "
                 duplicates_list = duplicates_list_starter.objects.filter(
-                    we_vote_id__iexact=position_we_vote_id)
+                    we_vote_id=normalize_we_vote_id(position_we_vote_id))
                 duplicates_count = len(duplicates_list)
                 duplicates_found = True if duplicates_count > 1 else False
                 success = True
@@ -4362,7 +5458,7 @@ class PositionManager(models.Model):
                     status += "MERGE_POSITION_DUPLICATES_WITH_ORG_CANDIDATE_WE_VOTE_ID_AND_ELECTION "
                     duplicates_list = duplicates_list_starter.objects.filter(
                         organization_id=organization_id,
-                        candidate_campaign_we_vote_id__iexact=candidate_campaign_we_vote_id,
+                        candidate_campaign_we_vote_id=normalize_we_vote_id(candidate_campaign_we_vote_id),
                         google_civic_election_id=google_civic_election_id)
                     # If still here, we found an existing position
                     duplicates_count = len(duplicates_list)
@@ -4372,7 +5468,7 @@ class PositionManager(models.Model):
                     status += "MERGE_POSITION_DUPLICATES_WITH_ORG_CANDIDATE_WE_VOTE_ID_AND_VOTE_SMART_TIME_SPAN "
                     duplicates_list = duplicates_list_starter.objects.filter(
                         organization_id=organization_id,
-                        candidate_campaign_we_vote_id__iexact=candidate_campaign_we_vote_id,
+                        candidate_campaign_we_vote_id=normalize_we_vote_id(candidate_campaign_we_vote_id),
                         vote_smart_time_span__iexact=vote_smart_time_span)
                     # If still here, we found an existing position
                     duplicates_count = len(duplicates_list)
@@ -4382,7 +5478,7 @@ class PositionManager(models.Model):
                     status += "MERGE_POSITION_DUPLICATES_WITH_ORG_AND_CANDIDATE_WE_VOTE_ID "
                     duplicates_list = duplicates_list_starter.objects.filter(
                         organization_id=organization_id,
-                        candidate_campaign_we_vote_id__iexact=candidate_campaign_we_vote_id)
+                        candidate_campaign_we_vote_id=normalize_we_vote_id(candidate_campaign_we_vote_id))
                     # If still here, we found an existing position
                     duplicates_count = len(duplicates_list)
                     duplicates_found = True if duplicates_count > 1 else False
@@ -4418,7 +5514,7 @@ class PositionManager(models.Model):
                     status += "MERGE_POSITION_DUPLICATES_WITH_ORG_MEASURE_WE_VOTE_ID_AND_ELECTION "
                     duplicates_list = duplicates_list_starter.objects.filter(
                         organization_id=organization_id,
-                        contest_measure_we_vote_id__iexact=contest_measure_we_vote_id,
+                        contest_measure_we_vote_id=normalize_we_vote_id(contest_measure_we_vote_id),
                         google_civic_election_id=google_civic_election_id)
                     # If still here, we found an existing position
                     duplicates_count = len(duplicates_list)
@@ -4428,7 +5524,7 @@ class PositionManager(models.Model):
                     status += "MERGE_POSITION_DUPLICATES_WITH_ORG_MEASURE_WE_VOTE_ID_AND_VOTE_SMART_TIME_SPAN "
                     duplicates_list = duplicates_list_starter.objects.filter(
                         organization_id=organization_id,
-                        contest_measure_we_vote_id__iexact=contest_measure_we_vote_id,
+                        contest_measure_we_vote_id=normalize_we_vote_id(contest_measure_we_vote_id),
                         vote_smart_time_span__iexact=vote_smart_time_span)
                     # If still here, we found an existing position
                     duplicates_count = len(duplicates_list)
@@ -4437,7 +5533,8 @@ class PositionManager(models.Model):
                 else:
                     status += "MERGE_POSITION_DUPLICATES_WITH_ORG_AND_MEASURE_WE_VOTE_ID "
                     duplicates_list = duplicates_list_starter.objects.filter(
-                        organization_id=organization_id, contest_measure_we_vote_id__iexact=contest_measure_we_vote_id)
+                        organization_id=organization_id,
+                        contest_measure_we_vote_id=normalize_we_vote_id(contest_measure_we_vote_id))
                     duplicates_count = len(duplicates_list)
                     duplicates_found = True if duplicates_count > 1 else False
                     success = True
@@ -4453,7 +5550,7 @@ class PositionManager(models.Model):
             elif positive_value_exists(voter_id) and positive_value_exists(contest_office_we_vote_id):
                 status += "MERGE_POSITION_DUPLICATES_WITH_VOTER_AND_OFFICE_WE_VOTE_ID "
                 duplicates_list = duplicates_list_starter.objects.filter(
-                    voter_id=voter_id, contest_office_we_vote_id__iexact=contest_office_we_vote_id)
+                    voter_id=voter_id, contest_office_we_vote_id=normalize_we_vote_id(contest_office_we_vote_id))
                 duplicates_count = len(duplicates_list)
                 duplicates_found = True if duplicates_count > 1 else False
                 success = True
@@ -4467,7 +5564,8 @@ class PositionManager(models.Model):
             elif positive_value_exists(voter_id) and positive_value_exists(candidate_campaign_we_vote_id):
                 status += "MERGE_POSITION_DUPLICATES_WITH_VOTER_AND_CANDIDATE_WE_VOTE_ID "
                 duplicates_list = duplicates_list_starter.objects.filter(
-                    voter_id=voter_id, candidate_campaign_we_vote_id__iexact=candidate_campaign_we_vote_id)
+                    voter_id=voter_id,
+                    candidate_campaign_we_vote_id=normalize_we_vote_id(candidate_campaign_we_vote_id))
                 duplicates_count = len(duplicates_list)
                 duplicates_found = True if duplicates_count > 1 else False
                 success = True
@@ -4481,7 +5579,7 @@ class PositionManager(models.Model):
             elif positive_value_exists(voter_id) and positive_value_exists(contest_measure_we_vote_id):
                 status += "MERGE_POSITION_DUPLICATES_WITH_VOTER_AND_MEASURE_WE_VOTE_ID "
                 duplicates_list = duplicates_list_starter.objects.filter(
-                    voter_id=voter_id, contest_measure_we_vote_id__iexact=contest_measure_we_vote_id)
+                    voter_id=voter_id, contest_measure_we_vote_id=normalize_we_vote_id(contest_measure_we_vote_id))
                 duplicates_count = len(duplicates_list)
                 duplicates_found = True if duplicates_count > 1 else False
                 success = True
@@ -4568,7 +5666,8 @@ class PositionManager(models.Model):
         try:
             if positive_value_exists(position_we_vote_id):
                 status += "RETRIEVE_POSITION_FOUND_WITH_WE_VOTE_ID "
-                position_on_stage = position_on_stage_starter.objects.get(we_vote_id__iexact=position_we_vote_id)
+                position_on_stage = position_on_stage_starter.objects.get(
+                    we_vote_id=normalize_we_vote_id(position_we_vote_id))
                 position_found = True
                 success = True
             # ###############################
@@ -4626,7 +5725,7 @@ class PositionManager(models.Model):
                     status += "RETRIEVE_POSITION_FOUND_WITH_ORG_CANDIDATE_WE_VOTE_ID_AND_ELECTION "
                     position_on_stage = position_on_stage_starter.objects.get(
                         organization_id=organization_id,
-                        candidate_campaign_we_vote_id__iexact=candidate_campaign_we_vote_id,
+                        candidate_campaign_we_vote_id=normalize_we_vote_id(candidate_campaign_we_vote_id),
                         google_civic_election_id=google_civic_election_id)
                     # If still here, we found an existing position
                     position_found = True
@@ -4635,7 +5734,7 @@ class PositionManager(models.Model):
                     status += "RETRIEVE_POSITION_FOUND_WITH_ORG_CANDIDATE_WE_VOTE_ID_AND_VOTE_SMART_TIME_SPAN "
                     position_on_stage = position_on_stage_starter.objects.get(
                         organization_id=organization_id,
-                        candidate_campaign_we_vote_id__iexact=candidate_campaign_we_vote_id,
+                        candidate_campaign_we_vote_id=normalize_we_vote_id(candidate_campaign_we_vote_id),
                         vote_smart_time_span__iexact=vote_smart_time_span)
                     # If still here, we found an existing position
                     position_found = True
@@ -4644,7 +5743,7 @@ class PositionManager(models.Model):
                     status += "RETRIEVE_POSITION_FOUND_WITH_ORG_AND_CANDIDATE_WE_VOTE_ID "
                     position_on_stage = position_on_stage_starter.objects.get(
                         organization_id=organization_id,
-                        candidate_campaign_we_vote_id__iexact=candidate_campaign_we_vote_id)
+                        candidate_campaign_we_vote_id=normalize_we_vote_id(candidate_campaign_we_vote_id))
                     # If still here, we found an existing position
                     position_found = True
                     success = True
@@ -4675,7 +5774,8 @@ class PositionManager(models.Model):
                 if positive_value_exists(google_civic_election_id):
                     status += "RETRIEVE_POSITION_FOUND_WITH_ORG_MEASURE_WE_VOTE_ID_AND_ELECTION "
                     position_on_stage = position_on_stage_starter.objects.get(
-                        organization_id=organization_id, contest_measure_we_vote_id__iexact=contest_measure_we_vote_id,
+                        organization_id=organization_id,
+                        contest_measure_we_vote_id=normalize_we_vote_id(contest_measure_we_vote_id),
                         google_civic_election_id=google_civic_election_id)
                     # If still here, we found an existing position
                     position_found = True
@@ -4683,7 +5783,8 @@ class PositionManager(models.Model):
                 elif positive_value_exists(vote_smart_time_span):
                     status += "RETRIEVE_POSITION_FOUND_WITH_ORG_MEASURE_WE_VOTE_ID_AND_VOTE_SMART_TIME_SPAN "
                     position_on_stage = position_on_stage_starter.objects.get(
-                        organization_id=organization_id, contest_measure_we_vote_id__iexact=contest_measure_we_vote_id,
+                        organization_id=organization_id,
+                        contest_measure_we_vote_id=normalize_we_vote_id(contest_measure_we_vote_id),
                         vote_smart_time_span__iexact=vote_smart_time_span)
                     # If still here, we found an existing position
                     position_found = True
@@ -4691,7 +5792,8 @@ class PositionManager(models.Model):
                 else:
                     status += "RETRIEVE_POSITION_FOUND_WITH_ORG_AND_MEASURE_WE_VOTE_ID "
                     position_on_stage = position_on_stage_starter.objects.get(
-                        organization_id=organization_id, contest_measure_we_vote_id__iexact=contest_measure_we_vote_id)
+                        organization_id=organization_id,
+                        contest_measure_we_vote_id=normalize_we_vote_id(contest_measure_we_vote_id))
                     position_found = True
                     success = True
             # ###############################
@@ -4705,7 +5807,7 @@ class PositionManager(models.Model):
             elif positive_value_exists(voter_id) and positive_value_exists(contest_office_we_vote_id):
                 status += "RETRIEVE_POSITION_FOUND_WITH_VOTER_AND_OFFICE_WE_VOTE_ID "
                 position_on_stage = position_on_stage_starter.objects.get(
-                    voter_id=voter_id, contest_office_we_vote_id__iexact=contest_office_we_vote_id)
+                    voter_id=voter_id, contest_office_we_vote_id=normalize_we_vote_id(contest_office_we_vote_id))
                 position_found = True
                 success = True
             elif positive_value_exists(voter_id) and positive_value_exists(candidate_campaign_id):
@@ -4717,7 +5819,8 @@ class PositionManager(models.Model):
             elif positive_value_exists(voter_id) and positive_value_exists(candidate_campaign_we_vote_id):
                 status += "RETRIEVE_POSITION_FOUND_WITH_VOTER_AND_CANDIDATE_WE_VOTE_ID "
                 position_on_stage = position_on_stage_starter.objects.get(
-                    voter_id=voter_id, candidate_campaign_we_vote_id__iexact=candidate_campaign_we_vote_id)
+                    voter_id=voter_id,
+                    candidate_campaign_we_vote_id=normalize_we_vote_id(candidate_campaign_we_vote_id))
                 position_found = True
                 success = True
             elif positive_value_exists(voter_id) and positive_value_exists(contest_measure_id):
@@ -4729,7 +5832,7 @@ class PositionManager(models.Model):
             elif positive_value_exists(voter_id) and positive_value_exists(contest_measure_we_vote_id):
                 status += "RETRIEVE_POSITION_FOUND_WITH_VOTER_AND_MEASURE_WE_VOTE_ID "
                 position_on_stage = position_on_stage_starter.objects.get(
-                    voter_id=voter_id, contest_measure_we_vote_id__iexact=contest_measure_we_vote_id)
+                    voter_id=voter_id, contest_measure_we_vote_id=normalize_we_vote_id(contest_measure_we_vote_id))
                 position_found = True
                 success = True
             else:
@@ -5989,8 +7092,8 @@ class PositionManager(models.Model):
                     position_network_score, new_position_network_score_created = \
                         PositionNetworkScore.objects.update_or_create(
                             viewing_voter_id=viewing_voter_id,
-                            organization_we_vote_id__iexact=organization_we_vote_id,
-                            candidate_we_vote_id__iexact=candidate_we_vote_id,
+                            organization_we_vote_id=normalize_we_vote_id(organization_we_vote_id),
+                            candidate_we_vote_id=normalize_we_vote_id(candidate_we_vote_id),
                             defaults=defaults)
                     position_network_score_updated = True
                     success = True
@@ -6010,8 +7113,8 @@ class PositionManager(models.Model):
                     position_network_score, new_position_network_score_created = \
                         PositionNetworkScore.objects.update_or_create(
                             viewing_voter_id=viewing_voter_id,
-                            organization_we_vote_id__iexact=organization_we_vote_id,
-                            measure_we_vote_id__iexact=measure_we_vote_id,
+                            organization_we_vote_id=normalize_we_vote_id(organization_we_vote_id),
+                            measure_we_vote_id=normalize_we_vote_id(measure_we_vote_id),
                             defaults=defaults)
                     position_network_score_updated = True
                     success = True
@@ -6036,8 +7139,8 @@ class PositionManager(models.Model):
                     position_network_score, new_position_network_score_created = \
                         PositionNetworkScore.objects.update_or_create(
                             viewing_voter_id=viewing_voter_id,
-                            friend_voter_we_vote_id__iexact=friend_voter_we_vote_id,
-                            candidate_we_vote_id__iexact=candidate_we_vote_id,
+                            friend_voter_we_vote_id=normalize_we_vote_id(friend_voter_we_vote_id),
+                            candidate_we_vote_id=normalize_we_vote_id(candidate_we_vote_id),
                             defaults=defaults)
                     position_network_score_updated = True
                     success = True
@@ -6057,8 +7160,8 @@ class PositionManager(models.Model):
                     position_network_score, new_position_network_score_created = \
                         PositionNetworkScore.objects.update_or_create(
                             viewing_voter_id=viewing_voter_id,
-                            friend_voter_we_vote_id__iexact=friend_voter_we_vote_id,
-                            measure_we_vote_id__iexact=measure_we_vote_id,
+                            friend_voter_we_vote_id=normalize_we_vote_id(friend_voter_we_vote_id),
+                            measure_we_vote_id=normalize_we_vote_id(measure_we_vote_id),
                             defaults=defaults)
                     position_network_score_updated = True
                     success = True
@@ -6808,8 +7911,8 @@ class PositionManager(models.Model):
                     try:
                         # TODO DALE replace with retrieve_position_table_unknown
                         position_on_stage = position_on_stage_starter.objects.get(
-                            contest_measure_we_vote_id__iexact=measure_we_vote_id,
-                            public_figure_we_vote_id__iexact=public_figure_we_vote_id,
+                            contest_measure_we_vote_id=normalize_we_vote_id(measure_we_vote_id),
+                            public_figure_we_vote_id=normalize_we_vote_id(public_figure_we_vote_id),
                             google_civic_election_id=google_civic_election_id,
                             state_code__iexact=state_code,
                         )
@@ -6830,8 +7933,8 @@ class PositionManager(models.Model):
                     try:
                         # TODO DALE replace with retrieve_position_table_unknown
                         position_on_stage = position_on_stage_starter.objects.get(
-                            contest_office_we_vote_id__iexact=office_we_vote_id,
-                            public_figure_we_vote_id__iexact=public_figure_we_vote_id,
+                            contest_office_we_vote_id=normalize_we_vote_id(office_we_vote_id),
+                            public_figure_we_vote_id=normalize_we_vote_id(public_figure_we_vote_id),
                             google_civic_election_id=google_civic_election_id,
                             state_code__iexact=state_code
                         )
@@ -7151,6 +8254,111 @@ class PositionManager(models.Model):
         }
         return results
 
+    def cached_position_info_is_missing(self, position_object):
+        """
+        Is any of the speaker or ballot item information that refresh_cached_position_info fills in missing
+        from this position?
+        :param position_object:
+        :return:
+        """
+        if not positive_value_exists(position_object.speaker_display_name) \
+                or not positive_value_exists(position_object.speaker_image_url_https) \
+                or not positive_value_exists(position_object.speaker_image_url_https_large) \
+                or not positive_value_exists(position_object.speaker_image_url_https_medium) \
+                or not positive_value_exists(position_object.speaker_image_url_https_tiny) \
+                or not positive_value_exists(position_object.speaker_twitter_handle) \
+                or not positive_value_exists(position_object.ballot_item_display_name) \
+                or not positive_value_exists(position_object.state_code):
+            return True
+        if positive_value_exists(position_object.voter_id) \
+                and not positive_value_exists(position_object.voter_we_vote_id):
+            return True
+        if positive_value_exists(position_object.candidate_campaign_we_vote_id):
+            if not positive_value_exists(position_object.ballot_item_image_url_https) \
+                    or not positive_value_exists(position_object.contest_office_we_vote_id) \
+                    or not positive_value_exists(position_object.contest_office_name):
+                return True
+        return False
+
+    def retrieve_cached_position_info_dicts(self, position_list):
+        """
+        Retrieve every organization, voter, office, candidate and measure referenced by a list of positions, with
+        one query per kind of object, and return them in the dicts that refresh_cached_position_info accepts.
+        Position list endpoints call this once before their loop, instead of refresh_cached_position_info
+        retrieving these objects one position at a time.
+        :param position_list: Usually only the positions that need to be refreshed
+        :return:
+        """
+        status = ""
+        success = True
+        offices_dict = {}
+        candidates_dict = {}
+        measures_dict = {}
+        organizations_dict = {}
+        voters_by_linked_org_dict = {}
+        voters_dict = {}
+
+        organization_we_vote_id_set = set()
+        voter_we_vote_id_set = set()
+        candidate_we_vote_id_set = set()
+        measure_we_vote_id_set = set()
+        office_we_vote_id_set = set()
+        for one_position in position_list:
+            if positive_value_exists(one_position.organization_we_vote_id):
+                organization_we_vote_id_set.add(one_position.organization_we_vote_id)
+            if positive_value_exists(one_position.voter_we_vote_id):
+                voter_we_vote_id_set.add(one_position.voter_we_vote_id)
+            if positive_value_exists(one_position.candidate_campaign_we_vote_id):
+                candidate_we_vote_id_set.add(one_position.candidate_campaign_we_vote_id)
+            elif positive_value_exists(one_position.contest_measure_we_vote_id):
+                measure_we_vote_id_set.add(one_position.contest_measure_we_vote_id)
+            if positive_value_exists(one_position.contest_office_we_vote_id):
+                office_we_vote_id_set.add(one_position.contest_office_we_vote_id)
+
+        try:
+            if len(organization_we_vote_id_set):
+                for organization in Organization.objects.filter(we_vote_id__in=organization_we_vote_id_set):
+                    organizations_dict[organization.we_vote_id] = organization
+                # Organizations without a name are named after their linked voter
+                organizations_without_names = [organization_we_vote_id
+                                               for organization_we_vote_id, organization in organizations_dict.items()
+                                               if not positive_value_exists(organization.organization_name)]
+                if len(organizations_without_names):
+                    for voter in Voter.objects.filter(linked_organization_we_vote_id__in=organizations_without_names):
+                        voters_by_linked_org_dict[voter.linked_organization_we_vote_id] = voter
+            if len(voter_we_vote_id_set):
+                for voter in Voter.objects.filter(we_vote_id__in=voter_we_vote_id_set):
+                    voters_dict[voter.we_vote_id] = voter
+            if len(candidate_we_vote_id_set):
+                for candidate in CandidateCampaign.objects.filter(we_vote_id__in=candidate_we_vote_id_set):
+                    candidates_dict[candidate.we_vote_id] = candidate
+                    # The office is filled in from the candidate when the position doesn't have it
+                    if positive_value_exists(candidate.contest_office_we_vote_id):
+                        office_we_vote_id_set.add(candidate.contest_office_we_vote_id)
+            if len(measure_we_vote_id_set):
+                for contest_measure in ContestMeasure.objects.filter(we_vote_id__in=measure_we_vote_id_set):
+                    measures_dict[contest_measure.we_vote_id] = contest_measure
+            if len(office_we_vote_id_set):
+                for office in ContestOffice.objects.filter(we_vote_id__in=office_we_vote_id_set):
+                    offices_dict[office.we_vote_id] = office
+            status += "CACHED_POSITION_INFO_DICTS_RETRIEVED "
+        except Exception as e:
+            # Anything we could not retrieve here is retrieved one at a time by refresh_cached_position_info
+            status += "CACHED_POSITION_INFO_DICTS_NOT_RETRIEVED " + str(e) + " "
+            success = False
+
+        results = {
+            'success':                      success,
+            'status':                       status,
+            'offices_dict':                 offices_dict,
+            'candidates_dict':              candidates_dict,
+            'measures_dict':                measures_dict,
+            'organizations_dict':           organizations_dict,
+            'voters_by_linked_org_dict':    voters_by_linked_org_dict,
+            'voters_dict':                  voters_dict,
+        }
+        return results
+
     def refresh_cached_position_info(self, position_object,
                                      force_update=False,
                                      offices_dict={},
@@ -7214,7 +8422,7 @@ class PositionManager(models.Model):
                         else:
                             try:
                                 linked_voter = Voter.objects.get(
-                                    linked_organization_we_vote_id__iexact=organization.we_vote_id)
+                                    linked_organization_we_vote_id=organization.we_vote_id)
                                 linked_voter_found = True
                                 voters_by_linked_org_dict[organization.we_vote_id] = linked_voter
                             except Voter.DoesNotExist:
@@ -7682,7 +8890,7 @@ class PositionMetricsManager(models.Model):
             count_query = PositionForFriends.objects.using('readonly').all()
             # As of Aug 2018 we are no longer using PERCENT_RATING
             count_query = count_query.exclude(stance__iexact=PERCENT_RATING)
-            count_query = count_query.filter(voter_we_vote_id__iexact=voter_we_vote_id)
+            count_query = count_query.filter(voter_we_vote_id=normalize_we_vote_id(voter_we_vote_id))
             count_query = count_query.exclude(
                 (Q(statement_text__isnull=True) | Q(statement_text__exact=''))
                 # Not working with statement_html yet
@@ -7702,7 +8910,7 @@ class PositionMetricsManager(models.Model):
             # As of Aug 2018 we are no longer using PERCENT_RATING
             count_query = count_query.exclude(stance__iexact=PERCENT_RATING)
 
-            count_query = count_query.filter(voter_we_vote_id__iexact=voter_we_vote_id)
+            count_query = count_query.filter(voter_we_vote_id=normalize_we_vote_id(voter_we_vote_id))
             count_query = count_query.exclude(
                 (Q(statement_text__isnull=True) | Q(statement_text__exact=''))
                 # Not working with statement_html yet
@@ -7720,7 +8928,7 @@ class PositionMetricsManager(models.Model):
             count_query = PositionForFriends.objects.using('readonly').all()
             # As of Aug 2018 we are no longer using PERCENT_RATING
             count_query = count_query.exclude(stance__iexact=PERCENT_RATING)
-            count_query = count_query.filter(voter_we_vote_id__iexact=voter_we_vote_id)
+            count_query = count_query.filter(voter_we_vote_id=normalize_we_vote_id(voter_we_vote_id))
             count_result = count_query.count()
         except Exception as e:
             pass
@@ -7734,7 +8942,7 @@ class PositionMetricsManager(models.Model):
             # As of Aug 2018 we are no longer using PERCENT_RATING
             count_query = count_query.exclude(stance__iexact=PERCENT_RATING)
 
-            count_query = count_query.filter(voter_we_vote_id__iexact=voter_we_vote_id)
+            count_query = count_query.filter(voter_we_vote_id=normalize_we_vote_id(voter_we_vote_id))
             count_result = count_query.count()
         except Exception as e:
             pass
@@ -7745,7 +8953,7 @@ class PositionMetricsManager(models.Model):
         position_filters = []
         final_position_filters = []
         if positive_value_exists(voter.we_vote_id):
-            new_position_filter = Q(voter_we_vote_id__iexact=voter.we_vote_id)
+            new_position_filter = Q(voter_we_vote_id=voter.we_vote_id)
             position_filters.append(new_position_filter)
         if positive_value_exists(voter.id):
             new_position_filter = Q(voter_id=voter.id)
@@ -7784,3 +8992,128 @@ class PositionMetricsManager(models.Model):
         total_positions_count = position_entered_count + position_for_friends_count
 
         return total_positions_count
+
+
+def encode_voter_position_key(is_public_position, position_id):
+    """
+    The keyset pagination cursor for a voter's positions. A voter's public positions come first, then the
+    friends-only positions, each ordered by id, so the cursor is the last position of a page in that order.
+    :param is_public_position:
+    :param position_id:
+    :return:
+    """
+    return "{table}_{position_id}".format(
+        table='public' if is_public_position else 'friends',
+        position_id=position_id)
+
+
+def decode_voter_position_key(position_key):
+    """
+    :param position_key: A value from encode_voter_position_key
+    :return: (is_public_position, position_id), or None if position_key isn't valid
+    """
+    try:
+        table, position_id_string = position_key.split('_')
+    except (AttributeError, ValueError):
+        return None
+    if table not in ('public', 'friends') or not position_id_string.isdigit():
+        return None
+    return table == 'public', int(position_id_string)
+
+
+POSITION_COUNT_FIELD_NAMES = \
+    ('stance', 'candidate_campaign_we_vote_id', 'contest_measure_we_vote_id', 'contest_office_we_vote_id')
+
+
+def fetch_position_count_keys(position_values, is_public_position):
+    """
+    The PositionCount entries one position is counted in.
+    :param position_values: A dict with the POSITION_COUNT_FIELD_NAMES of the position
+    :param is_public_position:
+    :return:
+    """
+    position_count_keys = set()
+    if not positive_value_exists(position_values.get('stance')):
+        return position_count_keys
+    stance = position_values['stance'].upper()
+    for ballot_item_we_vote_id in (position_values.get('candidate_campaign_we_vote_id'),
+                                   position_values.get('contest_measure_we_vote_id'),
+                                   position_values.get('contest_office_we_vote_id')):
+        if positive_value_exists(ballot_item_we_vote_id):
+            position_count_keys.add((ballot_item_we_vote_id.lower(), stance, is_public_position))
+    return position_count_keys
+
+
+def fetch_saved_position_count_values(position_model, position_id):
+    """
+    Read (and lock until the end of the transaction) what a position is counted as in the database right now.
+    Returns None if it isn't in the database.
+    :param position_model: PositionEntered or PositionForFriends
+    :param position_id:
+    :return:
+    """
+    if not positive_value_exists(position_id):
+        return None
+    return position_model.objects.select_for_update().filter(id=position_id).values(
+        *POSITION_COUNT_FIELD_NAMES).first()
+
+
+def update_position_counts(position_count_keys_removed, position_count_keys_added):
+    for position_count_keys, change in ((position_count_keys_removed, -1), (position_count_keys_added, 1)):
+        for ballot_item_we_vote_id, stance, is_public_position in position_count_keys:
+            rows_updated = PositionCount.objects.filter(
+                ballot_item_we_vote_id=ballot_item_we_vote_id, stance=stance,
+                is_public_position=is_public_position).update(positions_count=F('positions_count') + change)
+            if not rows_updated and change > 0:
+                try:
+                    with transaction.atomic():
+                        PositionCount.objects.create(
+                            ballot_item_we_vote_id=ballot_item_we_vote_id, stance=stance,
+                            is_public_position=is_public_position, positions_count=change)
+                except IntegrityError:
+                    # Another request created it first
+                    PositionCount.objects.filter(
+                        ballot_item_we_vote_id=ballot_item_we_vote_id, stance=stance,
+                        is_public_position=is_public_position).update(positions_count=F('positions_count') + change)
+
+
+def update_position_counts_for_saved_position(position, previous_values, is_public_position):
+    """
+    Called from PositionEntered.save and PositionForFriends.save, in the same transaction as the save.
+    :param position:
+    :param previous_values: From fetch_saved_position_count_values before the save
+    :param is_public_position:
+    :return:
+    """
+    # Deferred fields weren't saved, so they still have their previous values
+    position_values = {field_name: position.__dict__[field_name] if field_name in position.__dict__
+                       else (previous_values or {}).get(field_name) for field_name in POSITION_COUNT_FIELD_NAMES}
+    previous_position_count_keys = \
+        fetch_position_count_keys(previous_values, is_public_position) if previous_values else set()
+    position_count_keys = fetch_position_count_keys(position_values, is_public_position)
+    if previous_position_count_keys == position_count_keys:
+        return
+    try:
+        # A savepoint, so a failure here is logged without rolling back the position itself
+        with transaction.atomic():
+            update_position_counts(previous_position_count_keys - position_count_keys,
+                                   position_count_keys - previous_position_count_keys)
+    except Exception as e:
+        handle_exception(e, logger=logger, exception_message="UPDATE_POSITION_COUNTS_FOR_SAVED_POSITION")
+
+
+def update_position_counts_for_deleted_position(previous_values, is_public_position):
+    """
+    Called from PositionEntered.delete and PositionForFriends.delete, in the same transaction as the delete.
+    :param previous_values: From fetch_saved_position_count_values before the delete
+    :param is_public_position:
+    :return:
+    """
+    if not previous_values:
+        # Already deleted by someone else, who removed it from PositionCount
+        return
+    try:
+        with transaction.atomic():
+            update_position_counts(fetch_position_count_keys(previous_values, is_public_position), set())
+    except Exception as e:
+        handle_exception(e, logger=logger, exception_message="UPDATE_POSITION_COUNTS_FOR_DELETED_POSITION")
@@ -0,0 +1,193 @@
+# position/position_index.py
+# Brought to you by We Vote. Be good.
+# -*- coding: UTF-8 -*-
+
+from collections import OrderedDict
+from config.base import get_environment_variable_default
+from django.utils.timezone import now
+from position.models import PositionEntered, PositionForFriends, SUPPORT, OPPOSE
+import threading
+import wevote_functions.admin
+from wevote_functions.functions import convert_to_int, positive_value_exists
+
+logger = wevote_functions.admin.get_logger(__name__)
+
+# Which engine answers positionsCountForAllBallotItems:
+#  NETWORK_SCORE_TABLE reads the precomputed PositionNetworkScore table
+#  READ_TIME_INDEX intersects the voter's follows and friends with an in-memory index of the election's positions
+NETWORK_SCORE_TABLE = 'NETWORK_SCORE_TABLE'
+READ_TIME_INDEX = 'READ_TIME_INDEX'
+POSITION_COUNT_ENGINE = get_environment_variable_default("POSITION_COUNT_ENGINE", NETWORK_SCORE_TABLE)
+# How many seconds an election index can be used before it is rebuilt from the database
+POSITION_INDEX_TIME_TO_LIVE = convert_to_int(get_environment_variable_default("POSITION_INDEX_TIME_TO_LIVE", 60))
+# How many elections each worker keeps indexed at one time
+POSITION_INDEX_MAXIMUM_ELECTIONS = 10
+
+
+class ElectionPositionIndex(object):
+    """
+    All of the support and oppose positions for one election, organized by ballot item so the counts for one
+    voter can be computed by intersecting sets instead of reading that voter's PositionNetworkScore entries.
+    """
+
+    def __init__(self, google_civic_election_id):
+        self.google_civic_election_id = convert_to_int(google_civic_election_id)
+        # ballot_item_we_vote_id -> {organization_we_vote_id: (voter_we_vote_id, speaker_display_name, is_support)}
+        self.public_positions_by_ballot_item = {}
+        # ballot_item_we_vote_id -> {voter_we_vote_id: (speaker_display_name, is_support)}
+        self.friends_positions_by_ballot_item = {}
+        self.date_built = None
+
+    def build(self):
+        public_positions_by_ballot_item = {}
+        friends_positions_by_ballot_item = {}
+        position_fields = ('speaker_display_name', 'candidate_campaign_we_vote_id', 'contest_measure_we_vote_id',
+                           'stance')
+
+        # Only SUPPORT and OPPOSE are counted, matching the PositionNetworkScore table, which is refreshed from
+        # position lists that have excluded PERCENT_RATING since Aug 2018
+        # Ordered oldest first so that the most recent position from each speaker wins
+        public_query = PositionEntered.objects.using('readonly').filter(
+            google_civic_election_id=self.google_civic_election_id, stance__in=(SUPPORT, OPPOSE))
+        public_query = public_query.exclude(organization_we_vote_id__isnull=True).exclude(organization_we_vote_id='')
+        public_query = public_query.order_by('date_entered', 'id')
+        for organization_we_vote_id, voter_we_vote_id, speaker_display_name, candidate_we_vote_id, \
+                measure_we_vote_id, stance in public_query.values_list(
+                    'organization_we_vote_id', 'voter_we_vote_id', *position_fields):
+            ballot_item_we_vote_id = candidate_we_vote_id or measure_we_vote_id
+            if not positive_value_exists(ballot_item_we_vote_id):
+                continue
+            public_positions_by_ballot_item.setdefault(ballot_item_we_vote_id, {})[organization_we_vote_id] = \
+                (voter_we_vote_id, speaker_display_name, stance == SUPPORT)
+
+        friends_query = PositionForFriends.objects.using('readonly').filter(
+            google_civic_election_id=self.google_civic_election_id, stance__in=(SUPPORT, OPPOSE))
+        friends_query = friends_query.exclude(voter_we_vote_id__isnull=True).exclude(voter_we_vote_id='')
+        friends_query = friends_query.order_by('date_entered', 'id')
+        for voter_we_vote_id, speaker_display_name, candidate_we_vote_id, measure_we_vote_id, stance in \
+                friends_query.values_list('voter_we_vote_id', *position_fields):
+            ballot_item_we_vote_id = candidate_we_vote_id or measure_we_vote_id
+            if not positive_value_exists(ballot_item_we_vote_id):
+                continue
+            friends_positions_by_ballot_item.setdefault(ballot_item_we_vote_id, {})[voter_we_vote_id] = \
+                (speaker_display_name, stance == SUPPORT)
+
+        # Swap in the new indexes all at once so readers never see a half-built index
+        self.public_positions_by_ballot_item = public_positions_by_ballot_item
+        self.friends_positions_by_ballot_item = friends_positions_by_ballot_item
+        self.date_built = now()
+        return self
+
+    def is_stale(self):
+        if self.date_built is None:
+            return True
+        return (now() - self.date_built).total_seconds() > POSITION_INDEX_TIME_TO_LIVE
+
+    def count_for_ballot_item(self, ballot_item_we_vote_id, voter_we_vote_id,
+                              organizations_followed_we_vote_id_set, friends_we_vote_id_set):
+        """
+        Return the same structure that count_for_all_ballot_items_from_position_network_score_for_api builds from
+        PositionNetworkScore entries.
+        :param ballot_item_we_vote_id:
+        :param voter_we_vote_id: The voter looking at the ballot. Their own positions are counted as a friend's.
+        :param organizations_followed_we_vote_id_set: Should not include the voter's own linked organization
+        :param friends_we_vote_id_set: Should include voter_we_vote_id
+        :return:
+        """
+        support_we_vote_id_list = []
+        oppose_we_vote_id_list = []
+        support_name_list = []
+        oppose_name_list = []
+
+        public_positions = self.public_positions_by_ballot_item.get(ballot_item_we_vote_id, {})
+        for organization_we_vote_id in public_positions.keys() & organizations_followed_we_vote_id_set:
+            position_voter_we_vote_id, speaker_display_name, is_support = public_positions[organization_we_vote_id]
+            if positive_value_exists(position_voter_we_vote_id) and position_voter_we_vote_id == voter_we_vote_id:
+                # The voter's own public position is counted below, the way the PositionNetworkScore table does
+                continue
+            if is_support:
+                support_we_vote_id_list.append(organization_we_vote_id)
+                support_name_list.append(speaker_display_name)
+            else:
+                oppose_we_vote_id_list.append(organization_we_vote_id)
+                oppose_name_list.append(speaker_display_name)
+
+        friends_positions = dict(self.friends_positions_by_ballot_item.get(ballot_item_we_vote_id, {}))
+        for organization_we_vote_id, (position_voter_we_vote_id, speaker_display_name, is_support) in \
+                public_positions.items():
+            if positive_value_exists(position_voter_we_vote_id) and position_voter_we_vote_id == voter_we_vote_id:
+                friends_positions[voter_we_vote_id] = (speaker_display_name, is_support)
+        for friend_voter_we_vote_id in friends_positions.keys() & friends_we_vote_id_set:
+            speaker_display_name, is_support = friends_positions[friend_voter_we_vote_id]
+            if friend_voter_we_vote_id == voter_we_vote_id and speaker_display_name \
+                    and speaker_display_name.startswith("Voter-"):
+                speaker_display_name = "You"
+            if is_support:
+                support_we_vote_id_list.append(friend_voter_we_vote_id)
+                support_name_list.append(speaker_display_name)
+            else:
+                oppose_we_vote_id_list.append(friend_voter_we_vote_id)
+                oppose_name_list.append(speaker_display_name)
+
+        one_ballot_item_results = {
+            'ballot_item_we_vote_id':   ballot_item_we_vote_id,
+            'support_count':            len(support_we_vote_id_list),
+            'oppose_count':             len(oppose_we_vote_id_list),
+            'support_we_vote_id_list':  support_we_vote_id_list,
+            'support_name_list':        support_name_list,
+            'oppose_we_vote_id_list':   oppose_we_vote_id_list,
+            'oppose_name_list':         oppose_name_list,
+        }
+        return one_ballot_item_results
+
+
+_election_position_index_cache = OrderedDict()
+_election_position_index_lock = threading.Lock()
+_election_position_index_build_lock_by_election = {}
+
+
+def election_position_index_build_lock(google_civic_election_id):
+    # Held while an election's index is rebuilt, so the other requests in this worker wait for it instead of each
+    # rebuilding it too
+    with _election_position_index_lock:
+        return _election_position_index_build_lock_by_election.setdefault(google_civic_election_id, threading.Lock())
+
+
+def fetch_election_position_index(google_civic_election_id, force_rebuild=False):
+    """
+    Return this worker's index for the election, rebuilding it when it is older than POSITION_INDEX_TIME_TO_LIVE.
+    :param google_civic_election_id:
+    :param force_rebuild: Rebuild the index from the database even if it isn't stale yet
+    :return:
+    """
+    google_civic_election_id = convert_to_int(google_civic_election_id)
+    with _election_position_index_lock:
+        election_position_index = _election_position_index_cache.get(google_civic_election_id)
+        if election_position_index is not None:
+            _election_position_index_cache.move_to_end(google_civic_election_id)
+    if election_position_index is not None and not election_position_index.is_stale() and not force_rebuild:
+        return election_position_index
+
+    with election_position_index_build_lock(google_civic_election_id):
+        if not force_rebuild:
+            # Another request may have rebuilt it while we waited
+            with _election_position_index_lock:
+                election_position_index = _election_position_index_cache.get(google_civic_election_id)
+            if election_position_index is not None and not election_position_index.is_stale():
+                return election_position_index
+
+        election_position_index = ElectionPositionIndex(google_civic_election_id).build()
+        with _election_position_index_lock:
+            _election_position_index_cache[google_civic_election_id] = election_position_index
+            _election_position_index_cache.move_to_end(google_civic_election_id)
+            while len(_election_position_index_cache) > POSITION_INDEX_MAXIMUM_ELECTIONS:
+                _election_position_index_cache.popitem(last=False)
+    return election_position_index
+
+
+def clear_election_position_index(google_civic_election_id=0):
+    with _election_position_index_lock:
+        if positive_value_exists(google_civic_election_id):
+            _election_position_index_cache.pop(convert_to_int(google_civic_election_id), None)
+        else:
+            _election_position_index_cache.clear()
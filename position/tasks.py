@@ -0,0 +1,25 @@
+# position/tasks.py
+# Brought to you by We Vote. Be good.
+# -*- coding: UTF-8 -*-
+
+from background_task import background
+from .models import PositionListManager
+import wevote_functions.admin
+
+logger = wevote_functions.admin.get_logger(__name__)
+
+
+@background()
+def propagate_cached_values_to_positions_task(kind_of_source, source_id, source_we_vote_id, changed_values,
+                                              update_public_positions=True, update_friends_positions=True):
+    """
+    Run PositionListManager.propagate_cached_values_to_positions from the background task worker
+    (python manage.py process_tasks), so saving a candidate, office, measure, organization or voter doesn't wait
+    for the position tables to be updated.
+    """
+    position_list_manager = PositionListManager()
+    results = position_list_manager.propagate_cached_values_to_positions(
+        kind_of_source, source_id, source_we_vote_id, changed_values,
+        update_public_positions=update_public_positions, update_friends_positions=update_friends_positions)
+    if not results['success']:
+        logger.error("propagate_cached_values_to_positions_task: " + results['status'])
@@ -0,0 +1,414 @@
+from ballot.models import BallotItem, OFFICE
+from candidate.models import CandidateCampaign
+from datetime import timedelta
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils.timezone import now
+from io import StringIO
+import json
+import threading
+import time
+from unittest import mock
+
+from follow.models import FollowOrganization, FOLLOWING
+from measure.models import ContestMeasure
+from position.controllers import calculate_positions_count_for_all_ballot_items_for_api, \
+    count_for_all_ballot_items_from_position_network_score_for_api
+from position.models import NO_STANCE, OPPOSE, PERCENT_RATING, PositionCount, PositionEntered, PositionForFriends, \
+    PositionListManager, PositionNetworkScore, PositionNetworkScoreQueue, \
+    POSITION_NETWORK_SCORE_QUEUE_MAXIMUM_ATTEMPTS, SUPPORT
+from position.position_index import clear_election_position_index, ElectionPositionIndex, \
+    fetch_election_position_index, READ_TIME_INDEX
+from voter.models import Voter, VoterDeviceLink
+from wevote_functions.functions import generate_voter_device_id
+
+
+class BallotWithPositionsMixin(object):
+
+    def setUp(self):
+        self.voter = Voter.objects.create()
+        self.voter_device_id = generate_voter_device_id()
+        VoterDeviceLink.objects.create(voter_device_id=self.voter_device_id, voter_id=self.voter.id)
+        BallotItem.objects.create(voter_id=self.voter.id, google_civic_election_id='1000',
+                                  contest_office_we_vote_id='wv01off1')
+        BallotItem.objects.create(voter_id=self.voter.id, google_civic_election_id='1000',
+                                  contest_measure_we_vote_id='wv01meas1')
+        for candidate_we_vote_id in ('wv01cand1', 'wv01cand2'):
+            CandidateCampaign.objects.create(we_vote_id=candidate_we_vote_id, contest_office_we_vote_id='wv01off1',
+                                             google_civic_election_id='1000')
+        for organization_we_vote_id in ('wv01org1', 'wv01org2', 'wv01org3', 'wv01org4'):
+            FollowOrganization.objects.create(voter_id=self.voter.id, organization_we_vote_id=organization_we_vote_id,
+                                              following_status=FOLLOWING)
+
+        for organization_we_vote_id, candidate_we_vote_id, measure_we_vote_id, stance, vote_smart_rating in [
+                ('wv01org1', 'wv01cand1', None, SUPPORT, None),
+                ('wv01org2', 'wv01cand1', None, OPPOSE, None),
+                ('wv01org1', 'wv01cand2', None, NO_STANCE, None),
+                ('wv01org3', 'wv01cand2', None, PERCENT_RATING, '90'),
+                ('wv01org3', 'wv01cand1', None, PERCENT_RATING, '10'),
+                ('wv01org4', None, 'wv01meas1', SUPPORT, None),
+                ('wv01org5', 'wv01cand1', None, SUPPORT, None)]:  # Not followed
+            PositionEntered.objects.create(
+                organization_we_vote_id=organization_we_vote_id, speaker_display_name=organization_we_vote_id,
+                candidate_campaign_we_vote_id=candidate_we_vote_id, contest_measure_we_vote_id=measure_we_vote_id,
+                google_civic_election_id='1000', stance=stance, vote_smart_rating=vote_smart_rating)
+        PositionForFriends.objects.create(
+            voter_we_vote_id=self.voter.we_vote_id, voter_id=self.voter.id, speaker_display_name='Voter-1',
+            candidate_campaign_we_vote_id='wv01cand2', google_civic_election_id='1000', stance=OPPOSE)
+
+    def fetch_position_network_scores(self):
+        return set(PositionNetworkScore.objects.filter(viewing_voter_id=self.voter.id).values_list(
+            'viewing_voter_we_vote_id', 'organization_we_vote_id', 'friend_voter_we_vote_id', 'speaker_display_name',
+            'candidate_we_vote_id', 'measure_we_vote_id', 'is_support', 'is_oppose'))
+
+
+class PositionNetworkScoreBulkRecomputeTestCase(BallotWithPositionsMixin, TestCase):
+
+    def test_bulk_recompute_matches_ballot_item_by_ballot_item_refresh(self):
+        results = calculate_positions_count_for_all_ballot_items_for_api(
+            self.voter_device_id, 1000, bulk_recompute=False)
+        self.assertTrue(results['success'])
+        scores_from_ballot_item_refresh = self.fetch_position_network_scores()
+        self.assertEqual(len(scores_from_ballot_item_refresh), 4)
+
+        PositionNetworkScore.objects.all().delete()
+        results = calculate_positions_count_for_all_ballot_items_for_api(self.voter_device_id, 1000)
+        self.assertTrue(results['success'])
+        self.assertEqual(self.fetch_position_network_scores(), scores_from_ballot_item_refresh)
+
+        # Recomputing again changes nothing, and replaces what the ballot item refresh left behind the same way
+        calculate_positions_count_for_all_ballot_items_for_api(self.voter_device_id, 1000, bulk_recompute=False)
+        calculate_positions_count_for_all_ballot_items_for_api(self.voter_device_id, 1000)
+        self.assertEqual(self.fetch_position_network_scores(), scores_from_ballot_item_refresh)
+
+
+class PositionIndexTestCase(BallotWithPositionsMixin, TestCase):
+
+    def setUp(self):
+        super(PositionIndexTestCase, self).setUp()
+        clear_election_position_index()
+        self.read_time_index_engine = mock.patch('apis_v1.views.views_position.POSITION_COUNT_ENGINE', READ_TIME_INDEX)
+
+    def fetch_counts_from_view(self, **params):
+        with self.read_time_index_engine:
+            response = self.client.get(reverse("apis_v1:positionsCountForAllBallotItemsView"), dict(
+                voter_device_id=self.voter_device_id, google_civic_election_id=1000, **params))
+        json_data = json.loads(response.content.decode())
+        self.assertTrue(json_data['success'])
+        return self.summarize_position_counts_list(json_data['position_counts_list'])
+
+    @staticmethod
+    def summarize_position_counts_list(position_counts_list):
+        return {one_ballot_item['ballot_item_we_vote_id']: (
+            sorted(one_ballot_item['support_we_vote_id_list']), sorted(one_ballot_item['oppose_we_vote_id_list']))
+            for one_ballot_item in position_counts_list}
+
+    def test_index_counts_match_network_score_table(self):
+        calculate_positions_count_for_all_ballot_items_for_api(self.voter_device_id, 1000)
+        results = count_for_all_ballot_items_from_position_network_score_for_api(self.voter_device_id, 1000)
+        self.assertTrue(results['success'])
+        counts_from_network_score_table = self.summarize_position_counts_list(results['position_counts_list'])
+        self.assertEqual(counts_from_network_score_table['wv01cand1'], (['wv01org1'], ['wv01org2']))
+
+        self.assertEqual(self.fetch_counts_from_view(), counts_from_network_score_table)
+
+    def test_force_recount_rebuilds_index(self):
+        counts_before = self.fetch_counts_from_view()
+        PositionEntered.objects.create(
+            organization_we_vote_id='wv01org4', speaker_display_name='wv01org4',
+            candidate_campaign_we_vote_id='wv01cand2', google_civic_election_id='1000', stance=SUPPORT)
+
+        # The index is still fresh, so the new position isn't counted until it is rebuilt
+        self.assertEqual(self.fetch_counts_from_view(), counts_before)
+        self.assertEqual(self.fetch_counts_from_view(force_recount=1)['wv01cand2'],
+                         (['wv01org4'], [self.voter.we_vote_id]))
+
+    def test_concurrent_requests_build_the_index_once(self):
+        build_count = []
+
+        def build_slowly(election_position_index):
+            # Without reading the database, which the other threads can't see the test's positions in
+            build_count.append(election_position_index.google_civic_election_id)
+            time.sleep(0.2)
+            election_position_index.date_built = now()
+            return election_position_index
+
+        election_position_index_list = []
+        with mock.patch.object(ElectionPositionIndex, 'build', build_slowly):
+            thread_list = [threading.Thread(target=lambda: election_position_index_list.append(
+                fetch_election_position_index(1000))) for thread_number in range(4)]
+            for thread in thread_list:
+                thread.start()
+            for thread in thread_list:
+                thread.join()
+        self.assertEqual(build_count, [1000])
+        self.assertEqual(len(set(map(id, election_position_index_list))), 1)
+
+
+class PositionCountTestCase(TestCase):
+
+    def fetch_position_counts(self):
+        return {(position_count.ballot_item_we_vote_id, position_count.stance, position_count.is_public_position):
+                position_count.positions_count for position_count in PositionCount.objects.exclude(positions_count=0)}
+
+    def assert_position_counts_match_recount(self):
+        position_counts = self.fetch_position_counts()
+        PositionListManager().recount_positions_for_ballot_items()
+        self.assertEqual(position_counts, self.fetch_position_counts())
+        return position_counts
+
+    def test_save_and_delete_keep_counts_current(self):
+        position = PositionEntered.objects.create(
+            organization_we_vote_id='wv01org1', candidate_campaign_we_vote_id='wv01cand1',
+            contest_office_we_vote_id='wv01off1', stance=SUPPORT)
+        PositionForFriends.objects.create(voter_we_vote_id='wv01voter1', candidate_campaign_we_vote_id='wv01cand1',
+                                          stance=OPPOSE)
+        self.assertEqual(self.assert_position_counts_match_recount(), {
+            ('wv01cand1', SUPPORT, True): 1, ('wv01off1', SUPPORT, True): 1, ('wv01cand1', OPPOSE, False): 1})
+
+        position.stance = OPPOSE
+        position.candidate_campaign_we_vote_id = 'wv01cand2'
+        position.save()
+        self.assertEqual(self.assert_position_counts_match_recount(), {
+            ('wv01cand2', OPPOSE, True): 1, ('wv01off1', OPPOSE, True): 1, ('wv01cand1', OPPOSE, False): 1})
+
+        position.delete()
+        self.assertEqual(self.assert_position_counts_match_recount(), {('wv01cand1', OPPOSE, False): 1})
+
+    def test_stale_copies_do_not_drift(self):
+        position = PositionEntered.objects.create(
+            organization_we_vote_id='wv01org1', candidate_campaign_we_vote_id='wv01cand1', stance=SUPPORT)
+        first_copy = PositionEntered.objects.get(id=position.id)
+        second_copy = PositionEntered.objects.get(id=position.id)
+
+        first_copy.stance = OPPOSE
+        first_copy.save()
+        # second_copy was loaded as a SUPPORT, but the database already has it as an OPPOSE
+        second_copy.candidate_campaign_we_vote_id = 'wv01cand2'
+        second_copy.save()
+        self.assertEqual(self.assert_position_counts_match_recount(), {('wv01cand2', SUPPORT, True): 1})
+
+        # Saving only some of the fields, from a copy without the others
+        deferred_copy = PositionEntered.objects.only('id', 'we_vote_id', 'stance').get(id=position.id)
+        deferred_copy.stance = OPPOSE
+        deferred_copy.save(update_fields=['stance'])
+        self.assertEqual(self.assert_position_counts_match_recount(), {('wv01cand2', OPPOSE, True): 1})
+
+        first_copy.delete()
+        second_copy.delete()
+        self.assertEqual(self.assert_position_counts_match_recount(), {})
+
+    def test_propagated_we_vote_id_change_recounts_old_and_new(self):
+        for stance in (SUPPORT, OPPOSE):
+            PositionEntered.objects.create(
+                organization_we_vote_id='wv01org1', contest_office_id=1, contest_office_we_vote_id='wv01off1',
+                stance=stance)
+        self.assertEqual(self.assert_position_counts_match_recount(), {
+            ('wv01off1', SUPPORT, True): 1, ('wv01off1', OPPOSE, True): 1})
+
+        results = PositionListManager().propagate_cached_values_to_positions(
+            OFFICE, 1, 'wv01off2', {'contest_office_we_vote_id': 'wv01off2'})
+        self.assertEqual(results['positions_updated_count'], 2)
+        self.assertEqual(self.assert_position_counts_match_recount(), {
+            ('wv01off2', SUPPORT, True): 1, ('wv01off2', OPPOSE, True): 1})
+
+    def test_loading_and_queryset_delete_have_no_extra_queries(self):
+        PositionEntered.objects.create(organization_we_vote_id='wv01org1', candidate_campaign_we_vote_id='wv01cand1',
+                                       stance=SUPPORT)
+        with self.assertNumQueries(1):
+            list(PositionEntered.objects.all())
+        with self.assertNumQueries(1):
+            PositionEntered.objects.all().delete()
+
+
+class MostRecentPositionForEachOrgTestCase(TestCase):
+
+    def test_only_vote_smart_ratings_are_reduced_to_the_most_recent(self):
+        for organization_we_vote_id, vote_smart_time_span, stance in [
+                ('wv01org1', None, SUPPORT),
+                ('wv01org1', None, OPPOSE),
+                ('wv01org2', '2014-2015', PERCENT_RATING),
+                ('wv01org2', '2016-2017', PERCENT_RATING),
+                ('wv01org2', '2012-2013', PERCENT_RATING),
+                ('wv01org3', '2016', PERCENT_RATING),
+                ('wv01org3', '', SUPPORT),
+                (None, None, SUPPORT)]:
+            PositionEntered.objects.create(
+                organization_we_vote_id=organization_we_vote_id, candidate_campaign_we_vote_id='wv01cand1',
+                vote_smart_time_span=vote_smart_time_span, stance=stance)
+
+        position_list = list(PositionListManager().filter_to_most_recent_position_for_each_org(
+            PositionEntered.objects.order_by('-date_entered')))
+        self.assertEqual(sorted((position.organization_we_vote_id or '', position.vote_smart_time_span or '')
+                                for position in position_list),
+                         [('', ''), ('wv01org1', ''), ('wv01org1', ''), ('wv01org2', '2016-2017'),
+                          ('wv01org3', ''), ('wv01org3', '2016')])
+
+    def test_fetch_materialized_positions_count(self):
+        PositionEntered.objects.create(organization_we_vote_id='wv01org1', candidate_campaign_we_vote_id='wv01cand1',
+                                       stance=SUPPORT)
+        self.assertEqual(PositionListManager.fetch_materialized_positions_count('wv01cand1', SUPPORT), 1)
+        self.assertEqual(PositionListManager().fetch_materialized_positions_count('wv01cand1', OPPOSE), 0)
+
+
+class BulkRefreshCachedPositionInfoTestCase(TestCase):
+
+    def test_positions_without_the_election_id_are_refreshed(self):
+        CandidateCampaign.objects.create(we_vote_id='wv01cand1', candidate_name='Jane Doe',
+                                         google_civic_election_id='1000')
+        ContestMeasure.objects.create(we_vote_id='wv01meas1', measure_title='Measure A',
+                                      google_civic_election_id='1000')
+        for google_civic_election_id in ('', '999'):
+            PositionEntered.objects.create(
+                organization_we_vote_id='wv01org1', candidate_campaign_we_vote_id='wv01cand1',
+                google_civic_election_id=google_civic_election_id, ballot_item_display_name='Old Name', stance=SUPPORT)
+            PositionForFriends.objects.create(
+                voter_we_vote_id='wv01voter1', contest_measure_we_vote_id='wv01meas1',
+                google_civic_election_id=google_civic_election_id, ballot_item_display_name='Old Name', stance=OPPOSE)
+
+        results = PositionListManager().bulk_refresh_cached_position_info_for_election(1000)
+        self.assertTrue(results['success'])
+        self.assertEqual(results['rows_updated']['candidate'], 2)
+        self.assertEqual(results['rows_updated']['measure'], 2)
+        self.assertEqual(set(PositionEntered.objects.values_list('ballot_item_display_name', flat=True)),
+                         {'Jane Doe'})
+        self.assertEqual(set(PositionForFriends.objects.values_list('ballot_item_display_name', flat=True)),
+                         {'Measure A'})
+
+
+class VoterAllPositionsRetrieveTestCase(TestCase):
+
+    def setUp(self):
+        self.voter = Voter.objects.create()
+        self.voter_device_id = generate_voter_device_id()
+        VoterDeviceLink.objects.create(voter_device_id=self.voter_device_id, voter_id=self.voter.id)
+        for candidate_we_vote_id, google_civic_election_id in [('wv01cand3', '3000'), ('wv01cand1', '1000'),
+                                                               ('wv01cand2', '2000')]:
+            PositionEntered.objects.create(voter_id=self.voter.id, candidate_campaign_we_vote_id=candidate_we_vote_id,
+                                           google_civic_election_id=google_civic_election_id, stance=SUPPORT)
+        PositionForFriends.objects.create(voter_id=self.voter.id, contest_measure_we_vote_id='wv01meas1',
+                                          google_civic_election_id='1500', stance=OPPOSE)
+
+    def retrieve_voter_positions(self, **params):
+        response = self.client.get(reverse("apis_v1:voterAllPositionsRetrieveView"),
+                                   dict(voter_device_id=self.voter_device_id, **params))
+        json_data = json.loads(response.content.decode())
+        self.assertTrue(json_data['success'])
+        return json_data
+
+    def test_all_positions_without_page_params(self):
+        with mock.patch('position.controllers.VOTER_POSITIONS_PAGE_SIZE', 2):
+            json_data = self.retrieve_voter_positions()
+        self.assertEqual([one_position['ballot_item_we_vote_id'] for one_position in json_data['position_list']],
+                         ['wv01cand1', 'wv01cand2', 'wv01cand3', 'wv01meas1'])
+        self.assertEqual(json_data['next_position_key'], '')
+
+    def test_pages_when_asked(self):
+        with mock.patch('position.controllers.VOTER_POSITIONS_PAGE_SIZE', 2):
+            # page_size is capped at VOTER_POSITIONS_PAGE_SIZE
+            json_data = self.retrieve_voter_positions(page_size=5)
+            ballot_item_we_vote_id_list = []
+            while True:
+                self.assertLessEqual(len(json_data['position_list']), 2)
+                ballot_item_we_vote_id_list += [one_position['ballot_item_we_vote_id']
+                                                for one_position in json_data['position_list']]
+                if not json_data['next_position_key']:
+                    break
+                # after_position_key alone keeps paging at the default page size
+                json_data = self.retrieve_voter_positions(after_position_key=json_data['next_position_key'])
+        self.assertEqual(sorted(ballot_item_we_vote_id_list), ['wv01cand1', 'wv01cand2', 'wv01cand3', 'wv01meas1'])
+
+    def test_saving_a_position_while_paging_does_not_move_it(self):
+        json_data = self.retrieve_voter_positions(page_size=2)
+        ballot_item_we_vote_id_list = [one_position['ballot_item_we_vote_id']
+                                       for one_position in json_data['position_list']]
+        # The voter changes a position on the first page, and one on the next page
+        for position in PositionEntered.objects.all():
+            position.save()
+        json_data = self.retrieve_voter_positions(page_size=2, after_position_key=json_data['next_position_key'])
+        ballot_item_we_vote_id_list += [one_position['ballot_item_we_vote_id']
+                                        for one_position in json_data['position_list']]
+        self.assertEqual(json_data['next_position_key'], '')
+        self.assertEqual(ballot_item_we_vote_id_list, ['wv01cand3', 'wv01cand1', 'wv01cand2', 'wv01meas1'])
+
+
+class PositionNetworkScoreQueueTestCase(TestCase):
+
+    def setUp(self):
+        self.position = PositionEntered.objects.create(
+            organization_we_vote_id='wv01org1', candidate_campaign_we_vote_id='wv01cand1', stance=SUPPORT)
+        self.queue_entry = PositionNetworkScoreQueue.objects.create(
+            position_we_vote_id=self.position.we_vote_id, date_queued=now())
+        self.failing_fan_out = mock.patch.object(
+            PositionListManager, 'fan_out_position_network_scores_for_one_position',
+            side_effect=Exception('fan-out failed'))
+
+    def test_failed_entry_waits_before_retry(self):
+        with self.failing_fan_out:
+            results = PositionListManager().process_position_network_score_queue()
+            self.assertEqual(results['positions_failed'], 1)
+            queue_entry = PositionNetworkScoreQueue.objects.get(id=self.queue_entry.id)
+            self.assertEqual(queue_entry.attempts, 1)
+            self.assertGreater(queue_entry.date_next_attempt, now())
+            self.assertIsNone(queue_entry.date_claimed)
+
+            # Not claimed again until it is due
+            results = PositionListManager().process_position_network_score_queue()
+            self.assertEqual(results['positions_failed'], 0)
+
+        PositionNetworkScoreQueue.objects.filter(id=self.queue_entry.id).update(
+            date_next_attempt=now() - timedelta(seconds=1))
+        results = PositionListManager().process_position_network_score_queue()
+        self.assertEqual(results['positions_processed'], 1)
+        self.assertFalse(PositionNetworkScoreQueue.objects.exists())
+
+    def test_entry_becomes_dead_letter_until_saved_again(self):
+        PositionNetworkScoreQueue.objects.filter(id=self.queue_entry.id).update(
+            attempts=POSITION_NETWORK_SCORE_QUEUE_MAXIMUM_ATTEMPTS - 1)
+        with self.failing_fan_out:
+            PositionListManager().process_position_network_score_queue()
+        queue_entry = PositionNetworkScoreQueue.objects.get(id=self.queue_entry.id)
+        self.assertTrue(queue_entry.dead_letter)
+        self.assertEqual(queue_entry.last_error, 'fan-out failed')
+
+        PositionNetworkScoreQueue.objects.filter(id=self.queue_entry.id).update(date_next_attempt=None)
+        results = PositionListManager().process_position_network_score_queue()
+        self.assertEqual(results['positions_processed'], 0)
+        self.assertEqual(PositionListManager().fetch_position_network_score_queue_metrics()['dead_letter_count'], 1)
+
+        PositionListManager().queue_position_network_scores_update(self.position)
+        queue_entry = PositionNetworkScoreQueue.objects.get(id=self.queue_entry.id)
+        self.assertFalse(queue_entry.dead_letter)
+        self.assertEqual(queue_entry.attempts, 0)
+
+    def test_failed_fan_out_is_retried(self):
+        follower = Voter.objects.create()
+        FollowOrganization.objects.create(voter_id=follower.id, organization_we_vote_id='wv01org1',
+                                          following_status=FOLLOWING)
+        with mock.patch.object(PositionListManager, 'replace_position_network_scores_for_viewing_voters',
+                               side_effect=Exception('database unavailable')):
+            results = PositionListManager().process_position_network_score_queue()
+        self.assertEqual(results['positions_failed'], 1)
+        queue_entry = PositionNetworkScoreQueue.objects.get(id=self.queue_entry.id)
+        self.assertEqual(queue_entry.attempts, 1)
+        self.assertIn('database unavailable', queue_entry.last_error)
+
+    def test_scores_of_deleted_position_are_removed(self):
+        PositionListManager().queue_position_network_scores_update(self.position)
+        for organization_we_vote_id in ('wv01org1', 'wv01org2'):
+            PositionNetworkScore.objects.create(
+                viewing_voter_id=1, viewing_voter_we_vote_id='wv01voter1',
+                organization_we_vote_id=organization_we_vote_id, candidate_we_vote_id='wv01cand1', is_support=True)
+        self.position.delete()
+
+        results = PositionListManager().process_position_network_score_queue()
+        self.assertEqual(results['positions_processed'], 1)
+        self.assertEqual(list(PositionNetworkScore.objects.values_list('organization_we_vote_id', flat=True)),
+                         ['wv01org2'])
+        self.assertFalse(PositionNetworkScoreQueue.objects.exists())
+
+    def test_once_stops_after_one_pass(self):
+        with self.failing_fan_out, mock.patch('position.models.POSITION_NETWORK_SCORE_QUEUE_RETRY_SECONDS', 0):
+            call_command('process_position_network_score_queue', once=True, stdout=StringIO())
+        self.assertEqual(PositionNetworkScoreQueue.objects.get(id=self.queue_entry.id).attempts, 1)
@@ -25,7 +25,7 @@ from measure.controllers import push_contest_measure_data_to_other_table_caches
 from office.controllers import push_contest_office_data_to_other_table_caches
 from voter.models import voter_has_authority
 import wevote_functions.admin
-from wevote_functions.functions import convert_to_int, positive_value_exists
+from wevote_functions.functions import convert_to_int, normalize_we_vote_id, positive_value_exists
 from django.http import HttpResponse
 import json
 
@@ -166,22 +166,22 @@ def position_list_view(request):
             new_filter = Q(state_code__icontains=one_word)
             filters.append(new_filter)
 
-            new_filter = Q(we_vote_id__iexact=one_word)
+            new_filter = Q(we_vote_id=normalize_we_vote_id(one_word))
             filters.append(new_filter)
 
-            new_filter = Q(candidate_campaign_we_vote_id__iexact=one_word)
+            new_filter = Q(candidate_campaign_we_vote_id=normalize_we_vote_id(one_word))
             filters.append(new_filter)
 
-            new_filter = Q(contest_measure_we_vote_id__iexact=one_word)
+            new_filter = Q(contest_measure_we_vote_id=normalize_we_vote_id(one_word))
             filters.append(new_filter)
 
-            new_filter = Q(contest_office_we_vote_id__iexact=one_word)
+            new_filter = Q(contest_office_we_vote_id=normalize_we_vote_id(one_word))
             filters.append(new_filter)
 
-            new_filter = Q(organization_we_vote_id__iexact=one_word)
+            new_filter = Q(organization_we_vote_id=normalize_we_vote_id(one_word))
             filters.append(new_filter)
 
-            new_filter = Q(voter_we_vote_id__iexact=one_word)
+            new_filter = Q(voter_we_vote_id=normalize_we_vote_id(one_word))
             filters.append(new_filter)
 
             new_filter = Q(google_civic_measure_title__icontains=one_word)
@@ -228,22 +228,22 @@ def position_list_view(request):
             new_filter = Q(state_code__icontains=one_word)
             filters.append(new_filter)
 
-            new_filter = Q(we_vote_id__iexact=one_word)
+            new_filter = Q(we_vote_id=normalize_we_vote_id(one_word))
             filters.append(new_filter)
 
-            new_filter = Q(candidate_campaign_we_vote_id__iexact=one_word)
+            new_filter = Q(candidate_campaign_we_vote_id=normalize_we_vote_id(one_word))
             filters.append(new_filter)
 
-            new_filter = Q(contest_measure_we_vote_id__iexact=one_word)
+            new_filter = Q(contest_measure_we_vote_id=normalize_we_vote_id(one_word))
             filters.append(new_filter)
 
-            new_filter = Q(contest_office_we_vote_id__iexact=one_word)
+            new_filter = Q(contest_office_we_vote_id=normalize_we_vote_id(one_word))
             filters.append(new_filter)
 
-            new_filter = Q(organization_we_vote_id__iexact=one_word)
+            new_filter = Q(organization_we_vote_id=normalize_we_vote_id(one_word))
             filters.append(new_filter)
 
-            new_filter = Q(voter_we_vote_id__iexact=one_word)
+            new_filter = Q(voter_we_vote_id=normalize_we_vote_id(one_word))
             filters.append(new_filter)
 
             new_filter = Q(google_civic_measure_title__icontains=one_word)
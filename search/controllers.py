@@ -2,7 +2,7 @@
 # Brought to you by We Vote. Be good.
 # -*- coding: UTF-8 -*-
 
-from candidate.models import CandidateCampaignManager
+from ballot.election_snapshot import retrieve_candidate_campaign_from_snapshot
 from config.base import get_environment_variable
 from elasticsearch import Elasticsearch
 from organization.models import OrganizationManager
@@ -88,7 +88,6 @@ def search_all_for_api(text_from_search_field, voter_device_id):
     # Example of querying ALL indexes
     search_results = []
     search_count = 0
-    candidate_manager = CandidateCampaignManager()
     organization_manager = OrganizationManager()
     try:
         res = elastic_search_object.search(body=query)
@@ -126,8 +125,9 @@ def search_all_for_api(text_from_search_field, voter_device_id):
                 else:
                     link_internal = "/candidate/" + one_search_result_dict['we_vote_id']
 
-                results = candidate_manager.retrieve_candidate_campaign_from_we_vote_id(
-                    one_search_result_dict['we_vote_id'])
+                # Only look in the snapshots this worker already has, since the hits can come from many elections
+                results = retrieve_candidate_campaign_from_snapshot(
+                    candidate_campaign_we_vote_id=one_search_result_dict['we_vote_id'])
                 if results['candidate_campaign_found']:
                     candidate = results['candidate_campaign']
                     result_image = candidate.candidate_photo_url()
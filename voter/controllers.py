@@ -3,24 +3,26 @@
 # -*- coding: UTF-8 -*-
 from .models import BALLOT_ADDRESS, fetch_voter_id_from_voter_device_link, Voter, VoterAddressManager, \
     VoterDeviceLink, VoterDeviceLinkManager, VoterManager
+from .voter_context import voter_context_for_voter_device_id
+from .voter_merge import merge_voter_entries, VoterMergeRolledBack
+from .voter_profile_cache import fetch_cached_voter_profile, store_cached_voter_profile
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
 from django.http import HttpResponse
-from analytics.controllers import move_analytics_info_to_another_voter
 from analytics.models import AnalyticsManager, ACTION_FACEBOOK_AUTHENTICATION_EXISTS, ACTION_GOOGLE_AUTHENTICATION_EXISTS, \
     ACTION_TWITTER_AUTHENTICATION_EXISTS, ACTION_EMAIL_AUTHENTICATION_EXISTS
-from email_outbound.controllers import move_email_address_entries_to_another_voter, schedule_verification_email, \
-    WEB_APP_ROOT_URL, WE_VOTE_SERVER_ROOT_URL, schedule_email_with_email_outbound_description
+from email_outbound.controllers import schedule_verification_email, WEB_APP_ROOT_URL, WE_VOTE_SERVER_ROOT_URL, \
+    schedule_email_with_email_outbound_description
 from email_outbound.models import EmailManager, EmailAddress, FRIEND_INVITATION_TEMPLATE, TO_BE_PROCESSED, \
     WAITING_FOR_VERIFICATION, SEND_BALLOT_TO_FRIENDS, SEND_BALLOT_TO_SELF
 from follow.controllers import duplicate_follow_entries_to_another_voter, \
-    duplicate_follow_issue_entries_to_another_voter, \
-    move_follow_issue_entries_to_another_voter, move_follow_entries_to_another_voter, \
-    duplicate_organization_followers_to_another_organization
+    duplicate_follow_issue_entries_to_another_voter, duplicate_organization_followers_to_another_organization
 from friend.controllers import fetch_friend_invitation_recipient_voter_we_vote_id, friend_accepted_invitation_send, \
-    move_friend_invitations_to_another_voter, move_friends_to_another_voter, retrieve_voter_and_email_address, \
-    store_internal_friend_invitation_with_two_voters, store_internal_friend_invitation_with_unknown_email
+    retrieve_voter_and_email_address, store_internal_friend_invitation_with_two_voters, \
+    store_internal_friend_invitation_with_unknown_email
 from friend.models import FriendManager
 from image.controllers import cache_master_and_resized_image, TWITTER, FACEBOOK
-from import_export_facebook.models import FacebookManager
+from import_export_facebook.models import FacebookLinkToVoter, FacebookManager, FacebookUser
 from import_export_twitter.models import TwitterAuthManager
 import json
 from organization.controllers import move_organization_to_another_complete
@@ -33,7 +35,7 @@ from validate_email import validate_email
 from voter_guide.controllers import duplicate_voter_guides, move_voter_guides_to_another_voter
 import wevote_functions.admin
 from wevote_functions.functions import generate_voter_device_id, is_voter_device_id_valid, positive_value_exists
-from donate.controllers import donation_history_for_a_voter, move_donation_info_to_another_voter
+from donate.controllers import donation_history_for_a_voter
 
 
 logger = wevote_functions.admin.get_logger(__name__)
@@ -1471,167 +1473,167 @@ def voter_merge_two_accounts_for_api(  # voterMergeTwoAccounts
         new_owner_voter = invitation_owner_voter
         status += "TO_VOTER-" + str(to_voter_we_vote_id) + " "
 
-    # The from_voter and to_voter may both have their own linked_organization_we_vote_id
-    organization_manager = OrganizationManager()
-    from_voter_linked_organization_we_vote_id = voter.linked_organization_we_vote_id
-    from_voter_linked_organization_id = 0
-    if positive_value_exists(from_voter_linked_organization_we_vote_id):
-        from_linked_organization_results = organization_manager.retrieve_organization_from_we_vote_id(
-            from_voter_linked_organization_we_vote_id)
-        if from_linked_organization_results['organization_found']:
-            from_linked_organization = from_linked_organization_results['organization']
-            from_voter_linked_organization_id = from_linked_organization.id
-        else:
-            # Remove the link to the organization so we don't have a future conflict
-            try:
-                from_voter_linked_organization_we_vote_id = None
-                voter.linked_organization_we_vote_id = None
-                voter.save()
-                # All positions should have already been moved with move_positions_to_another_voter
-            except Exception as e:
-                status += "FAILED_TO_REMOVE_LINKED_ORGANIZATION_WE_VOTE_ID-FROM_VOTER " + str(e) + " "
-
-    to_voter_linked_organization_we_vote_id = new_owner_voter.linked_organization_we_vote_id
-    to_voter_linked_organization_id = 0
-    if positive_value_exists(to_voter_linked_organization_we_vote_id):
-        to_linked_organization_results = organization_manager.retrieve_organization_from_we_vote_id(
-            to_voter_linked_organization_we_vote_id)
-        if to_linked_organization_results['organization_found']:
-            to_linked_organization = to_linked_organization_results['organization']
-            to_voter_linked_organization_id = to_linked_organization.id
-        else:
-            # Remove the link to the organization so we don't have a future conflict
-            try:
-                to_voter_linked_organization_we_vote_id = None
-                new_owner_voter.linked_organization_we_vote_id = None
-                new_owner_voter.save()
-                # All positions should have already been moved with move_positions_to_another_voter
-            except Exception as e:
-                status += "FAILED_TO_REMOVE_LINKED_ORGANIZATION_WE_VOTE_ID-TO_VOTER " + str(e) + " "
-
-    # If the to_voter does not have a linked_organization_we_vote_id, then we should move the from_voter's
-    #  organization_we_vote_id
-    if not positive_value_exists(to_voter_linked_organization_we_vote_id):
-        # Use the from_voter's linked_organization_we_vote_id
-        to_voter_linked_organization_we_vote_id = from_voter_linked_organization_we_vote_id
-        to_voter_linked_organization_id = from_voter_linked_organization_id
-
-    # Data healing scripts before we try to move the positions
+    # Everything from here until the voter_device_id is relinked runs in one transaction, so a failure part way
+    # through leaves the two accounts as they were. (The steps above for the sign in method, like linking the Twitter
+    # owner's organization and sending the invitation accepted email, have already happened and aren't undone.)
+    # The movers report most of their errors in their status instead of raising. A database error one of them
+    # catches either marks the transaction for rollback, which is checked before it commits, or makes the next query
+    # fail, so the merge is rolled back either way.
     position_list_manager = PositionListManager()
-    if positive_value_exists(from_voter_id):
-        repair_results = position_list_manager.repair_all_positions_for_voter(from_voter_id)
-        status += repair_results['status']
-    if positive_value_exists(to_voter_id):
-        repair_results = position_list_manager.repair_all_positions_for_voter(to_voter_id)
-        status += repair_results['status']
-
-    # Transfer positions from voter to new_owner_voter
-    move_positions_results = move_positions_to_another_voter(
-        from_voter_id, from_voter_we_vote_id,
-        to_voter_id, to_voter_we_vote_id,
-        to_voter_linked_organization_id, to_voter_linked_organization_we_vote_id)
-    status += " " + move_positions_results['status']
-
-    if positive_value_exists(from_voter_linked_organization_we_vote_id) and \
-            positive_value_exists(to_voter_linked_organization_we_vote_id) and \
-            from_voter_linked_organization_we_vote_id != to_voter_linked_organization_we_vote_id:
-        move_organization_to_another_complete_results = move_organization_to_another_complete(
-            from_voter_linked_organization_id, from_voter_linked_organization_we_vote_id,
-            to_voter_linked_organization_id, to_voter_linked_organization_we_vote_id,
-            to_voter_id, to_voter_we_vote_id
-        )
-        status += " " + move_organization_to_another_complete_results['status']
-
-    # Transfer friends from voter to new_owner_voter
-    move_friends_results = move_friends_to_another_voter(from_voter_we_vote_id, to_voter_we_vote_id)
-    status += " " + move_friends_results['status']
-
-    # Transfer friend invitations from voter to email_owner_voter
-    move_friend_invitations_results = move_friend_invitations_to_another_voter(
-        from_voter_we_vote_id, to_voter_we_vote_id)
-    status += " " + move_friend_invitations_results['status']
-
-    if positive_value_exists(voter.linked_organization_we_vote_id):
-        # Remove the link to the organization so we don't have a future conflict
-        try:
-            voter.linked_organization_we_vote_id = None
-            voter.save()
-            # All positions should have already been moved with move_positions_to_another_voter
-        except Exception as e:
-            status += "CANNOT_DELETE_LINKED_ORGANIZATION_WE_VOTE_ID: " + str(e) + " "
-
-    # Transfer the organizations the from_voter is following to the new_owner_voter
-    move_follow_results = move_follow_entries_to_another_voter(from_voter_id, to_voter_id, to_voter_we_vote_id)
-    status += " " + move_follow_results['status']
+    try:
+        with transaction.atomic():
+            # Friends, friend invitations, follow entries, email addresses, donations and analytics, with one
+            # UPDATE per table (see voter/voter_merge.py)
+            merge_entries_results = merge_voter_entries(voter, new_owner_voter)
+            status += merge_entries_results['status']
+            if not merge_entries_results['success']:
+                raise VoterMergeRolledBack("MERGE_VOTER_ENTRIES_FAILED")
+
+            # The from_voter and to_voter may both have their own linked_organization_we_vote_id
+            organization_manager = OrganizationManager()
+            from_voter_linked_organization_we_vote_id = voter.linked_organization_we_vote_id
+            from_voter_linked_organization_id = 0
+            if positive_value_exists(from_voter_linked_organization_we_vote_id):
+                from_linked_organization_results = organization_manager.retrieve_organization_from_we_vote_id(
+                    from_voter_linked_organization_we_vote_id)
+                if from_linked_organization_results['organization_found']:
+                    from_linked_organization = from_linked_organization_results['organization']
+                    from_voter_linked_organization_id = from_linked_organization.id
+                else:
+                    # Remove the link to the organization so we don't have a future conflict
+                    try:
+                        from_voter_linked_organization_we_vote_id = None
+                        voter.linked_organization_we_vote_id = None
+                        voter.save()
+                        # All positions should have already been moved with move_positions_to_another_voter
+                    except Exception as e:
+                        status += "FAILED_TO_REMOVE_LINKED_ORGANIZATION_WE_VOTE_ID-FROM_VOTER " + str(e) + " "
+
+            to_voter_linked_organization_we_vote_id = new_owner_voter.linked_organization_we_vote_id
+            to_voter_linked_organization_id = 0
+            if positive_value_exists(to_voter_linked_organization_we_vote_id):
+                to_linked_organization_results = organization_manager.retrieve_organization_from_we_vote_id(
+                    to_voter_linked_organization_we_vote_id)
+                if to_linked_organization_results['organization_found']:
+                    to_linked_organization = to_linked_organization_results['organization']
+                    to_voter_linked_organization_id = to_linked_organization.id
+                else:
+                    # Remove the link to the organization so we don't have a future conflict
+                    try:
+                        to_voter_linked_organization_we_vote_id = None
+                        new_owner_voter.linked_organization_we_vote_id = None
+                        new_owner_voter.save()
+                        # All positions should have already been moved with move_positions_to_another_voter
+                    except Exception as e:
+                        status += "FAILED_TO_REMOVE_LINKED_ORGANIZATION_WE_VOTE_ID-TO_VOTER " + str(e) + " "
+
+            # If the to_voter does not have a linked_organization_we_vote_id, then we should move the from_voter's
+            #  organization_we_vote_id
+            if not positive_value_exists(to_voter_linked_organization_we_vote_id):
+                # Use the from_voter's linked_organization_we_vote_id
+                to_voter_linked_organization_we_vote_id = from_voter_linked_organization_we_vote_id
+                to_voter_linked_organization_id = from_voter_linked_organization_id
+
+            # Data healing scripts before we try to move the positions
+            if positive_value_exists(from_voter_id):
+                repair_results = position_list_manager.repair_all_positions_for_voter(from_voter_id)
+                status += repair_results['status']
+            if positive_value_exists(to_voter_id):
+                repair_results = position_list_manager.repair_all_positions_for_voter(to_voter_id)
+                status += repair_results['status']
 
-    # Transfer the issues that the voter is following
-    move_follow_issue_results = move_follow_issue_entries_to_another_voter(from_voter_we_vote_id, to_voter_we_vote_id)
-    status += " " + move_follow_issue_results['status']
+            # Transfer positions from voter to new_owner_voter
+            move_positions_results = move_positions_to_another_voter(
+                from_voter_id, from_voter_we_vote_id,
+                to_voter_id, to_voter_we_vote_id,
+                to_voter_linked_organization_id, to_voter_linked_organization_we_vote_id)
+            status += " " + move_positions_results['status']
+
+            if positive_value_exists(from_voter_linked_organization_we_vote_id) and \
+                    positive_value_exists(to_voter_linked_organization_we_vote_id) and \
+                    from_voter_linked_organization_we_vote_id != to_voter_linked_organization_we_vote_id:
+                move_organization_to_another_complete_results = move_organization_to_another_complete(
+                    from_voter_linked_organization_id, from_voter_linked_organization_we_vote_id,
+                    to_voter_linked_organization_id, to_voter_linked_organization_we_vote_id,
+                    to_voter_id, to_voter_we_vote_id
+                )
+                status += " " + move_organization_to_another_complete_results['status']
+
+            if positive_value_exists(voter.linked_organization_we_vote_id):
+                # Remove the link to the organization so we don't have a future conflict
+                try:
+                    voter.linked_organization_we_vote_id = None
+                    voter.save()
+                    # All positions should have already been moved with move_positions_to_another_voter
+                except Exception as e:
+                    status += "CANNOT_DELETE_LINKED_ORGANIZATION_WE_VOTE_ID: " + str(e) + " "
 
-    # Make sure we bring over all emails from the from_voter over to the to_voter
-    move_email_addresses_results = move_email_address_entries_to_another_voter(from_voter_we_vote_id,
-                                                                               to_voter_we_vote_id)
-    status += " " + move_email_addresses_results['status']
+            if positive_value_exists(voter.primary_email_we_vote_id):
+                # Remove the email information so we don't have a future conflict
+                try:
+                    voter.email = None
+                    voter.primary_email_we_vote_id = None
+                    voter.email_ownership_is_verified = False
+                    voter.save()
+                except Exception as e:
+                    status += "CANNOT_CLEAR_OUT_VOTER_EMAIL_INFO: " + str(e) + " "
+
+            # Bring over Facebook information
+            move_facebook_results = move_facebook_info_to_another_voter(voter, new_owner_voter)
+            status += " " + move_facebook_results['status']
+
+            # Bring over Twitter information
+            move_twitter_results = move_twitter_info_to_another_voter(voter, new_owner_voter)
+            status += " " + move_twitter_results['status']
+
+            # Bring over Voter Guides
+            move_voter_guide_results = move_voter_guides_to_another_voter(
+                from_voter_we_vote_id, to_voter_we_vote_id,
+                from_voter_linked_organization_we_vote_id, to_voter_linked_organization_we_vote_id)
+            status += " " + move_voter_guide_results['status']
+
+            # Bring over the voter-table data
+            merge_voter_accounts_results = merge_voter_accounts(voter, new_owner_voter)
+            status += " " + merge_voter_accounts_results['status']
+
+            # Delete all existing PositionNetworkScore entries for both the old account and the new account, so they
+            # have to be regenerated
+            delete_score_results = \
+                position_list_manager.delete_all_position_network_scores_for_voter(voter.id, voter.we_vote_id)
+            status += " " + delete_score_results['status']
+            delete_score_results = \
+                position_list_manager.delete_all_position_network_scores_for_voter(
+                    new_owner_voter.id, new_owner_voter.we_vote_id)
+            status += " " + delete_score_results['status']
+
+            # TODO Keep a record of voter_we_vote_id's associated with this voter, so we can find the
+            #  latest we_vote_id
+
+            # TODO If no errors, delete the voter account
+
+            # And finally, relink the current voter_device_id to email_owner_voter
+            update_link_results = voter_device_link_manager.update_voter_device_link(voter_device_link, new_owner_voter)
+            if update_link_results['voter_device_link_updated']:
+                success = True
+                status += "MERGE_TWO_ACCOUNTS_VOTER_DEVICE_LINK_UPDATED "
+            else:
+                status += "VOTER_DEVICE_LINK_NOT_UPDATED "
 
-    if positive_value_exists(voter.primary_email_we_vote_id):
-        # Remove the email information so we don't have a future conflict
-        try:
-            voter.email = None
-            voter.primary_email_we_vote_id = None
-            voter.email_ownership_is_verified = False
-            voter.save()
-        except Exception as e:
-            status += "CANNOT_CLEAR_OUT_VOTER_EMAIL_INFO: " + str(e) + " "
-
-    # Bring over Facebook information
-    move_facebook_results = move_facebook_info_to_another_voter(voter, new_owner_voter)
-    status += " " + move_facebook_results['status']
-
-    # Bring over Twitter information
-    move_twitter_results = move_twitter_info_to_another_voter(voter, new_owner_voter)
-    status += " " + move_twitter_results['status']
-
-    # Bring over any donations that have been made in this session by the new_owner_voter to the voter, subscriptions
-    # are complicated.  See the comments in the donate/controllers.py
-    move_donation_results = move_donation_info_to_another_voter(voter, new_owner_voter)
-    status += " " + move_donation_results['status']
-
-    # Bring over Voter Guides
-    move_voter_guide_results = move_voter_guides_to_another_voter(
-        from_voter_we_vote_id, to_voter_we_vote_id,
-        from_voter_linked_organization_we_vote_id, to_voter_linked_organization_we_vote_id)
-    status += " " + move_voter_guide_results['status']
-
-    # Bring over Analytics information
-    move_analytics_results = move_analytics_info_to_another_voter(from_voter_we_vote_id, to_voter_we_vote_id)
-    status += " " + move_analytics_results['status']
-
-    # Bring over the voter-table data
-    merge_voter_accounts_results = merge_voter_accounts(voter, new_owner_voter)
-    status += " " + merge_voter_accounts_results['status']
-
-    # Delete all existing PositionNetworkScore entries for both the old account and the new account, so they
-    # have to be regenerated
-    delete_score_results = \
-        position_list_manager.delete_all_position_network_scores_for_voter(voter.id, voter.we_vote_id)
-    status += " " + delete_score_results['status']
-    delete_score_results = \
-        position_list_manager.delete_all_position_network_scores_for_voter(
-            new_owner_voter.id, new_owner_voter.we_vote_id)
-    status += " " + delete_score_results['status']
-
-    # TODO Keep a record of voter_we_vote_id's associated with this voter, so we can find the
-    #  latest we_vote_id
-
-    # TODO If no errors, delete the voter account
-
-    # And finally, relink the current voter_device_id to email_owner_voter
-    update_link_results = voter_device_link_manager.update_voter_device_link(voter_device_link, new_owner_voter)
-    if update_link_results['voter_device_link_updated']:
-        success = True
-        status += "MERGE_TWO_ACCOUNTS_VOTER_DEVICE_LINK_UPDATED "
-    else:
-        status += "VOTER_DEVICE_LINK_NOT_UPDATED "
+            if transaction.get_rollback():
+                raise VoterMergeRolledBack("DATABASE_ERROR_DURING_MERGE")
+    except Exception as e:
+        success = False
+        status += "MERGE_TWO_ACCOUNTS_ROLLED_BACK " + str(e) + " "
+        error_results = {
+            'status':                       status,
+            'success':                      success,
+            'voter_device_id':              voter_device_id,
+            'current_voter_found':          current_voter_found,
+            'email_owner_voter_found':      email_owner_voter_found,
+            'facebook_owner_voter_found':   facebook_owner_voter_found,
+            'invitation_owner_voter_found': invitation_owner_voter_found,
+        }
+        return error_results
 
     # Data healing scripts
     repair_results = position_list_manager.repair_all_positions_for_voter(new_owner_voter.id)
@@ -1719,13 +1721,14 @@ def voter_photo_save_for_api(voter_device_id, facebook_profile_image_url_https,
 
 
 def voter_retrieve_for_api(voter_device_id, state_code_from_ip_address='',
-                           user_agent_string='', user_agent_object=None):  # voterRetrieve
+                           user_agent_string='', user_agent_object=None, voter_context=None):  # voterRetrieve
     """
     Used by the api
     :param voter_device_id:
     :param state_code_from_ip_address:
     :param user_agent_string:
     :param user_agent_object:
+    :param voter_context: The request's VoterContext, so the VoterDeviceLink and Voter it already retrieved are reused
     :return:
     """
     voter_manager = VoterManager()
@@ -1733,17 +1736,14 @@ def voter_retrieve_for_api(voter_device_id, state_code_from_ip_address='',
     voter_device_link_manager = VoterDeviceLinkManager()
     voter_id = 0
     voter_created = False
-    twitter_link_to_voter = TwitterLinkToVoter()
-    repair_twitter_link_to_voter_caching_now = False
-    repair_facebook_link_to_voter_caching_now = False
-    facebook_user = None;
 
     status = "VOTER_RETRIEVE_START "
 
     if positive_value_exists(voter_device_id):
         status += "VOTER_DEVICE_ID_RECEIVED "
+        voter_context = voter_context_for_voter_device_id(voter_device_id, voter_context)
         # If a voter_device_id is passed in that isn't valid, we want to throw an error
-        device_id_results = is_voter_device_id_valid(voter_device_id)
+        device_id_results = voter_context.voter_device_id_valid_results
         if not device_id_results['success']:
             json_data = {
                     'status':           device_id_results['status'],
@@ -1755,11 +1755,7 @@ def voter_retrieve_for_api(voter_device_id, state_code_from_ip_address='',
             }
             return json_data
 
-        voter_device_link_results = \
-            voter_device_link_manager.retrieve_voter_device_link_from_voter_device_id(voter_device_id)
-        if voter_device_link_results['voter_device_link_found']:
-            voter_device_link = voter_device_link_results['voter_device_link']
-            voter_id = voter_device_link.voter_id
+        voter_id = voter_context.voter_id
         if not positive_value_exists(voter_id):
             json_data = {
                 'status':           "VOTER_NOT_FOUND_FROM_DEVICE_ID-VOTER_RETRIEVE ",
@@ -1819,259 +1815,259 @@ def voter_retrieve_for_api(voter_device_id, state_code_from_ip_address='',
             return json_data
 
     # At this point, we should have a valid voter_id
-    results = voter_manager.retrieve_voter_by_id(voter_id)
-    if results['voter_found']:
-        voter = results['voter']
+    voter_profile = None
+    voter_we_vote_id = ""
+    if not voter_created and voter_context is not None and voter_context.voter_id == voter_id:
+        # Known from the VoterContext without reading the Voter
+        voter_we_vote_id = voter_context.voter_we_vote_id
+        voter_profile = fetch_cached_voter_profile(voter_we_vote_id)
+    if voter_profile is not None:
+        status += 'VOTER_FOUND VOTER_PROFILE_FROM_CACHE '
+    else:
+        if voter_context is not None and voter_context.voter_id == voter_id:
+            results = voter_context.retrieve_voter_results()
+        else:
+            results = voter_manager.retrieve_voter_by_id(voter_id)
+        if not results['voter_found']:
+            status = results['status']
+            json_data = {
+                'status':                           status,
+                'success':                          False,
+                'voter_device_id':                  voter_device_id,
+                'voter_created':                    False,
+                'voter_found':                      False,
+                'we_vote_id':                       '',
+                'facebook_id':                      '',
+                'email':                            '',
+                'facebook_email':                   '',
+                'facebook_profile_image_url_https': '',
+                'full_name':                        '',
+                'first_name':                       '',
+                'last_name':                        '',
+                'twitter_screen_name':              '',
+                'is_signed_in':                     False,
+                'is_admin':                         False,
+                'is_partner_organization':          False,
+                'is_political_data_manager':        False,
+                'is_political_data_viewer':         False,
+                'is_verified_volunteer':            False,
+                'signed_in_facebook':               False,
+                'signed_in_google':                 False,
+                'signed_in_twitter':                False,
+                'signed_in_with_email':             False,
+                'has_valid_email':                  False,
+                'has_data_to_preserve':             False,
+                'has_email_with_verified_ownership':    False,
+                'linked_organization_we_vote_id':   '',
+                'voter_photo_url_large':            '',
+                'voter_photo_url_medium':           '',
+                'voter_photo_url_tiny':             '',
+                'interface_status_flags':           0,
+                'notification_settings_flags':      0,
+                'state_code_from_ip_address':       state_code_from_ip_address,
+            }
+            return json_data
 
+        voter = results['voter']
         if voter_created:
             status += 'VOTER_CREATED '
         else:
             status += 'VOTER_FOUND '
+        profile_results = assemble_voter_profile_for_api(voter)
+        status += profile_results['status']
+        voter_profile = profile_results['voter_profile']
+        voter_we_vote_id = voter.we_vote_id
+        if not voter_created:
+            store_cached_voter_profile(voter_we_vote_id, voter_profile)
 
-        # Save state_code found via IP address
-        if positive_value_exists(state_code_from_ip_address):
+    # Save state_code found via IP address, if it changed
+    if positive_value_exists(state_code_from_ip_address):
+        if voter_created:
             voter_device_link_manager.update_voter_device_link_with_state_code(
                 voter_device_link, state_code_from_ip_address)
+        elif voter_context.voter_identity is not None \
+                and voter_context.voter_identity.state_code != state_code_from_ip_address:
+            voter_device_link_results = voter_context.retrieve_voter_device_link_results()
+            if voter_device_link_results['voter_device_link_found']:
+                voter_device_link_manager.update_voter_device_link_with_state_code(
+                    voter_device_link_results['voter_device_link'], state_code_from_ip_address)
+
+    is_bot = user_agent_object.is_bot or robot_detection.is_robot(user_agent_string)
+    action_constant_list = []
+    if voter_profile['signed_in_facebook']:
+        action_constant_list.append(ACTION_FACEBOOK_AUTHENTICATION_EXISTS)
+    if voter_profile['signed_in_google']:
+        action_constant_list.append(ACTION_GOOGLE_AUTHENTICATION_EXISTS)
+    if voter_profile['signed_in_twitter']:
+        action_constant_list.append(ACTION_TWITTER_AUTHENTICATION_EXISTS)
+    if voter_profile['signed_in_with_email']:
+        action_constant_list.append(ACTION_EMAIL_AUTHENTICATION_EXISTS)
+    if len(action_constant_list):
+        is_signed_in = True
+        analytics_manager = AnalyticsManager()
+        analytics_manager.create_action_type2_list(
+            action_constant_list, voter_we_vote_id, voter_id, is_signed_in, user_agent_string=user_agent_string,
+            is_bot=is_bot, is_mobile=user_agent_object.is_mobile, is_desktop=user_agent_object.is_pc,
+            is_tablet=user_agent_object.is_tablet)
 
-        twitter_link_to_voter_twitter_id = 0
-        # 2018-07-17 DALE Trying with this off
-        # if voter.is_signed_in():
-        twitter_user_manager = TwitterUserManager()
-        twitter_link_results = twitter_user_manager.retrieve_twitter_link_to_voter(0, voter.we_vote_id)
-        if twitter_link_results['twitter_link_to_voter_found']:
-            twitter_link_to_voter = twitter_link_results['twitter_link_to_voter']
-            twitter_link_to_voter_twitter_id = twitter_link_to_voter.twitter_id
-
-        twitter_link_to_organization_we_vote_id = ""
-        twitter_link_to_organization_twitter_id = 0
-        if positive_value_exists(twitter_link_to_voter_twitter_id):
-            twitter_org_link_results = \
-                twitter_user_manager.retrieve_twitter_link_to_organization_from_twitter_user_id(
-                    twitter_link_to_voter_twitter_id)
-            if twitter_org_link_results['twitter_link_to_organization_found']:
-                twitter_link_to_organization = twitter_org_link_results['twitter_link_to_organization']
-                twitter_link_to_organization_twitter_id = twitter_link_to_organization.twitter_id
-                twitter_link_to_organization_we_vote_id = twitter_link_to_organization.organization_we_vote_id
-        else:
-            if positive_value_exists(voter.twitter_screen_name) or positive_value_exists(voter.twitter_id):
-                # If the voter has cached twitter information, delete it now because there isn't a
-                #  twitter_link_to_voter entry
-                try:
-                    voter.twitter_id = 0
-                    voter.twitter_screen_name = ""
-                    voter.save()
-                    status += "VOTER_TWITTER_CLEARED1 "
-                    repair_twitter_link_to_voter_caching_now = True
-                except Exception as e:
-                    status += "UNABLE_TO_CLEAR_TWITTER_SCREEN_NAME1 "
-
-        if positive_value_exists(twitter_link_to_voter_twitter_id) and \
-                positive_value_exists(twitter_link_to_organization_twitter_id) and \
-                twitter_link_to_voter_twitter_id == twitter_link_to_organization_twitter_id:
-            # If we have a twitter link to both the voter and the organization, then we want to make sure the
-            #  voter is linked to the correct organization
-            status += "VERIFYING_TWITTER_LINK_TO_ORGANIZATION "
-            if voter.linked_organization_we_vote_id != twitter_link_to_organization_we_vote_id:
-                # If here there is a mismatch to fix
-                try:
-                    voter.linked_organization_we_vote_id = twitter_link_to_organization_we_vote_id
-                    voter.save()
-                    repair_twitter_link_to_voter_caching_now = True
-                    status += "VOTER_LINKED_ORGANIZATION_FIXED "
-                except Exception as e:
-                    status += "VOTER_LINKED_ORGANIZATION_COULD_NOT_BE_FIXED " + str(e) + " "
+    json_data = {
+        'status':                           status,
+        'success':                          True,
+        'voter_device_id':                  voter_device_id,
+        'voter_created':                    voter_created,
+        'voter_found':                      True,
+    }
+    json_data.update(voter_profile)
+    json_data['state_code_from_ip_address'] = state_code_from_ip_address
+    return json_data
 
-        if positive_value_exists(voter.linked_organization_we_vote_id):
-            existing_organization_for_this_voter_found = True
-        else:
-            status += "VOTER.LINKED_ORGANIZATION_WE_VOTE_ID-MISSING "
-            existing_organization_for_this_voter_found = False
-            create_twitter_link_to_organization = False
-            organization_twitter_handle = ""
-            organization_twitter_id = ""
-            twitter_link_to_voter_twitter_id = 0
-
-            # Is this voter associated with a Twitter account?
-            # If so, check to see if an organization entry exists for this voter.
-            if twitter_link_results['twitter_link_to_voter_found']:
-                twitter_link_to_voter = twitter_link_results['twitter_link_to_voter']
-                if not positive_value_exists(twitter_link_to_voter.twitter_id):
-                    if positive_value_exists(voter.twitter_screen_name) or positive_value_exists(voter.twitter_id):
-                        try:
-                            voter.twitter_id = 0
-                            voter.twitter_screen_name = ""
-                            voter.save()
-                            status += "VOTER_TWITTER_CLEARED2 "
-                        except Exception as e:
-                            status += "UNABLE_TO_CLEAR_TWITTER_SCREEN_NAME2 "
-                else:
-                    # If here there is a twitter_link_to_voter to possibly update
-                    try:
-                        value_to_save = False
-                        twitter_link_to_voter_twitter_id = twitter_link_to_voter.twitter_id
-                        if voter.twitter_id == twitter_link_to_voter_twitter_id:
-                            status += "VOTER_TWITTER_ID_MATCHES "
-                        else:
-                            status += "VOTER_TWITTER_ID_DOES_NOT_MATCH_LINKED_TO_VOTER "
-                            voter.twitter_id = twitter_link_to_voter_twitter_id
-                            value_to_save = True
 
-                        voter_twitter_screen_name = twitter_link_to_voter.fetch_twitter_handle_locally_or_remotely()
-                        if voter.twitter_screen_name == voter_twitter_screen_name:
-                            status += "VOTER_TWITTER_SCREEN_NAME_MATCHES "
-                        else:
-                            status += "VOTER_TWITTER_SCREEN_NAME_DOES_NOT_MATCH_LINKED_TO_VOTER "
-                            voter.twitter_screen_name = voter_twitter_screen_name
-                            value_to_save = True
+def assemble_voter_profile_for_api(voter):
+    """
+    What voterRetrieve returns about this voter. On the way, the Twitter, Facebook and organization information cached
+    on the voter is repaired if it is out of date. Reads a fixed number of queries: the voter's Twitter link, Facebook
+    user and donation history one query each, and the linked organization for voters signed in with Facebook.
+    :param voter:
+    :return:
+    """
+    status = ""
+    voter_manager = VoterManager()
+    twitter_link_to_voter = TwitterLinkToVoter()
+    repair_twitter_link_to_voter_caching_now = False
+    repair_facebook_link_to_voter_caching_now = False
+    facebook_user = None
 
-                        if value_to_save:
-                            voter.save()
-                            repair_twitter_link_to_voter_caching_now = True
-                    except Exception as e:
-                        status += "UNABLE_TO_SAVE_VOTER_TWITTER_CACHED_INFO "
+    twitter_link_to_voter_twitter_id = 0
+    # 2018-07-17 DALE Trying with this off
+    # if voter.is_signed_in():
+    twitter_user_manager = TwitterUserManager()
+    # The organization linked to the same Twitter account comes back with the TwitterLinkToVoter
+    twitter_link_results = retrieve_twitter_link_to_voter_with_organization(voter.we_vote_id)
+    status += twitter_link_results['status']
+    if twitter_link_results['twitter_link_to_voter_found']:
+        twitter_link_to_voter = twitter_link_results['twitter_link_to_voter']
+        twitter_link_to_voter_twitter_id = twitter_link_to_voter.twitter_id
+
+    twitter_link_to_organization_we_vote_id = ""
+    twitter_link_to_organization_twitter_id = 0
+    if positive_value_exists(twitter_link_to_voter_twitter_id):
+        if twitter_link_results['twitter_link_to_organization_found']:
+            twitter_link_to_organization_twitter_id = twitter_link_to_voter_twitter_id
+            twitter_link_to_organization_we_vote_id = twitter_link_results['twitter_link_to_organization_we_vote_id']
+    else:
+        if positive_value_exists(voter.twitter_screen_name) or positive_value_exists(voter.twitter_id):
+            # If the voter has cached twitter information, delete it now because there isn't a
+            #  twitter_link_to_voter entry
+            try:
+                voter.twitter_id = 0
+                voter.twitter_screen_name = ""
+                voter.save()
+                status += "VOTER_TWITTER_CLEARED1 "
+                repair_twitter_link_to_voter_caching_now = True
+            except Exception as e:
+                status += "UNABLE_TO_CLEAR_TWITTER_SCREEN_NAME1 "
+
+    if positive_value_exists(twitter_link_to_voter_twitter_id) and \
+            positive_value_exists(twitter_link_to_organization_twitter_id) and \
+            twitter_link_to_voter_twitter_id == twitter_link_to_organization_twitter_id:
+        # If we have a twitter link to both the voter and the organization, then we want to make sure the
+        #  voter is linked to the correct organization
+        status += "VERIFYING_TWITTER_LINK_TO_ORGANIZATION "
+        if voter.linked_organization_we_vote_id != twitter_link_to_organization_we_vote_id:
+            # If here there is a mismatch to fix
+            try:
+                voter.linked_organization_we_vote_id = twitter_link_to_organization_we_vote_id
+                voter.save()
+                repair_twitter_link_to_voter_caching_now = True
+                status += "VOTER_LINKED_ORGANIZATION_FIXED "
+            except Exception as e:
+                status += "VOTER_LINKED_ORGANIZATION_COULD_NOT_BE_FIXED " + str(e) + " "
 
-                    twitter_link_to_voter_twitter_id = twitter_link_to_voter.twitter_id
-                    # Since we know this voter has authenticated for a Twitter account,
-                    #  check to see if there is an organization associated with this Twitter account
-                    # If an existing TwitterLinkToOrganization is found, link this org to this voter
-                    twitter_org_link_results = \
-                        twitter_user_manager.retrieve_twitter_link_to_organization_from_twitter_user_id(
-                            twitter_link_to_voter.twitter_id)
-                    if twitter_org_link_results['twitter_link_to_organization_found']:
-                        twitter_link_to_organization = twitter_org_link_results['twitter_link_to_organization']
-                        organization_twitter_id = twitter_link_to_organization.twitter_id
-                        if positive_value_exists(twitter_link_to_organization.organization_we_vote_id):
-                            if twitter_link_to_organization.organization_we_vote_id \
-                                    != voter.linked_organization_we_vote_id:
-                                try:
-                                    voter.linked_organization_we_vote_id = \
-                                        twitter_link_to_organization.organization_we_vote_id
-                                    voter.save()
-                                    existing_organization_for_this_voter_found = True
+    if positive_value_exists(voter.linked_organization_we_vote_id):
+        existing_organization_for_this_voter_found = True
+    else:
+        status += "VOTER.LINKED_ORGANIZATION_WE_VOTE_ID-MISSING "
+        existing_organization_for_this_voter_found = False
+        create_twitter_link_to_organization = False
+        organization_twitter_handle = ""
+        organization_twitter_id = ""
+        twitter_link_to_voter_twitter_id = 0
 
-                                except Exception as e:
-                                    status += "UNABLE_TO_SAVE_LINKED_ORGANIZATION_FROM_TWITTER_LINK_TO_VOTER " + \
-                                              str(e) + " "
-                    else:
-                        # If an existing TwitterLinkToOrganization was not found,
-                        # create the organization below, and then create TwitterLinkToOrganization
-                        organization_twitter_handle = twitter_link_to_voter.fetch_twitter_handle_locally_or_remotely()
-                        organization_twitter_id = twitter_link_to_voter.twitter_id
-                        create_twitter_link_to_organization = True
-
-            if not existing_organization_for_this_voter_found:
-                status += "EXISTING_ORGANIZATION_NOT_FOUND "
-                # If we are here, we need to create an organization for this voter
-                organization_name = voter.get_full_name()
-                organization_website = ""
-                organization_email = ""
-                organization_facebook = ""
-                organization_image = voter.we_vote_hosted_profile_image_url_large \
-                    if positive_value_exists(voter.we_vote_hosted_profile_image_url_large) \
-                    else voter.voter_photo_url()
-                organization_type = INDIVIDUAL
-                organization_manager = OrganizationManager()
-                create_results = organization_manager.create_organization(
-                    organization_name, organization_website, organization_twitter_handle,
-                    organization_email, organization_facebook, organization_image, organization_twitter_id,
-                    organization_type)
-                if create_results['organization_created']:
-                    # Add value to twitter_owner_voter.linked_organization_we_vote_id when done.
-                    organization = create_results['organization']
-                    status += "ORGANIZATION_CREATED "
+        # Is this voter associated with a Twitter account?
+        # If so, check to see if an organization entry exists for this voter.
+        if twitter_link_results['twitter_link_to_voter_found']:
+            twitter_link_to_voter = twitter_link_results['twitter_link_to_voter']
+            if not positive_value_exists(twitter_link_to_voter.twitter_id):
+                if positive_value_exists(voter.twitter_screen_name) or positive_value_exists(voter.twitter_id):
                     try:
-                        voter.linked_organization_we_vote_id = organization.we_vote_id
+                        voter.twitter_id = 0
+                        voter.twitter_screen_name = ""
                         voter.save()
-                        existing_organization_for_this_voter_found = True
-                        if create_twitter_link_to_organization:
-                            create_results = twitter_user_manager.create_twitter_link_to_organization(
-                                twitter_link_to_voter_twitter_id, organization.we_vote_id)
-
-                            if create_results['twitter_link_to_organization_saved']:
-                                twitter_link_to_organization = create_results['twitter_link_to_organization']
-                                organization_list_manager = OrganizationListManager()
-                                repair_results = \
-                                    organization_list_manager.repair_twitter_related_organization_caching(
-                                        twitter_link_to_organization.twitter_id)
-                                status += repair_results['status']
-
+                        status += "VOTER_TWITTER_CLEARED2 "
                     except Exception as e:
-                        status += "UNABLE_TO_CREATE_NEW_ORGANIZATION_TO_VOTER_FROM_RETRIEVE_VOTER "
-                else:
-                    status += "ORGANIZATION_NOT_CREATED "
+                        status += "UNABLE_TO_CLEAR_TWITTER_SCREEN_NAME2 "
+            else:
+                # If here there is a twitter_link_to_voter to possibly update
+                try:
+                    value_to_save = False
+                    twitter_link_to_voter_twitter_id = twitter_link_to_voter.twitter_id
+                    if voter.twitter_id == twitter_link_to_voter_twitter_id:
+                        status += "VOTER_TWITTER_ID_MATCHES "
+                    else:
+                        status += "VOTER_TWITTER_ID_DOES_NOT_MATCH_LINKED_TO_VOTER "
+                        voter.twitter_id = twitter_link_to_voter_twitter_id
+                        value_to_save = True
 
-        # Check to see if there is a FacebookLinkToVoter for this voter, and if so, see if we need to make
-        #  organization update with latest Facebook data
-        facebook_manager = FacebookManager()
-        facebook_link_results = facebook_manager.retrieve_facebook_link_to_voter_from_voter_we_vote_id(
-            voter.we_vote_id)
-        if facebook_link_results['facebook_link_to_voter_found']:
-            status += "FACEBOOK_LINK_TO_VOTER_FOUND "
-            facebook_link_to_voter = facebook_link_results['facebook_link_to_voter']
-            facebook_link_to_voter_facebook_user_id = facebook_link_to_voter.facebook_user_id
-            if positive_value_exists(facebook_link_to_voter_facebook_user_id):
-                facebook_user_results = FacebookManager().retrieve_facebook_user_by_facebook_user_id(
-                    facebook_link_to_voter_facebook_user_id)
-                if facebook_user_results['facebook_user_found']:
-                    status += "FACEBOOK_USER_FOUND "
-                    facebook_user = facebook_user_results['facebook_user']
-
-                    organization_results = \
-                        OrganizationManager().retrieve_organization_from_we_vote_id(
-                            voter.linked_organization_we_vote_id)
-                    if organization_results['organization_found']:
-                        try:
-                            organization = organization_results['organization']
-                            status += "FACEBOOK-ORGANIZATION_FOUND "
-                            save_organization = False
-                            # Look at the linked_organization for the voter and update with latest
-                            if positive_value_exists(facebook_user.facebook_profile_image_url_https):
-                                facebook_profile_image_different = \
-                                    not positive_value_exists(organization.facebook_profile_image_url_https) \
-                                    or facebook_user.facebook_profile_image_url_https != \
-                                       organization.facebook_profile_image_url_https
-                                if facebook_profile_image_different:
-                                    organization.facebook_profile_image_url_https = \
-                                        facebook_user.facebook_profile_image_url_https
-                                    save_organization = True
-                            if positive_value_exists(facebook_user.facebook_background_image_url_https) and \
-                                    not positive_value_exists(organization.facebook_background_image_url_https):
-                                organization.facebook_background_image_url_https = \
-                                    facebook_user.facebook_background_image_url_https
-                                save_organization = True
-                            if positive_value_exists(facebook_user.facebook_user_id) and \
-                                    not positive_value_exists(organization.facebook_id):
-                                organization.facebook_id = facebook_user.facebook_user_id
-                                save_organization = True
-                            if positive_value_exists(facebook_user.facebook_email) and \
-                                    not positive_value_exists(organization.facebook_email):
-                                organization.facebook_email = facebook_user.facebook_email
-                                save_organization = True
-                            if save_organization:
-                                repair_facebook_link_to_voter_caching_now = True
-                                organization.save()
-                                status += "FACEBOOK-ORGANIZATION_SAVED "
-                        except Exception as e:
-                            status += "FAILED_UPDATE_OR_CREATE_ORGANIZATION: " + str(e)
-                            logger.error('FAILED organization_manager.update_or_create_organization. '
-                                         '{error} [type: {error_type}]'.format(error=e, error_type=type(e)))
+                    voter_twitter_screen_name = twitter_link_to_voter.fetch_twitter_handle_locally_or_remotely()
+                    if voter.twitter_screen_name == voter_twitter_screen_name:
+                        status += "VOTER_TWITTER_SCREEN_NAME_MATCHES "
                     else:
-                        status += "FACEBOOK_RELATED_ORGANIZATION_NOT_FOUND "
-                else:
-                    status += "FACEBOOK_USER_NOT_FOUND "
+                        status += "VOTER_TWITTER_SCREEN_NAME_DOES_NOT_MATCH_LINKED_TO_VOTER "
+                        voter.twitter_screen_name = voter_twitter_screen_name
+                        value_to_save = True
 
-        else:
-            status += "FACEBOOK_LINK_TO_VOTER_NOT_FOUND "
+                    if value_to_save:
+                        voter.save()
+                        repair_twitter_link_to_voter_caching_now = True
+                except Exception as e:
+                    status += "UNABLE_TO_SAVE_VOTER_TWITTER_CACHED_INFO "
+
+                twitter_link_to_voter_twitter_id = twitter_link_to_voter.twitter_id
+                # Since we know this voter has authenticated for a Twitter account,
+                #  check to see if there is an organization associated with this Twitter account
+                # If an existing TwitterLinkToOrganization is found, link this org to this voter
+                twitter_org_link_results = \
+                    twitter_user_manager.retrieve_twitter_link_to_organization_from_twitter_user_id(
+                        twitter_link_to_voter.twitter_id)
+                if twitter_org_link_results['twitter_link_to_organization_found']:
+                    twitter_link_to_organization = twitter_org_link_results['twitter_link_to_organization']
+                    organization_twitter_id = twitter_link_to_organization.twitter_id
+                    if positive_value_exists(twitter_link_to_organization.organization_we_vote_id):
+                        if twitter_link_to_organization.organization_we_vote_id \
+                                != voter.linked_organization_we_vote_id:
+                            try:
+                                voter.linked_organization_we_vote_id = \
+                                    twitter_link_to_organization.organization_we_vote_id
+                                voter.save()
+                                existing_organization_for_this_voter_found = True
 
-        if not positive_value_exists(voter.linked_organization_we_vote_id):
+                            except Exception as e:
+                                status += "UNABLE_TO_SAVE_LINKED_ORGANIZATION_FROM_TWITTER_LINK_TO_VOTER " + \
+                                          str(e) + " "
+                else:
+                    # If an existing TwitterLinkToOrganization was not found,
+                    # create the organization below, and then create TwitterLinkToOrganization
+                    organization_twitter_handle = twitter_link_to_voter.fetch_twitter_handle_locally_or_remotely()
+                    organization_twitter_id = twitter_link_to_voter.twitter_id
+                    create_twitter_link_to_organization = True
+
+        if not existing_organization_for_this_voter_found:
+            status += "EXISTING_ORGANIZATION_NOT_FOUND "
             # If we are here, we need to create an organization for this voter
-            status += "NEED_TO_CREATE_ORGANIZATION_FOR_THIS_VOTER "
             organization_name = voter.get_full_name()
             organization_website = ""
             organization_email = ""
             organization_facebook = ""
-            organization_twitter_handle = ""
-            organization_twitter_id = 0
             organization_image = voter.we_vote_hosted_profile_image_url_large \
                 if positive_value_exists(voter.we_vote_hosted_profile_image_url_large) \
                 else voter.voter_photo_url()
@@ -2084,131 +2080,214 @@ def voter_retrieve_for_api(voter_device_id, state_code_from_ip_address='',
             if create_results['organization_created']:
                 # Add value to twitter_owner_voter.linked_organization_we_vote_id when done.
                 organization = create_results['organization']
+                status += "ORGANIZATION_CREATED "
                 try:
                     voter.linked_organization_we_vote_id = organization.we_vote_id
                     voter.save()
-                    status += "ORGANIZATION_CREATED "
+                    existing_organization_for_this_voter_found = True
+                    if create_twitter_link_to_organization:
+                        create_results = twitter_user_manager.create_twitter_link_to_organization(
+                            twitter_link_to_voter_twitter_id, organization.we_vote_id)
+
+                        if create_results['twitter_link_to_organization_saved']:
+                            twitter_link_to_organization = create_results['twitter_link_to_organization']
+                            organization_list_manager = OrganizationListManager()
+                            repair_results = \
+                                organization_list_manager.repair_twitter_related_organization_caching(
+                                    twitter_link_to_organization.twitter_id)
+                            status += repair_results['status']
+
                 except Exception as e:
-                    status += "UNABLE_TO_CREATE_NEW_ORGANIZATION_TO_VOTER_FROM_RETRIEVE_VOTER2 "
+                    status += "UNABLE_TO_CREATE_NEW_ORGANIZATION_TO_VOTER_FROM_RETRIEVE_VOTER "
+            else:
+                status += "ORGANIZATION_NOT_CREATED "
+
+    # Check to see if there is a FacebookLinkToVoter for this voter, and if so, see if we need to make
+    #  organization update with latest Facebook data
+    facebook_user_results = retrieve_facebook_user_for_voter(voter.we_vote_id)
+    if facebook_user_results['facebook_user_found']:
+        status += "FACEBOOK_USER_FOUND "
+        facebook_user = facebook_user_results['facebook_user']
+
+        organization_results = \
+            OrganizationManager().retrieve_organization_from_we_vote_id(
+                voter.linked_organization_we_vote_id)
+        if organization_results['organization_found']:
+            try:
+                organization = organization_results['organization']
+                status += "FACEBOOK-ORGANIZATION_FOUND "
+                save_organization = False
+                # Look at the linked_organization for the voter and update with latest
+                if positive_value_exists(facebook_user.facebook_profile_image_url_https):
+                    facebook_profile_image_different = \
+                        not positive_value_exists(organization.facebook_profile_image_url_https) \
+                        or facebook_user.facebook_profile_image_url_https != \
+                           organization.facebook_profile_image_url_https
+                    if facebook_profile_image_different:
+                        organization.facebook_profile_image_url_https = \
+                            facebook_user.facebook_profile_image_url_https
+                        save_organization = True
+                if positive_value_exists(facebook_user.facebook_background_image_url_https) and \
+                        not positive_value_exists(organization.facebook_background_image_url_https):
+                    organization.facebook_background_image_url_https = \
+                        facebook_user.facebook_background_image_url_https
+                    save_organization = True
+                if positive_value_exists(facebook_user.facebook_user_id) and \
+                        not positive_value_exists(organization.facebook_id):
+                    organization.facebook_id = facebook_user.facebook_user_id
+                    save_organization = True
+                if positive_value_exists(facebook_user.facebook_email) and \
+                        not positive_value_exists(organization.facebook_email):
+                    organization.facebook_email = facebook_user.facebook_email
+                    save_organization = True
+                if save_organization:
+                    repair_facebook_link_to_voter_caching_now = True
+                    organization.save()
+                    status += "FACEBOOK-ORGANIZATION_SAVED "
+            except Exception as e:
+                status += "FAILED_UPDATE_OR_CREATE_ORGANIZATION: " + str(e)
+                logger.error('FAILED organization_manager.update_or_create_organization. '
+                             '{error} [type: {error_type}]'.format(error=e, error_type=type(e)))
+        else:
+            status += "FACEBOOK_RELATED_ORGANIZATION_NOT_FOUND "
+    else:
+        status += "FACEBOOK_USER_NOT_FOUND "
 
-        if repair_twitter_link_to_voter_caching_now:
-            # If here then we know that we have a twitter_link_to_voter, and there was some data cleanup done
-            repair_results = voter_manager.repair_twitter_related_voter_caching(
-                twitter_link_to_voter.twitter_id)
-            status += repair_results['status']
+    if not positive_value_exists(voter.linked_organization_we_vote_id):
+        # If we are here, we need to create an organization for this voter
+        status += "NEED_TO_CREATE_ORGANIZATION_FOR_THIS_VOTER "
+        organization_name = voter.get_full_name()
+        organization_website = ""
+        organization_email = ""
+        organization_facebook = ""
+        organization_twitter_handle = ""
+        organization_twitter_id = 0
+        organization_image = voter.we_vote_hosted_profile_image_url_large \
+            if positive_value_exists(voter.we_vote_hosted_profile_image_url_large) \
+            else voter.voter_photo_url()
+        organization_type = INDIVIDUAL
+        organization_manager = OrganizationManager()
+        create_results = organization_manager.create_organization(
+            organization_name, organization_website, organization_twitter_handle,
+            organization_email, organization_facebook, organization_image, organization_twitter_id,
+            organization_type)
+        if create_results['organization_created']:
+            # Add value to twitter_owner_voter.linked_organization_we_vote_id when done.
+            organization = create_results['organization']
+            try:
+                voter.linked_organization_we_vote_id = organization.we_vote_id
+                voter.save()
+                status += "ORGANIZATION_CREATED "
+            except Exception as e:
+                status += "UNABLE_TO_CREATE_NEW_ORGANIZATION_TO_VOTER_FROM_RETRIEVE_VOTER2 "
 
-        # TODO DALE: Add if repair_facebook_link_to_voter_caching_now
-        is_bot = user_agent_object.is_bot or robot_detection.is_robot(user_agent_string)
-        analytics_manager = AnalyticsManager()
-        if voter.signed_in_facebook():
-            is_signed_in = True
-            analytics_manager.save_action(ACTION_FACEBOOK_AUTHENTICATION_EXISTS, voter.we_vote_id, voter_id,
-                                          is_signed_in, user_agent_string=user_agent_string, is_bot=is_bot,
-                                          is_mobile=user_agent_object.is_mobile,
-                                          is_desktop=user_agent_object.is_pc,
-                                          is_tablet=user_agent_object.is_tablet)
-        if voter.signed_in_google():
-            is_signed_in = True
-            analytics_manager.save_action(ACTION_GOOGLE_AUTHENTICATION_EXISTS, voter.we_vote_id, voter_id,
-                                          is_signed_in, user_agent_string=user_agent_string, is_bot=is_bot,
-                                          is_mobile=user_agent_object.is_mobile,
-                                          is_desktop=user_agent_object.is_pc,
-                                          is_tablet=user_agent_object.is_tablet)
-        if voter.signed_in_twitter():
-            is_signed_in = True
-            analytics_manager.save_action(ACTION_TWITTER_AUTHENTICATION_EXISTS, voter.we_vote_id, voter_id,
-                                          is_signed_in, user_agent_string=user_agent_string, is_bot=is_bot,
-                                          is_mobile=user_agent_object.is_mobile,
-                                          is_desktop=user_agent_object.is_pc,
-                                          is_tablet=user_agent_object.is_tablet)
-        if voter.signed_in_with_email():
-            is_signed_in = True
-            analytics_manager.save_action(ACTION_EMAIL_AUTHENTICATION_EXISTS, voter.we_vote_id, voter_id,
-                                          is_signed_in, user_agent_string=user_agent_string, is_bot=is_bot,
-                                          is_mobile=user_agent_object.is_mobile,
-                                          is_desktop=user_agent_object.is_pc,
-                                          is_tablet=user_agent_object.is_tablet)
-
-        facebook_profile, voter_photo_large, voter_photo_medium = get_displayable_images(voter, facebook_user)
-        donation_list = donation_history_for_a_voter(voter.we_vote_id)
-        json_data = {
-            'status':                           status,
-            'success':                          True,
-            'voter_device_id':                  voter_device_id,
-            'voter_created':                    voter_created,
-            'voter_found':                      True,
-            'we_vote_id':                       voter.we_vote_id,
-            'facebook_id':                      voter.facebook_id,
-            'email':                            voter.email,
-            'facebook_email':                   voter.facebook_email,
-            'facebook_profile_image_url_https': facebook_profile,
-            'full_name':                        voter.get_full_name(),
-            'first_name':                       voter.first_name,
-            'last_name':                        voter.last_name,
-            'twitter_screen_name':              voter.twitter_screen_name,
-            'is_signed_in':                     voter.is_signed_in(),
-            'is_admin':                         voter.is_admin,
-            'is_partner_organization':          voter.is_partner_organization,
-            'is_political_data_manager':        voter.is_political_data_manager,
-            'is_political_data_viewer':         voter.is_political_data_viewer,
-            'is_verified_volunteer':            voter.is_verified_volunteer,
-            'signed_in_facebook':               voter.signed_in_facebook(),
-            'signed_in_google':                 voter.signed_in_google(),
-            'signed_in_twitter':                voter.signed_in_twitter(),
-            'signed_in_with_email':             voter.signed_in_with_email(),
-            'has_valid_email':                  voter.has_valid_email(),
-            'has_data_to_preserve':             voter.has_data_to_preserve(),
-            'has_email_with_verified_ownership':    voter.has_email_with_verified_ownership(),
-            'linked_organization_we_vote_id':   voter.linked_organization_we_vote_id,
-            'voter_photo_large':                voter_photo_large,
-            'voter_photo_url_medium':           voter_photo_medium,
-            'voter_photo_url_tiny':             voter.we_vote_hosted_profile_image_url_tiny,
-            'voter_donation_history_list':      donation_list,
-            'interface_status_flags':           voter.interface_status_flags,
-            'notification_settings_flags':      voter.notification_settings_flags,
-            'state_code_from_ip_address':       state_code_from_ip_address,
-        }
-        return json_data
+    if repair_twitter_link_to_voter_caching_now:
+        # If here then we know that we have a twitter_link_to_voter, and there was some data cleanup done
+        repair_results = voter_manager.repair_twitter_related_voter_caching(
+            twitter_link_to_voter.twitter_id)
+        status += repair_results['status']
 
-    else:
-        status = results['status']
-        json_data = {
-            'status':                           status,
-            'success':                          False,
-            'voter_device_id':                  voter_device_id,
-            'voter_created':                    False,
-            'voter_found':                      False,
-            'we_vote_id':                       '',
-            'facebook_id':                      '',
-            'email':                            '',
-            'facebook_email':                   '',
-            'facebook_profile_image_url_https': '',
-            'full_name':                        '',
-            'first_name':                       '',
-            'last_name':                        '',
-            'twitter_screen_name':              '',
-            'is_signed_in':                     False,
-            'is_admin':                         False,
-            'is_partner_organization':          False,
-            'is_political_data_manager':        False,
-            'is_political_data_viewer':         False,
-            'is_verified_volunteer':            False,
-            'signed_in_facebook':               False,
-            'signed_in_google':                 False,
-            'signed_in_twitter':                False,
-            'signed_in_with_email':             False,
-            'has_valid_email':                  False,
-            'has_data_to_preserve':             False,
-            'has_email_with_verified_ownership':    False,
-            'linked_organization_we_vote_id':   '',
-            'voter_photo_url_large':            '',
-            'voter_photo_url_medium':           '',
-            'voter_photo_url_tiny':             '',
-            'interface_status_flags':           0,
-            'notification_settings_flags':      0,
-            'state_code_from_ip_address':       state_code_from_ip_address,
-        }
-        return json_data
+    # TODO DALE: Add if repair_facebook_link_to_voter_caching_now
+    facebook_profile, voter_photo_large, voter_photo_medium = get_displayable_images(voter, facebook_user)
+    donation_list = donation_history_for_a_voter(voter.we_vote_id)
+    voter_profile = {
+        'we_vote_id':                       voter.we_vote_id,
+        'facebook_id':                      voter.facebook_id,
+        'email':                            voter.email,
+        'facebook_email':                   voter.facebook_email,
+        'facebook_profile_image_url_https': facebook_profile,
+        'full_name':                        voter.get_full_name(),
+        'first_name':                       voter.first_name,
+        'last_name':                        voter.last_name,
+        'twitter_screen_name':              voter.twitter_screen_name,
+        'is_signed_in':                     voter.is_signed_in(),
+        'is_admin':                         voter.is_admin,
+        'is_partner_organization':          voter.is_partner_organization,
+        'is_political_data_manager':        voter.is_political_data_manager,
+        'is_political_data_viewer':         voter.is_political_data_viewer,
+        'is_verified_volunteer':            voter.is_verified_volunteer,
+        'signed_in_facebook':               voter.signed_in_facebook(),
+        'signed_in_google':                 voter.signed_in_google(),
+        'signed_in_twitter':                voter.signed_in_twitter(),
+        'signed_in_with_email':             voter.signed_in_with_email(),
+        'has_valid_email':                  voter.has_valid_email(),
+        'has_data_to_preserve':             voter.has_data_to_preserve(),
+        'has_email_with_verified_ownership':    voter.has_email_with_verified_ownership(),
+        'linked_organization_we_vote_id':   voter.linked_organization_we_vote_id,
+        'voter_photo_large':                voter_photo_large,
+        'voter_photo_url_medium':           voter_photo_medium,
+        'voter_photo_url_tiny':             voter.we_vote_hosted_profile_image_url_tiny,
+        'voter_donation_history_list':      donation_list,
+        'interface_status_flags':           voter.interface_status_flags,
+        'notification_settings_flags':      voter.notification_settings_flags,
+    }
+    results = {
+        'success':          True,
+        'status':           status,
+        'voter_profile':    voter_profile,
+    }
+    return results
+
+
+def retrieve_twitter_link_to_voter_with_organization(voter_we_vote_id):
+    """
+    The voter's TwitterLinkToVoter, and the we_vote_id of the organization with a TwitterLinkToOrganization for the
+    same Twitter account, in one query
+    :param voter_we_vote_id:
+    :return:
+    """
+    twitter_link_to_voter = None
+    twitter_link_to_organization_we_vote_id = ""
+    try:
+        twitter_link_query = TwitterLinkToVoter.objects.filter(voter_we_vote_id=voter_we_vote_id)
+        twitter_link_query = twitter_link_query.annotate(linked_organization_we_vote_id=Subquery(
+            TwitterLinkToOrganization.objects.filter(twitter_id=OuterRef('twitter_id')).values(
+                'organization_we_vote_id')[:1]))
+        twitter_link_to_voter = twitter_link_query.first()
+        if twitter_link_to_voter is not None:
+            twitter_link_to_organization_we_vote_id = twitter_link_to_voter.linked_organization_we_vote_id or ""
+        success = True
+        status = ""
+    except Exception as e:
+        success = False
+        status = "RETRIEVE_TWITTER_LINK_TO_VOTER_WITH_ORGANIZATION_FAILED " + str(e) + " "
+
+    results = {
+        'success':                                  success,
+        'status':                                   status,
+        'twitter_link_to_voter_found':              twitter_link_to_voter is not None,
+        'twitter_link_to_voter':                    twitter_link_to_voter,
+        'twitter_link_to_organization_found':       positive_value_exists(twitter_link_to_organization_we_vote_id),
+        'twitter_link_to_organization_we_vote_id':  twitter_link_to_organization_we_vote_id,
+    }
+    return results
+
+
+def retrieve_facebook_user_for_voter(voter_we_vote_id):
+    """
+    The FacebookUser for the Facebook account in the voter's FacebookLinkToVoter, in one query
+    :param voter_we_vote_id:
+    :return:
+    """
+    facebook_user = None
+    try:
+        facebook_user_id_query = FacebookLinkToVoter.objects.filter(voter_we_vote_id=voter_we_vote_id).values(
+            'facebook_user_id')[:1]
+        facebook_user = FacebookUser.objects.filter(
+            facebook_user_id=Subquery(facebook_user_id_query)).order_by('id').first()
+        success = True
+        status = ""
+    except Exception as e:
+        success = False
+        status = "RETRIEVE_FACEBOOK_USER_FOR_VOTER_FAILED " + str(e) + " "
+
+    results = {
+        'success':              success,
+        'status':               status,
+        'facebook_user_found':  facebook_user is not None,
+        'facebook_user':        facebook_user,
+    }
+    return results
 
 
 def get_displayable_images(voter, facebook_user):
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+from voter.models import Voter
+from voter.voter_merge import merge_voter_entries
+
+
+class Command(BaseCommand):
+    help = 'Reports, table by table, what merging one voter account into another would move, update, delete or ' \
+           'leave behind, without changing anything.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('from_voter_we_vote_id', help='The voter whose entries would be moved')
+        parser.add_argument('to_voter_we_vote_id', help='The voter the entries would be moved to')
+
+    def handle(self, *args, **options):
+        voter_by_we_vote_id = {}
+        for voter_we_vote_id in (options['from_voter_we_vote_id'], options['to_voter_we_vote_id']):
+            try:
+                voter_by_we_vote_id[voter_we_vote_id] = Voter.objects.using('readonly').get(
+                    we_vote_id__iexact=voter_we_vote_id)
+            except Voter.DoesNotExist:
+                raise CommandError('Voter {} not found'.format(voter_we_vote_id))
+        results = merge_voter_entries(
+            voter_by_we_vote_id[options['from_voter_we_vote_id']], voter_by_we_vote_id[options['to_voter_we_vote_id']],
+            dry_run=True)
+
+        self.stdout.write(results['status'])
+        for spec_report in results['merge_report']:
+            self.stdout.write('{}: {} moved, {} updated, {} deleted, {} left'.format(
+                spec_report['name'], spec_report['entries_moved'], spec_report['to_entries_updated'],
+                spec_report['entries_deleted'], spec_report['entries_left']))
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from voter.voter_purge import purge_abandoned_voters
+
+
+class Command(BaseCommand):
+    help = 'Deletes voters who never signed in or saved anything and haven\'t been seen for --inactive_days, along ' \
+           'with their device links, addresses, ballots, analytics and network scores. Works through the voters a ' \
+           'chunk at a time, and continues from where the last run stopped.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--inactive_days', type=int, default=None,
+                            help='Defaults to VOTER_PURGE_INACTIVE_DAYS')
+        parser.add_argument('--chunk_size', type=int, default=None,
+                            help='Voters purged in one transaction. Defaults to VOTER_PURGE_CHUNK_SIZE')
+        parser.add_argument('--pause', type=float, default=None,
+                            help='Seconds to wait between chunks. Defaults to VOTER_PURGE_PAUSE_SECONDS')
+        parser.add_argument('--maximum_chunks', type=int, default=0,
+                            help='Stop after this many chunks; the next run continues from there')
+        parser.add_argument('--dry_run', action='store_true', help='Count what would be deleted without deleting')
+        parser.add_argument('--restart', action='store_true', help='Start from the first voter again')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        if chunk_size is not None:
+            chunk_size = max(chunk_size, 1)
+        results = purge_abandoned_voters(
+            inactive_days=options['inactive_days'], chunk_size=chunk_size, pause_seconds=options['pause'],
+            maximum_chunks=options['maximum_chunks'], dry_run=options['dry_run'], restart=options['restart'])
+
+        self.stdout.write(results['status'])
+        for table_name, rows in sorted(results['rows_by_table'].items()):
+            self.stdout.write('{}: {} rows {}'.format(
+                table_name, rows, 'would be deleted' if results['dry_run'] else 'deleted'))
+        if not results['dry_run']:
+            if results['all_voters_looked_at']:
+                self.stdout.write('Every voter has been looked at; the next run starts from the first voter.')
+            else:
+                self.stdout.write('The next run continues after voter id {}.'.format(results['last_voter_id']))
@@ -0,0 +1,19 @@
+# voter/middleware.py
+# Brought to you by We Vote. Be good.
+# -*- coding: UTF-8 -*-
+
+from voter.voter_context import VoterContext
+from wevote_functions.functions import get_voter_device_id
+
+
+class VoterContextMiddleware(object):
+    """
+    Attach a VoterContext for the request's voter_device_id as request.voter_context. Nothing is looked up until a
+    view or controller asks for it.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.voter_context = VoterContext(get_voter_device_id(request))
+        return self.get_response(request)
@@ -2,16 +2,22 @@
 # Brought to you by We Vote. Be good.
 # -*- coding: UTF-8 -*-
 
-from django.db import (models, IntegrityError)
-from django.db.models import Q
+from django.db import (models, IntegrityError, transaction)
+from django.db.models import OuterRef, Q, Subquery
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.contrib.auth.models import (BaseUserManager, AbstractBaseUser)  # PermissionsMixin
 from django.core.validators import RegexValidator
 from exception.models import handle_exception, handle_record_found_more_than_one_exception,\
     handle_record_not_saved_exception
+from donate.models import DonationJournal
 import sys
-from import_export_facebook.models import FacebookManager
-from twitter.models import TwitterUserManager
+from import_export_facebook.models import FacebookLinkToVoter, FacebookManager, FacebookUser
+from twitter.models import TwitterLinkToVoter, TwitterUserManager
 from validate_email import validate_email
+from voter.voter_identity_cache import fetch_cached_voter_identity, invalidate_cached_voter_identity, \
+    store_cached_voter_identity, voter_identity_cache_on, VoterIdentity
+from voter.voter_profile_cache import invalidate_cached_voter_profile, voter_profile_cache_on
 import wevote_functions.admin
 from wevote_functions.functions import extract_state_code_from_address_string, convert_to_int, \
     generate_voter_device_id, get_voter_api_device_id, positive_value_exists
@@ -902,10 +908,20 @@ class VoterManager(BaseUserManager):
     def create_voter_with_voter_device_id(self, voter_device_id):
         logger.info("create_voter_with_voter_device_id(voter_device_id)")
 
-    def clear_out_abandoned_voter_records(self):
-        # We will need a method that identifies and deletes abandoned voter records that don't have enough information
-        #  to ever be used
-        logger.info("clear_out_abandoned_voter_records")
+    def clear_out_abandoned_voter_records(self, inactive_days=None, maximum_chunks=0, dry_run=False, restart=False):
+        """
+        Delete voter records that don't have enough information to ever be used. See voter/voter_purge.py
+        (and python manage.py purge_abandoned_voters)
+        :param inactive_days:
+        :param maximum_chunks:
+        :param dry_run:
+        :param restart:
+        :return:
+        """
+        # Imported here since voter_purge imports the models of the apps that store voter data
+        from voter.voter_purge import purge_abandoned_voters
+        return purge_abandoned_voters(inactive_days=inactive_days, maximum_chunks=maximum_chunks,
+                                      dry_run=dry_run, restart=restart)
 
     def remove_voter_cached_email_entries_from_email_address_object(self, email_address_object):
         status = ""
@@ -2252,14 +2268,103 @@ class VoterDeviceLinkManager(models.Model):
         return results
 
 
+def fetch_voter_identity_from_voter_device_id(voter_device_id):
+    """
+    Return the VoterIdentity (voter_id, voter_we_vote_id, voter_device_link_id, state_code) for this
+    voter_device_id, or None if there isn't a VoterDeviceLink for it. The answer is cached (see
+    voter/voter_identity_cache.py), so it can be called as often as needed within a request.
+    :param voter_device_id:
+    :return:
+    """
+    if not positive_value_exists(voter_device_id):
+        return None
+    voter_identity = fetch_cached_voter_identity(voter_device_id)
+    if voter_identity is not None:
+        return voter_identity
+
+    # When identities are cached, read from the primary database, since a voter_device_id is often used right after it
+    # is linked to a voter, and whatever we read here is reused until it is invalidated. Otherwise read from the
+    # read-only database, like every lookup did before identities were cached.
+    cache_voter_identity = voter_identity_cache_on()
+    database_alias = 'default' if cache_voter_identity else 'readonly'
+    try:
+        voter_device_link_query = VoterDeviceLink.objects.using(database_alias).filter(voter_device_id=voter_device_id)
+        voter_device_link_query = voter_device_link_query.annotate(voter_we_vote_id=Subquery(
+            Voter.objects.using(database_alias).filter(id=OuterRef('voter_id')).values('we_vote_id')[:1]))
+        voter_device_link_values = voter_device_link_query.values_list(
+            'voter_id', 'voter_we_vote_id', 'id', 'state_code').first()
+    except Exception as e:
+        handle_exception(e, logger=logger)
+        return None
+    if voter_device_link_values is None:
+        # We don't remember voter_device_ids without a link, since the link is usually created next
+        return None
+    voter_identity = VoterIdentity(*voter_device_link_values)
+    if cache_voter_identity:
+        store_cached_voter_identity(voter_device_id, voter_identity)
+    return voter_identity
+
+
+def invalidate_voter_identities_for_voter(voter_id):
+    if not positive_value_exists(voter_id):
+        return
+    voter_device_id_list = list(
+        VoterDeviceLink.objects.filter(voter_id=voter_id).values_list('voter_device_id', flat=True))
+    invalidate_cached_voter_identity(voter_device_id_list)
+
+
+@receiver(post_save, sender=VoterDeviceLink)
+@receiver(post_delete, sender=VoterDeviceLink)
+def invalidate_voter_identity_for_voter_device_link_signal(sender, instance, **kwargs):
+    # Sign out, voter merges and state changes all come through here. Forget the identity now, and again when the
+    # transaction commits, so a request that reads the old link in the meantime can't cache it for long.
+    voter_device_id = instance.voter_device_id
+    invalidate_cached_voter_identity([voter_device_id])
+    transaction.on_commit(lambda: invalidate_cached_voter_identity([voter_device_id]))
+
+
+@receiver(post_delete, sender=Voter)
+def invalidate_voter_identities_for_voter_signal(sender, instance, **kwargs):
+    invalidate_voter_identities_for_voter(instance.id)
+
+
+def invalidate_cached_voter_profile_now_and_on_commit(voter_we_vote_id):
+    invalidate_cached_voter_profile([voter_we_vote_id])
+    transaction.on_commit(lambda: invalidate_cached_voter_profile([voter_we_vote_id]))
+
+
+@receiver(post_save, sender=Voter)
+@receiver(post_delete, sender=Voter)
+def invalidate_voter_profile_for_voter_signal(sender, instance, **kwargs):
+    invalidate_cached_voter_profile_now_and_on_commit(instance.we_vote_id)
+
+
+@receiver(post_save, sender=TwitterLinkToVoter)
+@receiver(post_delete, sender=TwitterLinkToVoter)
+@receiver(post_save, sender=FacebookLinkToVoter)
+@receiver(post_delete, sender=FacebookLinkToVoter)
+@receiver(post_save, sender=DonationJournal)
+def invalidate_voter_profile_for_voter_link_signal(sender, instance, **kwargs):
+    invalidate_cached_voter_profile_now_and_on_commit(instance.voter_we_vote_id)
+
+
+@receiver(post_save, sender=FacebookUser)
+def invalidate_voter_profile_for_facebook_user_signal(sender, instance, **kwargs):
+    # FacebookUser entries are also saved for voters' Facebook friends, so only look for a voter when profiles are
+    # being cached
+    if not voter_profile_cache_on() or not positive_value_exists(instance.facebook_user_id):
+        return
+    voter_we_vote_id = FacebookLinkToVoter.objects.filter(facebook_user_id=instance.facebook_user_id).values_list(
+        'voter_we_vote_id', flat=True).first()
+    if positive_value_exists(voter_we_vote_id):
+        invalidate_cached_voter_profile_now_and_on_commit(voter_we_vote_id)
+
+
 # This method *just* returns the voter_id or 0
 def fetch_voter_id_from_voter_device_link(voter_device_id):
-    voter_device_link_manager = VoterDeviceLinkManager()
-    results = voter_device_link_manager.retrieve_voter_device_link_from_voter_device_id(
-        voter_device_id, read_only=True)
-    if results['voter_device_link_found']:
-        voter_device_link = results['voter_device_link']
-        return voter_device_link.voter_id
+    voter_identity = fetch_voter_identity_from_voter_device_id(voter_device_id)
+    if voter_identity is not None:
+        return voter_identity.voter_id
     return 0
 
 
@@ -2299,18 +2404,9 @@ def fetch_voter_we_vote_id_from_voter_id(voter_id):
 
 
 def fetch_voter_we_vote_id_from_voter_device_link(voter_device_id):
-    voter_device_link_manager = VoterDeviceLinkManager()
-    results = voter_device_link_manager.retrieve_voter_device_link_from_voter_device_id(voter_device_id,
-                                                                                        read_only=True)
-    if results['voter_device_link_found']:
-        voter_device_link = results['voter_device_link']
-        voter_id = voter_device_link.voter_id
-        voter_manager = VoterManager()
-        results = voter_manager.retrieve_voter_by_id(voter_id, read_only=True)
-        if results['voter_found']:
-            voter = results['voter']
-            return voter.we_vote_id
-        return ""
+    voter_identity = fetch_voter_identity_from_voter_device_id(voter_device_id)
+    if voter_identity is not None:
+        return voter_identity.voter_we_vote_id or ""
 
 
 def retrieve_voter_authority(request):
@@ -0,0 +1,271 @@
+from analytics.models import AnalyticsAction
+from datetime import timedelta
+from django.core.cache import caches
+from django.core.management import call_command
+from django.test import override_settings, TestCase
+from django.utils import timezone
+from io import StringIO
+import shutil
+import tempfile
+from unittest import mock
+
+from bookmark.models import BookmarkItem
+from email_outbound.models import EmailAddress
+from follow.models import FollowIssue, FollowOrganization, FOLLOWING, STOP_FOLLOWING
+from friend.models import CurrentFriend, FriendInvitationVoterLink
+from pledge_to_vote.models import PledgeToVote
+from position_like.models import PositionLike
+from voter.controllers import voter_merge_two_accounts_for_api
+from voter.models import fetch_voter_identity_from_voter_device_id, Voter, VoterDeviceLink
+from voter.voter_context import VoterContext, voter_context_for_voter_device_id
+from voter.voter_identity_cache import clear_cached_voter_identities, fetch_cached_voter_identity, \
+    invalidate_cached_voter_identity, store_cached_voter_identity, VoterIdentity
+from voter.voter_merge import merge_voter_entries
+from voter.voter_purge import purge_abandoned_voters, VOTER_PURGE_CHECKPOINT_SETTING
+from wevote_functions.functions import generate_voter_device_id
+from wevote_settings.models import WeVoteSettingsManager
+
+
+class VoterMergeTestCase(TestCase):
+
+    def setUp(self):
+        self.from_voter = Voter.objects.create()
+        self.to_voter = Voter.objects.create()
+        from_we_vote_id = self.from_voter.we_vote_id
+        to_we_vote_id = self.to_voter.we_vote_id
+
+        # Both are friends with friend1, only from_voter is friends with friend2, and they are friends with each other
+        CurrentFriend.objects.create(viewer_voter_we_vote_id=from_we_vote_id, viewee_voter_we_vote_id='wv01voter1')
+        CurrentFriend.objects.create(viewer_voter_we_vote_id='wv01voter1', viewee_voter_we_vote_id=to_we_vote_id)
+        CurrentFriend.objects.create(viewer_voter_we_vote_id='wv01voter2', viewee_voter_we_vote_id=from_we_vote_id)
+        CurrentFriend.objects.create(viewer_voter_we_vote_id=from_we_vote_id, viewee_voter_we_vote_id=to_we_vote_id)
+
+        FollowOrganization.objects.create(voter_id=self.from_voter.id, organization_id=1)
+        FollowOrganization.objects.create(voter_id=self.from_voter.id, organization_id=2)
+        FollowOrganization.objects.create(voter_id=self.to_voter.id, organization_id=1)
+
+        FollowIssue.objects.create(
+            voter_we_vote_id=from_we_vote_id, issue_we_vote_id='wv01issue1', following_status=FOLLOWING)
+        FollowIssue.objects.create(
+            voter_we_vote_id=to_we_vote_id, issue_we_vote_id='wv01issue1', following_status=STOP_FOLLOWING)
+
+        FriendInvitationVoterLink.objects.create(
+            sender_voter_we_vote_id='wv01voter3', recipient_voter_we_vote_id=from_we_vote_id)
+
+    def test_dry_run_changes_nothing(self):
+        results = merge_voter_entries(self.from_voter, self.to_voter, dry_run=True)
+        self.assertTrue(results['success'])
+        report_by_name = {spec_report['name']: spec_report for spec_report in results['merge_report']}
+        self.assertEqual(report_by_name['CURRENT_FRIEND_VIEWER']['entries_moved'], 0)
+        self.assertEqual(report_by_name['CURRENT_FRIEND_VIEWER']['entries_deleted'], 2)
+        self.assertEqual(report_by_name['CURRENT_FRIEND_VIEWEE']['entries_moved'], 1)
+        self.assertEqual(report_by_name['FOLLOW_ORGANIZATION']['entries_moved'], 1)
+        self.assertEqual(report_by_name['FOLLOW_ORGANIZATION']['entries_left'], 1)
+        self.assertEqual(report_by_name['FOLLOW_ISSUE']['to_entries_updated'], 1)
+        self.assertEqual(FollowOrganization.objects.filter(voter_id=self.from_voter.id).count(), 2)
+        self.assertEqual(CurrentFriend.objects.count(), 4)
+
+    def test_merge(self):
+        results = merge_voter_entries(self.from_voter, self.to_voter)
+        self.assertTrue(results['success'])
+        from_we_vote_id = self.from_voter.we_vote_id
+        to_we_vote_id = self.to_voter.we_vote_id
+
+        # The duplicate friendship with friend1 and the friendship between the two voters are gone
+        self.assertFalse(CurrentFriend.objects.filter(viewer_voter_we_vote_id=from_we_vote_id).exists())
+        self.assertFalse(CurrentFriend.objects.filter(viewee_voter_we_vote_id=from_we_vote_id).exists())
+        self.assertEqual(sorted(CurrentFriend.objects.values_list('viewer_voter_we_vote_id', flat=True)),
+                         ['wv01voter1', 'wv01voter2'])
+
+        # The organization the to_voter already follows stays with the from_voter, as before
+        self.assertEqual(FollowOrganization.objects.filter(voter_id=self.to_voter.id).count(), 2)
+        self.assertEqual(FollowOrganization.objects.filter(voter_id=self.from_voter.id).count(), 1)
+
+        to_follow_issue = FollowIssue.objects.get(voter_we_vote_id=to_we_vote_id)
+        self.assertEqual(to_follow_issue.following_status, FOLLOWING)
+
+        self.assertTrue(FriendInvitationVoterLink.objects.filter(recipient_voter_we_vote_id=to_we_vote_id).exists())
+
+    def test_same_voter_is_not_merged(self):
+        results = merge_voter_entries(self.from_voter, self.from_voter)
+        self.assertFalse(results['success'])
+        self.assertEqual(CurrentFriend.objects.count(), 4)
+
+    def test_dry_run_command_reports_each_table(self):
+        out = StringIO()
+        call_command('merge_voter_accounts_dry_run', self.from_voter.we_vote_id, self.to_voter.we_vote_id, stdout=out)
+        self.assertIn('CURRENT_FRIEND_VIEWER: 0 moved, 0 updated, 2 deleted, 0 left', out.getvalue())
+        self.assertIn('FOLLOW_ORGANIZATION: 1 moved, 0 updated, 0 deleted, 1 left', out.getvalue())
+        self.assertEqual(CurrentFriend.objects.count(), 4)
+
+    def test_merge_is_rolled_back_when_a_later_step_fails(self):
+        voter_device_id = generate_voter_device_id()
+        VoterDeviceLink.objects.create(voter_device_id=voter_device_id, voter_id=self.from_voter.id)
+        EmailAddress.objects.create(
+            voter_we_vote_id=self.to_voter.we_vote_id, normalized_email_address='to_voter@example.com',
+            email_ownership_is_verified=True, secret_key='to_voter_secret_key')
+
+        with mock.patch('voter.controllers.move_voter_guides_to_another_voter', side_effect=Exception('failed')):
+            results = voter_merge_two_accounts_for_api(voter_device_id, 'to_voter_secret_key', '', '', '')
+        self.assertFalse(results['success'])
+        self.assertIn('MERGE_TWO_ACCOUNTS_ROLLED_BACK', results['status'])
+
+        # The friends and follow entries moved before the failure are back with the from_voter
+        self.assertEqual(CurrentFriend.objects.count(), 4)
+        self.assertEqual(FollowOrganization.objects.filter(voter_id=self.from_voter.id).count(), 2)
+        self.assertEqual(VoterDeviceLink.objects.get(voter_device_id=voter_device_id).voter_id, self.from_voter.id)
+
+
+class VoterPurgeTestCase(TestCase):
+
+    def setUp(self):
+        long_ago = timezone.now() - timedelta(days=400)
+        self.abandoned_voter = Voter.objects.create()
+        VoterDeviceLink.objects.create(voter_device_id='abandoned_device', voter_id=self.abandoned_voter.id)
+        AnalyticsAction.objects.create(
+            voter_we_vote_id=self.abandoned_voter.we_vote_id, voter_id=self.abandoned_voter.id)
+        self.following_voter = Voter.objects.create()
+        FollowIssue.objects.create(voter_we_vote_id=self.following_voter.we_vote_id, issue_we_vote_id='wv01issue1')
+        self.facebook_voter = Voter.objects.create(facebook_id=1234)
+        self.bookmarking_voter = Voter.objects.create()
+        BookmarkItem.objects.create(voter_id=self.bookmarking_voter.id, candidate_campaign_we_vote_id='wv01cand1')
+        self.liking_voter = Voter.objects.create()
+        PositionLike.objects.create(voter_id=self.liking_voter.id, position_entered_id=1)
+        self.pledging_voter = Voter.objects.create()
+        PledgeToVote.objects.create(voter_we_vote_id=self.pledging_voter.we_vote_id,
+                                    voter_guide_we_vote_id='wv01vg1')
+        self.returning_voter = Voter.objects.create()
+        VoterDeviceLink.objects.create(voter_device_id='returning_device', voter_id=self.returning_voter.id)
+
+        Voter.objects.update(date_joined=long_ago, date_last_changed=long_ago)
+        VoterDeviceLink.objects.filter(voter_device_id='abandoned_device').update(date_last_changed=long_ago)
+        AnalyticsAction.objects.update(exact_time=long_ago)
+
+    def test_dry_run_deletes_nothing(self):
+        results = purge_abandoned_voters(inactive_days=180, pause_seconds=0, dry_run=True, restart=True)
+        self.assertTrue(results['success'])
+        self.assertEqual(results['voters_purged'], 1)
+        self.assertEqual(results['rows_by_table']['VoterDeviceLink'], 1)
+        self.assertEqual(results['rows_by_table']['AnalyticsAction'], 1)
+        self.assertEqual(Voter.objects.count(), 7)
+
+    def test_purge_only_abandoned_voters(self):
+        results = purge_abandoned_voters(inactive_days=180, pause_seconds=0, restart=True)
+        self.assertTrue(results['success'])
+        self.assertTrue(results['all_voters_looked_at'])
+        self.assertFalse(Voter.objects.filter(id=self.abandoned_voter.id).exists())
+        self.assertFalse(VoterDeviceLink.objects.filter(voter_device_id='abandoned_device').exists())
+        self.assertFalse(AnalyticsAction.objects.exists())
+        self.assertEqual(set(Voter.objects.values_list('id', flat=True)),
+                         {self.following_voter.id, self.facebook_voter.id, self.bookmarking_voter.id,
+                          self.liking_voter.id, self.pledging_voter.id, self.returning_voter.id})
+
+    def test_purge_continues_from_checkpoint(self):
+        results = purge_abandoned_voters(inactive_days=180, chunk_size=1, pause_seconds=0, maximum_chunks=1,
+                                         restart=True)
+        self.assertFalse(results['all_voters_looked_at'])
+        self.assertEqual(results['last_voter_id'], self.abandoned_voter.id)
+        self.assertEqual(WeVoteSettingsManager().fetch_setting(VOTER_PURGE_CHECKPOINT_SETTING),
+                         self.abandoned_voter.id)
+
+        results = purge_abandoned_voters(inactive_days=180, chunk_size=1, pause_seconds=0)
+        self.assertEqual(results['voters_purged'], 0)
+        self.assertTrue(results['all_voters_looked_at'])
+        self.assertEqual(WeVoteSettingsManager().fetch_setting(VOTER_PURGE_CHECKPOINT_SETTING), 0)
+
+
+class VoterIdentityCacheTestCase(TestCase):
+
+    def setUp(self):
+        clear_cached_voter_identities()
+        self.addCleanup(clear_cached_voter_identities)
+        self.voter_identity = VoterIdentity(1, 'wv01voter1', 1, 'CA')
+
+    def shared_tier_settings(self):
+        shared_cache_directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, shared_cache_directory, ignore_errors=True)
+        return override_settings(CACHES={
+            'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+            'voter_identity': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                               'LOCATION': shared_cache_directory},
+        })
+
+    def test_nothing_cached_without_shared_tier(self):
+        store_cached_voter_identity('device1', self.voter_identity)
+        self.assertIsNone(fetch_cached_voter_identity('device1'))
+
+        with override_settings(CACHES={
+                'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+                'voter_identity': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}):
+            store_cached_voter_identity('device1', self.voter_identity)
+            self.assertIsNone(fetch_cached_voter_identity('device1'))
+
+    def test_shared_tier(self):
+        with self.shared_tier_settings():
+            store_cached_voter_identity('device1', self.voter_identity)
+            self.assertEqual(fetch_cached_voter_identity('device1'), self.voter_identity)
+
+            # Another worker, with nothing in its own tier
+            clear_cached_voter_identities()
+            self.assertEqual(fetch_cached_voter_identity('device1'), self.voter_identity)
+
+            invalidate_cached_voter_identity(['device1'])
+            self.assertIsNone(fetch_cached_voter_identity('device1'))
+
+    def test_signed_out_on_another_worker_without_local_tier(self):
+        with self.shared_tier_settings(), \
+                mock.patch('voter.voter_identity_cache.VOTER_IDENTITY_LOCAL_TIME_TO_LIVE', 0):
+            store_cached_voter_identity('device1', self.voter_identity)
+            # Another worker clears the shared tier
+            caches['voter_identity'].clear()
+            self.assertIsNone(fetch_cached_voter_identity('device1'))
+
+
+    def test_device_lookup_reads_primary_only_when_cached(self):
+        voter = Voter.objects.create()
+        voter_device_id = generate_voter_device_id()
+        VoterDeviceLink.objects.create(voter_device_id=voter_device_id, voter_id=voter.id)
+
+        with self.assertNumQueries(0), self.assertNumQueries(1, using='readonly'):
+            voter_identity = fetch_voter_identity_from_voter_device_id(voter_device_id)
+        self.assertEqual(voter_identity.voter_we_vote_id, voter.we_vote_id)
+
+        with self.shared_tier_settings():
+            with self.assertNumQueries(1), self.assertNumQueries(0, using='readonly'):
+                fetch_voter_identity_from_voter_device_id(voter_device_id)
+            with self.assertNumQueries(0), self.assertNumQueries(0, using='readonly'):
+                self.assertEqual(fetch_voter_identity_from_voter_device_id(voter_device_id), voter_identity)
+
+
+class VoterContextTestCase(TestCase):
+
+    def setUp(self):
+        self.voter = Voter.objects.create()
+        self.voter_device_id = generate_voter_device_id()
+        VoterDeviceLink.objects.create(voter_device_id=self.voter_device_id, voter_id=self.voter.id)
+
+    def test_voter_looked_up_once(self):
+        voter_context = VoterContext(self.voter_device_id)
+        self.assertEqual(voter_context.voter_id, self.voter.id)
+        self.assertEqual(voter_context.voter_we_vote_id, self.voter.we_vote_id)
+
+        results = voter_context.retrieve_voter_results(read_only=True)
+        self.assertEqual(results['voter']._state.db, 'readonly')
+        with self.assertNumQueries(0, using='readonly'):
+            voter_context.retrieve_voter_results(read_only=True)
+
+        results = voter_context.retrieve_voter_results()
+        self.assertEqual(results['voter']._state.db, 'default')
+        voter_device_link_results = voter_context.retrieve_voter_device_link_results()
+        self.assertEqual(voter_device_link_results['voter_device_link'].voter_id, self.voter.id)
+        with self.assertNumQueries(0), self.assertNumQueries(0, using='readonly'):
+            # Once read from the primary, that copy answers read only requests too
+            self.assertIs(voter_context.retrieve_voter_results(read_only=True), results)
+            self.assertIs(voter_context.retrieve_voter_device_link_results(), voter_device_link_results)
+
+    def test_context_only_reused_for_its_voter_device_id(self):
+        voter_context = VoterContext(self.voter_device_id)
+        self.assertIs(voter_context_for_voter_device_id(self.voter_device_id, voter_context), voter_context)
+        other_voter_context = voter_context_for_voter_device_id(generate_voter_device_id(), voter_context)
+        self.assertIsNot(other_voter_context, voter_context)
+        self.assertEqual(other_voter_context.voter_id, 0)
@@ -0,0 +1,125 @@
+# voter/voter_context.py
+# Brought to you by We Vote. Be good.
+# -*- coding: UTF-8 -*-
+
+from .models import fetch_voter_identity_from_voter_device_id, VoterDeviceLinkManager, VoterManager
+from wevote_functions.functions import get_voter_device_id, is_voter_device_id_valid
+
+
+class VoterContext(object):
+    """
+    The voter behind one voter_device_id, looked up the first time a view or controller asks and then reused for the
+    rest of the request. VoterContextMiddleware attaches one to every request as request.voter_context, so the
+    controllers that used to look up the VoterDeviceLink and Voter on their own can share one lookup.
+    So far only voterRetrieve, voterBallotItemsRetrieve and voterGuidesToFollowRetrieve pass theirs to their
+    controllers. Every other apis_v1 view still looks the voter up on its own, and can move over by calling
+    fetch_voter_context(request) and passing the result down.
+    """
+
+    def __init__(self, voter_device_id):
+        self.voter_device_id = voter_device_id
+        self._voter_device_id_valid_results = None
+        self._voter_identity = None
+        self._voter_identity_retrieved = False
+        self._voter_device_link_results = None
+        self._voter_results = None
+        self._read_only_voter_results = None
+
+    def __str__(self):
+        return "VoterContext for voter_device_id: {}".format(self.voter_device_id)
+
+    @property
+    def voter_device_id_valid_results(self):
+        # The same dict that is_voter_device_id_valid returns
+        if self._voter_device_id_valid_results is None:
+            self._voter_device_id_valid_results = is_voter_device_id_valid(self.voter_device_id)
+        return self._voter_device_id_valid_results
+
+    @property
+    def voter_device_id_valid(self):
+        return self.voter_device_id_valid_results['success']
+
+    @property
+    def voter_identity(self):
+        # A VoterIdentity (voter_id, voter_we_vote_id, voter_device_link_id, state_code), or None
+        if not self._voter_identity_retrieved:
+            self._voter_identity = fetch_voter_identity_from_voter_device_id(self.voter_device_id) \
+                if self.voter_device_id_valid else None
+            self._voter_identity_retrieved = True
+        return self._voter_identity
+
+    @property
+    def voter_id(self):
+        return self.voter_identity.voter_id if self.voter_identity is not None else 0
+
+    @property
+    def voter_we_vote_id(self):
+        return (self.voter_identity.voter_we_vote_id or "") if self.voter_identity is not None else ""
+
+    def retrieve_voter_device_link_results(self):
+        """
+        The same results as VoterDeviceLinkManager.retrieve_voter_device_link(voter_device_id), including a
+        VoterDeviceLink that can be updated and saved
+        :return:
+        """
+        if self._voter_device_link_results is None:
+            voter_device_link_manager = VoterDeviceLinkManager()
+            self._voter_device_link_results = voter_device_link_manager.retrieve_voter_device_link(self.voter_device_id)
+        return self._voter_device_link_results
+
+    def retrieve_voter_results(self, read_only=False):
+        """
+        The same results as VoterManager.retrieve_voter_by_id(voter_id, read_only) for this voter
+        :param read_only: Read from the 'readonly' database, unless the Voter was already read from the primary
+        :return:
+        """
+        if read_only:
+            if self._voter_results is not None:
+                return self._voter_results
+            if self._read_only_voter_results is None:
+                voter_manager = VoterManager()
+                self._read_only_voter_results = voter_manager.retrieve_voter_by_id(self.voter_id, read_only=True)
+            return self._read_only_voter_results
+        if self._voter_results is None:
+            voter_manager = VoterManager()
+            self._voter_results = voter_manager.retrieve_voter_by_id(self.voter_id)
+        return self._voter_results
+
+    def forget(self):
+        """
+        Call after changing which voter this voter_device_id is linked to, so the next question is answered from the
+        database
+        :return:
+        """
+        self._voter_identity = None
+        self._voter_identity_retrieved = False
+        self._voter_device_link_results = None
+        self._voter_results = None
+        self._read_only_voter_results = None
+
+
+def voter_context_for_voter_device_id(voter_device_id, voter_context=None):
+    """
+    Controllers that accept an optional voter_context call this, so a context for a different voter_device_id than
+    the one they were asked about is never used
+    :param voter_device_id:
+    :param voter_context:
+    :return:
+    """
+    if voter_context is not None and voter_context.voter_device_id == voter_device_id:
+        return voter_context
+    return VoterContext(voter_device_id)
+
+
+def fetch_voter_context(request):
+    """
+    The VoterContext that VoterContextMiddleware attached to this request, or a new one when the middleware didn't run
+    (like with a RequestFactory request in tests)
+    :param request:
+    :return:
+    """
+    voter_context = getattr(request, 'voter_context', None)
+    if voter_context is None:
+        voter_context = VoterContext(get_voter_device_id(request))
+        request.voter_context = voter_context
+    return voter_context
@@ -0,0 +1,150 @@
+# voter/voter_identity_cache.py
+# Brought to you by We Vote. Be good.
+# -*- coding: UTF-8 -*-
+
+from collections import namedtuple, OrderedDict
+from config.base import get_environment_variable_default
+from django.core.cache import caches
+from django.core.cache.backends.base import InvalidCacheBackendError
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+import threading
+import time
+import wevote_functions.admin
+from wevote_functions.functions import convert_to_int, positive_value_exists
+
+logger = wevote_functions.admin.get_logger(__name__)
+
+# What every API call needs to know about the voter behind a voter_device_id. The in-process tier is the first place
+# we look, then the shared tier (the "voter_identity" cache in config/base.py), and only then the database.
+# Both tiers are only used when the shared tier is set up: without it, signing out on one worker couldn't clear the
+# identity other workers remember, so every lookup goes to the database.
+VoterIdentity = namedtuple('VoterIdentity', ['voter_id', 'voter_we_vote_id', 'voter_device_link_id', 'state_code'])
+
+# How many seconds a worker can use its own copy of an identity. Invalidation only reaches the worker that made the
+# change (and the shared tier), so this is how long another worker could keep using a voter_device_id that was
+# signed out or relinked. Set to 0 to only use the shared tier.
+VOTER_IDENTITY_LOCAL_TIME_TO_LIVE = \
+    convert_to_int(get_environment_variable_default("VOTER_IDENTITY_LOCAL_TIME_TO_LIVE", 30))
+# How many voter_device_ids each worker remembers
+VOTER_IDENTITY_LOCAL_MAXIMUM_ENTRIES = \
+    convert_to_int(get_environment_variable_default("VOTER_IDENTITY_LOCAL_MAXIMUM_ENTRIES", 10000))
+VOTER_IDENTITY_SHARED_CACHE_ALIAS = 'voter_identity'
+
+_voter_identity_cache = OrderedDict()  # voter_device_id -> (VoterIdentity, time stored)
+_voter_identity_lock = threading.Lock()
+
+
+def _shared_voter_identity_cache():
+    """
+    The shared tier, or None if it isn't set up. DummyCache (the default) and LocMemCache aren't shared between
+    workers, so they don't count.
+    :return:
+    """
+    try:
+        shared_cache = caches[VOTER_IDENTITY_SHARED_CACHE_ALIAS]
+    except InvalidCacheBackendError:
+        return None
+    if isinstance(shared_cache, (DummyCache, LocMemCache)):
+        return None
+    return shared_cache
+
+
+def voter_identity_cache_on():
+    """
+    So callers know whether what they read will be cached (and so has to come from the primary database)
+    :return:
+    """
+    return _shared_voter_identity_cache() is not None
+
+
+def _shared_cache_key(voter_device_id):
+    return 'voter_identity_' + voter_device_id
+
+
+def fetch_cached_voter_identity(voter_device_id):
+    """
+    Return the VoterIdentity for this voter_device_id from the in-process tier or the shared tier, or None
+    :param voter_device_id:
+    :return:
+    """
+    if not positive_value_exists(voter_device_id):
+        return None
+    shared_cache = _shared_voter_identity_cache()
+    if shared_cache is None:
+        return None
+
+    with _voter_identity_lock:
+        cached_entry = _voter_identity_cache.get(voter_device_id)
+        if cached_entry is not None:
+            voter_identity, time_stored = cached_entry
+            if time.monotonic() - time_stored <= VOTER_IDENTITY_LOCAL_TIME_TO_LIVE:
+                _voter_identity_cache.move_to_end(voter_device_id)
+                return voter_identity
+            del _voter_identity_cache[voter_device_id]
+
+    try:
+        shared_value = shared_cache.get(_shared_cache_key(voter_device_id))
+    except Exception as e:
+        logger.error("fetch_cached_voter_identity, shared cache unavailable: " + str(e))
+        return None
+    if shared_value is None:
+        return None
+    voter_identity = VoterIdentity(*shared_value)
+    _store_local_voter_identity(voter_device_id, voter_identity)
+    return voter_identity
+
+
+def _store_local_voter_identity(voter_device_id, voter_identity):
+    if VOTER_IDENTITY_LOCAL_TIME_TO_LIVE <= 0:
+        return
+    with _voter_identity_lock:
+        _voter_identity_cache[voter_device_id] = (voter_identity, time.monotonic())
+        _voter_identity_cache.move_to_end(voter_device_id)
+        while len(_voter_identity_cache) > VOTER_IDENTITY_LOCAL_MAXIMUM_ENTRIES:
+            _voter_identity_cache.popitem(last=False)
+
+
+def store_cached_voter_identity(voter_device_id, voter_identity):
+    if not positive_value_exists(voter_device_id) or voter_identity is None:
+        return
+    shared_cache = _shared_voter_identity_cache()
+    if shared_cache is None:
+        return
+    _store_local_voter_identity(voter_device_id, voter_identity)
+    try:
+        shared_cache.set(_shared_cache_key(voter_device_id), tuple(voter_identity))
+    except Exception as e:
+        logger.error("store_cached_voter_identity, shared cache unavailable: " + str(e))
+
+
+def invalidate_cached_voter_identity(voter_device_id_list):
+    """
+    Forget these voter_device_ids in this worker and in the shared tier. Call whenever a VoterDeviceLink is saved or
+    deleted, or the voter it points to is deleted.
+    :param voter_device_id_list:
+    :return:
+    """
+    voter_device_id_list = [voter_device_id for voter_device_id in voter_device_id_list
+                            if positive_value_exists(voter_device_id)]
+    if not voter_device_id_list:
+        return
+    with _voter_identity_lock:
+        for voter_device_id in voter_device_id_list:
+            _voter_identity_cache.pop(voter_device_id, None)
+    shared_cache = _shared_voter_identity_cache()
+    if shared_cache is None:
+        return
+    try:
+        shared_cache.delete_many([_shared_cache_key(voter_device_id) for voter_device_id in voter_device_id_list])
+    except Exception as e:
+        logger.error("invalidate_cached_voter_identity, shared cache unavailable: " + str(e))
+
+
+def clear_cached_voter_identities():
+    """
+    Forget every identity in this worker. The shared tier entries expire on their own.
+    :return:
+    """
+    with _voter_identity_lock:
+        _voter_identity_cache.clear()
@@ -0,0 +1,286 @@
+# voter/voter_merge.py
+# Brought to you by We Vote. Be good.
+# -*- coding: UTF-8 -*-
+
+from analytics.models import AnalyticsAction
+from django.db import transaction
+from django.db.models import OuterRef, Q, Subquery
+from django.utils import timezone
+from donate.models import DonationJournal
+from email_outbound.models import EmailAddress
+from follow.models import FollowIssue, FollowOrganization, FOLLOWING
+from friend.friend_graph_cache import invalidate_cached_friend_adjacency
+from friend.models import CurrentFriend, FriendInvitationEmailLink, FriendInvitationVoterLink
+from voter.voter_profile_cache import invalidate_cached_voter_profile
+import wevote_functions.admin
+from wevote_functions.functions import positive_value_exists
+
+logger = wevote_functions.admin.get_logger(__name__)
+
+# What happens to a "from" voter entry when the "to" voter already has the matching entry
+LEAVE_CONFLICTING_ENTRIES = 'LEAVE'  # The entry stays with the "from" voter
+DELETE_CONFLICTING_ENTRIES = 'DELETE'
+
+
+class VoterMergeRolledBack(Exception):
+    """
+    Raised inside the transaction of a voter account merge to roll back everything it has moved so far.
+    """
+    pass
+
+
+class VoterMergeSpec(object):
+    """
+    How one table moves from one voter to another when two voter accounts are merged. The entries of the "from"
+    voter (key_field_name equal to the "from" voter's id or we_vote_id) are moved with one UPDATE, except the ones
+    conflict_filter finds, which are then left or deleted according to conflict_rule.
+    """
+    def __init__(self, name, model, key_field_name, key_is_voter_id=False, conflict_filter=None,
+                 conflict_rule=LEAVE_CONFLICTING_ENTRIES, resolve_conflicts=None, date_last_changed_field_name=None):
+        """
+        :param name: Used in the status and the dry run report
+        :param model:
+        :param key_field_name: The field that holds the voter
+        :param key_is_voter_id: True if key_field_name holds voter.id instead of voter.we_vote_id
+        :param conflict_filter: function(from_key, to_key) returning a Q that finds the "from" entries the "to" voter
+          already has
+        :param conflict_rule: LEAVE_CONFLICTING_ENTRIES or DELETE_CONFLICTING_ENTRIES
+        :param resolve_conflicts: function(from_key, to_key) returning a queryset of "to" entries and the values to
+          update them with, run before the "from" entries are moved
+        :param date_last_changed_field_name: An auto_now field that save() would have refreshed
+        """
+        self.name = name
+        self.model = model
+        self.key_field_name = key_field_name
+        self.key_is_voter_id = key_is_voter_id
+        self.conflict_filter = conflict_filter
+        self.conflict_rule = conflict_rule
+        self.resolve_conflicts = resolve_conflicts
+        self.date_last_changed_field_name = date_last_changed_field_name
+
+    def key_value(self, voter):
+        return voter.id if self.key_is_voter_id else voter.we_vote_id
+
+    def from_queryset(self, from_key):
+        return self.model.objects.filter(**{self.key_field_name: from_key})
+
+    def conflict_q(self, from_key, to_key):
+        if self.conflict_filter is None:
+            return Q(pk__in=[])
+        return self.conflict_filter(from_key, to_key)
+
+    def moved_values(self, to_key):
+        moved_values = {self.key_field_name: to_key}
+        if self.date_last_changed_field_name:
+            moved_values[self.date_last_changed_field_name] = timezone.now()
+        return moved_values
+
+
+def already_has_value(model, key_field_name, match_field_name, to_voter_match_field_name=None):
+    """
+    Build a conflict_filter that finds the "from" entries whose match_field_name value the "to" voter already has
+    :param model:
+    :param key_field_name:
+    :param match_field_name: The field on the "from" entry
+    :param to_voter_match_field_name: The field on the "to" voter's entries, if it is not match_field_name
+    :return:
+    """
+    to_voter_match_field_name = to_voter_match_field_name or match_field_name
+
+    def conflict_filter(from_key, to_key):
+        # NULLs are left out so that "NOT IN" does not turn into "not known" for every entry
+        to_voter_value_query = model.objects.filter(**{key_field_name: to_key}) \
+            .exclude(**{to_voter_match_field_name + '__isnull': True}) \
+            .values(to_voter_match_field_name)
+        return Q(**{match_field_name + '__in': to_voter_value_query})
+    return conflict_filter
+
+
+def current_friend_conflict_filter(friend_field_name):
+    """
+    A "from" friendship conflicts if the "to" voter is already friends with the other voter, whichever direction the
+    existing friendship is stored in, or if the other voter is the "to" voter
+    :param friend_field_name: The field holding the other voter
+    :return:
+    """
+    def conflict_filter(from_key, to_key):
+        return already_has_value(CurrentFriend, 'viewer_voter_we_vote_id', friend_field_name,
+                                 'viewee_voter_we_vote_id')(from_key, to_key) | \
+            already_has_value(CurrentFriend, 'viewee_voter_we_vote_id', friend_field_name,
+                              'viewer_voter_we_vote_id')(from_key, to_key) | \
+            Q(**{friend_field_name: to_key})
+    return conflict_filter
+
+
+def resolve_follow_issue_conflicts(from_key, to_key):
+    """
+    When both voters have an entry for the same issue, the "to" entry takes the "from" following_status unless it is
+    already FOLLOWING
+    :param from_key:
+    :param to_key:
+    :return:
+    """
+    from_follow_issue_query = FollowIssue.objects.filter(voter_we_vote_id=from_key)
+    to_follow_issue_query = FollowIssue.objects.filter(
+        voter_we_vote_id=to_key,
+        issue_we_vote_id__in=from_follow_issue_query.values('issue_we_vote_id')) \
+        .exclude(following_status=FOLLOWING)
+    new_values = {
+        'following_status': Subquery(from_follow_issue_query.filter(
+            issue_we_vote_id=OuterRef('issue_we_vote_id')).order_by('-id').values('following_status')[:1]),
+        'date_last_changed': timezone.now(),
+    }
+    return to_follow_issue_query, new_values
+
+
+# The tables moved by voter_merge_two_accounts_for_api, with the same rules as the move_*_to_another_voter functions
+# they replace. Voter guides and positions have their own movers, since they also depend on the linked organizations.
+VOTER_MERGE_SPEC_LIST = [
+    VoterMergeSpec(
+        'CURRENT_FRIEND_VIEWER', CurrentFriend, 'viewer_voter_we_vote_id',
+        conflict_filter=current_friend_conflict_filter('viewee_voter_we_vote_id'),
+        conflict_rule=DELETE_CONFLICTING_ENTRIES, date_last_changed_field_name='date_last_changed'),
+    VoterMergeSpec(
+        'CURRENT_FRIEND_VIEWEE', CurrentFriend, 'viewee_voter_we_vote_id',
+        conflict_filter=current_friend_conflict_filter('viewer_voter_we_vote_id'),
+        conflict_rule=DELETE_CONFLICTING_ENTRIES, date_last_changed_field_name='date_last_changed'),
+    VoterMergeSpec(
+        'FRIEND_INVITATION_EMAIL_LINK_SENDER', FriendInvitationEmailLink, 'sender_voter_we_vote_id',
+        conflict_filter=already_has_value(FriendInvitationEmailLink, 'sender_voter_we_vote_id',
+                                          'recipient_voter_email'),
+        date_last_changed_field_name='date_last_changed'),
+    VoterMergeSpec(
+        'FRIEND_INVITATION_VOTER_LINK_SENDER', FriendInvitationVoterLink, 'sender_voter_we_vote_id',
+        conflict_filter=already_has_value(FriendInvitationVoterLink, 'sender_voter_we_vote_id',
+                                          'recipient_voter_we_vote_id'),
+        date_last_changed_field_name='date_last_changed'),
+    VoterMergeSpec(
+        'FRIEND_INVITATION_VOTER_LINK_RECIPIENT', FriendInvitationVoterLink, 'recipient_voter_we_vote_id',
+        conflict_filter=already_has_value(FriendInvitationVoterLink, 'recipient_voter_we_vote_id',
+                                          'sender_voter_we_vote_id'),
+        date_last_changed_field_name='date_last_changed'),
+    VoterMergeSpec(
+        'FOLLOW_ORGANIZATION', FollowOrganization, 'voter_id', key_is_voter_id=True,
+        conflict_filter=already_has_value(FollowOrganization, 'voter_id', 'organization_id'),
+        date_last_changed_field_name='date_last_changed'),
+    VoterMergeSpec(
+        'FOLLOW_ISSUE', FollowIssue, 'voter_we_vote_id',
+        conflict_filter=already_has_value(FollowIssue, 'voter_we_vote_id', 'issue_we_vote_id'),
+        resolve_conflicts=resolve_follow_issue_conflicts, date_last_changed_field_name='date_last_changed'),
+    VoterMergeSpec('EMAIL_ADDRESS', EmailAddress, 'voter_we_vote_id'),
+    VoterMergeSpec('DONATION_JOURNAL', DonationJournal, 'voter_we_vote_id'),
+    VoterMergeSpec('ANALYTICS_ACTION', AnalyticsAction, 'voter_we_vote_id'),
+]
+
+
+def merge_voter_entries(from_voter, to_voter, dry_run=False, voter_merge_spec_list=None):
+    """
+    Move the entries of every table in voter_merge_spec_list from from_voter to to_voter with one UPDATE (and where
+    needed one DELETE) per table, all in one transaction, so a failure moves nothing.
+    :param from_voter:
+    :param to_voter:
+    :param dry_run: Count the entries that would be moved, updated or deleted without changing anything
+    :param voter_merge_spec_list: Defaults to VOTER_MERGE_SPEC_LIST
+    :return: merge_report has one dict per table with the number of entries moved, conflicting entries updated on the
+      "to" voter, and conflicting entries deleted or left with the "from" voter
+    """
+    status = "MERGE_VOTER_ENTRIES "
+    success = False
+    merge_report = []
+    if voter_merge_spec_list is None:
+        voter_merge_spec_list = VOTER_MERGE_SPEC_LIST
+
+    if not positive_value_exists(from_voter.we_vote_id) or not positive_value_exists(to_voter.we_vote_id) \
+            or not positive_value_exists(from_voter.id) or not positive_value_exists(to_voter.id):
+        status += "MERGE_VOTER_ENTRIES-MISSING_FROM_OR_TO_VOTER "
+    elif from_voter.id == to_voter.id:
+        status += "MERGE_VOTER_ENTRIES-FROM_AND_TO_VOTER_IDENTICAL "
+    else:
+        try:
+            if dry_run:
+                for voter_merge_spec in voter_merge_spec_list:
+                    merge_report.append(count_voter_merge_spec_entries(voter_merge_spec, from_voter, to_voter))
+            else:
+                with transaction.atomic():
+                    # Everyone whose friends change: both voters, and the friends of the "from" voter
+                    changed_friend_we_vote_id_set = {from_voter.we_vote_id, to_voter.we_vote_id}
+                    for viewer_voter_we_vote_id, viewee_voter_we_vote_id in CurrentFriend.objects.filter(
+                            Q(viewer_voter_we_vote_id=from_voter.we_vote_id) |
+                            Q(viewee_voter_we_vote_id=from_voter.we_vote_id)) \
+                            .values_list('viewer_voter_we_vote_id', 'viewee_voter_we_vote_id'):
+                        changed_friend_we_vote_id_set.update([viewer_voter_we_vote_id, viewee_voter_we_vote_id])
+                    for voter_merge_spec in voter_merge_spec_list:
+                        merge_report.append(apply_voter_merge_spec(voter_merge_spec, from_voter, to_voter))
+            success = True
+            if not dry_run:
+                # update() and delete() skip the DonationJournal and CurrentFriend signals that clear the cached
+                # voterRetrieve and friend lists. When the merge runs inside a larger transaction, the caches are
+                # cleared once that commits, so they aren't filled again from entries that might still be rolled back
+                changed_voter_we_vote_id_list = [from_voter.we_vote_id, to_voter.we_vote_id]
+                changed_friend_we_vote_id_list = list(changed_friend_we_vote_id_set)
+                transaction.on_commit(lambda: invalidate_cached_voter_profile(changed_voter_we_vote_id_list))
+                transaction.on_commit(lambda: invalidate_cached_friend_adjacency(changed_friend_we_vote_id_list))
+            for spec_report in merge_report:
+                status += spec_report['name'] + " moved: " + str(spec_report['entries_moved']) + " "
+        except Exception as e:
+            merge_report = []
+            status += "MERGE_VOTER_ENTRIES-FAILED_NOTHING_MOVED " + str(e) + " "
+            logger.error("merge_voter_entries from " + str(from_voter.we_vote_id) + " to " +
+                         str(to_voter.we_vote_id) + ": " + str(e))
+
+    results = {
+        'status':                   status,
+        'success':                  success,
+        'dry_run':                  dry_run,
+        'from_voter_we_vote_id':    from_voter.we_vote_id,
+        'to_voter_we_vote_id':      to_voter.we_vote_id,
+        'merge_report':             merge_report,
+    }
+    return results
+
+
+def count_voter_merge_spec_entries(voter_merge_spec, from_voter, to_voter):
+    from_key = voter_merge_spec.key_value(from_voter)
+    to_key = voter_merge_spec.key_value(to_voter)
+    from_query = voter_merge_spec.from_queryset(from_key)
+    conflict_q = voter_merge_spec.conflict_q(from_key, to_key)
+    conflicting_entries = from_query.filter(conflict_q).count()
+    to_entries_updated = 0
+    if voter_merge_spec.resolve_conflicts is not None:
+        to_query, new_values = voter_merge_spec.resolve_conflicts(from_key, to_key)
+        to_entries_updated = to_query.count()
+    return {
+        'name':                 voter_merge_spec.name,
+        'entries_moved':        from_query.exclude(conflict_q).count(),
+        'to_entries_updated':   to_entries_updated,
+        'entries_deleted':
+            conflicting_entries if voter_merge_spec.conflict_rule == DELETE_CONFLICTING_ENTRIES else 0,
+        'entries_left':
+            conflicting_entries if voter_merge_spec.conflict_rule == LEAVE_CONFLICTING_ENTRIES else 0,
+    }
+
+
+def apply_voter_merge_spec(voter_merge_spec, from_voter, to_voter):
+    from_key = voter_merge_spec.key_value(from_voter)
+    to_key = voter_merge_spec.key_value(to_voter)
+    to_entries_updated = 0
+    if voter_merge_spec.resolve_conflicts is not None:
+        to_query, new_values = voter_merge_spec.resolve_conflicts(from_key, to_key)
+        to_entries_updated = to_query.update(**new_values)
+    entries_moved = voter_merge_spec.from_queryset(from_key) \
+        .exclude(voter_merge_spec.conflict_q(from_key, to_key)) \
+        .update(**voter_merge_spec.moved_values(to_key))
+    # Only the conflicting entries are still with the "from" voter
+    entries_deleted = 0
+    entries_left = 0
+    if voter_merge_spec.conflict_rule == DELETE_CONFLICTING_ENTRIES:
+        entries_deleted, deleted_by_model = voter_merge_spec.from_queryset(from_key).delete()
+    else:
+        entries_left = voter_merge_spec.from_queryset(from_key).count()
+    return {
+        'name':                 voter_merge_spec.name,
+        'entries_moved':        entries_moved,
+        'to_entries_updated':   to_entries_updated,
+        'entries_deleted':      entries_deleted,
+        'entries_left':         entries_left,
+    }
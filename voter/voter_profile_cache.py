@@ -0,0 +1,79 @@
+# voter/voter_profile_cache.py
+# Brought to you by We Vote. Be good.
+# -*- coding: UTF-8 -*-
+
+from django.core.cache import caches
+from django.core.cache.backends.base import InvalidCacheBackendError
+from django.core.cache.backends.dummy import DummyCache
+import wevote_functions.admin
+from wevote_functions.functions import positive_value_exists
+
+logger = wevote_functions.admin.get_logger(__name__)
+
+# What voterRetrieve returns about a voter (everything but the request-specific values), keyed by voter_we_vote_id.
+# Stored in the "voter_profile" cache in config/base.py, which is off (DummyCache) unless it is configured. The
+# Voter, TwitterLinkToVoter, FacebookLinkToVoter, FacebookUser and DonationJournal signals in voter/models.py clear
+# a voter's entry when they are saved.
+VOTER_PROFILE_CACHE_ALIAS = 'voter_profile'
+
+
+def _voter_profile_cache():
+    try:
+        voter_profile_cache = caches[VOTER_PROFILE_CACHE_ALIAS]
+    except InvalidCacheBackendError:
+        return None
+    if isinstance(voter_profile_cache, DummyCache):
+        return None
+    return voter_profile_cache
+
+
+def _cache_key(voter_we_vote_id):
+    return 'voter_profile_' + voter_we_vote_id.lower()
+
+
+def voter_profile_cache_on():
+    """
+    So callers can skip the work of finding which voter changed when nothing is cached
+    :return:
+    """
+    return _voter_profile_cache() is not None
+
+
+def fetch_cached_voter_profile(voter_we_vote_id):
+    """
+    Return the dict saved with store_cached_voter_profile for this voter, or None
+    :param voter_we_vote_id:
+    :return:
+    """
+    voter_profile_cache = _voter_profile_cache()
+    if voter_profile_cache is None or not positive_value_exists(voter_we_vote_id):
+        return None
+    try:
+        return voter_profile_cache.get(_cache_key(voter_we_vote_id))
+    except Exception as e:
+        logger.error("fetch_cached_voter_profile, cache unavailable: " + str(e))
+        return None
+
+
+def store_cached_voter_profile(voter_we_vote_id, voter_profile):
+    voter_profile_cache = _voter_profile_cache()
+    if voter_profile_cache is None or not positive_value_exists(voter_we_vote_id):
+        return
+    try:
+        voter_profile_cache.set(_cache_key(voter_we_vote_id), voter_profile)
+    except Exception as e:
+        logger.error("store_cached_voter_profile, cache unavailable: " + str(e))
+
+
+def invalidate_cached_voter_profile(voter_we_vote_id_list):
+    voter_profile_cache = _voter_profile_cache()
+    if voter_profile_cache is None:
+        return
+    voter_we_vote_id_list = [voter_we_vote_id for voter_we_vote_id in voter_we_vote_id_list
+                             if positive_value_exists(voter_we_vote_id)]
+    if not voter_we_vote_id_list:
+        return
+    try:
+        voter_profile_cache.delete_many([_cache_key(voter_we_vote_id) for voter_we_vote_id in voter_we_vote_id_list])
+    except Exception as e:
+        logger.error("invalidate_cached_voter_profile, cache unavailable: " + str(e))
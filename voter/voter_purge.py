@@ -0,0 +1,234 @@
+# voter/voter_purge.py
+# Brought to you by We Vote. Be good.
+# -*- coding: UTF-8 -*-
+
+from .models import Voter, VoterAddress, VoterDeviceLink
+from analytics.models import AnalyticsAction
+from ballot.models import BallotItem, BallotReturned, VoterBallotSaved
+from bookmark.models import BookmarkItem
+from config.base import get_environment_variable_default
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from donate.models import DonateLinkToVoter, DonationJournal
+from email_outbound.models import EmailAddress
+from follow.models import FollowIssue, FollowOrganization
+from friend.models import CurrentFriend, FriendInvitationEmailLink, FriendInvitationVoterLink
+from import_export_facebook.models import FacebookLinkToVoter
+from pledge_to_vote.models import PledgeToVote
+from position.models import PositionEntered, PositionForFriends, PositionNetworkScore
+from position_like.models import PositionLike
+import time
+from twitter.models import TwitterLinkToVoter
+from voter_guide.models import VoterGuide
+import wevote_functions.admin
+from wevote_functions.functions import convert_to_float, convert_to_int, positive_value_exists
+from wevote_settings.models import WeVoteSettingsManager
+
+logger = wevote_functions.admin.get_logger(__name__)
+
+# A voter who hasn't been seen in this many days, and never signed in or saved anything, can be purged
+VOTER_PURGE_INACTIVE_DAYS = convert_to_int(get_environment_variable_default("VOTER_PURGE_INACTIVE_DAYS", 180))
+# How many voters are looked at, and purged in one transaction, at a time
+VOTER_PURGE_CHUNK_SIZE = convert_to_int(get_environment_variable_default("VOTER_PURGE_CHUNK_SIZE", 500))
+# Pause between chunks, so the purge can run while voters are using the site
+VOTER_PURGE_PAUSE_SECONDS = convert_to_float(get_environment_variable_default("VOTER_PURGE_PAUSE_SECONDS", 1.0))
+# The WeVoteSetting holding the highest voter id already looked at, so an interrupted purge picks up where it stopped
+VOTER_PURGE_CHECKPOINT_SETTING = 'voter_purge_last_voter_id'
+
+# A voter with an entry in any of these tables is kept: (model, field holding the voter, field holds we_vote_id)
+VOTER_PURGE_KEEP_LIST = [
+    (PositionEntered, 'voter_id', False),
+    (PositionForFriends, 'voter_id', False),
+    (FollowOrganization, 'voter_id', False),
+    (FollowIssue, 'voter_we_vote_id', True),
+    (BookmarkItem, 'voter_id', False),
+    (PositionLike, 'voter_id', False),
+    (PledgeToVote, 'voter_we_vote_id', True),
+    (CurrentFriend, 'viewer_voter_we_vote_id', True),
+    (CurrentFriend, 'viewee_voter_we_vote_id', True),
+    (FriendInvitationEmailLink, 'sender_voter_we_vote_id', True),
+    (FriendInvitationVoterLink, 'sender_voter_we_vote_id', True),
+    (FriendInvitationVoterLink, 'recipient_voter_we_vote_id', True),
+    (EmailAddress, 'voter_we_vote_id', True),
+    (TwitterLinkToVoter, 'voter_we_vote_id', True),
+    (FacebookLinkToVoter, 'voter_we_vote_id', True),
+    (DonationJournal, 'voter_we_vote_id', True),
+    (DonateLinkToVoter, 'voter_we_vote_id', True),
+    (VoterGuide, 'owner_voter_id', False),
+]
+
+# ...and so is a voter with activity in any of these tables since the cutoff: (model, voter field, we_vote_id, date)
+VOTER_PURGE_ACTIVITY_LIST = [
+    (VoterDeviceLink, 'voter_id', False, 'date_last_changed'),
+    (AnalyticsAction, 'voter_we_vote_id', True, 'exact_time'),
+]
+
+# The rows deleted along with a purged voter, in this order, with the Voter entry itself last
+VOTER_PURGE_DELETE_LIST = [
+    (AnalyticsAction, 'voter_we_vote_id', True),
+    (PositionNetworkScore, 'viewing_voter_id', False),
+    (BallotItem, 'voter_id', False),
+    (BallotReturned, 'voter_id', False),
+    (VoterBallotSaved, 'voter_id', False),
+    (VoterAddress, 'voter_id', False),
+    (VoterDeviceLink, 'voter_id', False),
+    (Voter, 'id', False),
+]
+
+
+def abandoned_voter_filter(cutoff):
+    """
+    The Voter columns of a voter who never signed in, and whose entry hasn't changed since the cutoff
+    :param cutoff:
+    :return:
+    """
+    return Q(date_joined__lt=cutoff) & (Q(date_last_changed__lt=cutoff) | Q(date_last_changed__isnull=True)) & \
+        Q(email__isnull=True, primary_email_we_vote_id__isnull=True, linked_organization_we_vote_id__isnull=True,
+          data_to_preserve=False, is_admin=False, is_partner_organization=False, is_political_data_manager=False,
+          is_political_data_viewer=False, is_verified_volunteer=False) & \
+        (Q(facebook_id__isnull=True) | Q(facebook_id=0)) & (Q(twitter_id__isnull=True) | Q(twitter_id=0))
+
+
+def remove_voters_to_keep(voter_list, cutoff):
+    """
+    :param voter_list: (id, we_vote_id) of voters whose Voter entry looks abandoned
+    :param cutoff:
+    :return: The voters in voter_list with no saved data and no activity since the cutoff, with one query per table
+    """
+    voter_id_list = [voter_id for voter_id, voter_we_vote_id in voter_list]
+    voter_we_vote_id_list = [voter_we_vote_id for voter_id, voter_we_vote_id in voter_list]
+    keep_voter_id_set = set()
+    keep_voter_we_vote_id_set = set()
+
+    def remember_voters_to_keep(model, field_name, holds_we_vote_id, extra_filter):
+        voter_value_list = voter_we_vote_id_list if holds_we_vote_id else voter_id_list
+        found_value_list = model.objects.filter(**{field_name + '__in': voter_value_list}) \
+            .filter(extra_filter).values_list(field_name, flat=True).distinct()
+        if holds_we_vote_id:
+            keep_voter_we_vote_id_set.update(found_value_list)
+        else:
+            keep_voter_id_set.update(found_value_list)
+
+    for model, field_name, holds_we_vote_id in VOTER_PURGE_KEEP_LIST:
+        remember_voters_to_keep(model, field_name, holds_we_vote_id, Q())
+    for model, field_name, holds_we_vote_id, date_field_name in VOTER_PURGE_ACTIVITY_LIST:
+        remember_voters_to_keep(model, field_name, holds_we_vote_id, Q(**{date_field_name + '__gte': cutoff}))
+
+    return [(voter_id, voter_we_vote_id) for voter_id, voter_we_vote_id in voter_list
+            if voter_id not in keep_voter_id_set and voter_we_vote_id not in keep_voter_we_vote_id_set]
+
+
+def purge_voter_chunk(voter_list, dry_run):
+    """
+    Delete the voters in voter_list and their rows in VOTER_PURGE_DELETE_LIST, or only count them
+    :param voter_list: (id, we_vote_id) of abandoned voters
+    :param dry_run:
+    :return: Number of rows deleted (or that would be deleted) by table name
+    """
+    voter_id_list = [voter_id for voter_id, voter_we_vote_id in voter_list]
+    voter_we_vote_id_list = [voter_we_vote_id for voter_id, voter_we_vote_id in voter_list]
+    rows_by_table = {}
+    for model, field_name, holds_we_vote_id in VOTER_PURGE_DELETE_LIST:
+        voter_value_list = voter_we_vote_id_list if holds_we_vote_id else voter_id_list
+        queryset = model.objects.filter(**{field_name + '__in': voter_value_list})
+        if dry_run:
+            rows = queryset.count()
+        else:
+            rows, rows_by_model = queryset.delete()
+        rows_by_table[model.__name__] = rows
+    return rows_by_table
+
+
+def purge_abandoned_voters(inactive_days=None, chunk_size=None, pause_seconds=None, maximum_chunks=0,
+                           dry_run=False, restart=False):
+    """
+    Purge voters who never signed in, never saved a position, follow, friend, email or donation, and haven't been
+    seen for inactive_days, along with their device links, addresses, ballots, analytics and network scores.
+    Voters are looked at in id order, chunk_size at a time, and each chunk is purged in its own transaction. After
+    every chunk the last voter id looked at is saved, so the next run continues from there; once every voter has been
+    looked at the next run starts over.
+    :param inactive_days:
+    :param chunk_size:
+    :param pause_seconds: Time to wait between chunks
+    :param maximum_chunks: Stop after this many chunks (0 to keep going until every voter has been looked at)
+    :param dry_run: Count what would be purged without deleting anything or saving the checkpoint
+    :param restart: Ignore the saved checkpoint and start from the first voter
+    :return:
+    """
+    status = "PURGE_ABANDONED_VOTERS "
+    success = True
+    inactive_days = VOTER_PURGE_INACTIVE_DAYS if inactive_days is None else inactive_days
+    chunk_size = VOTER_PURGE_CHUNK_SIZE if chunk_size is None else chunk_size
+    pause_seconds = VOTER_PURGE_PAUSE_SECONDS if pause_seconds is None else pause_seconds
+    cutoff = timezone.now() - timedelta(days=inactive_days)
+    we_vote_settings_manager = WeVoteSettingsManager()
+
+    last_voter_id = 0
+    if not restart:
+        last_voter_id = convert_to_int(we_vote_settings_manager.fetch_setting(VOTER_PURGE_CHECKPOINT_SETTING))
+    starting_voter_id = last_voter_id
+
+    chunks = 0
+    voters_looked_at = 0
+    voters_purged = 0
+    rows_by_table = {model.__name__: 0 for model, field_name, holds_we_vote_id in VOTER_PURGE_DELETE_LIST}
+    all_voters_looked_at = False
+    while True:
+        voter_list = list(Voter.objects.filter(id__gt=last_voter_id).filter(abandoned_voter_filter(cutoff))
+                          .order_by('id').values_list('id', 'we_vote_id')[:chunk_size])
+        if not voter_list:
+            all_voters_looked_at = True
+            last_voter_id = 0
+            if not dry_run:
+                we_vote_settings_manager.save_setting(VOTER_PURGE_CHECKPOINT_SETTING, 0)
+            break
+
+        try:
+            if dry_run:
+                abandoned_voter_list = remove_voters_to_keep(voter_list, cutoff)
+                chunk_rows_by_table = purge_voter_chunk(abandoned_voter_list, dry_run)
+            else:
+                with transaction.atomic():
+                    # Lock the voters and look again, in case one of them signed in since they were selected
+                    locked_voter_list = list(Voter.objects.select_for_update()
+                                             .filter(id__in=[voter_id for voter_id, voter_we_vote_id in voter_list])
+                                             .filter(abandoned_voter_filter(cutoff))
+                                             .order_by('id').values_list('id', 'we_vote_id'))
+                    abandoned_voter_list = remove_voters_to_keep(locked_voter_list, cutoff)
+                    chunk_rows_by_table = purge_voter_chunk(abandoned_voter_list, dry_run)
+        except Exception as e:
+            success = False
+            status += "PURGE_ABANDONED_VOTERS-CHUNK_FAILED after voter id " + str(last_voter_id) + ": " + str(e) + " "
+            logger.error("purge_abandoned_voters: " + status)
+            break
+
+        chunks += 1
+        voters_looked_at += len(voter_list)
+        voters_purged += len(abandoned_voter_list)
+        for table_name, rows in chunk_rows_by_table.items():
+            rows_by_table[table_name] += rows
+        last_voter_id = voter_list[-1][0]
+        if not dry_run:
+            we_vote_settings_manager.save_setting(VOTER_PURGE_CHECKPOINT_SETTING, last_voter_id)
+
+        if positive_value_exists(maximum_chunks) and chunks >= maximum_chunks:
+            break
+        if not dry_run and positive_value_exists(pause_seconds):
+            time.sleep(pause_seconds)
+
+    status += ("WOULD_PURGE " if dry_run else "PURGED ") + str(voters_purged) + " of " + str(voters_looked_at) + \
+        " voters looked at, from voter id " + str(starting_voter_id) + " "
+    results = {
+        'success':                  success,
+        'status':                   status,
+        'dry_run':                  dry_run,
+        'chunks':                   chunks,
+        'voters_looked_at':         voters_looked_at,
+        'voters_purged':            voters_purged,
+        'rows_by_table':            rows_by_table,
+        'last_voter_id':            last_voter_id,
+        'all_voters_looked_at':     all_voters_looked_at,
+    }
+    return results
@@ -23,8 +23,8 @@ from position.controllers import retrieve_ballot_item_we_vote_ids_for_organizati
     retrieve_ballot_item_we_vote_ids_for_organization_static
 from position.models import ANY_STANCE, INFORMATION_ONLY, OPPOSE, \
     PositionEntered, PositionManager, PositionListManager, SUPPORT
-from voter.models import fetch_voter_id_from_voter_device_link, fetch_voter_we_vote_id_from_voter_device_link, \
-    fetch_voter_we_vote_id_from_voter_id, VoterManager
+from voter.models import fetch_voter_id_from_voter_device_link, fetch_voter_we_vote_id_from_voter_id, VoterManager
+from voter.voter_context import voter_context_for_voter_device_id
 from voter_guide.models import POSSIBLE_ENDORSEMENT_NUMBER_LIST, POSSIBLE_ENDORSEMENT_NUMBER_LIST_FULL, \
     VoterGuide, VoterGuideListManager, VoterGuideManager, \
     VoterGuidePossibilityManager, VoterGuidePossibilityPosition
@@ -1127,7 +1127,22 @@ def voter_guides_to_follow_retrieve_for_api(voter_device_id,  # voterGuidesToFol
                                             start_retrieve_at_this_number=0,
                                             maximum_number_to_retrieve=0,
                                             filter_voter_guides_by_issue=False,
-                                            add_voter_guides_not_from_election=False):
+                                            add_voter_guides_not_from_election=False,
+                                            voter_context=None):
+    """
+    :param voter_device_id:
+    :param kind_of_ballot_item:
+    :param ballot_item_we_vote_id:
+    :param google_civic_election_id:
+    :param search_string:
+    :param start_retrieve_at_this_number:
+    :param maximum_number_to_retrieve:
+    :param filter_voter_guides_by_issue:
+    :param add_voter_guides_not_from_election:
+    :param voter_context: The request's VoterContext, so the voter it already looked up is reused
+    :return:
+    """
+    voter_context = voter_context_for_voter_device_id(voter_device_id, voter_context)
     voter_we_vote_id = ""
     start_retrieve_at_this_number = convert_to_int(start_retrieve_at_this_number)
     number_retrieved = 0
@@ -1135,8 +1150,7 @@ def voter_guides_to_follow_retrieve_for_api(voter_device_id,  # voterGuidesToFol
     add_voter_guides_not_from_election = positive_value_exists(add_voter_guides_not_from_election)
     status = ""
     # Get voter_id from the voter_device_id so we can figure out which voter_guides to offer
-    results = is_voter_device_id_valid(voter_device_id)
-    if not results['success']:
+    if not voter_context.voter_device_id_valid:
         json_data = {
             'status': 'ERROR_GUIDES_TO_FOLLOW_NO_VOTER_DEVICE_ID',
             'success': False,
@@ -1157,7 +1171,7 @@ def voter_guides_to_follow_retrieve_for_api(voter_device_id,  # voterGuidesToFol
         }
         return results
 
-    voter_id = fetch_voter_id_from_voter_device_link(voter_device_id)
+    voter_id = voter_context.voter_id
     if not positive_value_exists(voter_id):
         json_data = {
             'status': "ERROR_GUIDES_TO_FOLLOW_VOTER_NOT_FOUND_FROM_VOTER_DEVICE_ID",
@@ -1183,7 +1197,7 @@ def voter_guides_to_follow_retrieve_for_api(voter_device_id,  # voterGuidesToFol
     # issues that the voter follows
     organization_we_vote_id_list_for_voter_issues = []
     if filter_voter_guides_by_issue:
-        voter_we_vote_id = fetch_voter_we_vote_id_from_voter_device_link(voter_device_id)
+        voter_we_vote_id = voter_context.voter_we_vote_id
         if not positive_value_exists(voter_we_vote_id):
             json_data = {
                 'status': "ERROR_GUIDES_TO_FOLLOW_VOTER_NOT_FOUND_FROM_VOTER_DEVICE_ID VOTER_WE_VOTE_ID_NOT_FOUND",
@@ -1270,8 +1284,7 @@ def voter_guides_to_follow_retrieve_for_api(voter_device_id,  # voterGuidesToFol
         success = False
 
     if success:
-        voter_manager = VoterManager()
-        results = voter_manager.retrieve_voter_by_id(voter_id, read_only=True)
+        results = voter_context.retrieve_voter_results(read_only=True)
         linked_organization_we_vote_id = ""
         if results['voter_found']:
             voter = results['voter']
@@ -4,7 +4,8 @@
 
 from datetime import datetime, timedelta
 from django.db import models
-from django.db.models import Q
+from django.db.models import Count, Q
+from django.db.models.functions import Substr
 from election.models import ElectionManager, TIME_SPAN_LIST
 from exception.models import handle_exception, handle_record_not_found_exception, \
     handle_record_found_more_than_one_exception
@@ -15,7 +16,8 @@ from organization.models import Organization, OrganizationManager, \
 from pledge_to_vote.models import PledgeToVoteManager
 import pytz
 import wevote_functions.admin
-from wevote_functions.functions import convert_to_int, convert_to_str, positive_value_exists
+from wevote_functions.functions import convert_to_int, convert_to_str, normalize_we_vote_id, \
+    positive_value_exists
 from wevote_settings.models import fetch_site_unique_id_prefix, fetch_next_we_vote_id_voter_guide_integer
 
 logger = wevote_functions.admin.get_logger(__name__)
@@ -186,7 +188,7 @@ class VoterGuideManager(models.Manager):
 
                     voter_guide_on_stage, new_voter_guide_created = VoterGuide.objects.update_or_create(
                         google_civic_election_id__exact=google_civic_election_id,
-                        organization_we_vote_id__iexact=organization_we_vote_id,
+                        organization_we_vote_id=normalize_we_vote_id(organization_we_vote_id),
                         defaults=updated_values)
                     success = True
                     if new_voter_guide_created:
@@ -277,7 +279,7 @@ class VoterGuideManager(models.Manager):
                         updated_values['we_vote_hosted_profile_image_url_tiny'] = we_vote_hosted_profile_image_url_tiny
                     voter_guide_on_stage, new_voter_guide_created = VoterGuide.objects.update_or_create(
                         vote_smart_time_span__exact=vote_smart_time_span,
-                        organization_we_vote_id__iexact=organization_we_vote_id,
+                        organization_we_vote_id=normalize_we_vote_id(organization_we_vote_id),
                         defaults=updated_values)
                     success = True
                     if new_voter_guide_created:
@@ -341,7 +343,7 @@ class VoterGuideManager(models.Manager):
                 voter_guide_on_stage, new_voter_guide_created = VoterGuide.objects.update_or_create(
                     google_civic_election_id__exact=google_civic_election_id,
                     voter_guide_owner_type__iexact=voter_guide_owner_type,
-                    public_figure_we_vote_id__iexact=public_figure_we_vote_id,
+                    public_figure_we_vote_id=normalize_we_vote_id(public_figure_we_vote_id),
                     defaults=updated_values)
                 success = True
                 if new_voter_guide_created:
@@ -416,7 +418,7 @@ class VoterGuideManager(models.Manager):
                 }
                 voter_guide, new_voter_guide_created = VoterGuide.objects.update_or_create(
                     google_civic_election_id__exact=google_civic_election_id,
-                    organization_we_vote_id__iexact=linked_organization_we_vote_id,
+                    organization_we_vote_id=normalize_we_vote_id(linked_organization_we_vote_id),
                     defaults=updated_values)
                 success = True
                 if new_voter_guide_created:
@@ -448,8 +450,9 @@ class VoterGuideManager(models.Manager):
 
         try:
             if positive_value_exists(organization_we_vote_id) and positive_value_exists(google_civic_election_id):
-                voter_guide_query = VoterGuide.objects.filter(google_civic_election_id=google_civic_election_id,
-                                                              organization_we_vote_id__iexact=organization_we_vote_id)
+                voter_guide_query = VoterGuide.objects.filter(
+                    google_civic_election_id=google_civic_election_id,
+                    organization_we_vote_id=normalize_we_vote_id(organization_we_vote_id))
                 voter_guide_found = True if voter_guide_query.count() > 0 else False
         except VoterGuide.MultipleObjectsReturned as e:
             voter_guide_found = True
@@ -495,11 +498,11 @@ class VoterGuideManager(models.Manager):
                 if read_only:
                     voter_guide_on_stage = VoterGuide.objects.using('readonly').get(
                         google_civic_election_id=google_civic_election_id,
-                        organization_we_vote_id__iexact=organization_we_vote_id)
+                        organization_we_vote_id=normalize_we_vote_id(organization_we_vote_id))
                 else:
                     voter_guide_on_stage = VoterGuide.objects.get(
                         google_civic_election_id=google_civic_election_id,
-                        organization_we_vote_id__iexact=organization_we_vote_id)
+                        organization_we_vote_id=normalize_we_vote_id(organization_we_vote_id))
                 voter_guide_on_stage_id = voter_guide_on_stage.id
                 status = "VOTER_GUIDE_FOUND_WITH_ORGANIZATION_WE_VOTE_ID "
             elif positive_value_exists(organization_we_vote_id) and positive_value_exists(vote_smart_time_span):
@@ -507,11 +510,11 @@ class VoterGuideManager(models.Manager):
                 if read_only:
                     voter_guide_on_stage = VoterGuide.objects.using('readonly').get(
                         vote_smart_time_span=vote_smart_time_span,
-                        organization_we_vote_id__iexact=organization_we_vote_id)
+                        organization_we_vote_id=normalize_we_vote_id(organization_we_vote_id))
                 else:
                     voter_guide_on_stage = VoterGuide.objects.get(
                         vote_smart_time_span=vote_smart_time_span,
-                        organization_we_vote_id__iexact=organization_we_vote_id)
+                        organization_we_vote_id=normalize_we_vote_id(organization_we_vote_id))
                 voter_guide_on_stage_id = voter_guide_on_stage.id
                 status = "VOTER_GUIDE_FOUND_WITH_ORGANIZATION_WE_VOTE_ID_AND_TIME_SPAN "
             elif positive_value_exists(public_figure_we_vote_id) and positive_value_exists(google_civic_election_id):
@@ -519,11 +522,11 @@ class VoterGuideManager(models.Manager):
                 if read_only:
                     voter_guide_on_stage = VoterGuide.objects.using('readonly').get(
                         google_civic_election_id=google_civic_election_id,
-                        public_figure_we_vote_id__iexact=public_figure_we_vote_id)
+                        public_figure_we_vote_id=normalize_we_vote_id(public_figure_we_vote_id))
                 else:
                     voter_guide_on_stage = VoterGuide.objects.get(
                         google_civic_election_id=google_civic_election_id,
-                        public_figure_we_vote_id__iexact=public_figure_we_vote_id)
+                        public_figure_we_vote_id=normalize_we_vote_id(public_figure_we_vote_id))
                 voter_guide_on_stage_id = voter_guide_on_stage.id
                 status = "VOTER_GUIDE_FOUND_WITH_PUBLIC_FIGURE_WE_VOTE_ID "
             elif positive_value_exists(owner_we_vote_id) and positive_value_exists(google_civic_election_id):
@@ -531,11 +534,11 @@ class VoterGuideManager(models.Manager):
                 if read_only:
                     voter_guide_on_stage = VoterGuide.objects.using('readonly').get(
                         google_civic_election_id=google_civic_election_id,
-                        owner_we_vote_id__iexact=owner_we_vote_id)
+                        owner_we_vote_id=normalize_we_vote_id(owner_we_vote_id))
                 else:
                     voter_guide_on_stage = VoterGuide.objects.get(
                         google_civic_election_id=google_civic_election_id,
-                        owner_we_vote_id__iexact=owner_we_vote_id)
+                        owner_we_vote_id=normalize_we_vote_id(owner_we_vote_id))
                 voter_guide_on_stage_id = voter_guide_on_stage.id
                 status = "VOTER_GUIDE_FOUND_WITH_VOTER_WE_VOTE_ID "
             else:
@@ -1206,6 +1209,8 @@ class VoterGuideListManager(models.Model):
             if filter_by_this_google_civic_election_id:
                 voter_guide_query = voter_guide_query.filter(
                     google_civic_election_id=filter_by_this_google_civic_election_id)
+            # If we have multiple voter guides for one org, we only want to show the most recent
+            voter_guide_query = self.filter_to_most_recent_voter_guide_for_each_org(voter_guide_query)
             voter_guide_query = voter_guide_query.order_by('-twitter_followers_count')
             voter_guide_list = list(voter_guide_query)
 
@@ -1221,17 +1226,11 @@ class VoterGuideListManager(models.Model):
                      '{error} [type: {error_type}]'.format(error=e.message, error_type=type(e))
             success = False
 
-        # If we have multiple voter guides for one org, we only want to show the most recent
-        if voter_guide_list_found:
-            voter_guide_list_filtered = self.remove_older_voter_guides_for_each_org(voter_guide_list)
-        else:
-            voter_guide_list_filtered = []
-
         results = {
             'success':                      success,
             'status':                       status,
             'voter_guide_list_found':       voter_guide_list_found,
-            'voter_guide_list':             voter_guide_list_filtered,
+            'voter_guide_list':             voter_guide_list,
         }
         return results
 
@@ -1273,13 +1272,13 @@ class VoterGuideListManager(models.Model):
             voter_guide_query = voter_guide_query.exclude(vote_smart_ratings_only=True)
             if positive_value_exists(organization_we_vote_id):
                 voter_guide_query = voter_guide_query.filter(
-                    organization_we_vote_id__iexact=organization_we_vote_id)
+                    organization_we_vote_id=normalize_we_vote_id(organization_we_vote_id))
             elif positive_value_exists(owner_voter_id):
                 voter_guide_query = voter_guide_query.filter(
                     owner_voter_id=owner_voter_id)
             elif positive_value_exists(owner_voter_we_vote_id):
                 voter_guide_query = voter_guide_query.filter(
-                    owner_we_vote_id__iexact=owner_voter_we_vote_id)
+                    owner_we_vote_id=normalize_we_vote_id(owner_voter_we_vote_id))
             voter_guide_list = list(voter_guide_query)
 
             if len(voter_guide_list):
@@ -1399,7 +1398,7 @@ class VoterGuideListManager(models.Model):
             filter_list = Q()
             for item in orgs_we_need_found_by_position_and_time_span_list_of_dicts:
                 filter_list |= Q(vote_smart_time_span=item['vote_smart_time_span'],
-                                 organization_we_vote_id__iexact=item['organization_we_vote_id'])
+                                 organization_we_vote_id=normalize_we_vote_id(item['organization_we_vote_id']))
             voter_guide_query = voter_guide_query.filter(filter_list)
 
             if search_string:
@@ -1490,6 +1489,10 @@ class VoterGuideListManager(models.Model):
                     voter_guide_query = voter_guide_query.exclude(election_day_text__lt=earliest_date_to_show)
                     voter_guide_query = voter_guide_query.exclude(election_day_text__isnull=True)
 
+            if not positive_value_exists(len(google_civic_election_id_list)):
+                # If we haven't specified multiple elections, then remove old voter guides
+                voter_guide_query = self.filter_to_most_recent_voter_guide_for_each_org(voter_guide_query)
+
             if sort_order == 'desc':
                 voter_guide_query = voter_guide_query.order_by('-' + sort_by)[:maximum_number_to_retrieve]
             elif positive_value_exists(sort_by):
@@ -1510,61 +1513,41 @@ class VoterGuideListManager(models.Model):
                      '{error} [type: {error_type}]'.format(error=e, error_type=type(e))
             success = False
 
-        # If we have multiple voter guides for one org, we only want to show the most recent
-        voter_guide_list_filtered = []
-        if voter_guide_list_found:
-            if not positive_value_exists(len(google_civic_election_id_list)):
-                # If we haven't specified multiple elections, then remove old voter guides
-                voter_guide_list_filtered = self.remove_older_voter_guides_for_each_org(voter_guide_list)
-            else:
-                voter_guide_list_filtered = voter_guide_list
-        else:
-            voter_guide_list_filtered = []
-
         results = {
             'success':                      success,
             'status':                       status,
             'voter_guide_list_found':       voter_guide_list_found,
-            'voter_guide_list':             voter_guide_list_filtered,
+            'voter_guide_list':             voter_guide_list,
         }
         return results
 
-    def remove_older_voter_guides_for_each_org(self, voter_guide_list):
-        # If we have multiple voter guides for one org, we only want to show the most recent
-        organization_already_reviewed = []
-        organization_with_multiple_voter_guides = []
-        newest_voter_guide_for_org = {}  # Figure out the newest voter guide per org that we should show
-        for one_voter_guide in voter_guide_list:
-            if one_voter_guide.organization_we_vote_id:
-                if one_voter_guide.organization_we_vote_id not in organization_already_reviewed:
-                    organization_already_reviewed.append(one_voter_guide.organization_we_vote_id)
-                # Are we dealing with a time span (instead of google_civic_election_id)?
-                if positive_value_exists(one_voter_guide.vote_smart_time_span):
-                    # Take the first four digits of one_voter_guide.vote_smart_time_span
-                    first_four_digits = convert_to_int(one_voter_guide.vote_smart_time_span[:4])
-                    # And figure out the newest voter guide for each org
-                    if one_voter_guide.organization_we_vote_id in newest_voter_guide_for_org:
-                        # If we are here, it means we have seen this organization once already
-                        if one_voter_guide.organization_we_vote_id not in organization_with_multiple_voter_guides:
-                            organization_with_multiple_voter_guides.append(one_voter_guide.organization_we_vote_id)
-                        # If this voter guide is newer than the one already looked at, update newest_voter_guide_for_org
-                        if first_four_digits > newest_voter_guide_for_org[one_voter_guide.organization_we_vote_id]:
-                            newest_voter_guide_for_org[one_voter_guide.organization_we_vote_id] = first_four_digits
-                    else:
-                        newest_voter_guide_for_org[one_voter_guide.organization_we_vote_id] = first_four_digits
-
-        voter_guide_list_filtered = []
-        for one_voter_guide in voter_guide_list:
-            if one_voter_guide.organization_we_vote_id in organization_with_multiple_voter_guides:
-                if positive_value_exists(one_voter_guide.vote_smart_time_span):
-                    first_four_digits = convert_to_int(one_voter_guide.vote_smart_time_span[:4])
-                    if newest_voter_guide_for_org[one_voter_guide.organization_we_vote_id] == first_four_digits:
-                        # If this voter guide is the newest from among the org's voter guides, include in results
-                        voter_guide_list_filtered.append(one_voter_guide)
-            else:
-                voter_guide_list_filtered.append(one_voter_guide)
-
-        return voter_guide_list_filtered
+    def filter_to_most_recent_voter_guide_for_each_org(self, voter_guide_query):
+        """
+        If an organization has Vote Smart voter guides for more than one time span, we only want to show the most
+        recent one: the one whose time span starts in the latest year. For those organizations, that is the only voter
+        guide kept, as remove_older_voter_guides_for_each_org did before. Voter guides from every other organization,
+        and voter guides without an organization_we_vote_id, are all kept. This is done in the database (with a
+        Postgres DISTINCT ON subquery) so we don't transfer the older voter guides just to drop them.
+        :param voter_guide_query:
+        :return:
+        """
+        time_span_query = voter_guide_query.exclude(organization_we_vote_id__isnull=True)
+        time_span_query = time_span_query.exclude(organization_we_vote_id='')
+        time_span_query = time_span_query.exclude(vote_smart_time_span__isnull=True)
+        time_span_query = time_span_query.exclude(vote_smart_time_span='')
+        organizations_with_multiple_query = time_span_query.order_by().values('organization_we_vote_id')\
+            .annotate(time_span_voter_guides_count=Count('id')).filter(time_span_voter_guides_count__gt=1)\
+            .values('organization_we_vote_id')
+        # The first four digits of the time span are the year it starts
+        most_recent_voter_guide_ids_query = time_span_query.filter(
+            organization_we_vote_id__in=organizations_with_multiple_query)\
+            .annotate(time_span_start_year=Substr('vote_smart_time_span', 1, 4))\
+            .order_by('organization_we_vote_id', '-time_span_start_year', '-id')\
+            .distinct('organization_we_vote_id').values('id')
+        return voter_guide_query.filter(
+            Q(organization_we_vote_id__isnull=True) | Q(organization_we_vote_id='') |
+            ~Q(organization_we_vote_id__in=organizations_with_multiple_query) |
+            Q(id__in=most_recent_voter_guide_ids_query))
 
     def retrieve_all_voter_guides_order_by(self, order_by='', limit_number=0, search_string='',
                                            google_civic_election_id=0, show_individuals=False):
@@ -1589,7 +1572,7 @@ class VoterGuideListManager(models.Model):
                 for one_word in search_words:
                     filters = []
 
-                    new_filter = Q(we_vote_id__iexact=one_word)
+                    new_filter = Q(we_vote_id=normalize_we_vote_id(one_word))
                     filters.append(new_filter)
 
                     new_filter = Q(display_name__icontains=one_word)
@@ -1598,13 +1581,13 @@ class VoterGuideListManager(models.Model):
                     new_filter = Q(google_civic_election_id__iexact=one_word)
                     filters.append(new_filter)
 
-                    new_filter = Q(organization_we_vote_id__iexact=one_word)
+                    new_filter = Q(organization_we_vote_id=normalize_we_vote_id(one_word))
                     filters.append(new_filter)
 
-                    new_filter = Q(owner_we_vote_id__iexact=one_word)
+                    new_filter = Q(owner_we_vote_id=normalize_we_vote_id(one_word))
                     filters.append(new_filter)
 
-                    new_filter = Q(public_figure_we_vote_id__iexact=one_word)
+                    new_filter = Q(public_figure_we_vote_id=normalize_we_vote_id(one_word))
                     filters.append(new_filter)
 
                     new_filter = Q(state_code__icontains=one_word)
@@ -1683,15 +1666,15 @@ class VoterGuideListManager(models.Model):
 
             # Ignore entries with we_vote_id coming in from master server
             if positive_value_exists(we_vote_id_from_master):
-                voter_guide_query = voter_guide_query.exclude(we_vote_id__iexact=we_vote_id_from_master)
+                voter_guide_query = voter_guide_query.exclude(we_vote_id=normalize_we_vote_id(we_vote_id_from_master))
 
             # We want to find candidates with *any* of these values
             if positive_value_exists(organization_we_vote_id):
-                new_filter = Q(organization_we_vote_id__iexact=organization_we_vote_id)
+                new_filter = Q(organization_we_vote_id=normalize_we_vote_id(organization_we_vote_id))
                 filters.append(new_filter)
 
             if positive_value_exists(public_figure_we_vote_id):
-                new_filter = Q(public_figure_we_vote_id__iexact=public_figure_we_vote_id)
+                new_filter = Q(public_figure_we_vote_id=normalize_we_vote_id(public_figure_we_vote_id))
                 filters.append(new_filter)
 
             if positive_value_exists(twitter_handle):
@@ -1996,7 +1979,7 @@ class VoterGuidePossibilityManager(models.Manager):
                 # TODO: Update this to deal with the google_civic_election_id being spread across 50 fields
                 voter_guide_possibility_on_stage = VoterGuidePossibility.objects.get(
                     google_civic_election_id=google_civic_election_id,
-                    organization_we_vote_id__iexact=organization_we_vote_id)
+                    organization_we_vote_id=normalize_we_vote_id(organization_we_vote_id))
                 voter_guide_possibility_on_stage_id = voter_guide_possibility_on_stage.id
                 status = "VOTER_GUIDE_POSSIBILITY_FOUND_WITH_ORGANIZATION_WE_VOTE_ID"
                 success = True
@@ -2006,7 +1989,7 @@ class VoterGuidePossibilityManager(models.Manager):
                 # TODO: Update this to deal with the google_civic_election_id being spread across 50 fields
                 voter_guide_possibility_on_stage = VoterGuidePossibility.objects.get(
                     google_civic_election_id=google_civic_election_id,
-                    owner_we_vote_id__iexact=owner_we_vote_id)
+                    owner_we_vote_id=normalize_we_vote_id(owner_we_vote_id))
                 voter_guide_possibility_on_stage_id = voter_guide_possibility_on_stage.id
                 status = "VOTER_GUIDE_POSSIBILITY_FOUND_WITH_VOTER_WE_VOTE_ID"
                 success = True
@@ -2087,7 +2070,7 @@ class VoterGuidePossibilityManager(models.Manager):
                     new_filter = Q(organization_name__icontains=one_word)
                     filters.append(new_filter)
 
-                    new_filter = Q(organization_we_vote_id__iexact=one_word)
+                    new_filter = Q(organization_we_vote_id=normalize_we_vote_id(one_word))
                     filters.append(new_filter)
 
                     new_filter = Q(organization_twitter_handle__icontains=one_word)
@@ -2096,7 +2079,7 @@ class VoterGuidePossibilityManager(models.Manager):
                     new_filter = Q(voter_guide_possibility_url__icontains=one_word)
                     filters.append(new_filter)
 
-                    new_filter = Q(voter_who_submitted_we_vote_id__iexact=one_word)
+                    new_filter = Q(voter_who_submitted_we_vote_id=normalize_we_vote_id(one_word))
                     filters.append(new_filter)
 
                     new_filter = Q(voter_who_submitted_name__icontains=one_word)
@@ -2105,7 +2088,7 @@ class VoterGuidePossibilityManager(models.Manager):
                     try:
                         candidate_we_vote_id_query = VoterGuidePossibilityPosition.objects.all()
                         candidate_we_vote_id_query = candidate_we_vote_id_query.filter(
-                            candidate_we_vote_id__iexact=one_word)
+                            candidate_we_vote_id=normalize_we_vote_id(one_word))
                         candidate_we_vote_id_query = candidate_we_vote_id_query.values(
                             'voter_guide_possibility_parent_id').distinct()
                         candidate_voter_guide_possibility_parent_id_dict = list(candidate_we_vote_id_query)
@@ -2116,7 +2099,7 @@ class VoterGuidePossibilityManager(models.Manager):
 
                         measure_we_vote_id_query = VoterGuidePossibilityPosition.objects.all()
                         measure_we_vote_id_query = measure_we_vote_id_query.filter(
-                            measure_we_vote_id__iexact=one_word)
+                            measure_we_vote_id=normalize_we_vote_id(one_word))
                         measure_we_vote_id_query = measure_we_vote_id_query.values(
                             'voter_guide_possibility_parent_id').distinct()
                         measure_voter_guide_possibility_parent_id_dict = list(measure_we_vote_id_query)
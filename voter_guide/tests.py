@@ -0,0 +1,26 @@
+from django.test import TestCase
+
+from voter_guide.models import VoterGuide, VoterGuideListManager
+
+
+class MostRecentVoterGuideForEachOrgTestCase(TestCase):
+
+    def test_orgs_with_several_time_spans_keep_only_the_most_recent(self):
+        for organization_we_vote_id, vote_smart_time_span, google_civic_election_id in [
+                ('wv01org1', None, 1000),
+                ('wv01org1', None, 1001),
+                ('wv01org2', '2014-2015', None),
+                ('wv01org2', '2016-2017', None),
+                ('wv01org2', None, 1000),
+                ('wv01org3', '2016', None),
+                ('wv01org3', None, 1000)]:
+            VoterGuide.objects.create(
+                organization_we_vote_id=organization_we_vote_id, vote_smart_time_span=vote_smart_time_span,
+                google_civic_election_id=google_civic_election_id)
+
+        voter_guide_list = list(VoterGuideListManager().filter_to_most_recent_voter_guide_for_each_org(
+            VoterGuide.objects.all()))
+        self.assertEqual(sorted((voter_guide.organization_we_vote_id, voter_guide.vote_smart_time_span or '',
+                                 voter_guide.google_civic_election_id or 0) for voter_guide in voter_guide_list),
+                         [('wv01org1', '', 1000), ('wv01org1', '', 1001), ('wv01org2', '2016-2017', 0),
+                          ('wv01org3', '', 1000), ('wv01org3', '2016', 0)])
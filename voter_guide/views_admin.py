@@ -37,7 +37,7 @@ from twitter.models import TwitterUserManager
 from voter.models import voter_has_authority, VoterManager
 from wevote_functions.functions import convert_to_int, convert_date_to_we_vote_date_string, \
     extract_facebook_username_from_text_string, \
-    extract_twitter_handle_from_text_string, extract_website_from_url, positive_value_exists, \
+    extract_twitter_handle_from_text_string, extract_website_from_url, normalize_we_vote_id, positive_value_exists, \
     STATE_CODE_MAP, get_voter_device_id, get_voter_api_device_id
 from wevote_settings.models import RemoteRequestHistoryManager, SUGGESTED_VOTER_GUIDE_FROM_PRIOR
 from django.http import HttpResponse
@@ -1578,7 +1578,7 @@ def voter_guide_list_view(request):
         for one_word in search_words:
             filters = []
 
-            new_filter = Q(we_vote_id__iexact=one_word)
+            new_filter = Q(we_vote_id=normalize_we_vote_id(one_word))
             filters.append(new_filter)
 
             new_filter = Q(display_name__icontains=one_word)
@@ -1587,13 +1587,13 @@ def voter_guide_list_view(request):
             new_filter = Q(google_civic_election_id__iexact=one_word)
             filters.append(new_filter)
 
-            new_filter = Q(organization_we_vote_id__iexact=one_word)
+            new_filter = Q(organization_we_vote_id=normalize_we_vote_id(one_word))
             filters.append(new_filter)
 
-            new_filter = Q(owner_we_vote_id__iexact=one_word)
+            new_filter = Q(owner_we_vote_id=normalize_we_vote_id(one_word))
             filters.append(new_filter)
 
-            new_filter = Q(public_figure_we_vote_id__iexact=one_word)
+            new_filter = Q(public_figure_we_vote_id=normalize_we_vote_id(one_word))
             filters.append(new_filter)
 
             new_filter = Q(state_code__icontains=one_word)
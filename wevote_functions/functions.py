@@ -649,6 +649,14 @@ def convert_to_str(value):
     return new_value
 
 
+# We store every we_vote_id in lower case, so we can find it with an exact match, which can use the column's index.
+# (Postgres runs an __iexact lookup as UPPER(column) = UPPER(value), which can't use a plain index.)
+def normalize_we_vote_id(we_vote_id):
+    if not isinstance(we_vote_id, str):
+        return we_vote_id
+    return we_vote_id.strip().lower()
+
+
 # See also 'candidate_party_display' in candidate/models.py
 def convert_to_political_party_constant(raw_party_incoming):
     if not positive_value_exists(raw_party_incoming):
@@ -0,0 +1,63 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import connections, IntegrityError, transaction
+from django.db.models import F
+from django.db.models.functions import Lower, Trim
+from wevote_functions.models import fetch_we_vote_id_field_names
+
+
+class Command(BaseCommand):
+    help = 'Stores every we_vote_id in lower case, in every table. New and changed rows are normalized when they ' \
+           'are saved, so run this once to normalize the rows saved before that, which exact-match lookups ' \
+           'would not find.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('app_label', nargs='*', help='Only normalize the tables of these apps (default: all)')
+        parser.add_argument('--batch_size', type=int, default=1000, help='Number of rows to update at a time')
+        parser.add_argument('--dry_run', action='store_true',
+                            help='Count the rows that need to be normalized, without changing them')
+
+    def database_for_model(self, model):
+        # The analytics tables are in their own database
+        if model._meta.app_label == 'analytics' and 'analytics' in connections.databases:
+            return 'analytics'
+        return 'default'
+
+    def normalize_field(self, model, field_name, batch_size, dry_run):
+        database = self.database_for_model(model)
+        rows_to_normalize_query = model.objects.using(database).exclude(**{field_name + '__isnull': True})
+        rows_to_normalize_query = rows_to_normalize_query.annotate(normalized_we_vote_id=Lower(Trim(field_name)))
+        rows_to_normalize_query = rows_to_normalize_query.exclude(**{field_name: F('normalized_we_vote_id')})
+        if dry_run:
+            return rows_to_normalize_query.count()
+
+        rows_updated = 0
+        while True:
+            id_list = list(rows_to_normalize_query.order_by('pk').values_list('pk', flat=True)[:batch_size])
+            if not len(id_list):
+                break
+            try:
+                with transaction.atomic(using=database):
+                    rows_updated += model.objects.using(database).filter(pk__in=id_list).update(
+                        **{field_name: Lower(Trim(field_name))})
+            except IntegrityError as e:
+                # Two rows with the same we_vote_id in different case. Those need to be merged by hand.
+                self.stderr.write('{}.{}: unable to normalize, {}'.format(model.__name__, field_name, e))
+                break
+        return rows_updated
+
+    def handle(self, *args, **options):
+        total_rows = 0
+        for model in apps.get_models():
+            if options['app_label'] and model._meta.app_label not in options['app_label']:
+                continue
+            if not model._meta.managed or model._meta.proxy:
+                continue
+            for field_name in fetch_we_vote_id_field_names(model):
+                rows = self.normalize_field(model, field_name, max(options['batch_size'], 1), options['dry_run'])
+                if rows:
+                    self.stdout.write('{}.{}: {} rows {}'.format(
+                        model.__name__, field_name, rows,
+                        'to normalize' if options['dry_run'] else 'normalized'))
+                total_rows += rows
+        self.stdout.write('{} rows {}'.format(total_rows, 'to normalize' if options['dry_run'] else 'normalized'))
@@ -0,0 +1,35 @@
+# wevote_functions/models.py
+# Brought to you by We Vote. Be good.
+# -*- coding: UTF-8 -*-
+
+from django.db import models
+from django.db.models.signals import pre_save
+from django.dispatch import receiver
+from .functions import normalize_we_vote_id
+
+# This app doesn't have any tables. Django loads this module for every installed app at startup, which is what we need
+# to store every we_vote_id in lower case, for every model (see normalize_we_vote_id).
+
+_we_vote_id_field_names_by_model = {}
+
+
+def fetch_we_vote_id_field_names(model):
+    """
+    The names of the text fields in this model that hold a we_vote_id, like we_vote_id or voter_we_vote_id
+    :param model:
+    :return:
+    """
+    if model not in _we_vote_id_field_names_by_model:
+        _we_vote_id_field_names_by_model[model] = [
+            field.attname for field in model._meta.concrete_fields
+            if field.attname.endswith('we_vote_id') and isinstance(field, (models.CharField, models.TextField))]
+    return _we_vote_id_field_names_by_model[model]
+
+
+@receiver(pre_save, dispatch_uid='normalize_we_vote_id_fields')
+def normalize_we_vote_id_fields_signal(sender, instance, **kwargs):
+    instance_fields = instance.__dict__
+    for field_name in fetch_we_vote_id_field_names(sender):
+        # Deferred fields aren't saved, so we don't load them just to normalize them
+        if field_name in instance_fields:
+            instance_fields[field_name] = normalize_we_vote_id(instance_fields[field_name])
@@ -2,8 +2,15 @@
 # Brought to you by We Vote. Be good.
 # -*- coding: UTF-8 -*-
 
+from ballot.models import BallotItemListManager
+from contextlib import ExitStack
+from django.db import connections, transaction
 from django.test import TestCase
-from .functions import positive_value_exists
+from django.test.utils import CaptureQueriesContext
+from friend.friend_graph_cache import clear_cached_friend_adjacencies
+from friend.models import FriendManager
+from unittest import skipUnless
+from .functions import normalize_we_vote_id, positive_value_exists
 
 
 class WeVoteFunctionsTestsModels(TestCase):
@@ -74,3 +81,55 @@ class WeVoteFunctionsTestsModels(TestCase):
         value_to_test = []
         self.assertEqual(positive_value_exists(value_to_test), False,
                          "Testing value: {value_to_test}, False expected".format(value_to_test=value_to_test))
+
+    def test_normalize_we_vote_id(self):
+        self.assertEqual(normalize_we_vote_id(' WV01Cand123 '), 'wv01cand123')
+        self.assertEqual(normalize_we_vote_id('wv01org5'), 'wv01org5')
+        self.assertEqual(normalize_we_vote_id(None), None)
+
+
+@skipUnless(connections['default'].vendor == 'postgresql', "EXPLAIN output is checked for PostgreSQL only")
+class WeVoteIdLookupQueryPlanTests(TestCase):
+    """
+    we_vote_id lookups are exact matches so they can use the indexes on those columns. A case-insensitive match
+    (__iexact) turns into UPPER(column) = UPPER(value), which can't use them.
+    """
+
+    def assert_queries_use_indexes(self, captured_queries_list):
+        select_count = 0
+        for captured_queries in captured_queries_list:
+            database_connection = captured_queries.connection
+            for query in captured_queries.captured_queries:
+                if not query['sql'].startswith('SELECT'):
+                    continue
+                select_count += 1
+                with transaction.atomic(using=database_connection.alias):
+                    with database_connection.cursor() as cursor:
+                        # With tiny test tables a sequential scan is always cheapest, so rule it out whenever an
+                        # index can be used instead
+                        cursor.execute("SET LOCAL enable_seqscan = off")
+                        cursor.execute("EXPLAIN " + query['sql'])
+                        query_plan = "\n".join(row[0] for row in cursor.fetchall())
+                self.assertNotIn("Seq Scan", query_plan, "{}\n{}".format(query['sql'], query_plan))
+        self.assertTrue(select_count > 0)
+
+    def capture_queries(self, lookup_function):
+        captured_queries_list = [CaptureQueriesContext(connections[alias])
+                                 for alias in ('default', 'readonly') if alias in connections.databases]
+        with ExitStack() as stack:
+            for captured_queries in captured_queries_list:
+                stack.enter_context(captured_queries)
+            lookup_function()
+        return captured_queries_list
+
+    def test_friends_we_vote_id_list_uses_indexes(self):
+        clear_cached_friend_adjacencies()
+        captured_queries_list = self.capture_queries(
+            lambda: FriendManager().retrieve_friends_we_vote_id_list('WV01VOTER1'))
+        self.assert_queries_use_indexes(captured_queries_list)
+
+    def test_ballot_items_for_polling_location_use_indexes(self):
+        captured_queries_list = self.capture_queries(
+            lambda: BallotItemListManager().retrieve_all_ballot_items_for_polling_location(
+                'wv01ploc1', 0, for_editing=True))
+        self.assert_queries_use_indexes(captured_queries_list)